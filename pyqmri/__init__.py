@@ -21,6 +21,7 @@ from pyqmri.pyqmri import run
 
 from pyqmri._helper_fun.multislice_viewer import imshow as msv
 from pyqmri._helper_fun._utils import gen_default_config as gen_config
+from pyqmri._helper_fun._clprogram import warmCache as warm_cache
 from pyqmri.models.template import BaseModel, constraints
 from pyqmri.models.GeneralModel \
     import genDefaultModelfile as generate_text_models
\ No newline at end of file
@@ -1,2 +1,3 @@
 """Utility functions for Fitting and Reconstruction."""
 from ._clprogram import CLProgram
+from ._clprogram import warmCache
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Block size selection for streamed reconstructions.
+
+Each Stream allocates two device buffers per input and output and device,
+each holding par_slices plus the overlap slices. The device footprint of a
+streamed solver thus grows linearly with par_slices. The block size is
+chosen among the sizes which fit into the global memory of the smallest
+device, either by a timed trial or by the number of transferred slices.
+If the number of slices is not divisible by the block size, the last block
+is padded with slices of its predecessor.
+"""
+import time
+
+import numpy as np
+
+from pyqmri.streaming import Stream
+
+
+def find_streams(*objs, depth=2):
+    """Collect the Stream objects held by objects and their attributes.
+
+    Parameters
+    ----------
+      objs : objects
+        E.g. solvers or operators.
+      depth : int, 2
+        Levels of attributes which are searched.
+
+    Returns
+    -------
+      list of pyqmri.streaming.Stream
+        Each Stream found, only listed once.
+    """
+    streams = []
+    seen = set()
+    level = list(objs)
+    for _ in range(depth+1):
+        children = []
+        for obj in level:
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            if isinstance(obj, Stream):
+                streams.append(obj)
+            elif isinstance(obj, (list, tuple)):
+                children += list(obj)
+            elif hasattr(obj, "__dict__"):
+                children += list(vars(obj).values())
+        level = children
+    return streams
+
+
+def stream_footprint(streams):
+    """Device memory of the Stream buffers per slice and device.
+
+    Buffers shared by several Stream objects, e.g. after concatenation or
+    connecting an output to an input, are counted once.
+
+    Parameters
+    ----------
+      streams : list of pyqmri.streaming.Stream
+        The Stream objects allocated on the devices.
+
+    Returns
+    -------
+      float
+        Bytes per slice of the blocks on each device.
+    """
+    buffers = {}
+    for stream in streams:
+        block_size = stream.slices + stream.overlap
+        for ifun in range(stream.num_fun):
+            # Both buffers of the first device.
+            for i in range(2):
+                for buffer in stream.inp[ifun][i] + [stream.outp[ifun][i]]:
+                    if hasattr(buffer, "nbytes"):
+                        buffers[id(buffer)] = buffer.nbytes / block_size
+    return sum(buffers.values())
+
+
+def time_streams(streams):
+    """Time a single evaluation of Stream objects on zero data.
+
+    Parameters
+    ----------
+      streams : list of pyqmri.streaming.Stream
+        The Stream objects to evaluate. The functions need to accept
+        par=None.
+
+    Returns
+    -------
+      float
+        The wall time in seconds.
+    """
+    start = time.perf_counter()
+    for stream in streams:
+        outp = [np.zeros((stream.nslice,)+buffer.shape[1:], stream.dtype)
+                for buffer in (stream.outp[ifun][0]
+                               for ifun in range(stream.num_fun))]
+        inp = []
+        for ifun in range(stream.num_fun):
+            inp.append([])
+            for buffer in stream.inp[ifun][0]:
+                if (not hasattr(buffer, "shape")
+                        or any(buffer is out[0] for out in stream.outp)):
+                    # Unused or connected to the output of a function.
+                    inp[ifun].append([])
+                else:
+                    inp[ifun].append(
+                        np.zeros((stream.nslice,)+buffer.shape[1:],
+                                 stream.dtype))
+        stream.eval(outp, inp)
+    return time.perf_counter() - start
+
+
+def tune_par_slices(par, bytes_per_slice, trial=None, mem_fraction=0.8,
+                    max_trials=4, min_blocks=4):
+    """Choose the number of slices streamed per block.
+
+    Parameters
+    ----------
+      par : dict
+        Parameter dictionary holding the number of slices (NSlice), the
+        overlap of the blocks (overlap) and the OpenCL contexts (ctx).
+      bytes_per_slice : float
+        Device memory per slice of a block, e.g. from stream_footprint.
+      trial : callable, None
+        Called with a block size and returns the time of a streamed
+        evaluation. If None, the block size with the least transferred
+        slices, including the overlap and padding, is chosen among the
+        sizes which keep min_blocks blocks per device, if possible.
+      mem_fraction : float, 0.8
+        Fraction of the global memory available for the blocks.
+      max_trials : int, 4
+        Maximum number of block sizes passed to trial.
+      min_blocks : int, 4
+        Preferred minimum number of blocks per device, such that transfers
+        and computations overlap.
+
+    Returns
+    -------
+      int
+        The number of slices per block.
+
+    Raises
+    ------
+      ValueError
+        If not even a single slice per block fits on the devices or there
+        are less than two slices per device.
+    """
+    num_dev = len(par["ctx"])
+    mem_size = min(ctx.devices[0].global_mem_size for ctx in par["ctx"])
+    # At least two blocks per device are needed for double buffering.
+    candidates = [
+        slices for slices in range(1, par["NSlice"]-par["overlap"]+1)
+        if -(-par["NSlice"]//slices) >= 2*num_dev
+        and (slices+par["overlap"])*bytes_per_slice <= mem_fraction*mem_size]
+    if not candidates:
+        raise ValueError(
+            "No block size fits on the devices. A single slice needs "
+            "%.1f MB, %.1f MB of device memory are available and at least "
+            "two slices per device are required." % (
+                (1+par["overlap"])*bytes_per_slice/1e6,
+                mem_fraction*mem_size/1e6))
+
+    def transferred(slices):
+        return -(-par["NSlice"]//slices)*(slices+par["overlap"])
+
+    pipelined = [slices for slices in candidates
+                 if -(-par["NSlice"]//slices) >= min_blocks*num_dev]
+    candidates = pipelined or candidates
+    candidates.sort(key=lambda slices: (transferred(slices), -slices))
+    if trial is None:
+        return candidates[0]
+
+    timings = {}
+    for slices in candidates[:max_trials]:
+        timings[slices] = trial(slices)
+        print("Streaming %i slices per block: %.3f s" % (
+            slices, timings[slices]))
+    return min(timings, key=timings.get)
@@ -1,23 +1,159 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """Base for PyOpenCL programs."""
+import os
+import hashlib
+import tempfile
+
 import pyopencl as cl
+from pkg_resources import resource_filename
+from pyqmri._helper_fun._profiler import PROFILER
+
+BUILD_OPTIONS = "-cl-mad-enable -cl-fast-relaxed-math"
+KERNEL_FILES = (
+    'kernels/OpenCL_Kernels.c',
+    'kernels/OpenCL_Kernels_double.c',
+    'kernels/OpenCL_Kernels_streamed.c',
+    'kernels/OpenCL_Kernels_double_streamed.c',
+    'kernels/OpenCL_gridding_single.c',
+    'kernels/OpenCL_gridding_double.c',
+    'kernels/OpenCL_gridding_slicefirst_single.c',
+    'kernels/OpenCL_gridding_slicefirst_double.c')
+
+
+def cacheDir():
+    """Directory of the on-disk program binary cache.
+
+    Can be set with the PYQMRI_CACHE_DIR environment variable and defaults
+    to ~/.cache/pyqmri.
+
+    Returns
+    -------
+      str
+        The path of the cache directory.
+    """
+    return os.environ.get(
+        "PYQMRI_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "pyqmri"))
+
+
+def _cacheKey(device, code, options):
+    key = hashlib.sha256()
+    for item in (device.platform.name,
+                 device.name,
+                 device.version,
+                 device.driver_version,
+                 options,
+                 code):
+        key.update(item.encode())
+        key.update(b"\0")
+    return key.hexdigest()
+
+
+def _loadBinaries(ctx, paths, options):
+    binaries = []
+    for path in paths:
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as binfile:
+            binaries.append(binfile.read())
+    try:
+        prg = cl.Program(ctx, ctx.devices, binaries)
+        prg.build(options)
+    except (cl.Error, RuntimeError):
+        return None
+    return prg
+
+
+def _storeBinaries(prg, paths):
+    try:
+        os.makedirs(os.path.dirname(paths[0]), exist_ok=True)
+        for path, binary in zip(
+                paths, prg.get_info(cl.program_info.BINARIES)):
+            handle, tmppath = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(handle, "wb") as binfile:
+                binfile.write(binary)
+            os.replace(tmppath, path)
+    except OSError:
+        print("Could not write OpenCL program cache to " + cacheDir())
 
 
 class CLProgram():
     """Base class for PyOpenCL kernels.
 
+    Compiled program binaries are stored on disk, keyed by the device,
+    the kernel source, and the build options. Subsequent constructions
+    with identical keys load the binary instead of compiling the source.
+
     Parameters
     ----------
       ctx : PyOpenCL.Context
         The context to compile the code in.
       code : string
         The Kernel to compile
+      options : string, BUILD_OPTIONS
+        The OpenCL compiler options.
+      cache : bool, True
+        Use the on-disk binary cache.
     """
 
-    def __init__(self, ctx, code):
-        self._cl_prg = cl.Program(ctx, code)
-        self._cl_prg.build("-cl-mad-enable -cl-fast-relaxed-math")
+    def __init__(self, ctx, code, options=BUILD_OPTIONS, cache=True):
+        self._cl_prg = None
+        if cache:
+            paths = [os.path.join(cacheDir(),
+                                  _cacheKey(device, code, options) + ".bin")
+                     for device in ctx.devices]
+            self._cl_prg = _loadBinaries(ctx, paths, options)
+        if self._cl_prg is None:
+            self._cl_prg = cl.Program(ctx, code)
+            self._cl_prg.build(options)
+            if cache:
+                _storeBinaries(self._cl_prg, paths)
         self._cl_kernels = self._cl_prg.all_kernels()
         for kernel in self._cl_kernels:
-            self.__dict__[kernel.function_name] = kernel
+            if PROFILER.enabled:
+                self.__dict__[kernel.function_name] = _profiledKernel(kernel)
+            else:
+                self.__dict__[kernel.function_name] = kernel
+
+
+def _profiledKernel(kernel):
+    name = kernel.function_name
+
+    def launch(*args, **kwargs):
+        event = kernel(*args, **kwargs)
+        PROFILER.record(name, event)
+        return event
+    return launch
+
+
+def warmCache(ctx, files=KERNEL_FILES, options=BUILD_OPTIONS):
+    """Compile the PyQMRI kernels ahead of time.
+
+    Populates the on-disk program cache for all devices of the given
+    context, e.g. once per node before a batch of reconstructions.
+    Double precision kernels are skipped on devices without fp64 support.
+
+    Parameters
+    ----------
+      ctx : PyOpenCL.Context
+        The context to compile the code in.
+      files : tuple of str, KERNEL_FILES
+        The kernel files relative to the pyqmri package.
+      options : string, BUILD_OPTIONS
+        The OpenCL compiler options.
+
+    Returns
+    -------
+      list of str
+        The kernel files which were compiled successfully.
+    """
+    compiled = []
+    for kernelfile in files:
+        if "double" in kernelfile and not all(
+                device.double_fp_config for device in ctx.devices):
+            continue
+        with open(resource_filename('pyqmri', kernelfile)) as file:
+            CLProgram(ctx, file.read(), options)
+        compiled.append(kernelfile)
+    return compiled
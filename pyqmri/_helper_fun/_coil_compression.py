@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Compression of the receive coils to fewer virtual coils.
+
+Two methods are available:
+
+  SVD : A single compression matrix for the whole data set is obtained
+    from the principal components of the coil covariance matrix.
+  GCC : Geometric coil compression (see Zhang et al.: Coil compression for
+    accelerated imaging with Cartesian sampling). The data is transformed
+    to image space along the fully sampled readout (the last axis) and a
+    compression matrix is computed for each readout position. Adjacent
+    matrices are aligned to keep the virtual coils smooth along the
+    readout. If the readout is undersampled, SVD compression is used
+    instead.
+
+The same linear combination is applied to the k-space data and to the coil
+sensitivities, thus the compressed data is consistent with the compressed
+forward model.
+"""
+import numpy as np
+
+
+def compress_coils(data, par, method="SVD", ncoils=0, energy=0.99):
+    """Compress the k-space data and coil sensitivities to virtual coils.
+
+    Parameters
+    ----------
+      data : numpy.array
+        The complex k-space data with coils along the second axis.
+      par : dict
+        Parameter dictionary. The coil sensitivities par["C"] and the
+        number of coils par["NC"] are replaced by their compressed
+        counterparts. The Cartesian sampling mask par["mask"] is shared by
+        all coils and is left unchanged.
+      method : str, SVD
+        The compression method, either SVD or GCC. GCC falls back to SVD
+        if the last axis of the mask is not fully sampled.
+      ncoils : int, 0
+        Number of virtual coils. If 0, the smallest number of virtual coils
+        which retains the given energy is used.
+      energy : float, 0.99
+        Fraction of the signal energy to retain if ncoils is 0.
+
+    Returns
+    -------
+      numpy.array
+        The compressed k-space data.
+      int
+        Number of virtual coils.
+      float
+        Fraction of the signal energy retained by the virtual coils.
+
+    Raises
+    ------
+      ValueError
+        If an unknown method is selected or geometric coil compression is
+        requested for non-Cartesian data.
+    """
+    method = method.upper()
+    if method == "SVD":
+        matrices, sing_val = _svdMatrices(data)
+    elif method == "GCC":
+        if par["mask"] is None:
+            raise ValueError(
+                "Geometric coil compression needs a Cartesian readout.")
+        if _fullReadout(par["mask"]):
+            matrices, sing_val = _gccMatrices(data)
+        else:
+            print("The readout is not fully sampled. Falling back to SVD "
+                  "coil compression.")
+            method = "SVD"
+            matrices, sing_val = _svdMatrices(data)
+    else:
+        raise ValueError("Unknown coil compression method " + str(method)
+                         + ". Use SVD or GCC.")
+
+    ncoils = _numVirtualCoils(sing_val, ncoils, energy)
+    retained = (np.sum(sing_val[..., :ncoils]**2)
+                / np.sum(sing_val**2))
+    matrices = matrices[..., :ncoils, :]
+
+    if method == "GCC":
+        matrices = _alignMatrices(matrices)
+        data = np.fft.ifft(data, axis=-1, norm='ortho')
+        data = np.einsum('xvc,sc...x->sv...x', matrices, data)
+        data = np.fft.fft(data, axis=-1, norm='ortho')
+        par["C"] = np.einsum('xvc,c...x->v...x', matrices, par["C"])
+    else:
+        data = np.einsum('vc,sc...->sv...', matrices, data)
+        par["C"] = np.einsum('vc,c...->v...', matrices, par["C"])
+
+    data = np.require(data.astype(par["DTYPE"]), requirements='C')
+    par["C"] = np.require(par["C"].astype(par["DTYPE"]), requirements='C')
+    par["NC"] = ncoils
+    return data, ncoils, retained
+
+
+def _fullReadout(mask):
+    # Each sampled line along the last axis needs to be sampled completely.
+    lines = np.asarray(mask).reshape(-1, np.shape(mask)[-1]) != 0
+    return bool(np.all(lines.any(axis=-1) == lines.all(axis=-1)))
+
+
+def _svdMatrices(data):
+    NC = data.shape[1]
+    cov = np.zeros((NC, NC), dtype=np.complex128)
+    for scan in data:
+        scan = scan.reshape(NC, -1)
+        cov += scan @ scan.conj().T
+    eigval, eigvec = np.linalg.eigh(cov)
+    # eigh sorts ascending
+    sing_val = np.sqrt(np.maximum(eigval[::-1], 0))
+    return eigvec[:, ::-1].conj().T, sing_val
+
+
+def _gccMatrices(data):
+    NC = data.shape[1]
+    hybrid = np.fft.ifft(data, axis=-1, norm='ortho')
+    hybrid = np.moveaxis(hybrid, (-1, 1), (0, 1)).reshape(
+        hybrid.shape[-1], NC, -1)
+    cov = hybrid @ np.conj(np.swapaxes(hybrid, -1, -2))
+    eigval, eigvec = np.linalg.eigh(cov)
+    sing_val = np.sqrt(np.maximum(eigval[:, ::-1], 0))
+    return np.conj(np.swapaxes(eigvec[..., ::-1], -1, -2)), sing_val
+
+
+def _alignMatrices(matrices):
+    # Rotate each matrix onto its predecessor along the readout such that
+    # the virtual coils vary smoothly.
+    matrices = matrices.copy()
+    for x in range(1, matrices.shape[0]):
+        u, _, vh = np.linalg.svd(matrices[x] @ matrices[x-1].conj().T)
+        matrices[x] = (vh.conj().T @ u.conj().T) @ matrices[x]
+    return matrices
+
+
+def _numVirtualCoils(sing_val, ncoils, energy):
+    NC = sing_val.shape[-1]
+    if ncoils > 0:
+        return min(int(ncoils), NC)
+    if not 0 < energy <= 1:
+        raise ValueError("The retained coil energy needs to be in (0, 1].")
+    if sing_val.ndim > 1:
+        sing_val = np.sqrt(np.sum(sing_val**2, axis=0))
+    cum_energy = np.cumsum(sing_val**2) / np.sum(sing_val**2)
+    return min(int(np.searchsorted(cum_energy, energy*(1-1e-12))) + 1, NC)
@@ -9,12 +9,14 @@ inversion joint estimation of coil sensitivities and image content)
 """
 import sys
 import numpy as np
-import ipyparallel as ipp
 import pyopencl.array as clarray
 from pyqmri._helper_fun import _nlinvns_3D as nlinvns3D
 from pyqmri._helper_fun import _nlinvns as nlinvns
 from pyqmri._helper_fun import _goldcomp as goldcomp
 from pyqmri._helper_fun import _utils as utils
+from pyqmri._helper_fun._h5reader import LazyComplexDataset
+from pyqmri._helper_fun._nlinv_pool import NLINVPool
+from pyqmri._helper_fun._nlinvns_cl import NLINVOpenCL
 
 
 def est_coils(data, par, file, args, off, dimreduction):
@@ -49,36 +51,19 @@ def est_coils(data, par, file, args, off, dimreduction):
         numpy.array
             The complex coilsensitivity information.
     """
-    ###########################################################################
-    # Initiate parallel interface #############################################
-    ###########################################################################
-    c = ipp.Client()
     nlinvNewtonSteps = 6
     nlinvRealConstr = False
 
     if args.sms or "Coils_real" in list(file.keys()):
         print("Using precomputed coil sensitivities")
         
-        if "Coils_real" in file.keys():
-            slices_coils = file['Coils_real'][()].shape[1]
-            par["C"] = file['Coils_real'][
-                :,
-                int(slices_coils / 2) - int(np.floor((par["NSlice"]) / 2)) + off:
-                int(slices_coils / 2) + int(np.ceil(par["NSlice"] / 2)) + off,
-                ...] + 1j * file['Coils_imag'][
-                :,
-                int(slices_coils / 2) - int(np.floor((par["NSlice"]) / 2)) + off:
-                int(slices_coils / 2) + int(np.ceil(par["NSlice"] / 2)) + off,
-                ...]
-            par["C"] = par["C"].astype(par["DTYPE"])
-        else:
-            slices_coils = file['Coils'][()].shape[1]
-            par["C"] = file['Coils'][
-                :,
-                int(slices_coils / 2) - int(np.floor((par["NSlice"]) / 2)) + off:
-                int(slices_coils / 2) + int(np.ceil(par["NSlice"] / 2)) + off,
-                ...] 
-            par["C"] = par["C"].astype(par["DTYPE"])
+        coils = LazyComplexDataset.fromFile(file, "Coils", par["DTYPE"])
+        slices_coils = coils.shape[1]
+        par["C"] = coils[
+            :,
+            int(slices_coils / 2) - int(np.floor((par["NSlice"]) / 2)) + off:
+            int(slices_coils / 2) + int(np.ceil(par["NSlice"] / 2)) + off,
+            ...]
         if np.max(dimreduction) > 0:
             #Apply dimreduction in k-space 
             par["C"] = np.fft.fftshift(np.fft.fft2(np.fft.ifftshift(par["C"])))
@@ -124,7 +109,6 @@ def est_coils(data, par, file, args, off, dimreduction):
                 par_coils["is3D"] = par["is3D"]
             FFT = utils.NUFFT(par_coils)
 
-            result = []
             if args.is3Ddata:     
                 sys.stdout.write(
                     "Computing coil sensitivity maps in 3D")
@@ -161,71 +145,55 @@ def est_coils(data, par, file, args, off, dimreduction):
                     dtype=par["DTYPE"],
                     requirements='C')
     
-                result = nlinvns3D.nlinvns(
-                    combinedData, nlinvNewtonSteps,
-                    True, nlinvRealConstr, DTYPE=par["DTYPE"],
-                    DTYPE_real=par["DTYPE_real"])
+                par["C"] = _nlinvVolume(par, args, combinedData,
+                                        nlinvNewtonSteps, nlinvRealConstr)
                 sys.stdout.write("done")
-                par["C"] = result[2:,-1]
             else:
-                for i in range(0, (par["NSlice"])):
-                    sys.stdout.write(
-                        "Computing coil sensitivity map of slice %i \r" %
-                        (i))
-                    sys.stdout.flush()
-    
-                    # RADIAL PART
-                    combinedData = np.transpose(
-                        data[:, :, i, :, :], (1, 0, 2, 3))
-                    combinedData = np.require(
-                        np.reshape(
-                            combinedData,
-                            (1,
-                             par["NC"],
-                                1,
-                                par["NScan"] * par["Nproj"],
-                                par["N"])),
-                        requirements='C') * dcf_coil
-                    tmp_coilData = clarray.zeros(
-                        FFT.queue, (1, 1, 1, par["dimY"], par["dimX"]),
-                        dtype=par["DTYPE"])
-                    coilData = np.zeros(
-                        (par["NC"], par["dimY"], par["dimX"]), dtype=par["DTYPE"])
-                    for j in range(par["NC"]):
-                        tmp_combinedData = clarray.to_device(
-                            FFT.queue, combinedData[None, :, j, ...])
-                        FFT.FFTH(tmp_coilData, tmp_combinedData)
-                        coilData[j, ...] = np.squeeze(tmp_coilData.get())
+                with _nlinvSlices(par, args, nlinvNewtonSteps,
+                                  nlinvRealConstr) as pool:
+                    for i in range(0, (par["NSlice"])):
+                        sys.stdout.write(
+                            "Computing coil sensitivity map of slice %i \r" %
+                            (i))
+                        sys.stdout.flush()
     
-                    combinedData = np.require(
-                        np.fft.fft2(
-                            coilData,
-                            norm=None) /
-                        np.sqrt(
-                            par["dimX"] *
-                            par["dimY"]),
-                        dtype=par["DTYPE"],
-                        requirements='C')
+                        # RADIAL PART
+                        combinedData = np.transpose(
+                            data[:, :, i, :, :], (1, 0, 2, 3))
+                        combinedData = np.require(
+                            np.reshape(
+                                combinedData,
+                                (1,
+                                 par["NC"],
+                                    1,
+                                    par["NScan"] * par["Nproj"],
+                                    par["N"])),
+                            requirements='C') * dcf_coil
+                        tmp_coilData = clarray.zeros(
+                            FFT.queue, (1, 1, 1, par["dimY"], par["dimX"]),
+                            dtype=par["DTYPE"])
+                        coilData = np.zeros(
+                            (par["NC"], par["dimY"], par["dimX"]), dtype=par["DTYPE"])
+                        for j in range(par["NC"]):
+                            tmp_combinedData = clarray.to_device(
+                                FFT.queue, combinedData[None, :, j, ...])
+                            FFT.FFTH(tmp_coilData, tmp_combinedData)
+                            coilData[j, ...] = np.squeeze(tmp_coilData.get())
     
-                    dview = c[int(np.floor(i * len(c) / par["NSlice"]))]
-                    result.append(
-                        dview.apply_sync(
-                            nlinvns.nlinvns,
-                            combinedData,
-                            nlinvNewtonSteps,
-                            True,
-                            nlinvRealConstr,
-                            DTYPE=par["DTYPE"],
-                            DTYPE_real=par["DTYPE_real"]))
+                        combinedData = np.require(
+                            np.fft.fft2(
+                                coilData,
+                                norm=None) /
+                            np.sqrt(
+                                par["dimX"] *
+                                par["dimY"]),
+                            dtype=par["DTYPE"],
+                            requirements='C')
     
-                for i in range(par["NSlice"]):
-                    par["C"][:, i, :, :] = result[i][2:, -1, :, :]
-                    sys.stdout.write("slice %i done \r"
-                                     % (i))
-                    sys.stdout.flush()
-                    if not nlinvRealConstr:
-                        par["phase"][i, :, :] = np.exp(
-                            1j * np.angle(result[i][0, -1, :, :]))
+                        pool.submit(i, combinedData)
+                    par["C"], image = pool.results()
+                if not nlinvRealConstr:
+                    par["phase"] = np.exp(1j * np.angle(image))
             # standardize coil sensitivity profiles
             sumSqrC = np.sqrt(
                 np.sum(
@@ -256,7 +224,6 @@ def est_coils(data, par, file, args, off, dimreduction):
             par["phase"] = np.zeros(
                 (par["NSlice"], par["dimY"], par["dimX"]), dtype=par["DTYPE"])
 
-            result = []
             combinedData = np.sum(data, 0)
             if args.use3Dcoilest:
                 if not args.is3Ddata:
@@ -266,38 +233,23 @@ def est_coils(data, par, file, args, off, dimreduction):
                 sys.stdout.write(
                     "Computing coil sensitivity maps in 3D")
                 sys.stdout.flush()
-                result = nlinvns3D.nlinvns(combinedData, nlinvNewtonSteps,
-                                         True, nlinvRealConstr, DTYPE=par["DTYPE"],
-                                         DTYPE_real=par["DTYPE_real"])
+                par["C"] = _nlinvVolume(par, args, combinedData,
+                                        nlinvNewtonSteps, nlinvRealConstr)
                 sys.stdout.write("done")
-                par["C"] = result[2:,-1]
             else:
-                for i in range(0, (par["NSlice"])):
-                    sys.stdout.write(
-                        "Computing coil sensitivity map of slice %i \r" %
-                        (i))
-                    sys.stdout.flush()
-    
-                    tmp = combinedData[:, i, ...]
-                    dview = c[int(np.floor(i * len(c) / par["NSlice"]))]
-                    result.append(
-                        dview.apply_sync(
-                            nlinvns.nlinvns,
-                            tmp,
-                            nlinvNewtonSteps,
-                            True,
-                            nlinvRealConstr,
-                            DTYPE=par["DTYPE"],
-                            DTYPE_real=par["DTYPE_real"]))
+                with _nlinvSlices(par, args, nlinvNewtonSteps,
+                                  nlinvRealConstr) as pool:
+                    for i in range(0, (par["NSlice"])):
+                        sys.stdout.write(
+                            "Computing coil sensitivity map of slice %i \r" %
+                            (i))
+                        sys.stdout.flush()
     
-                for i in range(par["NSlice"]):
-                    par["C"][:, i, :, :] = result[i][2:, -1, :, :]
-                    sys.stdout.write("slice %i done \r"
-                                     % (i))
-                    sys.stdout.flush()
-                    if not nlinvRealConstr:
-                        par["phase"][i, :, :] = np.exp(
-                            1j * np.angle(result[i][0, -1, :, :]))
+                        tmp = combinedData[:, i, ...]
+                        pool.submit(i, tmp)
+                    par["C"], image = pool.results()
+                if not nlinvRealConstr:
+                    par["phase"] = np.exp(1j * np.angle(image))
 
                     # standardize coil sensitivity profiles
             sumSqrC = np.sqrt(
@@ -323,13 +275,12 @@ def est_coils(data, par, file, args, off, dimreduction):
             print("Using precomputed coil sensitivities")
             slices_coils = file['Coils'].shape[1]
             par["C"] = \
-                file['Coils'][
+                LazyComplexDataset(file['Coils'], dtype=par["DTYPE"])[
                     :,
                     int(slices_coils / 2) -
                     int(np.floor((par["NSlice"]) / 2)) + off:
                     int(slices_coils / 2) +
                     int(np.ceil(par["NSlice"] / 2)) + off, ...]
-            par["C"] = par["C"].astype(par["DTYPE"])
 
     else:
         if args.trafo:
@@ -367,7 +318,6 @@ def est_coils(data, par, file, args, off, dimreduction):
                 par_coils["is3D"] = par["is3D"]
             FFT = utils.NUFFT(par_coils)
 
-            result = []
             if args.is3Ddata:     
                 sys.stdout.write(
                     "Computing coil sensitivity maps in 3D")
@@ -406,68 +356,53 @@ def est_coils(data, par, file, args, off, dimreduction):
                     dtype=par["DTYPE"],
                     requirements='C')
     
-                result = nlinvns3D.nlinvns(combinedData, nlinvNewtonSteps,
-                                         True, nlinvRealConstr, DTYPE=par["DTYPE"],
-                                         DTYPE_real=par["DTYPE_real"])
+                par["C"] = _nlinvVolume(par, args, combinedData,
+                                        nlinvNewtonSteps, nlinvRealConstr)
                 sys.stdout.write("done")
-                par["C"] = result[2:,-1]
             else:
-                for i in range(0, (par["NSlice"])):
-                    sys.stdout.write(
-                        "Computing coil sensitivity map of slice %i \r" %
-                        (i))
-                    sys.stdout.flush()
+                with _nlinvSlices(par, args, nlinvNewtonSteps,
+                                  nlinvRealConstr) as pool:
+                    for i in range(0, (par["NSlice"])):
+                        sys.stdout.write(
+                            "Computing coil sensitivity map of slice %i \r" %
+                            (i))
+                        sys.stdout.flush()
     
-                    combinedData = np.transpose(data[:, :, i, :, :], (1, 0, 2, 3))
-                    combinedData = np.require(
-                        np.reshape(
-                            combinedData,
-                            (1,
-                             par["NC"],
-                                1,
-                                par["NScan"] * par["Nproj"],
-                                par["N"])),
-                        requirements='C') * dcf_coil
-                    tmp_coilData = clarray.zeros(
-                        FFT.queue, (1, 1, 1, par["dimY"], par["dimX"]),
-                        dtype=par["DTYPE"])
-                    coilData = np.zeros(
-                        (par["NC"], par["dimY"], par["dimX"]), dtype=par["DTYPE"])
-                    for j in range(par["NC"]):
-                        tmp_combinedData = clarray.to_device(
-                            FFT.queue, combinedData[None, :, j, ...])
-                        FFT.FFTH(tmp_coilData, tmp_combinedData)
-                        coilData[j, ...] = np.squeeze(tmp_coilData.get())
+                        combinedData = np.transpose(data[:, :, i, :, :], (1, 0, 2, 3))
+                        combinedData = np.require(
+                            np.reshape(
+                                combinedData,
+                                (1,
+                                 par["NC"],
+                                    1,
+                                    par["NScan"] * par["Nproj"],
+                                    par["N"])),
+                            requirements='C') * dcf_coil
+                        tmp_coilData = clarray.zeros(
+                            FFT.queue, (1, 1, 1, par["dimY"], par["dimX"]),
+                            dtype=par["DTYPE"])
+                        coilData = np.zeros(
+                            (par["NC"], par["dimY"], par["dimX"]), dtype=par["DTYPE"])
+                        for j in range(par["NC"]):
+                            tmp_combinedData = clarray.to_device(
+                                FFT.queue, combinedData[None, :, j, ...])
+                            FFT.FFTH(tmp_coilData, tmp_combinedData)
+                            coilData[j, ...] = np.squeeze(tmp_coilData.get())
 
-                    combinedData = np.require(
-                        np.fft.fft2(
-                            coilData,
-                            norm=None) /
-                        np.sqrt(
-                            par["dimX"] *
-                            par["dimY"]),
-                        dtype=par["DTYPE"],
-                        requirements='C')
+                        combinedData = np.require(
+                            np.fft.fft2(
+                                coilData,
+                                norm=None) /
+                            np.sqrt(
+                                par["dimX"] *
+                                par["dimY"]),
+                            dtype=par["DTYPE"],
+                            requirements='C')
     
-                    dview = c[int(np.floor(i * len(c) / par["NSlice"]))]
-                    result.append(
-                        dview.apply_sync(
-                            nlinvns.nlinvns,
-                            combinedData,
-                            nlinvNewtonSteps,
-                            True,
-                            nlinvRealConstr,
-                            DTYPE=par["DTYPE"],
-                            DTYPE_real=par["DTYPE_real"]))
-    
-                for i in range(par["NSlice"]):
-                    par["C"][:, i, :, :] = result[i][2:, -1, :, :]
-                    sys.stdout.write("slice %i done \r"
-                                     % (i))
-                    sys.stdout.flush()
-                    if not nlinvRealConstr:
-                        par["phase"][i, :, :] = np.exp(
-                            1j * np.angle(result[i][0, -1, :, :]))
+                        pool.submit(i, combinedData)
+                    par["C"], image = pool.results()
+                if not nlinvRealConstr:
+                    par["phase"] = np.exp(1j * np.angle(image))
 
                     # standardize coil sensitivity profiles
             sumSqrC = np.sqrt(
@@ -493,7 +428,6 @@ def est_coils(data, par, file, args, off, dimreduction):
             par["phase"] = np.zeros(
                 (par["NSlice"], par["dimY"], par["dimX"]), dtype=par["DTYPE"])
 
-            result = []
             combinedData = np.sum(data, 0)
             if args.use3Dcoilest:
                 if not args.is3Ddata:
@@ -503,40 +437,24 @@ def est_coils(data, par, file, args, off, dimreduction):
                 sys.stdout.write(
                     "Computing coil sensitivity maps in 3D")
                 sys.stdout.flush()
-                result = nlinvns3D.nlinvns(
-                    combinedData, nlinvNewtonSteps,
-                    True, nlinvRealConstr, DTYPE=par["DTYPE"],
-                    DTYPE_real=par["DTYPE_real"])
+                par["C"] = _nlinvVolume(par, args, combinedData,
+                                        nlinvNewtonSteps, nlinvRealConstr)
                 sys.stdout.write("done")
-                par["C"] = result[2:,-1]
             else:
-                for i in range(0, (par["NSlice"])):
-                    sys.stdout.write(
-                        "Computing coil sensitivity map of slice %i \r" %
-                        (i))
-                    sys.stdout.flush()
-    
-                    # RADIAL PART
-                    tmp = combinedData[:, i, ...]
-                    dview = c[int(np.floor(i * len(c) / par["NSlice"]))]
-                    result.append(
-                        dview.apply_sync(
-                            nlinvns.nlinvns,
-                            tmp,
-                            nlinvNewtonSteps,
-                            True,
-                            nlinvRealConstr,
-                            DTYPE=par["DTYPE"],
-                            DTYPE_real=par["DTYPE_real"]))
+                with _nlinvSlices(par, args, nlinvNewtonSteps,
+                                  nlinvRealConstr) as pool:
+                    for i in range(0, (par["NSlice"])):
+                        sys.stdout.write(
+                            "Computing coil sensitivity map of slice %i \r" %
+                            (i))
+                        sys.stdout.flush()
     
-                for i in range(par["NSlice"]):
-                    par["C"][:, i, :, :] = result[i][2:, -1, :, :]
-                    sys.stdout.write("slice %i done \r"
-                                      % (i))
-                    sys.stdout.flush()
-                    if not nlinvRealConstr:
-                        par["phase"][i, :, :] = np.exp(
-                            1j * np.angle(result[i][0, -1, :, :]))
+                        # RADIAL PART
+                        tmp = combinedData[:, i, ...]
+                        pool.submit(i, tmp)
+                    par["C"], image = pool.results()
+                if not nlinvRealConstr:
+                    par["phase"] = np.exp(1j * np.angle(image))
                         # standardize coil sensitivity profiles
             sumSqrC = np.sqrt(
                 np.sum(
@@ -555,3 +473,22 @@ def est_coils(data, par, file, args, off, dimreduction):
             dtype=par["C"].dtype,
             data=par["C"])
         file.flush()
+
+
+def _nlinvSlices(par, args, n, realConstr):
+    shape = (par["NSlice"], par["NC"], par["dimY"], par["dimX"])
+    if args.opencl_coils:
+        return NLINVOpenCL(par, shape, n, realConstr)
+    return NLINVPool(shape, args.coil_workers, n, realConstr,
+                     DTYPE=par["DTYPE"], DTYPE_real=par["DTYPE_real"])
+
+
+def _nlinvVolume(par, args, data, n, realConstr):
+    if args.opencl_coils:
+        with NLINVOpenCL(par, (1,)+data.shape, n, realConstr) as nlinv:
+            nlinv.submit(0, data)
+            return nlinv.results()[0]
+    result = nlinvns3D.nlinvns(data, n, True, realConstr,
+                               DTYPE=par["DTYPE"],
+                               DTYPE_real=par["DTYPE_real"])
+    return result[2:, -1]
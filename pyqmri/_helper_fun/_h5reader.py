@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Lazy complex valued reader for HDF5 datasets."""
+import numpy as np
+
+
+class LazyComplexDataset():
+    """Lazy complex view on HDF5 datasets.
+
+    Nothing is read on construction. Indexing reads only the selected
+    hyperslab, chunked along its first axis, and converts the precision
+    during the read directly into the (preallocated) complex output.
+    Supported layouts are separate real and imaginary datasets, a single
+    real dataset, and complex or compound datasets with two fields.
+
+    Indexing returns C-contiguous numpy arrays, thus the object can be
+    used wherever slice blocks are pulled with ``[idx, ...]``.
+
+    Parameters
+    ----------
+      real : h5py.Dataset
+        The real part, or the complex/compound dataset if imag is None.
+      imag : h5py.Dataset, None
+        The imaginary part.
+      dtype : numpy.dtype, numpy.complex64
+        The complex output precision.
+      chunk_bytes : int, 2**26
+        Upper bound of the temporary buffer per read in bytes.
+
+    Attributes
+    ----------
+      shape : tuple of ints
+        The shape of the dataset.
+      ndim : int
+        The number of dimensions of the dataset.
+      dtype : numpy.dtype
+        The complex output precision.
+    """
+
+    def __init__(self, real, imag=None, dtype=np.complex64,
+                 chunk_bytes=2**26):
+        if imag is not None and real.shape != imag.shape:
+            raise ValueError("Real and imaginary part differ in shape.")
+        if real.dtype.names is not None and len(real.dtype.names) != 2:
+            raise ValueError("Compound datasets need exactly two fields.")
+        self._real = real
+        self._imag = imag
+        self.shape = real.shape
+        self.ndim = len(real.shape)
+        self.dtype = np.dtype(dtype)
+        self._dtype_real = np.empty(0, self.dtype).real.dtype
+        self._chunk_bytes = chunk_bytes
+
+    @staticmethod
+    def fromFile(file, name, dtype=np.complex64):
+        """Create a lazy dataset from the common PyQMRI layouts.
+
+        Looks for the split variants "real_<name>"/"imag_<name>" and
+        "<name>_real"/"<name>_imag" first and for the dataset itself
+        otherwise.
+
+        Parameters
+        ----------
+          file : h5py.File
+            The opened input file.
+          name : str
+            The name of the dataset.
+          dtype : numpy.dtype, numpy.complex64
+            The complex output precision.
+
+        Returns
+        -------
+          LazyComplexDataset
+            The lazy dataset.
+
+        Raises
+        ------
+          KeyError
+            If none of the layouts is present in the file.
+        """
+        for real, imag in (("real_"+name, "imag_"+name),
+                           (name+"_real", name+"_imag")):
+            if real in file.keys() and imag in file.keys():
+                return LazyComplexDataset(file[real], file[imag], dtype)
+        if name in file.keys():
+            return LazyComplexDataset(file[name], dtype=dtype)
+        raise KeyError("Dataset " + name + " not found in file.")
+
+    def _expandKey(self, key):
+        key = np.index_exp[key]
+        if any(item is Ellipsis for item in key):
+            pos = [item is Ellipsis for item in key].index(True)
+            key = (key[:pos]
+                   + (slice(None),)*(self.ndim - len(key) + 1)
+                   + key[pos+1:])
+        return key + (slice(None),)*(self.ndim - len(key))
+
+    def _readChunk(self, key, out):
+        if self._imag is not None:
+            out.real = self._real.astype(self._dtype_real)[key]
+            out.imag = self._imag.astype(self._dtype_real)[key]
+        elif self._real.dtype.names is not None:
+            re_name, im_name = self._real.dtype.names
+            out.real = self._real.fields(re_name)[key]
+            out.imag = self._real.fields(im_name)[key]
+        elif self._real.dtype.kind == 'c':
+            out[...] = self._real.astype(self.dtype)[key]
+        else:
+            out.real = self._real.astype(self._dtype_real)[key]
+            out.imag = 0
+
+    def read(self, key=(), out=None):
+        """Read a hyperslab into a (preallocated) complex array.
+
+        Parameters
+        ----------
+          key : index expression, ()
+            Basic numpy/h5py indexing of the selected hyperslab.
+          out : numpy.Array, None
+            Output buffer of the selected shape and complex type. A new
+            array is allocated if None is passed.
+
+        Returns
+        -------
+          numpy.Array
+            The complex hyperslab.
+        """
+        key = self._expandKey(key)
+        shape = np.broadcast_to(np.empty((), bool), self.shape)[key].shape
+        if out is None:
+            out = np.empty(shape, dtype=self.dtype)
+        elif out.shape != shape:
+            raise ValueError("Output shape " + str(out.shape) +
+                             " does not match selection " + str(shape))
+        if self.ndim == 0 or not isinstance(key[0], slice):
+            self._readChunk(key, out)
+            return out
+
+        rows = range(*key[0].indices(self.shape[0]))
+        row_bytes = (np.prod(shape[1:], dtype=np.int64)
+                     * self.dtype.itemsize)
+        chunk = max(1, int(self._chunk_bytes // max(row_bytes, 1)))
+        for start in range(0, len(rows), chunk):
+            sub = rows[start:start+chunk]
+            stop = sub[-1] + sub.step
+            self._readChunk(
+                (slice(sub[0], stop if stop >= 0 else None, sub.step),)
+                + key[1:],
+                out[start:start+len(sub)])
+        return out
+
+    def __getitem__(self, key):
+        """Read the selected hyperslab as complex array."""
+        return self.read(key)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Compact Cartesian sampling masks.
+
+The compact mask has the shape (scans, slices, dimY, dimX). The sampling
+pattern is shared by all coils and the scan or slice axis is reduced to a
+single entry if the pattern is identical along it. The masking kernels
+broadcast such an axis over all scans or slices.
+"""
+import numpy as np
+
+
+def compact_mask(mask):
+    """Reduce a Cartesian sampling mask to its compact layout.
+
+    Parameters
+    ----------
+      mask : numpy.array
+        The sampling mask. Either a 2D mask (dimY, dimX) shared by all
+        scans and slices, a 3D mask (NSlice, dimY, dimX) shared by all
+        scans, a 4D mask (NScan, NSlice, dimY, dimX) or a mask of the size
+        of the k-space data (NScan, NC, NSlice, dimY, dimX).
+
+    Returns
+    -------
+      numpy.array
+        The compact mask (scans, slices, dimY, dimX) with scans either 1
+        or NScan and slices either 1 or NSlice.
+
+    Raises
+    ------
+      ValueError
+        If the mask has less than 2 or more than 5 dimensions.
+    """
+    if not 2 <= mask.ndim <= 5:
+        raise ValueError("The sampling mask needs to have between 2 and 5 "
+                         "dimensions, got %i." % mask.ndim)
+    if mask.ndim == 5:
+        # All coils are sampled simultaneously.
+        mask = np.max(mask, axis=1)
+    mask = mask.reshape((1,)*(4-mask.ndim) + mask.shape)
+    if np.all(mask == mask[:, :1]):
+        mask = mask[:, :1]
+    if np.all(mask == mask[:1]):
+        mask = mask[:1]
+    return np.require(mask, requirements='C')
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Device memory planning for in-core reconstructions.
+
+The in-core solvers keep all primal, dual and auxiliary variables of the
+whole volume on a single device. The footprint is computed from the
+buffers allocated by the solver, the linear operators and the NUFFT before
+any of them is constructed, such that the reconstruction can be switched
+to streamed mode instead of failing with an allocation error.
+"""
+import numpy as np
+
+INCORE = "in-core"
+STREAMED = "streamed"
+MULTI_DEVICE = "multi-device streamed"
+
+
+def solver_footprint(par, reg_type="TGV", trafo=True, imagespace=False,
+                     soft_sense=False):
+    """Device buffers of an in-core reconstruction.
+
+    The footprint is a lower bound. It holds the variables of the solver
+    and the large temporaries of the operators, including the optional
+    CSR gridding matrices, Toeplitz kernels and temporal subspace buffers.
+    The model, FFT plans, compiled programs and small temporaries are not
+    accounted for.
+
+    Parameters
+    ----------
+      par : dict
+        Parameter dictionary holding the dimensions (NScan, NC, NSlice,
+        dimY, dimX, Nproj, N), the number of unknowns and the data type.
+        The optional entries csr_gridding, toeplitz and subspace add the
+        respective buffers.
+      reg_type : str, TGV
+        The regularization, TGV, TV, ICTGV or ICTV.
+      trafo : bool, True
+        Radial (True) or Cartesian (False) sampling.
+      imagespace : bool, False
+        Fitting in image space, without coils and Fourier transform.
+      soft_sense : bool, False
+        The buffers of the SoftSenseOptimizer instead of the
+        IRGNOptimizer.
+
+    Returns
+    -------
+      list of tuple or None
+        The name and size in bytes of each buffer, None if there is no
+        plan for the regularization.
+    """
+    itemsize = np.dtype(par["DTYPE"]).itemsize
+    itemsize_real = np.dtype(par["DTYPE_real"]).itemsize
+    vol = par["NSlice"]*par["dimY"]*par["dimX"]
+    if soft_sense:
+        unknowns = par["NMaps"]*vol
+    else:
+        unknowns = par["unknowns"]*vol
+        unknowns_TGV = par["unknowns_TGV"]*vol
+    if imagespace:
+        data = par["NScan"]*vol
+    else:
+        data = par["NScan"]*par["NC"]*par["NSlice"]*par["Nproj"]*par["N"]
+
+    if soft_sense:
+        buffers = _softSenseBuffers(reg_type, data, unknowns)
+    else:
+        buffers = _irgnBuffers(reg_type, data, unknowns, unknowns_TGV)
+    if buffers is None:
+        return None
+    if not soft_sense:
+        buffers += [("modelgrad", par["NScan"]*unknowns)]
+    buffers = [(name, size*itemsize) for name, size in buffers]
+    if imagespace:
+        return buffers
+
+    buffers += [("coils", par["NC"]*vol*itemsize)]
+    if trafo:
+        grid = (par["NScan"]*par["NC"]*par["NSlice"]
+                * int(round(par["dimY"]*par["ogf"]))
+                * int(round(par["dimX"]*par["ogf"])))
+        samples = par["NScan"]*par["Nproj"]*par["N"]
+        buffers += [("NUFFT grid", grid*itemsize),
+                    ("NUFFT traj, dcf", 3*samples*itemsize_real)]
+        if par.get("csr_gridding"):
+            buffers += [("CSR gridding", csr_footprint(
+                samples, par["NScan"], int(round(par["dimX"]*par["ogf"])),
+                par["DTYPE_real"])[1])]
+        if par.get("toeplitz"):
+            # Kernels and grids of twice the image size per transformed
+            # dimension, the 2D kernels are shared by all slices.
+            if len(par.get("fft_dim") or ()) == 3:
+                kernel = 8*vol
+                padded = 8*vol
+            else:
+                kernel = 4*par["dimY"]*par["dimX"]
+                padded = 4*vol
+            buffers += [("Toeplitz kernels",
+                         par["NScan"]*kernel*itemsize_real),
+                        ("Toeplitz grid",
+                         par["NScan"]*par["NC"]*padded*itemsize)]
+    else:
+        buffers += [("FFT temporary",
+                     par["NScan"]*par["NC"]*vol*itemsize)]
+        if par.get("mask") is not None:
+            buffers += [("FFT mask", np.asarray(par["mask"]).nbytes)]
+    if par.get("subspace", 0) > 0 and not soft_sense:
+        buffers += [("subspace basis",
+                     par["NScan"]*par["subspace"]*itemsize),
+                    ("subspace images",
+                     par["subspace"]*par["NC"]*vol*itemsize)]
+    return buffers
+
+
+def _irgnBuffers(reg_type, data, unknowns, unknowns_TGV):
+    buffers = [("data", data),
+               ("Ax (twins)", 2*data),
+               ("r (twins)", 2*data)]
+    if reg_type in ("TGV", "TV"):
+        buffers += [("x, xk (twins)", 4*unknowns),
+                    ("Kyk1 (twins)", 2*unknowns),
+                    ("z1 (twins)", 2*4*unknowns),
+                    ("gradx (twins)", 2*4*unknowns)]
+        if reg_type == "TGV":
+            buffers += [("v (twins)", 2*4*unknowns_TGV),
+                        ("Kyk2 (twins)", 2*4*unknowns_TGV),
+                        ("z2 (twins)", 2*8*unknowns),
+                        ("symgradx (twins)", 2*8*unknowns)]
+    elif reg_type == "ICTV":
+        buffers += [("x, v (twins)", 4*unknowns),
+                    ("Kyk1 (twins)", 2*unknowns),
+                    ("Kyk2 (twins)", 2*4*unknowns),
+                    ("z1, z2 (twins)", 2*2*4*unknowns),
+                    ("gradx1-3 (twins)", 3*2*4*unknowns)]
+    elif reg_type == "ICTGV":
+        # Diagonal and off-diagonal entries of the symmetrized gradients.
+        buffers += [("x, v (twins)", 4*unknowns),
+                    ("w1, w2 (twins)", 2*2*4*unknowns),
+                    ("Kyk1, Kyk2 (twins)", 2*2*unknowns),
+                    ("Kyk3, Kyk4 (twins)", 2*2*4*unknowns),
+                    ("z1, z2 (twins)", 2*2*4*unknowns),
+                    ("z3, z4 (twins)", 2*2*12*unknowns),
+                    ("gradx1-3 (twins)", 3*2*4*unknowns),
+                    ("symgradx1, 2 (twins)", 2*2*12*unknowns)]
+    else:
+        return None
+    return buffers
+
+
+def _softSenseBuffers(reg_type, data, unknowns):
+    buffers = [("data", data),
+               ("Kx", data),
+               ("y (twins)", 2*data),
+               ("x (twins)", 2*unknowns),
+               ("Kyk1", unknowns),
+               ("gradx", 4*unknowns)]
+    if reg_type == "TGV":
+        buffers += [("z1 (twins)", 2*4*unknowns),
+                    ("v (twins)", 2*4*unknowns),
+                    ("Kyk2", 4*unknowns),
+                    ("z2 (twins)", 2*8*unknowns),
+                    ("symgradv", 8*unknowns)]
+    elif reg_type == "TV":
+        buffers += [("z (twins)", 2*4*unknowns)]
+    else:
+        return None
+    return buffers
+
+
+def csr_footprint(samples, NScan, gridsize, DTYPE_real, kwidth=2.5):
+    """Estimate the size of the CSR gridding matrices of a radial NUFFT.
+
+    The number of non-zeros is approximated by the area of the circular
+    gridding kernel times the number of k-space samples of all scans. Both
+    the forward matrix and its transpose are stored in CSR format with 32
+    bit indices.
+
+    Parameters
+    ----------
+      samples : int
+        The number of k-space samples of all scans.
+      NScan : int
+        The number of scans.
+      gridsize : int
+        The size of the (square) overgridded k-space.
+      DTYPE_real : numpy.dtype
+        The real precision type of the matrix values.
+      kwidth : float, 2.5
+        The radius of the gridding kernel.
+
+    Returns
+    -------
+      tuple of ints
+        The estimated number of non-zeros and bytes of both matrices.
+    """
+    nnz = int(np.ceil(samples * np.pi * kwidth**2))
+    nrows = samples + NScan * gridsize**2 + 2
+    nbytes = (2 * nnz * (np.dtype(np.int32).itemsize
+                         + np.dtype(DTYPE_real).itemsize)
+              + nrows * np.dtype(np.int32).itemsize)
+    return nnz, nbytes
+
+
+def plan_mode(footprint, device, num_devices=1, mem_fraction=0.9):
+    """Choose between in-core and streamed reconstruction.
+
+    Parameters
+    ----------
+      footprint : list of tuple
+        Name and size in bytes of each buffer, see solver_footprint.
+      device : pyopencl.Device
+        The device of the in-core reconstruction.
+      num_devices : int, 1
+        Number of devices available for streaming.
+      mem_fraction : float, 0.9
+        Fraction of the global memory available for the buffers.
+
+    Returns
+    -------
+      str
+        INCORE if all buffers fit on the device, otherwise STREAMED or,
+        given several devices, MULTI_DEVICE.
+    """
+    total = sum(size for _, size in footprint)
+    largest = max(size for _, size in footprint)
+    if (total <= mem_fraction*device.global_mem_size
+            and largest <= device.max_mem_alloc_size):
+        return INCORE
+    if num_devices > 1:
+        return MULTI_DEVICE
+    return STREAMED
+
+
+def print_footprint(footprint, device, mem_fraction=0.9):
+    """Print the size of each buffer and the available device memory.
+
+    Parameters
+    ----------
+      footprint : list of tuple
+        Name and size in bytes of each buffer, see solver_footprint.
+      device : pyopencl.Device
+        The device of the in-core reconstruction.
+      mem_fraction : float, 0.9
+        Fraction of the global memory available for the buffers.
+    """
+    print("Device memory of the in-core reconstruction:")
+    for name, size in footprint:
+        print("  %-20s %10.1f MB" % (name, size/1e6))
+    print("  %-20s %10.1f MB" % (
+        "total", sum(size for _, size in footprint)/1e6))
+    print("  %-20s %10.1f MB" % (
+        "available", mem_fraction*device.global_mem_size/1e6))
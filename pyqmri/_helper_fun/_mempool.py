@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Process wide pools of device memory.
+
+All operators, NUFFTs and solvers on an OpenCL context allocate their
+arrays from a single pyopencl.tools.MemoryPool. Released arrays are held by
+the pool and handed out again for allocations of the same size, thus the
+large variables allocated anew in every Gauss-Newton step neither call into
+the driver nor fragment the device memory. Each object still owns its
+temporaries, as the kernels reading them are not ordered across objects on
+out-of-order queues. A pool lives as long as any object allocating from
+it, such that the held memory is returned to the device together with the
+context. FFT plans and the CSR gridding matrices of radial NUFFTs are kept
+by the pool for the same reason and released with the last object on the
+context.
+"""
+import collections
+import weakref
+
+import pyopencl.tools as cl_tools
+
+_pools = weakref.WeakValueDictionary()
+
+
+class DevicePool():
+    """Memory pool of an OpenCL context with usage statistics.
+
+    The object is passed as allocator to PyOpenCL.Array functions.
+
+    Parameters
+    ----------
+      queue : PyOpenCL.Queue
+        A queue of the context to allocate from.
+
+    Attributes
+    ----------
+      peak_bytes : int
+        The maximum of the allocated bytes in use so far.
+      fft_plans : collections.OrderedDict
+        FFT plans of the context in least recently used order, see
+        pyqmri.transforms.fftPlan.
+      csr_matrices : collections.OrderedDict
+        Device CSR gridding matrices of the context per trajectory in
+        least recently used order.
+    """
+
+    def __init__(self, queue):
+        self._pool = cl_tools.MemoryPool(cl_tools.ImmediateAllocator(queue))
+        self.fft_plans = collections.OrderedDict()
+        self.csr_matrices = collections.OrderedDict()
+        self.peak_bytes = 0
+
+    def __call__(self, size):
+        """Allocate a buffer of size bytes from the pool."""
+        buffer = self._pool.allocate(size)
+        self._updatePeak()
+        return buffer
+
+    def _updatePeak(self):
+        self.peak_bytes = max(self.peak_bytes, self._pool.active_bytes)
+
+    @property
+    def active_bytes(self):
+        """int: Bytes of the buffers in use."""
+        return self._pool.active_bytes
+
+    @property
+    def held_bytes(self):
+        """int: Bytes of released buffers held for reuse."""
+        return self._pool.managed_bytes - self._pool.active_bytes
+
+    def freeHeld(self):
+        """Return the buffers held for reuse to the device."""
+        self._pool.free_held()
+
+    def report(self):
+        """Usage of the pool in MB.
+
+        Returns
+        -------
+          str
+            The current, peak and held memory.
+        """
+        return ("current %.1f MB, peak %.1f MB, held %.1f MB" % (
+            self.active_bytes/1e6, self.peak_bytes/1e6,
+            self.held_bytes/1e6))
+
+
+def device_pool(queue):
+    """Get the memory pool of the context of a queue.
+
+    Parameters
+    ----------
+      queue : PyOpenCL.Queue
+        A queue of the context.
+
+    Returns
+    -------
+      DevicePool
+        The pool shared by all objects on the context.
+    """
+    key = queue.context.int_ptr
+    pool = _pools.get(key)
+    if pool is None:
+        pool = DevicePool(queue)
+        _pools[key] = pool
+    return pool
+
+
+def report_pools():
+    """Print the usage of the memory pool of each context."""
+    for key, pool in list(_pools.items()):
+        print("Device memory pool %#x: %s" % (key, pool.report()))
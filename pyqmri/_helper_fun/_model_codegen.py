@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""OpenCL code generation for sympy signal models."""
+import hashlib
+
+import numpy as np
+import sympy
+import pyopencl.array as clarray
+
+from pyqmri._helper_fun._clprogram import CLProgram as Program
+
+# Model kernels keep IEEE semantics, non finite values are replaced.
+MODEL_BUILD_OPTIONS = "-cl-mad-enable"
+
+_COMPLEX_HELPERS = """
+inline {c} cmult({c} a, {c} b)
+{{
+    return ({c})(a.x*b.x-a.y*b.y, a.x*b.y+a.y*b.x);
+}}
+
+inline {c} cdiv({c} a, {c} b)
+{{
+    {r} den = b.x*b.x+b.y*b.y;
+    return ({c})((a.x*b.x+a.y*b.y)/den, (a.y*b.x-a.x*b.y)/den);
+}}
+
+inline {c} cexp_({c} a)
+{{
+    return exp(a.x)*({c})(cos(a.y), sin(a.y));
+}}
+
+inline {c} clog_({c} a)
+{{
+    return ({c})(log(hypot(a.x, a.y)), atan2(a.y, a.x));
+}}
+
+inline {c} csqrt_({c} a)
+{{
+    {r} r = hypot(a.x, a.y);
+    return ({c})(sqrt((r+a.x)/2), copysign(sqrt((r-a.x)/2), a.y));
+}}
+
+inline {c} csin_({c} a)
+{{
+    return ({c})(sin(a.x)*cosh(a.y), cos(a.x)*sinh(a.y));
+}}
+
+inline {c} ccos_({c} a)
+{{
+    return ({c})(cos(a.x)*cosh(a.y), -sin(a.x)*sinh(a.y));
+}}
+
+inline {c} csinh_({c} a)
+{{
+    return ({c})(sinh(a.x)*cos(a.y), cosh(a.x)*sin(a.y));
+}}
+
+inline {c} ccosh_({c} a)
+{{
+    return ({c})(cosh(a.x)*cos(a.y), sinh(a.x)*sin(a.y));
+}}
+
+inline {c} ctan_({c} a)
+{{
+    return cdiv(csin_(a), ccos_(a));
+}}
+
+inline {c} ctanh_({c} a)
+{{
+    return cdiv(csinh_(a), ccosh_(a));
+}}
+
+inline {c} cpowi({c} a, int n)
+{{
+    {c} res = ({c})(1, 0);
+    for (int k=0; k<n; k++)
+        res = cmult(res, a);
+    return res;
+}}
+
+inline {c} cpow_({c} a, {c} b)
+{{
+    if (a.x == 0 && a.y == 0)
+        return ({c})(0, 0);
+    return cexp_(cmult(b, clog_(a)));
+}}
+
+inline {c} finite_or_tiny({c} a)
+{{
+    if (!isfinite(a.x) || !isfinite(a.y))
+        return ({c})(1e-20, 0);
+    return a;
+}}
+"""
+
+_FUNCTIONS = {
+    sympy.exp: "cexp_",
+    sympy.log: "clog_",
+    sympy.sin: "csin_",
+    sympy.cos: "ccos_",
+    sympy.tan: "ctan_",
+    sympy.sinh: "csinh_",
+    sympy.cosh: "ccosh_",
+    sympy.tanh: "ctanh_"}
+
+
+class _ComplexPrinter():
+    def __init__(self, names, ctype, suffix):
+        self._names = names
+        self._c = ctype
+        self._suffix = suffix
+
+    def _real(self, value):
+        return repr(float(value)) + self._suffix
+
+    def _const(self, value):
+        value = complex(value)
+        return "(%s)(%s, %s)" % (self._c, self._real(value.real),
+                                 self._real(value.imag))
+
+    def _pow(self, base, exp):
+        if exp.is_Integer and 0 < exp <= 16:
+            if exp == 1:
+                return self.doprint(base)
+            return "cpowi(%s, %d)" % (self.doprint(base), int(exp))
+        if exp == sympy.Rational(1, 2):
+            return "csqrt_(%s)" % self.doprint(base)
+        return "cpow_(%s, %s)" % (self.doprint(base), self.doprint(exp))
+
+    def _mul(self, factors):
+        if not factors:
+            return self._const(1)
+        code = self.doprint(factors[0])
+        for factor in factors[1:]:
+            code = "cmult(%s, %s)" % (code, self.doprint(factor))
+        return code
+
+    def doprint(self, expr):
+        if expr in self._names:
+            return self._names[expr]
+        if expr.is_Number or expr is sympy.I or expr.is_NumberSymbol:
+            return self._const(sympy.N(expr))
+        if expr.is_Add:
+            return "(" + " + ".join(
+                self.doprint(arg) for arg in expr.args) + ")"
+        if expr.is_Mul:
+            coeff, rest = expr.as_coeff_Mul()
+            num = []
+            den = []
+            for factor in sympy.Mul.make_args(rest):
+                if (factor.is_Pow and factor.exp.is_Number
+                        and factor.exp < 0):
+                    den.append(sympy.Pow(factor.base, -factor.exp))
+                else:
+                    num.append(factor)
+            code = self._mul(num)
+            if den:
+                code = "cdiv(%s, %s)" % (code, self._mul(den))
+            if coeff == 1:
+                return code
+            if coeff == -1:
+                return "(-%s)" % code
+            return "(%s*%s)" % (self._real(coeff), code)
+        if expr.is_Pow:
+            if expr.exp.is_Number and expr.exp < 0:
+                return "cdiv(%s, %s)" % (
+                    self._const(1),
+                    self._pow(expr.base, -expr.exp))
+            return self._pow(expr.base, expr.exp)
+        if expr.func in _FUNCTIONS:
+            return "%s(%s)" % (_FUNCTIONS[expr.func],
+                               self.doprint(expr.args[0]))
+        if isinstance(expr, sympy.Abs):
+            arg = self.doprint(expr.args[0])
+            return "(%s)(hypot((%s).x, (%s).y), 0)" % (self._c, arg, arg)
+        if isinstance(expr, sympy.re):
+            return "(%s)((%s).x, 0)" % (self._c, self.doprint(expr.args[0]))
+        if isinstance(expr, sympy.im):
+            return "(%s)((%s).y, 0)" % (self._c, self.doprint(expr.args[0]))
+        if isinstance(expr, sympy.conjugate):
+            arg = self.doprint(expr.args[0])
+            return "(%s)((%s).x, -(%s).y)" % (self._c, arg, arg)
+        raise NotImplementedError(
+            "No OpenCL code generation for " + str(expr.func))
+
+
+class SympyCLModel():
+    """OpenCL evaluation of a sympy signal model and its Jacobian.
+
+    Emits OpenCL C for the signal equation and all partial derivatives
+    with common subexpression elimination. All quantities are evaluated in
+    complex arithmetic to match the NumPy evaluation of the lambdified
+    expressions. Model parameters are uploaded once in their stored shape
+    and broadcast in the kernel. The generated code is compiled through
+    CLProgram and thus cached on disk, keyed by the code hash which
+    includes the model and the parameter layout.
+
+    Parameters
+    ----------
+      signaleq : sympy.Expr
+        The signal equation.
+      unknowns : list of sympy.Symbol
+        The unknowns of the model.
+      uk_scale : list of sympy.Symbol
+        The scaling factors of the unknowns.
+      modelpar : list of sympy.Symbol
+        The sequence parameters of the model.
+      modelparams : list of numpy.Array or float
+        The values of the sequence parameters, broadcastable to
+        (NScan, NSlice, dimY, dimX).
+      shape : tuple of int
+        The output shape (NScan, NSlice, dimY, dimX).
+      phase : bool, False
+        Multiply the signal and derivatives by an individual phase.
+      DTYPE : numpy.dtype, numpy.complex64
+        Complex working precission.
+
+    Attributes
+    ----------
+      code : str
+        The generated OpenCL code.
+      key : str
+        The hash of the generated code.
+
+    Raises
+    ------
+      NotImplementedError
+        If the model contains functions without OpenCL translation.
+      ValueError
+        If a model parameter is not broadcastable to the output shape.
+    """
+
+    def __init__(self, signaleq, unknowns, uk_scale, modelpar, modelparams,
+                 shape, phase=False, DTYPE=np.complex64):
+        self.shape = tuple(shape)
+        self._DTYPE = DTYPE
+        self._nuk = len(unknowns)
+        self._phase = phase
+        self._params = []
+        strides = []
+        for value in modelparams:
+            value = np.require(np.asarray(value, dtype=DTYPE),
+                               requirements='C')
+            while value.ndim > len(self.shape) and value.shape[0] == 1:
+                value = value[0]
+            view = np.broadcast_to(value, self.shape)
+            strides.append([s // value.itemsize for s in view.strides])
+            self._params.append(value)
+        self._prg = {}
+        self._buffers = {}
+
+        if DTYPE == np.complex128:
+            ctype, rtype, suffix = "double2", "double", ""
+        else:
+            ctype, rtype, suffix = "float2", "float", "f"
+        names = {}
+        for j, uk in enumerate(unknowns):
+            names[uk] = "x%d" % j
+        for j, scale in enumerate(uk_scale):
+            names[scale] = "(%s)(sc%d, 0)" % (ctype, j)
+        for j, mypar in enumerate(modelpar):
+            names[mypar] = "p%d" % j
+        printer = _ComplexPrinter(names, ctype, suffix)
+
+        grads = [sympy.diff(signaleq, uk) for uk in unknowns]
+        args = ", ".join(
+            ["__global const %s *x" % ctype]
+            + ["__global const %s *par%d" % (ctype, j)
+               for j in range(len(modelpar))]
+            + ["__global const %s *phase" % ctype]
+            + ["const %s sc%d" % (rtype, j) for j in range(self._nuk)])
+        code = ["#define NSCAN %d" % self.shape[0],
+                _COMPLEX_HELPERS.format(c=ctype, r=rtype)]
+        for kernel, exprs in (("model_forward", [signaleq]),
+                              ("model_gradient", grads)):
+            tmps, reduced = sympy.cse(
+                exprs, symbols=sympy.numbered_symbols("cse"))
+            body = []
+            for j in range(self._nuk):
+                body.append("    const %s x%d = x[%d*NVOX+vox];"
+                            % (ctype, j, j))
+            body.append("    for (size_t scan=0; scan<NSCAN; scan++)")
+            body.append("    {")
+            for j, stride in enumerate(strides):
+                body.append(
+                    "        const %s p%d = par%d[scan*%d+slice*%d+y*%d"
+                    "+x_*%d];" % ((ctype, j, j) + tuple(stride)))
+            for tmp, expr in tmps:
+                tmpname = "t" + str(tmp)
+                body.append("        const %s %s = %s;"
+                            % (ctype, tmpname, printer.doprint(expr)))
+                names[tmp] = tmpname
+            for j, expr in enumerate(reduced):
+                value = printer.doprint(expr)
+                if phase:
+                    value = "cmult(%s, phase[scan*NVOX+vox])" % value
+                body.append(
+                    "        out[(%d*NSCAN+scan)*NVOX+vox] = "
+                    "finite_or_tiny(%s);" % (j, value))
+            body.append("    }")
+            code.append(
+                "__kernel void %s(__global %s *out, %s)\n{\n"
+                "    size_t Nx = get_global_size(2), Ny = get_global_size(1);"
+                "\n    size_t NVOX = get_global_size(0)*Ny*Nx;\n"
+                "    size_t slice = get_global_id(0), y = get_global_id(1);\n"
+                "    size_t x_ = get_global_id(2);\n"
+                "    size_t vox = (slice*Ny+y)*Nx+x_;\n%s\n}\n"
+                % (kernel, ctype, args, "\n".join(body)))
+            for tmp, _ in tmps:
+                del names[tmp]
+        self.code = "\n".join(code)
+        self.key = hashlib.sha256(self.code.encode()).hexdigest()
+
+    def _setup(self, queue):
+        ctx = queue.context
+        if ctx.int_ptr not in self._prg:
+            self._prg[ctx.int_ptr] = Program(
+                ctx, self.code, options=MODEL_BUILD_OPTIONS)
+            self._buffers[ctx.int_ptr] = [
+                clarray.to_device(queue, value) for value in self._params]
+        return self._prg[ctx.int_ptr], self._buffers[ctx.int_ptr]
+
+    def _eval(self, kernel, nout, x, uk_scale, phase, out):
+        prg, params = self._setup(x.queue)
+        if out is None:
+            out = clarray.empty(x.queue, (nout,)+self.shape,
+                                dtype=self._DTYPE)
+        if phase is None:
+            phase = params[0] if params else x
+        real = np.empty(0, self._DTYPE).real.dtype.type
+        out.add_event(getattr(prg, kernel)(
+            x.queue, self.shape[1:], None, out.data, x.data,
+            *[param.data for param in params], phase.data,
+            *[real(scale) for scale in uk_scale],
+            wait_for=out.events + x.events + phase.events))
+        return out
+
+    def forward(self, x, uk_scale, phase=None, out=None):
+        """Evaluate the signal equation on the device.
+
+        Parameters
+        ----------
+          x : PyOpenCL.Array
+            The unknowns (unknowns, NSlice, dimY, dimX).
+          uk_scale : list of float
+            The scaling factors of the unknowns.
+          phase : PyOpenCL.Array, None
+            The individual phase (NScan, NSlice, dimY, dimX).
+          out : PyOpenCL.Array, None
+            The output (NScan, NSlice, dimY, dimX).
+
+        Returns
+        -------
+          PyOpenCL.Array
+            The signal.
+        """
+        if out is not None:
+            out = out.reshape((1,)+self.shape)
+        return self._eval("model_forward", 1, x, uk_scale, phase,
+                          out).reshape(self.shape)
+
+    def gradient(self, x, uk_scale, phase=None, out=None):
+        """Evaluate all partial derivatives on the device.
+
+        Parameters
+        ----------
+          x : PyOpenCL.Array
+            The unknowns (unknowns, NSlice, dimY, dimX).
+          uk_scale : list of float
+            The scaling factors of the unknowns.
+          phase : PyOpenCL.Array, None
+            The individual phase (NScan, NSlice, dimY, dimX).
+          out : PyOpenCL.Array, None
+            The output (unknowns, NScan, NSlice, dimY, dimX).
+
+        Returns
+        -------
+          PyOpenCL.Array
+            The partial derivatives.
+        """
+        return self._eval("model_gradient", self._nuk, x, uk_scale, phase,
+                          out)
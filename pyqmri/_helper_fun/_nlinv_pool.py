@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Process pool for slice-wise NLINV coil sensitivity estimation."""
+import os
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pyqmri._helper_fun import _nlinvns as nlinvns
+
+_SINGLE_THREAD_ENV = ("OMP_NUM_THREADS",
+                      "OPENBLAS_NUM_THREADS",
+                      "MKL_NUM_THREADS",
+                      "NUMEXPR_NUM_THREADS",
+                      "PYFFTW_NUM_THREADS")
+
+_worker = {}
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13. Spawned workers share the resource tracker of the
+        # parent, which owns and unlinks the segments.
+        return shared_memory.SharedMemory(name=name)
+
+
+def _initWorker(in_name, in_shape, out_name, out_shape, DTYPE):
+    import pyfftw
+    pyfftw.config.NUM_THREADS = 1
+    _worker["shm"] = (_attach(in_name), _attach(out_name))
+    _worker["inp"] = np.ndarray(in_shape, dtype=DTYPE,
+                                buffer=_worker["shm"][0].buf)
+    _worker["out"] = np.ndarray(out_shape, dtype=DTYPE,
+                                buffer=_worker["shm"][1].buf)
+
+
+def _nlinvSlice(islice, n, realConstr, DTYPE, DTYPE_real):
+    result = nlinvns.nlinvns(_worker["inp"][islice], n, True, realConstr,
+                             DTYPE=DTYPE, DTYPE_real=DTYPE_real)
+    _worker["out"][islice] = result[:, -1]
+    return islice
+
+
+class NLINVPool():
+    """Parallel slice-wise NLINV coil sensitivity estimation.
+
+    Slices are processed asynchronously in a pool of local worker
+    processes. Input and output slices are exchanged via shared memory,
+    thus only the slice index is sent to the workers. As submit returns
+    immediately, the preparation (e.g. gridding) of the next slice
+    overlaps with the estimation of the already submitted ones.
+    Each worker runs pyFFTW and BLAS single-threaded to avoid
+    oversubscription.
+
+    Workers are started with the spawn method, which requires scripts
+    using PyQMRI to guard their entry point with
+    ``if __name__ == "__main__":``.
+
+    Parameters
+    ----------
+      shape : tuple of int
+        The shape of the k-space data (NSlice, NC, dimY, dimX).
+      workers : int, 0
+        Number of worker processes. Defaults to the number of CPU cores,
+        at most one per slice, if 0 is passed.
+      n : int, 6
+        Number of Gauss-Newton steps.
+      realConstr : bool, False
+        Real value constraint on the image.
+      DTYPE : numpy.dtype, numpy.complex64
+        Complex working precission.
+      DTYPE_real : numpy.dtype, numpy.float32
+        Real working precission.
+    """
+
+    def __init__(self, shape, workers=0, n=6, realConstr=False,
+                 DTYPE=np.complex64, DTYPE_real=np.float32):
+        self._n = n
+        self._realConstr = realConstr
+        self._DTYPE = DTYPE
+        self._DTYPE_real = DTYPE_real
+        self._pending = []
+        self._pool = None
+        self._shm = []
+        in_shape = tuple(shape)
+        out_shape = (in_shape[0], in_shape[1]+2) + in_shape[2:]
+        itemsize = np.dtype(DTYPE).itemsize
+        self._shm = [
+            shared_memory.SharedMemory(
+                create=True, size=int(np.prod(in_shape))*itemsize),
+            shared_memory.SharedMemory(
+                create=True, size=int(np.prod(out_shape))*itemsize)]
+        self._inp = np.ndarray(in_shape, dtype=DTYPE,
+                               buffer=self._shm[0].buf)
+        self._out = np.ndarray(out_shape, dtype=DTYPE,
+                                buffer=self._shm[1].buf)
+
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, in_shape[0]))
+        environ = {key: os.environ.get(key) for key in _SINGLE_THREAD_ENV}
+        os.environ.update({key: "1" for key in _SINGLE_THREAD_ENV})
+        try:
+            self._pool = mp.get_context("spawn").Pool(
+                workers,
+                initializer=_initWorker,
+                initargs=(self._shm[0].name, in_shape,
+                          self._shm[1].name, out_shape, DTYPE))
+        except BaseException:
+            self.close()
+            raise
+        finally:
+            for key, value in environ.items():
+                if value is None:
+                    del os.environ[key]
+                else:
+                    os.environ[key] = value
+        self.workers = workers
+
+    def __enter__(self):
+        """Use the pool as context manager."""
+        return self
+
+    def __exit__(self, *args):
+        """Shut down the workers and free the shared memory."""
+        self.close()
+
+    def submit(self, islice, data):
+        """Start the estimation of a slice.
+
+        Parameters
+        ----------
+          islice : int
+            The slice index.
+          data : numpy.array
+            The Cartesian k-space data of the slice (NC, dimY, dimX).
+        """
+        self._inp[islice] = data
+        self._pending.append(self._pool.apply_async(
+            _nlinvSlice,
+            (islice, self._n, self._realConstr,
+             self._DTYPE, self._DTYPE_real)))
+
+    def results(self):
+        """Wait for all submitted slices.
+
+        Returns
+        -------
+          tuple of numpy.array
+            The coil sensitivities (NC, NSlice, dimY, dimX) and the
+            image (NSlice, dimY, dimX) of the last Gauss-Newton step.
+        """
+        for pending in self._pending:
+            pending.get()
+        self._pending = []
+        return (np.require(np.swapaxes(self._out[:, 2:], 0, 1),
+                           requirements='C'),
+                self._out[:, 0].copy())
+
+    def close(self):
+        """Shut down the workers and free the shared memory."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        if self._shm:
+            self._inp = self._out = None
+            for shm in self._shm:
+                shm.close()
+                shm.unlink()
+            self._shm = []
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Non-linear Inversion on OpenCL devices.
+
+OpenCL version of the regularized nonlinear inversion in _nlinvns and
+_nlinvns_3D (Martin Uecker: Image reconstruction by regularized nonlinear
+inversion joint estimation of coil sensitivities and image content).
+All slices of a 2D multi-slice acquisition are estimated at once, each
+slice keeps its own data scaling and CG stopping criterion.
+"""
+import sys
+import numpy as np
+import pyopencl as cl
+import pyopencl.array as clarray
+
+from pyqmri.transforms import fftPlan
+from pyqmri._helper_fun._clprogram import CLProgram as Program
+from pyqmri._helper_fun._profiler import PROFILER
+from pyqmri._helper_fun import _utils as utils
+
+_REDUCTION_SIZE = 256
+_CHECK_INTERVAL = 10
+
+_KERNELS = """
+inline {c} cmult({c} a, {c} b)
+{{
+    return ({c})(a.x*b.x-a.y*b.y, a.x*b.y+a.y*b.x);
+}}
+
+inline {c} cmultconj({c} a, {c} b)
+{{
+    return ({c})(a.x*b.x+a.y*b.y, a.y*b.x-a.x*b.y);
+}}
+
+__kernel void weighted_coils(__global {c} *K, __global {c} *X,
+                             __global {r} *W, const int NC)
+{{
+    size_t bc = get_global_id(0), v = get_global_id(1);
+    size_t V = get_global_size(1);
+    size_t b = bc/NC, c = bc%NC;
+    K[bc*V+v] = W[v]*X[(b*(NC+1)+c+1)*V+v];
+}}
+
+__kernel void set_xt(__global {c} *XT, __global {c} *XN, __global {c} *K,
+                     const int NC, const {r} scale)
+{{
+    size_t bc = get_global_id(0), v = get_global_id(1);
+    size_t V = get_global_size(1);
+    size_t b = bc/(NC+1), c = bc%(NC+1);
+    if (c == 0)
+        XT[bc*V+v] = XN[bc*V+v];
+    else
+        XT[bc*V+v] = K[(b*NC+c-1)*V+v]*scale;
+}}
+
+__kernel void image_coils(__global {c} *K, __global {c} *XT, const int NC)
+{{
+    size_t bc = get_global_id(0), v = get_global_id(1);
+    size_t V = get_global_size(1);
+    size_t b = bc/NC, c = bc%NC;
+    K[bc*V+v] = cmult(XT[b*(NC+1)*V+v], XT[(b*(NC+1)+c+1)*V+v]);
+}}
+
+__kernel void residual(__global {c} *K, __global {c} *Y, __global {r} *P,
+                       const int NC, const {r} scale)
+{{
+    size_t bc = get_global_id(0), v = get_global_id(1);
+    size_t V = get_global_size(1);
+    {r} mask = P[(bc/NC)*V+v];
+    K[bc*V+v] = mask*(Y[bc*V+v]-mask*scale*K[bc*V+v]);
+}}
+
+__kernel void der_mid(__global {c} *K, __global {c} *XT, __global {c} *DX,
+                      const int NC, const {r} scale)
+{{
+    size_t bc = get_global_id(0), v = get_global_id(1);
+    size_t V = get_global_size(1);
+    size_t b = bc/NC, c = bc%NC;
+    size_t x0 = b*(NC+1)*V+v;
+    K[bc*V+v] = scale*cmult(XT[x0], K[bc*V+v])
+                + cmult(DX[x0], XT[x0+(c+1)*V]);
+}}
+
+__kernel void mask(__global {c} *K, __global {r} *P, const int NC,
+                   const {r} scale)
+{{
+    size_t bc = get_global_id(0), v = get_global_id(1);
+    size_t V = get_global_size(1);
+    K[bc*V+v] = P[(bc/NC)*V+v]*scale*K[bc*V+v];
+}}
+
+__kernel void derH_rho(__global {c} *out, __global {c} *K, __global {c} *XT,
+                       __global {c} *add, const int NC, const {r} scale,
+                       const {r} beta, const {r} offset,
+                       const int realConstr)
+{{
+    size_t b = get_global_id(0), v = get_global_id(1);
+    size_t V = get_global_size(1);
+    size_t x0 = b*(NC+1)*V+v;
+    {c} acc = 0.0f;
+    for (int c = 0; c < NC; c++)
+    {{
+        size_t k = (b*NC+c)*V+v;
+        {c} tmp = scale*K[k];
+        acc += cmultconj(tmp, XT[x0+(c+1)*V]);
+        K[k] = cmultconj(tmp, XT[x0]);
+    }}
+    if (realConstr)
+        acc.y = 0.0f;
+    acc.x += offset;
+    out[x0] = acc + beta*add[x0];
+}}
+
+__kernel void derH_coils(__global {c} *out, __global {c} *K,
+                         __global {r} *W, __global {c} *add, const int NC,
+                         const {r} scale, const {r} beta)
+{{
+    size_t bc = get_global_id(0), v = get_global_id(1);
+    size_t V = get_global_size(1);
+    size_t b = bc/NC, c = bc%NC;
+    size_t x = (b*(NC+1)+c+1)*V+v;
+    out[x] = W[v]*scale*K[bc*V+v] + beta*add[x];
+}}
+
+__kernel void dotc(__global {r} *out, __global {c} *a, __global {c} *b,
+                   const int n, __local {r} *scratch)
+{{
+    size_t batch = get_group_id(0), lid = get_local_id(0);
+    size_t L = get_local_size(0);
+    __global {c} *pa = a+batch*n;
+    __global {c} *pb = b+batch*n;
+    {r} acc = 0.0f;
+    for (size_t i = lid; i < n; i += L)
+        acc += pa[i].x*pb[i].x+pa[i].y*pb[i].y;
+    scratch[lid] = acc;
+    barrier(CLK_LOCAL_MEM_FENCE);
+    for (size_t s = L/2; s > 0; s >>= 1)
+    {{
+        if (lid < s)
+            scratch[lid] += scratch[lid+s];
+        barrier(CLK_LOCAL_MEM_FENCE);
+    }}
+    if (lid == 0)
+        out[batch] = scratch[0];
+}}
+
+__kernel void cg_step(__global {c} *z, __global {c} *r, __global {c} *d,
+                      __global {c} *q, __global {r} *dnew,
+                      __global {r} *dq, __global int *active)
+{{
+    size_t b = get_global_id(0), i = get_global_id(1);
+    size_t N = get_global_size(1);
+    if (active[b])
+    {{
+        {r} a = dnew[b]/dq[b];
+        z[b*N+i] += a*d[b*N+i];
+        r[b*N+i] -= a*q[b*N+i];
+    }}
+}}
+
+__kernel void cg_direction(__global {c} *d, __global {c} *r,
+                           __global {r} *dnew, __global {r} *rnew,
+                           __global int *active)
+{{
+    size_t b = get_global_id(0), i = get_global_id(1);
+    size_t N = get_global_size(1);
+    if (active[b])
+        d[b*N+i] = d[b*N+i]*(rnew[b]/dnew[b]) + r[b*N+i];
+}}
+
+__kernel void cg_check(__global {r} *dnew, __global {r} *rnew,
+                       __global {r} *dnot, __global int *active,
+                       const {r} tol)
+{{
+    size_t b = get_global_id(0);
+    if (active[b])
+    {{
+        dnew[b] = rnew[b];
+        if (sqrt(dnew[b]) < tol*dnot[b])
+            active[b] = 0;
+    }}
+}}
+
+__kernel void postprocess(__global {c} *R, __global {c} *XN,
+                          __global {c} *K, __global {r} *yscale,
+                          const int NC, const {r} scale)
+{{
+    size_t b = get_global_id(0), v = get_global_id(1);
+    size_t V = get_global_size(1);
+    {r} C = 0.0f;
+    for (int c = 0; c < NC; c++)
+    {{
+        {c} CR = scale*K[(b*NC+c)*V+v];
+        C += CR.x*CR.x+CR.y*CR.y;
+        R[(b*(NC+2)+c+2)*V+v] = CR/yscale[b];
+    }}
+    {c} rho = XN[b*(NC+1)*V+v];
+    R[b*(NC+2)*V+v] = rho*sqrt(C)/yscale[b];
+    R[(b*(NC+2)+1)*V+v] = rho;
+}}
+"""
+
+
+def weights(shape, DTYPE_real=np.float32):
+    """Sobolev weights of the coil sensitivities.
+
+    Parameters
+    ----------
+      shape : tuple of int
+        The image dimensions, (dimY, dimX) or (NSlice, dimY, dimX).
+      DTYPE_real : numpy.dtype, numpy.float32
+        Real working precission.
+
+    Returns
+    -------
+      numpy.array
+        The weights in FFT order.
+    """
+    grid = np.meshgrid(*[np.arange(dim)/dim - 0.5 for dim in shape],
+                       indexing="ij")
+    W = 1 / (1 + 220 * sum(axis**2 for axis in grid))**16
+    return np.fft.fftshift(W).astype(DTYPE_real)
+
+
+class NLINVOpenCL():
+    """Slice-wise NLINV coil sensitivity estimation on an OpenCL device.
+
+    Drop-in replacement for NLINVPool. Submitted slices are collected on
+    the host and estimated together by results(), in as few batches as
+    the device memory permits. For 3D data a single volume of shape
+    (1, NC, NSlice, dimY, dimX) is estimated with the regularization,
+    iteration, and tolerance settings of _nlinvns_3D.
+
+    Parameters
+    ----------
+      par : dict
+        Parameter struct holding the PyOpenCL context (ctx), DTYPE, and
+        DTYPE_real.
+      shape : tuple of int
+        The shape of the k-space data, (NSlice, NC, dimY, dimX) or
+        (1, NC, NSlice, dimY, dimX).
+      n : int, 6
+        Number of Gauss-Newton steps.
+      realConstr : bool, False
+        Real value constraint on the image.
+    """
+
+    def __init__(self, par, shape, n=6, realConstr=False):
+        self._n = n
+        self._realConstr = realConstr
+        self._DTYPE = par["DTYPE"]
+        self._DTYPE_real = par["DTYPE_real"]
+        self.ctx = par["ctx"][0]
+        self.queue = cl.CommandQueue(
+            self.ctx, self.ctx.devices[0],
+            properties=PROFILER.queueProperties(0))
+        self.shape = tuple(shape)
+        self._NC = self.shape[1]
+        self._img_shape = self.shape[2:]
+        self._V = int(np.prod(self._img_shape))
+        if len(self._img_shape) == 3:
+            self._alpha, self._cg_iters, self._cg_tol = 1e-3, 100, 1e-4
+        else:
+            self._alpha, self._cg_iters, self._cg_tol = 1, 500, 1e-2
+
+        itemsize = np.dtype(self._DTYPE).itemsize
+        bytes_per_slice = self._V * (
+            itemsize * (2 * self._NC + 6 * (self._NC + 1))
+            + np.dtype(self._DTYPE_real).itemsize)
+        self.par_slices = utils.scans_per_block(
+            dict(par, NScan=self.shape[0]), bytes_per_slice,
+            alloc_per_scan=itemsize * (self._NC + 2) * self._V)
+
+        self._data = np.zeros(self.shape, dtype=self._DTYPE)
+        if self._DTYPE == np.complex64:
+            ctypes = {"c": "float2", "r": "float"}
+        else:
+            ctypes = {"c": "double2", "r": "double"}
+        self.prg = Program(self.ctx, _KERNELS.format(**ctypes))
+        self._W = clarray.to_device(
+            self.queue, weights(self._img_shape, self._DTYPE_real))
+
+    def __enter__(self):
+        """Use the estimator as context manager."""
+        return self
+
+    def __exit__(self, *args):
+        """Release the host copy of the data."""
+        self.close()
+
+    def submit(self, islice, data):
+        """Add a slice to the estimation.
+
+        Parameters
+        ----------
+          islice : int
+            The slice index.
+          data : numpy.array
+            The Cartesian k-space data of the slice (NC, dimY, dimX).
+        """
+        self._data[islice] = data
+
+    def results(self):
+        """Estimate all submitted slices.
+
+        Returns
+        -------
+          tuple of numpy.array
+            The coil sensitivities (NC, NSlice, dimY, dimX) and the
+            image (NSlice, dimY, dimX) of the last Gauss-Newton step.
+        """
+        NSlice = self.shape[0]
+        C = np.zeros((self._NC, NSlice)+self._img_shape, dtype=self._DTYPE)
+        image = np.zeros((NSlice,)+self._img_shape, dtype=self._DTYPE)
+        for first in range(0, NSlice, self.par_slices):
+            last = min(first + self.par_slices, NSlice)
+            R = self._nlinv(self._data[first:last])
+            C[:, first:last] = np.swapaxes(R[:, 2:], 0, 1)
+            image[first:last] = R[:, 0]
+        if len(self._img_shape) == 3:
+            return C[:, 0], image[0]
+        return C, image
+
+    def close(self):
+        """Release the host copy of the data."""
+        self._data = None
+
+    def _nlinv(self, Y):
+        B = Y.shape[0]
+        NC = np.int32(self._NC)
+        V = self._V
+        scale = self._DTYPE_real(np.sqrt(V))
+        inv_scale = self._DTYPE_real(1 / np.sqrt(V))
+        x_shape = (B, self._NC + 1) + self._img_shape
+        k_shape = (B * self._NC,) + self._img_shape
+
+        yscale = (100 / np.sqrt(np.sum(
+            np.abs(Y.reshape(B, -1))**2, axis=-1))).astype(self._DTYPE_real)
+        P = (Y[:, 0] != 0).astype(self._DTYPE_real)
+        self._Y = clarray.to_device(
+            self.queue, np.require(Y * yscale.reshape((B,)+(1,)*(Y.ndim-1)),
+                                   self._DTYPE, 'C'))
+        self._P = clarray.to_device(self.queue, P)
+        self._K = clarray.empty(self.queue, k_shape, self._DTYPE)
+        self._fft = fftPlan(self.ctx, self.queue, self._K,
+                            tuple(range(-len(self._img_shape), 0)))
+        XN = np.zeros(x_shape, dtype=self._DTYPE)
+        XN[:, 0] = 1
+        XN = clarray.to_device(self.queue, XN)
+        XT, r, z, d, q = [clarray.empty(self.queue, x_shape, self._DTYPE)
+                          for _ in range(5)]
+        dnew, dnot, dq, rnew = [clarray.empty(self.queue, B,
+                                              self._DTYPE_real)
+                                for _ in range(4)]
+        active = clarray.empty(self.queue, B, np.int32)
+        glob_coils = (B * self._NC, V)
+        glob_x = (B, (self._NC + 1) * V)
+
+        print('Start...')
+        alpha = self._alpha
+        for i in range(self._n):
+            self._apweights(XT, XN)
+            self.prg.image_coils(self.queue, glob_coils, None,
+                                 self._K.data, XT.data, NC)
+            self._fftForward()
+            self.prg.residual(self.queue, glob_coils, None,
+                              self._K.data, self._Y.data, self._P.data,
+                              NC, inv_scale)
+            self._dotc(rnew, self._K, self._K)
+            print(np.round(np.sqrt(rnew.get())))
+
+            # rhs: derH(RES) + alpha*(X0-XN)
+            self._derH(r, XN, XT, -alpha, alpha)
+            cl.enqueue_copy(self.queue, d.data, r.data)
+            z.fill(0)
+            self._dotc(dnew, r, r)
+            cl.enqueue_copy(self.queue, dnot.data, dnew.data)
+            active.fill(1)
+
+            for j in range(self._cg_iters):
+                self._normal(q, d, XT, alpha)
+                self._dotc(dq, d, q)
+                self.prg.cg_step(self.queue, glob_x, None,
+                                 z.data, r.data, d.data, q.data,
+                                 dnew.data, dq.data, active.data)
+                self._dotc(rnew, r, r)
+                self.prg.cg_direction(self.queue, glob_x, None,
+                                      d.data, r.data, dnew.data, rnew.data,
+                                      active.data)
+                self.prg.cg_check(self.queue, (B,), None,
+                                  dnew.data, rnew.data, dnot.data,
+                                  active.data,
+                                  self._DTYPE_real(self._cg_tol))
+                if ((j + 1) % _CHECK_INTERVAL == 0
+                        and not active.get().any()):
+                    break
+            print('(', j, ')')
+
+            XN += z
+            alpha = alpha / 3
+            sys.stdout.flush()
+
+        self._apweights(XT, XN)
+        yscale = clarray.to_device(self.queue, yscale)
+        R = clarray.empty(self.queue, (B, self._NC + 2) + self._img_shape,
+                          self._DTYPE)
+        self.prg.postprocess(self.queue, (B, V), None,
+                             R.data, XN.data, self._K.data, yscale.data,
+                             NC, scale)
+        result = R.get()
+        del self._Y, self._P, self._K
+        return result
+
+    def _fftForward(self):
+        self._fft.enqueue_arrays(data=self._K, result=self._K, forward=True)
+
+    def _fftInverse(self):
+        self._fft.enqueue_arrays(data=self._K, result=self._K,
+                                 forward=False)
+
+    def _dotc(self, out, a, b):
+        self.prg.dotc(self.queue, (out.size * _REDUCTION_SIZE,),
+                      (_REDUCTION_SIZE,), out.data, a.data, b.data,
+                      np.int32(a.size // out.size),
+                      cl.LocalMemory(_REDUCTION_SIZE *
+                                     np.dtype(self._DTYPE_real).itemsize))
+
+    def _apweights(self, XT, XN):
+        # XT = [XN[0], ifft(W*XN[1:])], K keeps the weighted coils.
+        NC = np.int32(self._NC)
+        self.prg.weighted_coils(self.queue, self._K.shape[:1] + (self._V,),
+                                None, self._K.data, XN.data, self._W.data,
+                                NC)
+        self._fftInverse()
+        self.prg.set_xt(self.queue, (XT.shape[0] * XT.shape[1], self._V),
+                        None, XT.data, XN.data, self._K.data, NC,
+                        self._DTYPE_real(np.sqrt(self._V)))
+
+    def _der(self, DX, XT):
+        # K = P*fft(XT[0]*ifft(W*DX[1:]) + DX[0]*XT[1:])
+        NC = np.int32(self._NC)
+        glob_coils = self._K.shape[:1] + (self._V,)
+        self.prg.weighted_coils(self.queue, glob_coils, None,
+                                self._K.data, DX.data, self._W.data, NC)
+        self._fftInverse()
+        self.prg.der_mid(self.queue, glob_coils, None,
+                         self._K.data, XT.data, DX.data, NC,
+                         self._DTYPE_real(np.sqrt(self._V)))
+        self._fftForward()
+        self.prg.mask(self.queue, glob_coils, None,
+                      self._K.data, self._P.data, NC,
+                      self._DTYPE_real(1 / np.sqrt(self._V)))
+
+    def _derH(self, out, add, XT, beta, offset=0):
+        # out = derH(K) + beta*add + offset*e_0 with K = P*DK.
+        NC = np.int32(self._NC)
+        self._fftInverse()
+        self.prg.derH_rho(self.queue, (XT.shape[0], self._V), None,
+                          out.data, self._K.data, XT.data, add.data, NC,
+                          self._DTYPE_real(np.sqrt(self._V)),
+                          self._DTYPE_real(beta), self._DTYPE_real(offset),
+                          np.int32(self._realConstr))
+        self._fftForward()
+        self.prg.derH_coils(self.queue, self._K.shape[:1] + (self._V,),
+                            None, out.data, self._K.data, self._W.data,
+                            add.data, NC,
+                            self._DTYPE_real(1 / np.sqrt(self._V)),
+                            self._DTYPE_real(beta))
+
+    def _normal(self, q, d, XT, alpha):
+        # Regularized normal equations q = derH(der(d)) + alpha*d.
+        self._der(d, XT)
+        self._derH(q, d, XT, alpha)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Cached power iteration estimates of linear operator norms."""
+import numpy as np
+import pyopencl.array as clarray
+
+
+class OperatorNorm:
+    """Power iteration on the normal operator of a linear operator.
+
+    All iterates stay on the device, only the Rayleigh quotient and the norm
+    of each iterate are transferred to the host. Estimates are cached per
+    operator configuration and the dominant vector of the last estimate of
+    each operator is kept to warm start the next estimate, e.g. after the
+    linearization point changed in a Gauss-Newton step.
+
+    Parameters
+    ----------
+      queue : PyOpenCL.CommandQueue
+        The queue used for the power iterations.
+      DTYPE : numpy.dtype, numpy.complex64
+        Complex working precission.
+      max_iters : int, 50
+        Maximum number of power iterations.
+      tol : float, 1e-3
+        Relative change of the eigenvalue estimate to stop iterating.
+
+    Attributes
+    ----------
+      iterations : dict
+        Number of power iterations used for the last estimate of each
+        operator.
+    """
+
+    def __init__(self, queue, DTYPE=np.complex64, max_iters=50, tol=1e-3):
+        self._queue = queue
+        self._DTYPE = DTYPE
+        self._max_iters = max_iters
+        self._tol = tol
+        self._norms = {}
+        self._vectors = {}
+        self.iterations = {}
+
+    def estimate(self, name, config, normal, shape, cached=True,
+                 max_iters=None, start=None):
+        """Estimate the norm of an operator K.
+
+        Parameters
+        ----------
+          name : hashable
+            Name of the operator, e.g. a str or the operator object. The
+            dominant vector is stored per name.
+          config : hashable
+            Configuration of the operator, e.g. shape, weights and
+            preconditioning. Together with name the key of the cache.
+          normal : callable
+            Applies the normal operator K^H K (or its negative) in-place,
+            called as normal(out, inp) with PyOpenCL.Arrays of shape.
+            Pending operations need to be attached as events to out.
+          shape : tuple of int
+            Shape of the domain of K.
+          cached : bool, True
+            Return a cached estimate if available. Operators which change
+            their values without changing their configuration, e.g. the
+            linearized model, need to be estimated again.
+          max_iters : int, None
+            Overrides the maximum number of power iterations.
+          start : numpy.array, None
+            Start vector of shape, used if no dominant vector is stored for
+            name. Defaults to a seeded random vector.
+
+        Returns
+        -------
+          float
+            Estimate of the operator norm of K.
+        """
+        key = (name, config)
+        if cached and key in self._norms:
+            return self._norms[key]
+
+        x = self._vectors.get(name)
+        if x is None or x.shape != tuple(shape):
+            if start is None:
+                rng = np.random.default_rng(0)
+                start = (rng.standard_normal(shape)
+                         + 1j*rng.standard_normal(shape))
+            x = clarray.to_device(
+                self._queue,
+                np.require(np.reshape(start, shape), self._DTYPE, 'C'))
+            x *= self._DTYPE(1/np.sqrt(clarray.vdot(x, x).get().real))
+        y = clarray.zeros_like(x)
+
+        lmax = 0
+        if max_iters is None:
+            max_iters = self._max_iters
+        for i in range(max_iters):
+            normal(y, x)
+            lmax_old = lmax
+            lmax = np.abs(clarray.vdot(x, y).get())
+            ynorm = np.sqrt(clarray.vdot(y, y).get().real)
+            if ynorm == 0:
+                break
+            y *= self._DTYPE(1/ynorm)
+            x, y = y, x
+            if np.abs(lmax - lmax_old) <= self._tol * lmax:
+                break
+
+        self._vectors[name] = x
+        self.iterations[name] = i + 1
+        self._norms[key] = np.sqrt(lmax)
+        return self._norms[key]
+
+    def clear(self):
+        """Drop all cached estimates and dominant vectors."""
+        self._norms = {}
+        self._vectors = {}
+        self.iterations = {}
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Opt-in profiling of OpenCL kernels, transfers and host phases."""
+import os
+import json
+import time
+import contextlib
+import functools
+
+import pyopencl as cl
+
+
+class Profiler():
+    """Collect device event and host phase timings.
+
+    Profiling is disabled by default and adds no overhead in that case.
+    If enabled, queues created afterwards in _setupOCL use
+    PROFILING_ENABLE, kernel launches of CLProgram objects and FFT plans
+    created afterwards register their events, and all host-device copies
+    issued via pyopencl.enqueue_copy are recorded. Host phases are
+    timed with the phase context manager. Events are resolved lazily in
+    batches to avoid host synchronization in the iteration loops.
+
+    Parameters
+    ----------
+      max_trace_events : int, 200000
+        Maximum number of entries written to the Chrome trace. Summary
+        statistics are collected for all events.
+
+    Attributes
+    ----------
+      enabled : bool
+        Profiling state.
+      kernels : dict
+        Accumulated device time in seconds and calls per kernel name.
+      phases : dict
+        Accumulated wall time in seconds and calls per host phase.
+    """
+
+    def __init__(self, max_trace_events=200000):
+        self.enabled = False
+        self.max_trace_events = max_trace_events
+        self.kernels = {}
+        self.phases = {}
+        self._pending = []
+        self._trace = []
+        self._t0 = time.perf_counter()
+        self._device_t0 = None
+        self._enqueue_copy = None
+
+    def enable(self):
+        """Start profiling and record host-device copies.
+
+        Timings of a previous session are discarded.
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        self.kernels = {}
+        self.phases = {}
+        self._pending = []
+        self._trace = []
+        self._t0 = time.perf_counter()
+        self._device_t0 = None
+        self._enqueue_copy = cl.enqueue_copy
+
+        @functools.wraps(self._enqueue_copy)
+        def enqueue_copy(queue, dest, src, **kwargs):
+            event = self._enqueue_copy(queue, dest, src, **kwargs)
+            if isinstance(dest, cl.MemoryObjectHolder):
+                if isinstance(src, cl.MemoryObjectHolder):
+                    name = "copy_dtod"
+                else:
+                    name = "copy_htod"
+            else:
+                name = "copy_dtoh"
+            self.record(name, event)
+            return event
+        cl.enqueue_copy = enqueue_copy
+
+    def disable(self):
+        """Stop profiling and restore pyopencl.enqueue_copy.
+
+        Events not resolved by report or writeReport are dropped.
+        """
+        if not self.enabled:
+            return
+        cl.enqueue_copy = self._enqueue_copy
+        self.enabled = False
+        self._pending = []
+
+    @contextlib.contextmanager
+    def session(self, enabled=True):
+        """Profile the enclosed code.
+
+        pyopencl.enqueue_copy and the profiling state are restored on
+        exit, also if an exception is raised.
+
+        Parameters
+        ----------
+          enabled : bool, True
+            Whether to profile at all.
+        """
+        if not enabled:
+            yield
+            return
+        self.enable()
+        try:
+            yield
+        finally:
+            self.disable()
+
+    def queueProperties(self, properties=None):
+        """Add PROFILING_ENABLE to the queue properties if enabled.
+
+        Parameters
+        ----------
+          properties : int, None
+            The command queue properties.
+
+        Returns
+        -------
+          int or None
+            The command queue properties.
+        """
+        if not self.enabled:
+            return properties
+        if properties is None:
+            properties = 0
+        return properties | cl.command_queue_properties.PROFILING_ENABLE
+
+    def record(self, name, event):
+        """Register an OpenCL event for timing.
+
+        Parameters
+        ----------
+          name : str
+            The name of the kernel or transfer.
+          event : PyOpenCL.Event
+            The event to time.
+        """
+        if not self.enabled or not isinstance(event, cl.Event):
+            return
+        self._pending.append((name, event))
+        if len(self._pending) > 10000:
+            self._resolve()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time a host side phase.
+
+        Parameters
+        ----------
+          name : str
+            The name of the phase.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._accumulate(self.phases, name, end - start)
+            self._addTrace(name, "host", 0, start - self._t0,
+                           end - start)
+
+    def _accumulate(self, stats, name, duration):
+        entry = stats.setdefault(name, {"time": 0.0, "calls": 0})
+        entry["time"] += duration
+        entry["calls"] += 1
+
+    def _addTrace(self, name, cat, pid, start, duration):
+        if len(self._trace) < self.max_trace_events:
+            self._trace.append({
+                "name": name, "cat": cat, "ph": "X", "pid": pid, "tid": 0,
+                "ts": start * 1e6, "dur": duration * 1e6})
+
+    def _resolve(self, wait=False):
+        pending = []
+        for name, event in self._pending:
+            if (not wait and event.command_execution_status
+                    != cl.command_execution_status.COMPLETE):
+                pending.append((name, event))
+                continue
+            event.wait()
+            try:
+                start = event.profile.start
+                end = event.profile.end
+            except cl.Error:
+                # Queue without PROFILING_ENABLE
+                continue
+            self._accumulate(self.kernels, name, (end - start) * 1e-9)
+            if self._device_t0 is None:
+                self._device_t0 = start
+            self._addTrace(name, "device", 1,
+                           (start - self._device_t0) * 1e-9,
+                           (end - start) * 1e-9)
+        self._pending = pending
+
+    def report(self):
+        """Summary of all recorded timings.
+
+        Returns
+        -------
+          dict
+            Per kernel and per phase total time, calls and mean time,
+            sorted by total time.
+        """
+        self._resolve(wait=True)
+
+        def summarize(stats):
+            return {
+                name: dict(entry, mean=entry["time"] / entry["calls"])
+                for name, entry in sorted(
+                    stats.items(), key=lambda item: -item[1]["time"])}
+        return {"kernels": summarize(self.kernels),
+                "phases": summarize(self.phases)}
+
+    def writeReport(self, path):
+        """Write the JSON summary and the Chrome trace.
+
+        Creates <path>.json and <path>_trace.json. The trace can be opened
+        in chrome://tracing or Perfetto. Host phases and device events use
+        separate time bases.
+
+        Parameters
+        ----------
+          path : str
+            Output path without extension.
+        """
+        report = self.report()
+        with open(path + ".json", "w") as file:
+            json.dump(report, file, indent=2)
+        meta = [{"name": "process_name", "ph": "M", "pid": pid,
+                 "args": {"name": name}}
+                for pid, name in ((0, "host"), (1, "device"))]
+        with open(path + "_trace.json", "w") as file:
+            json.dump({"traceEvents": meta + self._trace}, file)
+        print("Profiling report written to " +
+              os.path.abspath(path + ".json"))
+
+
+PROFILER = Profiler()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Host storage backends for streamed reconstructions."""
+import os
+import mmap
+import time
+import tempfile
+
+import numpy as np
+
+
+def prefetch(arr, idx):
+    """Advise the kernel to read a block of a memory mapped array ahead.
+
+    Does nothing for arrays which are not backed by a file.
+
+    Parameters
+    ----------
+      arr : numpy.Array
+        The host array.
+      idx : slice
+        The block along the first (slice) axis which will be read next.
+    """
+    if (not isinstance(arr, np.memmap)
+            or getattr(arr, "_mmap", None) is None
+            or not hasattr(mmap, "MADV_WILLNEED")):
+        return
+    start, stop, _ = idx.indices(arr.shape[0])
+    begin = arr.offset + start * arr.strides[0]
+    begin -= begin % mmap.PAGESIZE
+    length = arr.offset + stop * arr.strides[0] - begin
+    if length > 0:
+        arr._mmap.madvise(mmap.MADV_WILLNEED, begin, length)
+
+
+def ioCounters():
+    """Bytes read from and written to storage by this process.
+
+    Returns
+    -------
+      tuple of int or None
+        The read and written bytes. None if the platform does not expose
+        /proc/self/io.
+    """
+    try:
+        with open("/proc/self/io") as file:
+            stats = dict(line.split(":") for line in file)
+        return int(stats["read_bytes"]), int(stats["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class HostStorage():
+    """Allocator for the host arrays of the streamed solvers.
+
+    The "ram" backend returns plain NumPy arrays. The "memmap" backend
+    backs each array by a file in a scratch directory, such that volumes
+    larger than the host memory can be streamed through the devices.
+    Arrays are allocated by name and reused if requested again with the
+    same shape, thus repeated solver runs do not grow the scratch space.
+
+    Parameters
+    ----------
+      backend : str, ram
+        Either "ram" or "memmap".
+      scratch_dir : str, ''
+        Directory for the scratch files. Defaults to the system temp dir.
+
+    Attributes
+    ----------
+      backend : str
+        The selected backend.
+      io_throughput : list of tuple of float
+        Read and write throughput in MB/s per reported iteration.
+
+    Raises
+    ------
+      ValueError
+        If the backend is unknown.
+    """
+
+    backends = ("ram", "memmap")
+
+    def __init__(self, backend="ram", scratch_dir=''):
+        self.backend = backend
+        self.io_throughput = []
+        self._arrays = {}
+        self._nfiles = 0
+        self._tmpdir = None
+        self._last_io = None
+        if backend not in self.backends:
+            raise ValueError(
+                "Unknown host storage backend " + str(backend) + ". Use "
+                + " or ".join(self.backends) + ".")
+        if backend == "memmap":
+            self._tmpdir = tempfile.TemporaryDirectory(
+                prefix="pyqmri_scratch_", dir=scratch_dir or None)
+            print("Using memory mapped scratch files in " +
+                  self._tmpdir.name)
+
+    def __del__(self):
+        """Remove the scratch files."""
+        self._arrays = {}
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+
+    def zeros(self, name, shape, dtype):
+        """Get a zero initialized array.
+
+        Parameters
+        ----------
+          name : str
+            Unique name of the array.
+          shape : tuple of int
+            The shape of the array.
+          dtype : numpy.dtype
+            The type of the array.
+
+        Returns
+        -------
+          numpy.Array or numpy.memmap
+            The zero initialized array.
+        """
+        if self.backend == "ram":
+            return np.zeros(shape, dtype=dtype)
+        arr = self._arrays.get(name)
+        if (arr is not None and arr.shape == tuple(shape)
+                and arr.dtype == dtype):
+            arr[...] = 0
+            return arr
+        if arr is not None:
+            # Unlinking keeps the mapping of remaining references valid
+            os.remove(arr.filename)
+        # New files are sparse and read as zeros
+        self._nfiles += 1
+        arr = np.memmap(
+            os.path.join(self._tmpdir.name,
+                         "%s_%d.dat" % (name, self._nfiles)),
+            dtype=dtype, mode="w+", shape=tuple(shape))
+        self._arrays[name] = arr
+        return arr
+
+    def zeros_like(self, name, arr):
+        """Get a zero initialized array with shape and type of arr."""
+        return self.zeros(name, arr.shape, arr.dtype)
+
+    def copy(self, name, arr):
+        """Get a copy of arr."""
+        if self.backend == "ram":
+            return arr.copy()
+        out = self.zeros(name, arr.shape, arr.dtype)
+        out[...] = arr
+        return out
+
+    def resetIO(self):
+        """Start a new throughput measurement, e.g. before a solver run."""
+        self._last_io = (time.perf_counter(), ioCounters())
+
+    def reportIO(self, iteration):
+        """Print the storage throughput since the last call.
+
+        Only reported for the memmap backend.
+
+        Parameters
+        ----------
+          iteration : int
+            The current iteration.
+        """
+        if self.backend == "ram":
+            return
+        now = (time.perf_counter(), ioCounters())
+        if (self._last_io is not None and now[1] is not None
+                and self._last_io[1] is not None):
+            elapsed = max(now[0] - self._last_io[0], 1e-9)
+            read = (now[1][0] - self._last_io[1][0]) / elapsed / 1024**2
+            write = (now[1][1] - self._last_io[1][1]) / elapsed / 1024**2
+            self.io_throughput.append((read, write))
+            print("\nIteration: %04d ---- Scratch I/O: read %.1f MB/s, "
+                  "write %.1f MB/s" % (iteration+1, read, write))
+        self._last_io = now
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Temporal subspace estimation from simulated signal curves.
+
+The signal curves and partial derivatives of a model are simulated for
+parameters drawn uniformly from the constraint box of each unknown. The
+leading left singular vectors of the stacked curves form a temporal basis
+in which the linearized forward model is approximately low-rank.
+"""
+import numpy as np
+
+
+def temporal_basis(model, par, rank, seed=0):
+    """Estimate a temporal basis for a signal model.
+
+    Parameters
+    ----------
+      model : pyqmri.models.template.BaseModel
+        The signal model. Uses the constraints and, for unbounded
+        parameters, the range of the current initial guess.
+      par : dict
+        Parameter dictionary holding the number of scans (NScan), slices
+        (NSlice), the image dimensions (dimY, dimX), the number of
+        unknowns (unknowns) and the working precission (DTYPE).
+      rank : int
+        Number of basis functions.
+      seed : int, 0
+        Seed of the random parameter samples.
+
+    Returns
+    -------
+      numpy.array
+        The temporal basis with orthonormal columns (NScan x rank).
+      float
+        Fraction of the energy of the simulated curves retained by the
+        basis.
+
+    Raises
+    ------
+      ValueError
+        If the rank is not between 1 and the number of scans.
+    """
+    if not 0 < rank <= par["NScan"]:
+        raise ValueError(
+            "The subspace rank needs to be between 1 and the number of "
+            "scans (%i)." % par["NScan"])
+    samples = _sampleParameters(model, par, seed)
+
+    signal = np.nan_to_num(model.execute_forward(samples))
+    grad = np.nan_to_num(model.execute_gradient(samples))
+    curves = [signal.reshape(par["NScan"], -1)]
+    curves += [grad[uk].reshape(par["NScan"], -1)
+               for uk in range(grad.shape[0])]
+
+    cov = np.zeros((par["NScan"], par["NScan"]), dtype=np.complex128)
+    for block in curves:
+        norm = np.linalg.norm(block)
+        if norm > 0:
+            block = block / norm
+            cov += block @ block.conj().T
+    eigval, eigvec = np.linalg.eigh(cov)
+    # eigh sorts ascending
+    eigval = np.maximum(eigval[::-1], 0)
+    basis = np.require(eigvec[:, ::-1][:, :rank].astype(par["DTYPE"]),
+                       requirements='C')
+    return basis, np.sum(eigval[:rank]) / np.sum(eigval)
+
+
+def _sampleParameters(model, par, seed):
+    rng = np.random.default_rng(seed)
+    shape = (par["NSlice"], par["dimY"], par["dimX"])
+    samples = np.zeros((par["unknowns"],) + shape, dtype=par["DTYPE"])
+    for uk in range(par["unknowns"]):
+        low = model.constraints[uk].min
+        high = model.constraints[uk].max
+        if not (np.isfinite(low) and np.isfinite(high)):
+            guess = np.abs(model.guess[uk])
+            low = max(low, np.min(guess))
+            high = min(high, np.max(guess))
+        if high <= low:
+            high = low + 1
+        samples[uk] = rng.uniform(low, high, shape)
+    return samples
@@ -27,7 +27,7 @@ def prime_factors(n):
     return factors
 
 
-def NUFFT(par, trafo=True, SMS=False):
+def NUFFT(par, trafo=True, SMS=False, NScan=1, NC=1):
     """NUFFT for image guess.
 
     Parameters
@@ -38,23 +38,57 @@ def NUFFT(par, trafo=True, SMS=False):
         Radial (True) or Cartesian (False) FFT.
       SMS : bool, False
         SMS (True) or normal FFT (False, default).
+      NScan : int, 1
+        Number of scans transformed in one call.
+      NC : int, 1
+        Number of coils transformed in one call.
     """
-    NC = par["NC"]
-    NScan = par["NScan"]
-    par["NC"] = 1
-    par["NScan"] = 1
+    tmp_NC = par["NC"]
+    tmp_NScan = par["NScan"]
+    par["NC"] = NC
+    par["NScan"] = NScan
     
     FFT = (PyOpenCLnuFFT.create(
         par["ctx"][0], par["queue"][0], par,
         DTYPE=par["DTYPE"],
         DTYPE_real=par["DTYPE_real"],
         radial=trafo, SMS=SMS))
-    par["NC"] = NC
-    par["NScan"] = NScan
+    par["NC"] = tmp_NC
+    par["NScan"] = tmp_NScan
 
     return FFT
 
 
+def scans_per_block(par, bytes_per_scan, mem_fraction=0.5,
+                    alloc_per_scan=0):
+    """Number of scans which can be processed at once on the device.
+
+    Parameters
+    ----------
+      par : dict
+        Parameter struct holding the PyOpenCL context (ctx) and the
+        number of scans (NScan).
+      bytes_per_scan : int
+        Device memory in bytes which is needed to process a single scan.
+      mem_fraction : float, 0.5
+        Fraction of the global device memory which may be used.
+      alloc_per_scan : int, 0
+        Size in bytes per scan of the largest single buffer. Used to respect
+        the maximum allocation size of the device.
+
+    Returns
+    -------
+      int
+        Number of scans per block, at least 1 and at most NScan.
+    """
+    device = par["ctx"][0].devices[0]
+    avail_mem = device.global_mem_size * mem_fraction
+    nscans = int(avail_mem // max(bytes_per_scan, 1))
+    if alloc_per_scan > 0:
+        nscans = min(nscans, int(device.max_mem_alloc_size // alloc_per_scan))
+    return int(np.clip(nscans, 1, par["NScan"]))
+
+
 def gen_soft_sense_default_config():
     """Generate soft sense default config file."""
     config = configparser.ConfigParser()
@@ -106,6 +140,11 @@ def gen_default_config():
     config['TGV']["beta"] = '15'
     config['TGV']["precond"] = 'False'
     config['TGV']["precond_startiter"] = '0'
+    config['TGV']["precond_chunksize"] = '65536'
+    config['TGV']["gap_every"] = '1'
+    config['TGV']["warm_start"] = 'False'
+    config['TGV']["host_storage"] = 'ram'
+    config['TGV']["scratch_dir"] = ''
     config['TGV']["cutoffPre"] = '1e-2 '  
     
     config['TV'] = {}
@@ -129,6 +168,11 @@ def gen_default_config():
     config['TV']["beta"] = '1'
     config['TV']["precond"] = 'False'
     config['TV']["precond_startiter"] = '0'
+    config['TV']["precond_chunksize"] = '65536'
+    config['TV']["gap_every"] = '1'
+    config['TV']["warm_start"] = 'False'
+    config['TV']["host_storage"] = 'ram'
+    config['TV']["scratch_dir"] = ''
     config['TV']["cutoffPre"] = '1e-2 '     
     
     config['ICTV'] = {}
@@ -222,9 +266,13 @@ def read_config(conf_file,optimizer="IRGN", reg_type="TGV",par = []):
     finally:
         params = {}
         for key in config[reg_type]:
-            if key in {'max_gn_it', 'max_iters', 'start_iters'}:
+            if key in {'max_gn_it', 'max_iters', 'start_iters',
+                       'precond_chunksize', 'gap_every'}:
                 params[key] = int(config[reg_type][key])
-            elif key in {'display_iterations', 'adaptive_stepsize', 'precond','adaptive_gamma'}:
+            elif key in {'host_storage', 'scratch_dir'}:
+                params[key] = config[reg_type][key]
+            elif key in {'display_iterations', 'adaptive_stepsize', 'precond',
+                         'adaptive_gamma', 'warm_start'}:
                 params[key] = config[reg_type].getboolean(key)
             elif key in {'weights','dt_custom'}:
                 if ',' in config[reg_type][key]:
@@ -13,6 +13,11 @@ import pyqmri.operator as operator
 import pyqmri.solver as optimizer
 from pyqmri._helper_fun import CLProgram as Program
 from pyqmri._helper_fun import _utils as utils
+from pyqmri._helper_fun._profiler import PROFILER
+from pyqmri._helper_fun._mempool import device_pool, report_pools
+from pyqmri._helper_fun._subspace import temporal_basis
+from pyqmri._helper_fun._autotune import (find_streams, stream_footprint,
+                                          time_streams, tune_par_slices)
 from scipy import linalg as spl
 import faulthandler; faulthandler.enable()
 
@@ -89,6 +94,7 @@ class IRGNOptimizer:
         self._fval_init = 0
         self._ctx = par["ctx"]
         self._queue = par["queue"]
+        self._pool = device_pool(self._queue[0])
         self._model = model
         self._reg_type = reg_type
         self._prg = []
@@ -99,19 +105,6 @@ class IRGNOptimizer:
         self._streamed = streamed
         self._imagespace = imagespace
         self._SMS = SMS
-        if streamed and par["NSlice"]/(num_dev*par["par_slices"]) < 2:
-            raise ValueError(
-                "Number of Slices devided by parallel "
-                "computed slices and devices needs to be larger two.\n"
-                "Current values are %i total Slices, %i parallel slices and "
-                "%i compute devices."
-                % (par["NSlice"], par["par_slices"], num_dev))
-        if streamed and par["NSlice"] % par["par_slices"]:
-            raise ValueError(
-                "Number of Slices devided by parallel "
-                "computed slices needs to be an integer.\n"
-                "Current values are %i total Slices with %i parallel slices."
-                % (par["NSlice"], par["par_slices"]))
         if DTYPE == np.complex128:
             if streamed:
                 kernname = 'kernels/OpenCL_Kernels_double_streamed.c'
@@ -180,22 +173,83 @@ class IRGNOptimizer:
                 self._coils = clarray.to_device(self._queue[0],
                                                 self.par["C"])
 
+        self._subspace = par.get("subspace", 0) > 0
+        basis = None
+        if self._subspace:
+            basis, energy = temporal_basis(model, par, par["subspace"])
+            print("Temporal subspace of rank %i retains %.2f%% of the "
+                  "simulated signal energy." % (par["subspace"], 100*energy))
+
+        if streamed and par["par_slices"] == -1:
+            par["par_slices"] = self._tuneParSlices(
+                basis, trafo, imagespace, DTYPE, DTYPE_real)
+            print("Streaming %i slices per block." % par["par_slices"])
+        if streamed:
+            self._checkParSlices(num_dev)
+        self._setupOperators(basis, trafo, imagespace, DTYPE, DTYPE_real)
+
+        self._gamma = None
+        self._delta = None
+        self._omega = None
+        self._step_val = None
+        self._modelgrad = None
+
+    def _checkParSlices(self, num_dev):
+        # The last block is padded with slices of its predecessor if the
+        # number of slices is not divisible by the block size.
+        nblocks = -(-self.par["NSlice"]//self.par["par_slices"])
+        if nblocks < 2*num_dev:
+            raise ValueError(
+                "Number of Slices devided by parallel "
+                "computed slices and devices needs to be larger two.\n"
+                "Current values are %i total Slices, %i parallel slices and "
+                "%i compute devices."
+                % (self.par["NSlice"], self.par["par_slices"], num_dev))
+        if self._SMS and self.par["NSlice"] % self.par["par_slices"]:
+            raise ValueError(
+                "Number of Slices devided by parallel "
+                "computed slices needs to be an integer.\n"
+                "Current values are %i total Slices with %i parallel slices."
+                % (self.par["NSlice"], self.par["par_slices"]))
+
+    def _tuneParSlices(self, basis, trafo, imagespace, DTYPE, DTYPE_real):
+        # The device footprint is linear in the block size, probe it with
+        # a single slice per block.
+        self.par["par_slices"] = 1
+        self._setupOperators(basis, trafo, imagespace, DTYPE, DTYPE_real)
+        bytes_per_slice = stream_footprint(
+            find_streams(self._pdop, self._MRI_operator))
+        del self._pdop, self._MRI_operator, self._FT
+
+        def trial(par_slices):
+            self.par["par_slices"] = par_slices
+            MRI_operator, _ = operator.Operator.MRIOperatorFactory(
+                self.par, self._prg, DTYPE, DTYPE_real, trafo, imagespace,
+                self._SMS, True, basis=basis)
+            grad_op = operator.Operator.GradientOperatorFactory(
+                self.par, self._prg, DTYPE, DTYPE_real, True)
+            return time_streams(find_streams(MRI_operator, grad_op))
+
+        return tune_par_slices(self.par, bytes_per_slice, trial)
+
+    def _setupOperators(self, basis, trafo, imagespace, DTYPE, DTYPE_real):
         self._MRI_operator, self._FT = operator.Operator.MRIOperatorFactory(
-            par,
+            self.par,
             self._prg,
             DTYPE,
             DTYPE_real,
             trafo,
             imagespace,
-            SMS,
-            streamed
+            self._SMS,
+            self._streamed,
+            basis=basis
             )
 
         grad_op, symgrad_op, self._v = self._setupLinearOps(
             DTYPE,
             DTYPE_real)
 
-        if not reg_type == "H1":
+        if not self._reg_type == "H1":
             self._pdop = optimizer.PDBaseSolver.factory(
                 self._prg,
                 self._queue,
@@ -204,7 +258,7 @@ class IRGNOptimizer:
                 self._fval_init,
                 self._coils,
                 linops=(self._MRI_operator, *grad_op, symgrad_op),
-                model=model,
+                model=self._model,
                 reg_type=self._reg_type,
                 SMS=self._SMS,
                 streamed=self._streamed,
@@ -222,12 +276,6 @@ class IRGNOptimizer:
                 linops=(self._MRI_operator, *grad_op)
                 )
 
-        self._gamma = None
-        self._delta = None
-        self._omega = None
-        self._step_val = None
-        self._modelgrad = None
-
     def _setupLinearOps(self, DTYPE, DTYPE_real):
         if self._reg_type == 'ICTV':
             if hasattr(self._model, "dt"):
@@ -341,13 +389,24 @@ class IRGNOptimizer:
             start = time.time()
 
 
-            self._modelgrad = np.nan_to_num(
-                self._model.execute_gradient(result))
-            self._step_val = np.nan_to_num(
-                self._model.execute_forward(result))
+            with PROFILER.phase("model_evaluation"):
+                if self._model.device_evaluation and not self._streamed:
+                    tmpx = clarray.to_device(self._queue[0], result,
+                                             allocator=self._pool)
+                    self._modelgrad = self._model.execute_gradient_cl(tmpx)
+                    self._step_val = self._model.execute_forward_cl(
+                        tmpx).get()
+                    del tmpx
+                else:
+                    self._modelgrad = np.nan_to_num(
+                        self._model.execute_gradient(result))
+                    self._step_val = np.nan_to_num(
+                        self._model.execute_forward(result))
                 
             # Use this to enable Preconditioning at a certain IGN step.
             if self.precond and ign >= self.irgn_par["precond_startiter"]:
+                if isinstance(self._modelgrad, clarray.Array):
+                    self._modelgrad = self._modelgrad.get()
                 # Switch between pointwise and average preconditioning
                 self._pdop.precond = True
                 self._pdop._grad_op.precond = True
@@ -384,6 +443,13 @@ class IRGNOptimizer:
                     requirements='C')
                 self._pdop.model = self._model
                 self._pdop.modelgrad = self._modelgrad
+            elif self._subspace:
+                self._pdop.model = self._model
+                self._pdop.modelgrad = (
+                    self._MRI_operator.projectModelGradient(self._modelgrad))
+            elif isinstance(self._modelgrad, clarray.Array):
+                self._pdop.model = self._model
+                self._pdop.modelgrad = self._modelgrad
             else:
                 _jacobi = np.sum(
                     np.abs(
@@ -392,11 +458,13 @@ class IRGNOptimizer:
                 self._pdop.model = self._model
                 self._pdop.modelgrad = clarray.to_device(
                     self._queue[0],
-                    self._modelgrad)
+                    self._modelgrad, allocator=self._pool)
 
             self._pdop.updateRegPar(self.irgn_par)
 
-            result = self._irgnSolve3D(result, iters, data, ign)
+            with PROFILER.phase("pd_solver"):
+                result = self._irgnSolve3D(result, iters, data, ign)
+            pd_iters = iters
             if self.precond and ign >= self.irgn_par["precond_startiter"]:
                 result = self.removePrecond(result)
 
@@ -406,9 +474,14 @@ class IRGNOptimizer:
             self.gn_res.append(self._fval)
             print("-" * 75)
             print("GN-Iter: %d  Elapsed time: %f seconds" % (ign, end))
+            if isinstance(self._pdop, optimizer.PDBaseSolver):
+                print("PD iterations: %d of %d" % (
+                    self._pdop.iterations[-1], pd_iters))
+            report_pools()
             print("-" * 75)
             self._fval_old = self._fval
-            self._saveToFile(ign, self._model.rescale(result)["data"])
+            with PROFILER.phase("hdf5_write"):
+                self._saveToFile(ign, self._model.rescale(result)["data"])
             if ign > 1:
                 if (np.abs(self.gn_res[-1]-self.gn_res[-2])/self.gn_res[0]
                     < self.irgn_par["rtol"]):
@@ -419,6 +492,10 @@ class IRGNOptimizer:
             % (ign, np.abs(self.gn_res[-1]-self.gn_res[-2])/self.gn_res[0], 
                              self.irgn_par["rtol"]))
                     break
+        if isinstance(self._pdop, optimizer.PDBaseSolver):
+            print("Total PD iterations: %d%s" % (
+                sum(self._pdop.iterations),
+                " (warm started)" if self._pdop.warm_start else ""))
         if self.precond and ign >= self.irgn_par["precond_startiter"]:            
             self._calcResidual(self.applyPrecond(result), data, ign+1)
         else:
@@ -445,91 +522,52 @@ class IRGNOptimizer:
             self.irgn_par["omega_min"])/(self.irgn_par["lambd"])
 
     def _balanceModelGradients(self, result, ign, cutoff):
-
         jacobi = self._modelgrad.reshape(*self._modelgrad.shape[:2], -1)
-        
+        nvox = jacobi.shape[-1]
         self.k = np.minimum(*self._modelgrad.shape[:2])
-        
-        U = np.zeros((jacobi.shape[-1], self.k, self._modelgrad.shape[0]), dtype=self.par["DTYPE"])
-        V = np.zeros((jacobi.shape[-1], self._modelgrad.shape[1], self.k), dtype=self.par["DTYPE"])
-        E = np.zeros((jacobi.shape[-1], self.k), dtype=self.par["DTYPE"])
-        self.UTE = np.zeros((jacobi.shape[-1], self.k, self._modelgrad.shape[0]), dtype=self.par["DTYPE"])
-        self.EU = np.zeros((jacobi.shape[-1], self.k, self._modelgrad.shape[0]), dtype=self.par["DTYPE"])
-        self.UT = np.zeros((jacobi.shape[-1], self.k, self._modelgrad.shape[0]), dtype=self.par["DTYPE"])
-        
-        jacobi = np.require(jacobi.T, requirements='C')
-
-        maxval = 0
-        minval = 1e30
-        
-        for j in range(jacobi.shape[0]):
-            V[j], E[j], U[j] = spl.svd(jacobi[j], full_matrices=False)
-            if np.any(E[j].imag!=0):
-                print("Non-zero complex eigenvalue")
-
-            E_cut = E[j]
-            #E_no_cut[j] = np.copy(E[j])
-
-            #mCut = E_cut/E_cut[0] < cutoff
-
-
-            # Original Cutoff 
-            E_cut[E_cut/E_cut[0] < cutoff] = cutoff*E_cut[0]
-            einv = 1/E_cut
-
-            #different way of reg.
-            # E[j] += 0.003
-            # einv = 1 / E[j] 
-
-            #einv[~np.isfinite(einv)] = cutoff*einv[0]
-            #einv[mCut] = cutoff*einv[0]
 
-            V[j] = V[j]@np.diag(E[j])@np.diag(einv)
-            
-            maxval = np.maximum(maxval, np.max((E[j])))
-            minval = np.minimum(minval, np.min((E[j])))
+        V = np.zeros(
+            (nvox, self._modelgrad.shape[1], self.k), dtype=self.par["DTYPE"])
+        E = np.zeros((nvox, self.k), dtype=self.par["DTYPE_real"])
+        self.UTE = np.zeros(
+            (nvox, self._modelgrad.shape[0], self.k), dtype=self.par["DTYPE"])
+        self.EU = np.zeros(
+            (nvox, self.k, self._modelgrad.shape[0]), dtype=self.par["DTYPE"])
 
-            #maxval_noClip = np.maximum(maxval, np.max((E_no_cut)))
-            #minval_noClip = np.minimum(minval, np.min((E_no_cut)))
+        jacobi = np.require(jacobi.T, requirements='C')
 
-            self.UTE[j] = np.conj(U[j].T)@np.diag(einv)
-            self.UT[j] = np.diag(einv)
-            self.EU[j] = np.diag(1/einv)@U[j]
+        # Stacked SVDs of the small NScan x unknowns Jacobians, computed
+        # chunk-wise to bound the memory of the LAPACK workspace.
+        chunksize = int(self.irgn_par.get("precond_chunksize", 2**16))
+        for j in range(0, nvox, chunksize):
+            sl = slice(j, j+chunksize)
+            V[sl], E_chunk, U = np.linalg.svd(
+                jacobi[sl], full_matrices=False)
+            E_chunk = np.where(
+                E_chunk/E_chunk[:, :1] < cutoff,
+                cutoff*E_chunk[:, :1],
+                E_chunk)
+            E[sl] = E_chunk
+            self.UTE[sl] = np.conj(np.swapaxes(U, -1, -2))/E_chunk[:, None, :]
+            self.EU[sl] = E_chunk[..., None]*U
+
+        maxval = np.max(E)
+        minval = np.min(E)
         print("-" * 75)
         print("With Clipping")
-        print("Maximum Eigenvalue: ", maxval.real)
-        print("Minimum Eigenvalue: ", minval.real)
-        print("Condition number: ", maxval.real/minval.real)
-        print("Mean Eigenvalues: ", np.mean(E, axis=0).real)
-
-        # print("-" * 75)
-        # print("Without Clipping")
-        # print("Maximum Eigenvalue: ", maxval_noClip.real)
-        # print("Minimum Eigenvalue: ", minval_noClip.real)
-        # print("Condition number: ", maxval_noClip.real/minval_noClip.real)
-        # print("Mean Eigenvalues: ", np.mean(E_no_cut, axis=0).real)
+        print("Maximum Eigenvalue: ", maxval)
+        print("Minimum Eigenvalue: ", minval)
+        print("Condition number: ", maxval/minval)
+        print("Mean Eigenvalues: ", np.mean(E, axis=0))
+
         self._pdop._grad_op.updateRatio(
-            np.mean(E, axis=0).real*np.sqrt(self.par["NSlice"]))
-        # bDrawSV = True
-        # if bDrawSV:
-        #     import matplotlib.pyplot as plt
-        #     plt.figure()
-        #     plt.plot(np.mean(E_no_cut, axis=0).real)
-        #     plt.plot(np.mean(E, axis=0).real)
-        #     plt.legend({"Without Clipping","With Clipping"})
-        #     plt.xlabel("# of Singular Value")
-        #     plt.ylabel("Value (1)")
-        #     plt.grid()
-        #     plt.yscale('log')
-        #     plt.draw()
+            np.mean(E, axis=0)*np.sqrt(self.par["NSlice"]))
 
         V = np.require(np.transpose(V, (2, 1, 0)), requirements='C')
 
         self._modelgrad = V.reshape(*V.shape[:2], *self._modelgrad.shape[2:])
 
         self.UTE = np.require(self.UTE.transpose(1, 2, 0), requirements='C')
-        self.UT = np.require(self.UT.transpose(1, 2, 0), requirements='C')
-
         self.EU = np.require(self.EU.transpose(1, 2, 0), requirements='C')
 
         self._pdop.EU = clarray.to_device(self._pdop._queue[0], self.EU)
@@ -592,28 +630,73 @@ class IRGNOptimizer:
         self._pdop.UTE = clarray.to_device(self._pdop._queue[0], self.UTE)
 
     def applyPrecond(self, inp):
-        tmp_step_val = np.require(inp.reshape(
-            inp.shape[0], -1).T, requirements='C')
-        precond_stepval = np.zeros(
-            (np.prod(inp.shape[1:]), self.k), dtype=self.par["DTYPE"])
+        """Transform the unknowns into the preconditioned basis.
 
-        for j in range(tmp_step_val.shape[0]):
-            precond_stepval[j] = self.EU[..., j]@tmp_step_val[j]
+        Parameters
+        ----------
+          inp : numpy.array or PyOpenCL.Array
+            The unknowns in the original parametrization.
 
-        return np.require(precond_stepval.T.reshape(self.k, *inp.shape[1:]), requirements='C', dtype=self.par["DTYPE"])
+        Returns
+        -------
+          numpy.array or PyOpenCL.Array
+            The preconditioned unknowns, on the host or device like inp.
+        """
+        if isinstance(inp, clarray.Array):
+            return self._precondMatVecDevice(self._pdop.EU, inp)
+        return self._precondMatVec(self.EU, inp)
 
     def removePrecond(self, inp):
-        tmp_step_val = np.require(inp.reshape(
-            inp.shape[0], -1).T, requirements='C')
-        precond_stepval = np.zeros(
-            (np.prod(inp.shape[1:]), self.k), dtype=self.par["DTYPE"])
-        for j in range(tmp_step_val.shape[0]):
-            precond_stepval[j] = self.UTE[..., j]@tmp_step_val[j]
-        return np.require(precond_stepval.T.reshape(self.k, *inp.shape[1:]), requirements='C', dtype=self.par["DTYPE"])
+        """Transform preconditioned unknowns back to the original basis.
 
-    def _balanceModelGradientsNorm(self, result, ign):
+        Parameters
+        ----------
+          inp : numpy.array or PyOpenCL.Array
+            The preconditioned unknowns.
+
+        Returns
+        -------
+          numpy.array or PyOpenCL.Array
+            The unknowns in the original parametrization, on the host or
+            device like inp.
+        """
+        if isinstance(inp, clarray.Array):
+            return self._precondMatVecDevice(self._pdop.UTE, inp)
+        return self._precondMatVec(self.UTE, inp)
+
+    def _precondMatVec(self, mat, inp):
+        # mat holds an (out, in) factor per voxel. It is rectangular if
+        # k = min(NScan, unknowns) is less than the number of unknowns.
+        tmp_step_val = inp.reshape(inp.shape[0], -1)
+        precond_stepval = np.einsum(
+            'ijv,jv->iv', mat, tmp_step_val, optimize=True)
+        return np.require(
+            precond_stepval.reshape(mat.shape[0], *inp.shape[1:]),
+            requirements='C', dtype=self.par["DTYPE"])
+
+    def _precondMatVecDevice(self, mat, inp):
+        # Same as _precondMatVec with the factors already on the device.
+        outp = clarray.empty(
+            self._queue[0], (mat.shape[0],)+inp.shape[1:],
+            dtype=self._DTYPE, allocator=self._pool)
+        outp.add_event(self._prg[0].matvecmult(
+            self._queue[0], (int(np.prod(inp.shape[1:])),), None,
+            outp.data, mat.data, inp.data,
+            np.int32(mat.shape[0]), np.int32(mat.shape[1]),
+            wait_for=outp.events+mat.events+inp.events))
+        return outp
+
+    def _modelGradientNorms(self):
+        if isinstance(self._modelgrad, clarray.Array):
+            return np.sqrt(np.array(
+                [clarray.vdot(self._modelgrad[uk],
+                              self._modelgrad[uk]).get().real
+                 for uk in range(self.par["unknowns"])]))
         scale = self._modelgrad.reshape(self.par["unknowns"], -1)
-        scale = np.linalg.norm(scale, axis=-1)
+        return np.linalg.norm(scale, axis=-1)
+
+    def _balanceModelGradientsNorm(self, result, ign):
+        scale = self._modelGradientNorms()
         print("Initial Norm: ", np.linalg.norm(scale))
         print("Initial Ratio: ", scale)
         scale /= 1e2/np.sqrt(self.par["unknowns"])
@@ -626,8 +709,7 @@ class IRGNOptimizer:
             self._model.uk_scale[uk] *= scale[uk]
             result[uk, ...] /= self._model.uk_scale[uk]
             self._modelgrad[uk] *= self._model.uk_scale[uk]
-        scale = self._modelgrad.reshape(self.par["unknowns"], -1)
-        scale = np.linalg.norm(scale, axis=-1)
+        scale = self._modelGradientNorms()
         print("Norm after rescale: ", np.linalg.norm(scale))
         print("Ratio after rescale: ", np.abs(scale))
 
@@ -672,7 +754,7 @@ class IRGNOptimizer:
             res = data - b + self._MRI_operator.fwdoop(
                 [[x, self._coils, self._pdop.modelgrad]])
         else:
-            tmpx = clarray.to_device(self._queue[0], x)
+            tmpx = clarray.to_device(self._queue[0], x, allocator=self._pool)
             res = data - b + self._MRI_operator.fwdoop(
                 [tmpx, self._coils, self._pdop.modelgrad]).get()
             del tmpx
@@ -761,29 +843,34 @@ class IRGNOptimizer:
         return None
 
     def _calcFwdGNPartLinear(self, x):
-        if self._imagespace is False:
+        if self._subspace:
+            b = self._MRI_operator.FFTScans(
+                np.require(self._step_val[:, None, ...] * self.par["C"],
+                           self._DTYPE, 'C'))
+        elif self._imagespace is False:
             b = clarray.zeros(self._queue[0],
                               self._data_shape,
-                              dtype=self._DTYPE)
+                              dtype=self._DTYPE, allocator=self._pool)
             self._FT.FFT(b, clarray.to_device(
                 self._queue[0],
                 (self._step_val[:, None, ...] *
-                 self.par["C"]))).wait()
+                 self.par["C"]), allocator=self._pool)).wait()
             b = b.get()
         else:
             b = self._step_val
 
-        x = clarray.to_device(self._queue[0], np.require(x, requirements="C"))
-        grad = clarray.to_device(self._queue[0],
-                                 np.zeros(x.shape+(4,), dtype=self._DTYPE))
+        x = clarray.to_device(self._queue[0], np.require(x, requirements="C"),
+                              allocator=self._pool)
+        grad = clarray.zeros(self._queue[0], x.shape+(4,),
+                             dtype=self._DTYPE, allocator=self._pool)
         if "IC" in self._reg_type:
             self._pdop._grad_op_1.fwd(
                 grad,
                 x,
                 wait_for=grad.events +
                 x.events).wait()
-            grad2 = clarray.to_device(self._queue[0],
-                                      np.zeros(x.shape+(4,), dtype=self._DTYPE))
+            grad2 = clarray.zeros(self._queue[0], x.shape+(4,),
+                                  dtype=self._DTYPE, allocator=self._pool)
             self._pdop._grad_op_2.fwd(
                 grad2,
                 x,
@@ -803,10 +890,10 @@ class IRGNOptimizer:
             grad = [grad]
         sym_grad = None
         if self._reg_type == 'TGV':
-            v = clarray.to_device(self._queue[0], self._v)
-            sym_grad = clarray.to_device(self._queue[0],
-                                         np.zeros(x.shape+(8,),
-                                                  dtype=self._DTYPE))
+            v = clarray.to_device(self._queue[0], self._v,
+                                  allocator=self._pool)
+            sym_grad = clarray.zeros(self._queue[0], x.shape+(8,),
+                                     dtype=self._DTYPE, allocator=self._pool)
 
             self._pdop._symgrad_op.fwd(
                 sym_grad,
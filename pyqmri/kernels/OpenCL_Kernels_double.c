@@ -67,6 +67,70 @@ __kernel void squarematvecmult_conj(__global double2* outvec,
     }
 }
 
+__kernel void matvecmult(__global double2* outvec,
+                         __global double2* mat,
+                         __global double2* invec,
+                         const int dimout,
+                         const int dimin
+                         )
+{
+    size_t NVox = get_global_size(0);
+    size_t vox = get_global_id(0);
+
+    for (int dim_x=0; dim_x<dimout; dim_x++)
+    {
+        double2 tmp = 0.0;
+        for (int dim_y=0; dim_y<dimin; dim_y++)
+        {
+            tmp += cmult(invec[dim_y*NVox+vox],
+                         mat[(dim_x*dimin+dim_y)*NVox+vox]);
+        }
+        outvec[dim_x*NVox+vox] = tmp;
+    }
+}
+
+__kernel void subspace_expand(__global double2* out,
+                          __global double2* in,
+                          __global double2* basis,
+                          const int NScan,
+                          const int NSub
+                          )
+{
+    size_t M = get_global_size(1);
+    size_t m = get_global_id(1);
+    size_t n = get_global_id(0);
+    size_t batch = n / NScan;
+    size_t scan = n % NScan;
+
+    double2 sum = 0.0;
+    for (int k=0; k<NSub; k++)
+    {
+        sum += cmult(basis[scan*NSub+k], in[(batch*NSub+k)*M+m]);
+    }
+    out[n*M+m] = sum;
+}
+
+__kernel void subspace_project(__global double2* out,
+                          __global double2* in,
+                          __global double2* basis,
+                          const int NScan,
+                          const int NSub
+                          )
+{
+    size_t M = get_global_size(1);
+    size_t m = get_global_id(1);
+    size_t n = get_global_id(0);
+    size_t batch = n / NSub;
+    size_t k = n % NSub;
+
+    double2 sum = 0.0;
+    for (int scan=0; scan<NScan; scan++)
+    {
+        sum += cmult_conj(in[(batch*NScan+scan)*M+m], basis[scan*NSub+k]);
+    }
+    out[n*M+m] = sum;
+}
+
 __kernel void extrapolate_x(
                 __global double2 *xn1_,
                 __global double2 *xn1,
@@ -230,6 +230,32 @@ __kernel void grid_lut(
     }
 }
 
+__kernel void grid_csr(
+                __global double2 *sg,
+                __global double2 *s,
+                __global int *rowptr,
+                __global int *colind,
+                __global double *val,
+                const int kDim,
+                const int scanoffset
+                )
+{
+    size_t j = get_global_id(2);
+    size_t GDim = get_global_size(2);
+    size_t n = get_global_id(1);
+    size_t NDim = get_global_size(1);
+    size_t scan = get_global_id(0);
+
+    size_t row = (scan+scanoffset)*GDim + j;
+    double2 tmp_dat = 0.0;
+
+    for (int ind = rowptr[row]; ind < rowptr[row+1]; ind++)
+    {
+        tmp_dat += val[ind]*s[colind[ind] + kDim*n + kDim*NDim*scan];
+    }
+    sg[j + GDim*n + GDim*NDim*scan] = tmp_dat;
+}
+
 __kernel void grid_lut3D(
                 __global double *sg,
                 __global double2 *s,
@@ -428,6 +454,34 @@ __kernel void invgrid_lut(
 }
 
 
+__kernel void invgrid_csr(
+                __global double2 *s,
+                __global double2 *sg,
+                __global int *rowptr,
+                __global int *colind,
+                __global double *val,
+                const int gridsize,
+                const int scanoffset
+                )
+{
+    size_t k = get_global_id(2);
+    size_t kDim = get_global_size(2);
+    size_t n = get_global_id(1);
+    size_t NDim = get_global_size(1);
+    size_t scan = get_global_id(0);
+
+    size_t GDim = gridsize*gridsize;
+    size_t row = (scan+scanoffset)*kDim + k;
+    double2 tmp_dat = 0.0;
+
+    for (int ind = rowptr[row]; ind < rowptr[row+1]; ind++)
+    {
+        tmp_dat += val[ind]*sg[colind[ind] + GDim*n + GDim*NDim*scan];
+    }
+    s[k + kDim*n + kDim*NDim*scan] = tmp_dat;
+}
+
+
 __kernel void invgrid_lut3D(
                 __global double2 *s,
                 __global double2 *sg,
@@ -554,6 +608,29 @@ __kernel void copy(
     out[x] = in[x]*scale;
 }
 
+__kernel void coil_combine_adj(
+                __global double2 *out,
+                __global double2 *in,
+                __global double2 *coils,
+                const int NC
+                )
+{
+    size_t x = get_global_id(1);
+    size_t NVox = get_global_size(1);
+    size_t scan = get_global_id(0);
+
+    double2 tmp_in, tmp_coil;
+    double2 sum = 0.0;
+    for (int coil=0; coil < NC; coil++)
+    {
+        tmp_in = in[x+NVox*(coil+NC*scan)];
+        tmp_coil = coils[x+NVox*coil];
+        sum.s0 += tmp_in.s0*tmp_coil.s0 + tmp_in.s1*tmp_coil.s1;
+        sum.s1 += tmp_in.s1*tmp_coil.s0 - tmp_in.s0*tmp_coil.s1;
+    }
+    out[x+NVox*scan] = sum;
+}
+
 
 __kernel void copy_SMS_fwd(
                 __global double2 *out,
@@ -633,22 +710,51 @@ __kernel void copy_SMS_adj(
     }
 }
 
-__kernel void masking(__global double2 *ksp, __global double *mask)
+__kernel void masking(
+                __global double2 *ksp,
+                __global double *mask,
+                const int scan_stride,
+                const int NScan,
+                const int mask_scans,
+                const int mask_len,
+                const int scan_offset
+                )
 {
     size_t x = get_global_id(0);
-    ksp[x] = ksp[x]*mask[x];
+    size_t scan = (x / scan_stride) % NScan + scan_offset;
+    double weight = mask[(scan % mask_scans) * mask_len + x % mask_len];
+    if (weight == 0.0)
+    {
+        ksp[x] = 0.0;
+        return;
+    }
+    ksp[x] = ksp[x]*weight;
 }
 
 __kernel void maskingcpy(
                 __global double2* out,
                 __global double2 *ksp,
-                __global double *mask
+                __global double *mask,
+                const int scan_stride,
+                const int NScan,
+                const int mask_scans,
+                const int mask_len,
+                const int scan_offset
                 )
 {
     size_t x = get_global_id(1);
     size_t dimX = get_global_size(1);
     size_t n = get_global_id(0);
-    out[x+n*dimX] = ksp[x+n*dimX]*mask[x];
+    size_t ind = x+n*dimX;
+    size_t scan = (ind / scan_stride) % NScan + scan_offset;
+    double weight = mask[(scan % mask_scans) * mask_len + ind % mask_len];
+    // Unsampled k-space points are not read.
+    if (weight == 0.0)
+    {
+        out[ind] = 0.0;
+        return;
+    }
+    out[ind] = ksp[ind]*weight;
 }
 
 __kernel void fftshift(__global double2* ksp, __global double *check)
@@ -675,6 +781,65 @@ __kernel void fftshift3D(__global double2* ksp, __global double *check)
 }
 
 
+__kernel void toeplitz_pad(
+                __global double2 *out,
+                __global double2 *in,
+                const int NZ,
+                const int NY,
+                const int NX,
+                const int NZp
+                )
+{
+    size_t x = get_global_id(2);
+    size_t NXp = get_global_size(2);
+    size_t y = get_global_id(1);
+    size_t NYp = get_global_size(1);
+    size_t k = get_global_id(0);
+    size_t z = k % NZp;
+    size_t n = k / NZp;
+
+    if (x < NX && y < NY && z < NZ)
+        out[x+NXp*y+NXp*NYp*k] = in[x+NX*y+NX*NY*(z+NZ*n)];
+    else
+        out[x+NXp*y+NXp*NYp*k] = 0.0f;
+}
+
+__kernel void toeplitz_crop(
+                __global double2 *out,
+                __global double2 *in,
+                const int NZ,
+                const int NZp,
+                const int NYp,
+                const int NXp
+                )
+{
+    size_t x = get_global_id(2);
+    size_t NX = get_global_size(2);
+    size_t y = get_global_id(1);
+    size_t NY = get_global_size(1);
+    size_t k = get_global_id(0);
+    size_t z = k % NZ;
+    size_t n = k / NZ;
+
+    out[x+NX*y+NX*NY*k] = in[x+NXp*y+NXp*NYp*(z+NZp*n)];
+}
+
+__kernel void toeplitz_mult(
+                __global double2 *ksp,
+                __global double *psf,
+                const int NBatch,
+                const int scanoffset
+                )
+{
+    size_t i = get_global_id(1);
+    size_t NPix = get_global_size(1);
+    size_t k = get_global_id(0);
+    size_t scan = k / NBatch + scanoffset;
+
+    ksp[i+NPix*k] = ksp[i+NPix*k]*psf[i+NPix*scan];
+}
+
+
 __kernel void copy_SMS_fwdkspace(
                 __global double2 *out,
                 __global double2 *in,
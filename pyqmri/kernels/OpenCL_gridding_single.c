@@ -225,6 +225,32 @@ __kernel void grid_lut(
     }
 }
 
+__kernel void grid_csr(
+                __global float2 *sg,
+                __global float2 *s,
+                __global int *rowptr,
+                __global int *colind,
+                __global float *val,
+                const int kDim,
+                const int scanoffset
+                )
+{
+    size_t j = get_global_id(2);
+    size_t GDim = get_global_size(2);
+    size_t n = get_global_id(1);
+    size_t NDim = get_global_size(1);
+    size_t scan = get_global_id(0);
+
+    size_t row = (scan+scanoffset)*GDim + j;
+    float2 tmp_dat = 0.0f;
+
+    for (int ind = rowptr[row]; ind < rowptr[row+1]; ind++)
+    {
+        tmp_dat += val[ind]*s[colind[ind] + kDim*n + kDim*NDim*scan];
+    }
+    sg[j + GDim*n + GDim*NDim*scan] = tmp_dat;
+}
+
 __kernel void grid_lut3D(
                 __global float *sg,
                 __global float2 *s,
@@ -423,6 +449,34 @@ __kernel void invgrid_lut(
 }
 
 
+__kernel void invgrid_csr(
+                __global float2 *s,
+                __global float2 *sg,
+                __global int *rowptr,
+                __global int *colind,
+                __global float *val,
+                const int gridsize,
+                const int scanoffset
+                )
+{
+    size_t k = get_global_id(2);
+    size_t kDim = get_global_size(2);
+    size_t n = get_global_id(1);
+    size_t NDim = get_global_size(1);
+    size_t scan = get_global_id(0);
+
+    size_t GDim = gridsize*gridsize;
+    size_t row = (scan+scanoffset)*kDim + k;
+    float2 tmp_dat = 0.0f;
+
+    for (int ind = rowptr[row]; ind < rowptr[row+1]; ind++)
+    {
+        tmp_dat += val[ind]*sg[colind[ind] + GDim*n + GDim*NDim*scan];
+    }
+    s[k + kDim*n + kDim*NDim*scan] = tmp_dat;
+}
+
+
 __kernel void invgrid_lut3D(
                 __global float2 *s,
                 __global float2 *sg,
@@ -549,6 +603,29 @@ __kernel void copy(
     out[x] = in[x]*scale;
 }
 
+__kernel void coil_combine_adj(
+                __global float2 *out,
+                __global float2 *in,
+                __global float2 *coils,
+                const int NC
+                )
+{
+    size_t x = get_global_id(1);
+    size_t NVox = get_global_size(1);
+    size_t scan = get_global_id(0);
+
+    float2 tmp_in, tmp_coil;
+    float2 sum = 0.0f;
+    for (int coil=0; coil < NC; coil++)
+    {
+        tmp_in = in[x+NVox*(coil+NC*scan)];
+        tmp_coil = coils[x+NVox*coil];
+        sum.s0 += tmp_in.s0*tmp_coil.s0 + tmp_in.s1*tmp_coil.s1;
+        sum.s1 += tmp_in.s1*tmp_coil.s0 - tmp_in.s0*tmp_coil.s1;
+    }
+    out[x+NVox*scan] = sum;
+}
+
 
 __kernel void copy_SMS_fwd(
                 __global float2 *out,
@@ -628,22 +705,51 @@ __kernel void copy_SMS_adj(
     }
 }
 
-__kernel void masking(__global float2 *ksp, __global float *mask)
+__kernel void masking(
+                __global float2 *ksp,
+                __global float *mask,
+                const int scan_stride,
+                const int NScan,
+                const int mask_scans,
+                const int mask_len,
+                const int scan_offset
+                )
 {
     size_t x = get_global_id(0);
-    ksp[x] = ksp[x]*mask[x];
+    size_t scan = (x / scan_stride) % NScan + scan_offset;
+    float weight = mask[(scan % mask_scans) * mask_len + x % mask_len];
+    if (weight == 0.0f)
+    {
+        ksp[x] = 0.0f;
+        return;
+    }
+    ksp[x] = ksp[x]*weight;
 }
 
 __kernel void maskingcpy(
                 __global float2* out,
                 __global float2 *ksp,
-                __global float *mask
+                __global float *mask,
+                const int scan_stride,
+                const int NScan,
+                const int mask_scans,
+                const int mask_len,
+                const int scan_offset
                 )
 {
     size_t x = get_global_id(1);
     size_t dimX = get_global_size(1);
     size_t n = get_global_id(0);
-    out[x+n*dimX] = ksp[x+n*dimX]*mask[x];
+    size_t ind = x+n*dimX;
+    size_t scan = (ind / scan_stride) % NScan + scan_offset;
+    float weight = mask[(scan % mask_scans) * mask_len + ind % mask_len];
+    // Unsampled k-space points are not read.
+    if (weight == 0.0f)
+    {
+        out[ind] = 0.0f;
+        return;
+    }
+    out[ind] = ksp[ind]*weight;
 }
 
 __kernel void fftshift(__global float2* ksp, __global float *check)
@@ -670,6 +776,65 @@ __kernel void fftshift3D(__global float2* ksp, __global float *check)
 }
 
 
+__kernel void toeplitz_pad(
+                __global float2 *out,
+                __global float2 *in,
+                const int NZ,
+                const int NY,
+                const int NX,
+                const int NZp
+                )
+{
+    size_t x = get_global_id(2);
+    size_t NXp = get_global_size(2);
+    size_t y = get_global_id(1);
+    size_t NYp = get_global_size(1);
+    size_t k = get_global_id(0);
+    size_t z = k % NZp;
+    size_t n = k / NZp;
+
+    if (x < NX && y < NY && z < NZ)
+        out[x+NXp*y+NXp*NYp*k] = in[x+NX*y+NX*NY*(z+NZ*n)];
+    else
+        out[x+NXp*y+NXp*NYp*k] = 0.0f;
+}
+
+__kernel void toeplitz_crop(
+                __global float2 *out,
+                __global float2 *in,
+                const int NZ,
+                const int NZp,
+                const int NYp,
+                const int NXp
+                )
+{
+    size_t x = get_global_id(2);
+    size_t NX = get_global_size(2);
+    size_t y = get_global_id(1);
+    size_t NY = get_global_size(1);
+    size_t k = get_global_id(0);
+    size_t z = k % NZ;
+    size_t n = k / NZ;
+
+    out[x+NX*y+NX*NY*k] = in[x+NXp*y+NXp*NYp*(z+NZp*n)];
+}
+
+__kernel void toeplitz_mult(
+                __global float2 *ksp,
+                __global float *psf,
+                const int NBatch,
+                const int scanoffset
+                )
+{
+    size_t i = get_global_id(1);
+    size_t NPix = get_global_size(1);
+    size_t k = get_global_id(0);
+    size_t scan = k / NBatch + scanoffset;
+
+    ksp[i+NPix*k] = ksp[i+NPix*k]*psf[i+NPix*scan];
+}
+
+
 __kernel void copy_SMS_fwdkspace(
                 __global float2 *out,
                 __global float2 *in,
@@ -326,25 +326,51 @@ __kernel void copy_SMS_adj(
 }
 
 
-__kernel void masking(__global float2 *ksp, __global float *mask)
+__kernel void masking(
+                __global float2 *ksp,
+                __global float *mask,
+                const int scan_stride,
+                const int NScan,
+                const int mask_scans,
+                const int mask_len,
+                const int scan_offset
+                )
 {
     size_t x = get_global_id(0);
-    ksp[x] = ksp[x]*mask[x];
+    size_t scan = (x / scan_stride) % NScan + scan_offset;
+    float weight = mask[(scan % mask_scans) * mask_len + x % mask_len];
+    if (weight == 0.0f)
+    {
+        ksp[x] = 0.0f;
+        return;
+    }
+    ksp[x] = ksp[x]*weight;
 }
 
-
 __kernel void maskingcpy(
                 __global float2* out,
                 __global float2 *ksp,
-                __global float *mask
+                __global float *mask,
+                const int scan_stride,
+                const int NScan,
+                const int mask_scans,
+                const int mask_len,
+                const int scan_offset
                 )
 {
-    size_t x = get_global_id(2);
-    size_t dimX = get_global_size(2);
-    size_t y = get_global_id(1);
-    size_t dimY = get_global_size(1);
+    size_t x = get_global_id(1);
+    size_t dimX = get_global_size(1);
     size_t n = get_global_id(0);
-    out[x+y*dimX+dimX*dimY*n] = ksp[x+y*dimX+dimX*dimY*n]*mask[x+y*dimX];
+    size_t ind = x+n*dimX;
+    size_t scan = (ind / scan_stride) % NScan + scan_offset;
+    float weight = mask[(scan % mask_scans) * mask_len + ind % mask_len];
+    // Unsampled k-space points are not read.
+    if (weight == 0.0f)
+    {
+        out[ind] = 0.0f;
+        return;
+    }
+    out[ind] = ksp[ind]*weight;
 }
 
 
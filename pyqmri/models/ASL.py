@@ -18,66 +18,61 @@ def _T1pr(T1, f, f_sc, lambd):
         "1/T1+f*f_sc/lambd")
 
 
-def _S1(M0, alpha, lambd, f, T1, T1p, del_t,  t, tau, expAttT1b):
+_S1 = ("2*alpha*M0/lambd * f/T1p * expAttT1b * "
+       "(1-exp(-(t-del_t) * T1p))")
+
+_S2 = ("2*alpha*M0/lambd * f/T1p * expAttT1b * "
+       "exp(-(t-del_t-tau) * T1p) * "
+       "(1-exp(-tau * T1p))")
+
+_delCBF1 = (
+    "(-2*M0*f*f_sc**2*(del_t*del_t_sc - t) * "
+    "exp((del_t*del_t_sc - t) * T1p) * expAttT1b / (lambd**2*T1p) - "
+    "2*M0*f*f_sc**2 * (-exp((del_t*del_t_sc - t) * T1p) + 1) * "
+    "expAttT1b / (lambd**2*T1p**2) + "
+    "2*M0*f_sc*(-exp((del_t*del_t_sc - t) * T1p) + 1) * expAttT1b / "
+    "(lambd*T1p))*alpha")
+
+_delCBF2 = (
+    "(2*M0*f*f_sc**2*tau *  exp(-tau*T1p) * "
+    "exp(T1p * (del_t*del_t_sc - t + tau)) * "
+    "expAttT1b / (lambd**2*T1p) + "
+    "2*M0*f*f_sc**2 * (1 - exp(-tau*T1p)) * "
+    "(del_t*del_t_sc - t + tau) * "
+    "exp(T1p * (del_t*del_t_sc - t + tau)) * "
+    "expAttT1b / (lambd**2*T1p) - "
+    "2*M0*f*f_sc**2 * (1 - exp(-tau*T1p)) * "
+    "exp(T1p * (del_t*del_t_sc - t + tau)) * "
+    "expAttT1b / (lambd**2*T1p**2) + "
+    "2*M0*f_sc * (1 - exp(-tau*T1p)) * "
+    "exp(T1p * (del_t*del_t_sc - t + tau)) * "
+    "expAttT1b / (lambd*T1p)) * "
+    "alpha")
+
+_delATT1 = (
+    "(-2*M0*del_t_sc*f*f_sc * exp((del_t*del_t_sc - t) * T1p) * "
+    "expAttT1b/lambd - "
+    "2*M0*del_t_sc*f*f_sc*(- exp((del_t*del_t_sc - t) * T1p) + 1) * "
+    "expAttT1b / (T1b*lambd*T1p))*alpha")
+
+_delATT2 = (
+    "(2*M0*del_t_sc*f*f_sc * (1 - exp(-tau*T1p)) * "
+    "exp(T1p * (del_t*del_t_sc - t + tau)) * expAttT1b/lambd - "
+    "2*M0*del_t_sc*f*f_sc * (1 - exp(-tau*T1p)) * "
+    "exp(T1p * (del_t*del_t_sc - t + tau)) * expAttT1b / "
+    "(T1b*lambd*T1p))*alpha")
+
+
+def _piecewise(during, after, ind_during, ind_after, variables):
+    """Evaluate the signal during and after the bolus in a single pass.
+
+    Both expressions are evaluated over the whole volume, which avoids
+    gathering and scattering every operand with the boolean masks.
+    """
+    variables = dict(variables, ind_during=ind_during, ind_after=ind_after)
     return ne.evaluate(
-        "2*alpha*M0/lambd * f/T1p * expAttT1b * \
-        (1-exp(-(t-del_t) * T1p))")
-
-
-def _S2(M0, alpha, lambd, f, T1, T1p, del_t, t, tau, expAttT1b):
-    return ne.evaluate(
-        "2*alpha*M0/lambd * f/T1p * expAttT1b * \
-         exp(-(t-del_t-tau) * T1p) * \
-         (1-exp(-tau * T1p))")
-
-
-def _delCBF1(M0, alpha, lambd, f, f_sc, T1, del_t,
-             del_t_sc, T1b, t, tau, T1p, expAttT1b):
-    return ne.evaluate(
-        "(-2*M0*f*f_sc**2*(del_t*del_t_sc - t) *\
-         exp((del_t*del_t_sc - t) * T1p) * expAttT1b / (lambd**2*T1p) -\
-         2*M0*f*f_sc**2 * (-exp((del_t*del_t_sc - t) * T1p) + 1) * \
-         expAttT1b / (lambd**2*T1p**2) +\
-         2*M0*f_sc*(-exp((del_t*del_t_sc - t) * T1p) + 1) * expAttT1b /\
-         (lambd*T1p))*alpha")
-
-
-def _delCBF2(M0, alpha, lambd, f, f_sc, T1, del_t,
-             del_t_sc, T1b, t, tau, T1p, expAttT1b):
-    return ne.evaluate(
-        "(2*M0*f*f_sc**2*tau *  exp(-tau*T1p) *\
-          exp(T1p * (del_t*del_t_sc - t + tau)) * \
-          expAttT1b / (lambd**2*T1p) +\
-          2*M0*f*f_sc**2 * (1 - exp(-tau*T1p)) * \
-          (del_t*del_t_sc - t + tau) *\
-          exp(T1p * (del_t*del_t_sc - t + tau)) * \
-          expAttT1b / (lambd**2*T1p) -\
-          2*M0*f*f_sc**2 * (1 - exp(-tau*T1p)) * \
-          exp(T1p * (del_t*del_t_sc - t + tau)) * \
-          expAttT1b / (lambd**2*T1p**2) +\
-          2*M0*f_sc * (1 - exp(-tau*T1p)) * \
-          exp(T1p * (del_t*del_t_sc - t + tau)) * \
-          expAttT1b / (lambd*T1p)) *\
-          alpha")
-
-
-def _delATT1(M0, alpha, lambd, f, f_sc, T1, del_t,
-             del_t_sc, T1b, t, tau, T1p, expAttT1b):
-    return ne.evaluate(
-        "(-2*M0*del_t_sc*f*f_sc * exp((del_t*del_t_sc - t) * T1p) *\
-          expAttT1b/lambd -\
-          2*M0*del_t_sc*f*f_sc*(- exp((del_t*del_t_sc - t) * T1p) + 1) *\
-          expAttT1b / (T1b*lambd*T1p))*alpha")
-
-
-def _delATT2(M0, alpha, lambd, f, f_sc, T1, del_t,
-             del_t_sc, T1b, t, tau, T1p, expAttT1b):
-    return ne.evaluate(
-        "(2*M0*del_t_sc*f*f_sc * (1 - exp(-tau*T1p)) *\
-          exp(T1p * (del_t*del_t_sc - t + tau)) * expAttT1b/lambd -\
-          2*M0*del_t_sc*f*f_sc * (1 - exp(-tau*T1p)) *\
-          exp(T1p * (del_t*del_t_sc - t + tau)) * expAttT1b /\
-          (T1b*lambd*T1p))*alpha")
+        "where(ind_during, %s, where(ind_after, %s, 0))" % (during, after),
+        local_dict=variables)
 
 
 class Model(BaseModel):
@@ -161,21 +156,16 @@ class Model(BaseModel):
 
         T1prinv = _T1pr(self.T1, x[0], self.uk_scale[0], self.lambd)
         expAtt = _expAttT1b(x[1], self.uk_scale[1], self.T1b)
+        variables = {"M0": self.M0, "alpha": self.alpha,
+                     "lambd": self.lambd, "f": f, "T1p": T1prinv,
+                     "del_t": del_t, "expAttT1b": expAtt}
         for j in range(self.t.shape[0]):
-            ind_low = self.t[j] >= del_t
-            ind_high = self.t[j] < (del_t+self.tau[j])
-            ind = ind_low & ind_high
-            if np.any(ind):
-                S[j, ind] = _S1(self.M0[ind], self.alpha[ind],
-                                self.lambd[ind], f[ind], self.T1[ind],
-                                T1prinv[ind], del_t[ind],
-                                self.t[j], self.tau[j, ind], expAtt[ind])
-            ind = self.t[j] >= del_t + self.tau[j]
-            if np.any(ind):
-                S[j, ind] = _S2(self.M0[ind], self.alpha[ind],
-                                self.lambd[ind], f[ind], self.T1[ind],
-                                T1prinv[ind], del_t[ind],
-                                self.t[j], self.tau[j, ind], expAtt[ind])
+            variables.update(t=self.t[j], tau=self.tau[j])
+            S[j] = _piecewise(
+                _S1, _S2,
+                (self.t[j] >= del_t) & (self.t[j] < (del_t+self.tau[j])),
+                self.t[j] >= del_t + self.tau[j],
+                variables)
         S[~np.isfinite(S)] = 1e-20
         S = np.array(S, dtype=self._DTYPE)
         return S
@@ -189,46 +179,19 @@ class Model(BaseModel):
         t = self.t
         T1prinv = _T1pr(self.T1, x[0], self.uk_scale[0], self.lambd)
         expAtt = _expAttT1b(x[1], self.uk_scale[1], self.T1b)
+        variables = {"M0": self.M0, "alpha": self.alpha,
+                     "lambd": self.lambd, "f": x[0], "f_sc": f_sc,
+                     "del_t": x[1], "del_t_sc": del_t_sc, "T1b": self.T1b,
+                     "T1p": T1prinv, "expAttT1b": expAtt}
         for j in range(self.t.shape[0]):
-            ind_low = self.t[j] >= del_t
-            ind_high = self.t[j] < (del_t+self.tau[j])
-            ind = ind_low & ind_high
-            if np.any(ind):
-                grad[0, j, ind] = _delCBF1(self.M0[ind], self.alpha[ind],
-                                           self.lambd[ind], x[0, ind],
-                                           f_sc,
-                                           self.T1[ind], x[1, ind],
-                                           del_t_sc, self.T1b[ind], t[j],
-                                           self.tau[j, ind],
-                                           T1prinv[ind],
-                                           expAtt[ind])
-                grad[1, j, ind] = _delATT1(self.M0[ind], self.alpha[ind],
-                                           self.lambd[ind], x[0, ind],
-                                           f_sc,
-                                           self.T1[ind], x[1, ind],
-                                           del_t_sc, self.T1b[ind], t[j],
-                                           self.tau[j, ind],
-                                           T1prinv[ind],
-                                           expAtt[ind])
-
-            ind = self.t[j] >= del_t + self.tau[j]
-            if np.any(ind):
-                grad[0, j, ind] = _delCBF2(self.M0[ind], self.alpha[ind],
-                                           self.lambd[ind], x[0, ind],
-                                           f_sc,
-                                           self.T1[ind], x[1, ind],
-                                           del_t_sc, self.T1b[ind], t[j],
-                                           self.tau[j, ind],
-                                           T1prinv[ind],
-                                           expAtt[ind])
-                grad[1, j, ind] = _delATT2(self.M0[ind], self.alpha[ind],
-                                           self.lambd[ind], x[0, ind],
-                                           f_sc,
-                                           self.T1[ind], x[1, ind],
-                                           del_t_sc, self.T1b[ind], t[j],
-                                           self.tau[j, ind],
-                                           T1prinv[ind],
-                                           expAtt[ind])
+            variables.update(t=t[j], tau=self.tau[j])
+            ind_during = ((self.t[j] >= del_t)
+                          & (self.t[j] < (del_t+self.tau[j])))
+            ind_after = self.t[j] >= del_t + self.tau[j]
+            grad[0, j] = _piecewise(
+                _delCBF1, _delCBF2, ind_during, ind_after, variables)
+            grad[1, j] = _piecewise(
+                _delATT1, _delATT2, ind_during, ind_after, variables)
         grad[~np.isfinite(grad)] = 1e-20
         grad = np.array(grad, dtype=self._DTYPE)
         return grad
@@ -4,7 +4,9 @@
 import configparser
 import numpy as np
 import sympy
+import pyopencl.array as clarray
 from pyqmri.models.template import BaseModel, constraints
+from pyqmri._helper_fun._model_codegen import SympyCLModel
 
 
 def _str2bool(v):
@@ -41,6 +43,10 @@ class Model(BaseModel):
         forward and gradient evaluation.
       init_values : list of str
           Initial guess for each unknown
+      device_evaluation : bool
+        If par["opencl_model"] is set, the signal and its partial
+        derivatives are additionally translated to OpenCL and can be
+        evaluated directly into device buffers.
     """
 
     def __init__(self, par):
@@ -132,8 +138,21 @@ class Model(BaseModel):
 
         self._plot = []
         self._phase = None
+        self._phase_cl = None
         self.guess = None
 
+        self._cl_model = None
+        if par.get("opencl_model", False):
+            try:
+                self._cl_model = SympyCLModel(
+                    signaleq, unknowns, uk_scale, modelpar,
+                    self.modelparams,
+                    (self.NScan, self.NSlice, self.dimY, self.dimX),
+                    phase=self.indphase, DTYPE=self._DTYPE)
+                self.device_evaluation = True
+            except (NotImplementedError, ValueError) as err:
+                print("Evaluating the model on the host: " + str(err))
+
     def rescale(self, x):
         """Rescale the unknowns with the scaling factors.
 
@@ -189,6 +208,54 @@ class Model(BaseModel):
         modelgradient[~np.isfinite(modelgradient)] = 1e-20
         return modelgradient
 
+    def _phaseCL(self, queue):
+        if not self.indphase:
+            return None
+        if self._phase_cl is None or self._phase_cl.queue != queue:
+            self._phase_cl = clarray.to_device(
+                queue, np.require(np.broadcast_to(
+                    self._phase,
+                    (self.NScan, self.NSlice, self.dimY, self.dimX)),
+                    self._DTYPE, requirements='C'))
+        return self._phase_cl
+
+    def execute_forward_cl(self, x, out=None):
+        """Execute the signal model on the device.
+
+        Parameters
+        ----------
+          x : PyOpenCL.Array
+            The array of quantitative parameters to be fitted
+          out : PyOpenCL.Array, None
+            Optional output array of shape (NScan, NSlice, dimY, dimX).
+
+        Returns
+        -------
+          PyOpenCL.Array
+            The image series.
+        """
+        return self._cl_model.forward(
+            x, self.uk_scale, self._phaseCL(x.queue), out)
+
+    def execute_gradient_cl(self, x, out=None):
+        """Execute the partial derivatives of the signal model on the device.
+
+        Parameters
+        ----------
+          x : PyOpenCL.Array
+            The array of quantitative parameters to be fitted
+          out : PyOpenCL.Array, None
+            Optional output array of shape
+            (unknowns, NScan, NSlice, dimY, dimX).
+
+        Returns
+        -------
+          PyOpenCL.Array
+            The partial derivatives.
+        """
+        return self._cl_model.gradient(
+            x, self.uk_scale, self._phaseCL(x.queue), out)
+
     def computeInitialGuess(self, **kwargs):
         """Initialize unknown array for the fitting.
 
@@ -204,6 +271,7 @@ class Model(BaseModel):
         """
         if self.indphase is True:
             self._phase = np.exp(1j*(np.angle(kwargs['images'])-np.angle(kwargs['images'][0])))
+            self._phase_cl = None
         x = np.ones((len(self.init_values),
                      self.NSlice, self.dimY, self.dimX), self._DTYPE)
         for j in range(len(self.init_values)):
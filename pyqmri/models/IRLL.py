@@ -128,10 +128,38 @@ class Model(BaseModel):
                 "unknown_name": ["M0", "T1"],
                 "real_valued": const}
 
+    def _projectionMeans(self, Etau_cos_phi):
+        """Per scan means of the signal recursion over the projections.
+
+        With r = Etau*cos_phi and n = i*Nproj + j + 1 for projection j of
+        scan i, the means over j of r**(n-1) and (n-1)*r**(n-1) are
+        r**(i*Nproj)*G and r**(i*Nproj)*(i*Nproj*G + D), with G and D the
+        means of r**j and j*r**j over one scan. G and D are identical for
+        all scans and accumulated once, which avoids the cancellation of
+        the closed form geometric sums for r close to one.
+
+        Parameters
+        ----------
+          Etau_cos_phi : numpy.array
+            The decay per projection r.
+
+        Returns
+        -------
+          tuple of numpy.array
+            The means G and D over one scan.
+        """
+        G = np.zeros_like(Etau_cos_phi)
+        D = np.zeros_like(Etau_cos_phi)
+        r_pow = np.ones_like(Etau_cos_phi)
+        for j in range(self.Nproj):
+            G += r_pow
+            D += j * r_pow
+            r_pow *= Etau_cos_phi
+        return G / self.Nproj, D / self.Nproj
+
     def _execute_forward_3D(self, x):
         S = np.zeros(
             (self.NScan,
-             self.Nproj,
              self.NSlice,
              self.dimY,
              self.dimX),
@@ -157,23 +185,22 @@ class Model(BaseModel):
              Etd - 2 * Etd + 1) / (Etr * Etd * (Etau * cos_phi)**(N - 1) *
                                    cos_phi + 1)
         Q_F = Q - F
+        Etau_cos_phi = Etau * cos_phi
+        G, _ = self._projectionMeans(Etau_cos_phi)
 
-        def numexpeval_S(M0, M0_sc, sin_phi, cos_phi, n, Q_F, F, Etau):
+        def numexpeval_S(M0, M0_sc, sin_phi, Etau_cos_phi, k, G, Q_F, F):
             return ne.evaluate(
-                "M0*M0_sc*((Etau*cos_phi)**(n - 1)*Q_F + F)*sin_phi")
+                "M0*M0_sc*(Etau_cos_phi**k*G*Q_F + F)*sin_phi")
         for i in range(self.NScan):
-            for j in range(self.Nproj):
-                n = i * self.Nproj + j + 1
-                S[i, j, ...] = numexpeval_S(
-                    M0, M0_sc, sin_phi, cos_phi, n, Q_F, F, Etau)
+            S[i, ...] = numexpeval_S(
+                M0, M0_sc, sin_phi, Etau_cos_phi, i * self.Nproj, G, Q_F, F)
 
-        return np.mean(S, axis=1, dtype=self._DTYPE).astype(self._DTYPE)
+        return S
 
     def _execute_gradient_3D(self, x):
         grad = np.zeros(
             (2,
              self.NScan,
-             self.Nproj,
              self.NSlice,
              self.dimY,
              self.dimX),
@@ -254,36 +281,38 @@ class Model(BaseModel):
                     )
             ) / (x[1, ...] * scale)
 
-        def numexpeval_M0(M0_sc, sin_phi, cos_phi, n, Q_F, F, Etau):
+        Etau_cos_phi = Etau * cos_phi
+        G, D = self._projectionMeans(Etau_cos_phi)
+
+        def numexpeval_M0(M0_sc, sin_phi, Etau_cos_phi, k, G, Q_F, F):
             return ne.evaluate(
-                "M0_sc*((Etau*cos_phi)**(n - 1)*Q_F + F)*sin_phi")
+                "M0_sc*(Etau_cos_phi**k*G*Q_F + F)*sin_phi")
 
         def numexpeval_T1(
                 M0,
                 M0_sc,
-                Etau,
-                cos_phi,
+                Etau_cos_phi,
                 sin_phi,
-                n,
+                k,
+                G,
+                D,
                 tmp1,
                 tmp2,
                 tmp3,
                 tau):
             return ne.evaluate(
-                "M0*M0_sc*((Etau*cos_phi)**(n - 1)*tmp1 + "
-                "tmp2 + tau*(Etau*cos_phi)**(n - 1)*(n - 1)*tmp3)*sin_phi")
+                "M0*M0_sc*(Etau_cos_phi**k*G*tmp1 + "
+                "tmp2 + tau*Etau_cos_phi**k*(k*G + D)*tmp3)*sin_phi")
 
         for i in range(self.NScan):
-            for j in range(self.Nproj):
-                n = i * self.Nproj + j + 1
-
-                grad[0, i, j, ...] = numexpeval_M0(
-                    M0_sc, sin_phi, cos_phi, n, Q_F, F, Etau)
-                grad[1, i, j, ...] = numexpeval_T1(
-                    M0, M0_sc, Etau, cos_phi, sin_phi, n,
-                    tmp1, tmp2, tmp3, tau)
-
-        return np.mean(grad, axis=2, dtype=self._DTYPE).astype(self._DTYPE)
+            k = i * self.Nproj
+            grad[0, i, ...] = numexpeval_M0(
+                M0_sc, sin_phi, Etau_cos_phi, k, G, Q_F, F)
+            grad[1, i, ...] = numexpeval_T1(
+                M0, M0_sc, Etau_cos_phi, sin_phi, k, G, D,
+                tmp1, tmp2, tmp3, tau)
+
+        return grad
 
     def computeInitialGuess(self, **kwargs):
         """Initialize unknown array for the fitting.
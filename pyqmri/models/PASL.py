@@ -30,45 +30,46 @@ def _T1r(T1app, T1b):
         "T1app - 1/T1b")
 
 
-def _S1(M0, alpha, lambd, f, T1r, expT1r, expAttT1r, expT1app):
+_S1 = "2*M0*alpha*f*(expT1r - expAttT1r)*expT1app/(lambd*T1r)"
+
+_S2 = ("2*M0*alpha*f*(exp((del_t + tau)*T1r) - expAttT1r)*expT1app"
+       "/(lambd*T1r)")
+
+_delCBF1 = (
+    "-2*M0*alpha*f*f_sc**2*t*(expT1r - expAttT1r)*expT1app/(lambd**2*T1r) "
+    "- 2*M0*alpha*f*f_sc**2*(expT1r - expAttT1r)*expT1app/(lambd**2*T1r**2) "
+    "+ 2*M0*alpha*f*f_sc*(-del_t*del_t_sc*f_sc*expAttT1r/lambd "
+    "+ f_sc*t*expT1r/lambd)*expT1app/(lambd*T1r) "
+    "+ 2*M0*alpha*f_sc*(expT1r - expAttT1r)*expT1app/(lambd*T1r)")
+
+_delCBF2 = (
+    "-2*M0*alpha*f*f_sc**2*t*(exp((del_t*del_t_sc + tau)*T1r) - expAttT1r)"
+    "*expT1app/(lambd**2*T1r) "
+    "- 2*M0*alpha*f*f_sc**2*(exp((del_t*del_t_sc + tau)*T1r) - expAttT1r)"
+    "*expT1app/(lambd**2*T1r**2) "
+    "+ 2*M0*alpha*f*f_sc*(-del_t*del_t_sc*f_sc*expAttT1r/lambd "
+    "+ f_sc*(del_t*del_t_sc + tau)*exp((del_t*del_t_sc + tau)*T1r)/lambd)"
+    "*expT1app/(lambd*T1r) "
+    "+ 2*M0*alpha*f_sc*(exp((del_t*del_t_sc + tau)*T1r) - expAttT1r)"
+    "*expT1app/(lambd*T1r)")
+
+_delATT1 = "-2*M0*alpha*del_t_sc*f*f_sc*expT1app*expAttT1r/lambd"
+
+_delATT2 = (
+    "2*M0*alpha*f*f_sc*(del_t_sc*T1r*exp((del_t*del_t_sc + tau)*T1r) "
+    "- del_t_sc*T1r*expAttT1r)*expT1app/(lambd*T1r)")
+
+
+def _piecewise(during, after, ind_during, ind_after, variables):
+    """Evaluate the signal during and after the bolus in a single pass.
+
+    Both expressions are evaluated over the whole volume, which avoids
+    gathering and scattering every operand with the boolean masks.
+    """
+    variables = dict(variables, ind_during=ind_during, ind_after=ind_after)
     return ne.evaluate(
-        "2*M0*alpha*f*(expT1r - expAttT1r)*expT1app/(lambd*T1r)")
-
-
-def _S2(M0, alpha, lambd, f, T1r, del_t, tau, expAttT1r, expT1app):
-    return ne.evaluate(
-        "2*M0*alpha*f*(exp((del_t + tau)*T1r) - expAttT1r)*expT1app/(lambd*T1r)")
-
-
-def _delCBF1(M0, alpha, lambd, f, f_sc, del_t,
-             del_t_sc, t, T1r, expT1r, expT1app, expAttT1r):
-    return ne.evaluate(
-        "-2*M0*alpha*f*f_sc**2*t*(expT1r - expAttT1r)*expT1app/(lambd**2*T1r) \
-         - 2*M0*alpha*f*f_sc**2*(expT1r - expAttT1r)*expT1app/(lambd**2*T1r**2) \
-         + 2*M0*alpha*f*f_sc*(-del_t*del_t_sc*f_sc*expAttT1r/lambd + f_sc*t*expT1r/lambd)*expT1app/(lambd*T1r) \
-         + 2*M0*alpha*f_sc*(expT1r - expAttT1r)*expT1app/(lambd*T1r)")
-
-
-def _delCBF2(M0, alpha, lambd, f, f_sc, del_t,
-             del_t_sc, t, tau, expT1app, expAttT1r, T1r):
-    return ne.evaluate(
-        "-2*M0*alpha*f*f_sc**2*t*(exp((del_t*del_t_sc + tau)*T1r) - expAttT1r)*expT1app/(lambd**2*T1r) \
-         - 2*M0*alpha*f*f_sc**2*(exp((del_t*del_t_sc + tau)*T1r) - expAttT1r)*expT1app/(lambd**2*T1r**2) \
-         + 2*M0*alpha*f*f_sc*(-del_t*del_t_sc*f_sc*expAttT1r/lambd \
-                              + f_sc*(del_t*del_t_sc + tau)*exp((del_t*del_t_sc + tau)*T1r)/lambd)*expT1app/(lambd*T1r) \
-         + 2*M0*alpha*f_sc*(exp((del_t*del_t_sc + tau)*T1r) - expAttT1r)*expT1app/(lambd*T1r)")
-
-
-def _delATT1(M0, alpha, lambd, f, f_sc, 
-             del_t_sc, expT1app, expAttT1r):
-    return ne.evaluate(
-        "-2*M0*alpha*del_t_sc*f*f_sc*expT1app*expAttT1r/lambd")
-
-
-def _delATT2(M0, alpha, lambd, f, f_sc, del_t,
-             del_t_sc, T1r, tau, expT1app, expAttT1r):
-    return ne.evaluate(
-        "2*M0*alpha*f*f_sc*(del_t_sc*T1r*exp((del_t*del_t_sc + tau)*T1r) - del_t_sc*T1r*expAttT1r)*expT1app/(lambd*T1r)")
+        "where(ind_during, %s, where(ind_after, %s, 0))" % (during, after),
+        local_dict=variables)
 
 
 class Model(BaseModel):
@@ -132,25 +133,17 @@ class Model(BaseModel):
         expT1app = _expT1app(self.t, T1appinv)
         expAttT1r = _expAttT1r(del_t, T1rinv)
         
+        variables = {"M0": self.M0, "alpha": self.alpha,
+                     "lambd": self.lambd, "f": f, "T1r": T1rinv,
+                     "del_t": del_t, "expAttT1r": expAttT1r}
         for j in range(self.t.shape[0]):
-            ind_low = self.t[j] >= del_t
-            ind_high = self.t[j] < (del_t+self.tau[j])
-            ind = ind_low & ind_high
-            if np.any(ind):
-                S[j, ind] = _S1(self.M0[ind], self.alpha[ind],
-                                self.lambd[ind], f[ind], 
-                                T1rinv[ind],
-                                expT1r[j, ind], expAttT1r[ind],
-                                expT1app[j, ind])
-                
-            ind = self.t[j] >= del_t + self.tau[j]
-            if np.any(ind):
-                S[j, ind] = _S2(self.M0[ind], self.alpha[ind],
-                                self.lambd[ind], f[ind], T1rinv[ind],
-                                del_t[ind], 
-                                self.tau[j, ind], 
-                                expAttT1r[ind],
-                                expT1app[j, ind])
+            variables.update(expT1r=expT1r[j], expT1app=expT1app[j],
+                             tau=self.tau[j])
+            S[j] = _piecewise(
+                _S1, _S2,
+                (self.t[j] >= del_t) & (self.t[j] < (del_t+self.tau[j])),
+                self.t[j] >= del_t + self.tau[j],
+                variables)
         S[~np.isfinite(S)] = 1e-20
         S = np.array(S, dtype=self._DTYPE)
         return S
@@ -170,47 +163,20 @@ class Model(BaseModel):
         expAttT1r = _expAttT1r(del_t, T1rinv)
    
         
+        variables = {"M0": self.M0, "alpha": self.alpha,
+                     "lambd": self.lambd, "f": x[0], "f_sc": f_sc,
+                     "del_t": x[1], "del_t_sc": del_t_sc, "T1r": T1rinv,
+                     "expAttT1r": expAttT1r}
         for j in range(self.t.shape[0]):
-            ind_low = self.t[j] >= del_t
-            ind_high = self.t[j] < (del_t+self.tau[j])
-            ind = ind_low & ind_high
-            if np.any(ind):
-                grad[0, j, ind] = _delCBF1(self.M0[ind], self.alpha[ind],
-                                           self.lambd[ind], x[0, ind],
-                                           f_sc,
-                                           x[1, ind],
-                                           del_t_sc, t[j, ind],
-                                           T1rinv[ind],
-                                           expT1r[j, ind],
-                                           expT1app[j, ind],
-                                           expAttT1r[ind])
-                grad[1, j, ind] = _delATT1(self.M0[ind], self.alpha[ind],
-                                           self.lambd[ind], x[0, ind],
-                                           f_sc, 
-                                           del_t_sc, 
-                                           expT1app[j, ind],
-                                           expAttT1r[ind])
-
-            ind = self.t[j] >= del_t + self.tau[j]
-            if np.any(ind):
-                grad[0, j, ind] = _delCBF2(self.M0[ind], self.alpha[ind],
-                                           self.lambd[ind], x[0, ind],
-                                           f_sc, x[1, ind],
-                                           del_t_sc, 
-                                           t[j, ind],
-                                           self.tau[j, ind],
-                                           expT1app[j, ind],
-                                           expAttT1r[ind],
-                                           T1rinv[ind])
-                grad[1, j, ind] = _delATT2(self.M0[ind], self.alpha[ind],
-                                           self.lambd[ind], x[0, ind],
-                                           f_sc,
-                                           x[1, ind],
-                                           del_t_sc, 
-                                           T1rinv[ind], 
-                                           self.tau[j, ind],
-                                           expT1app[j, ind],
-                                           expAttT1r[ind])
+            variables.update(t=t[j], expT1r=expT1r[j],
+                             expT1app=expT1app[j], tau=self.tau[j])
+            ind_during = ((self.t[j] >= del_t)
+                          & (self.t[j] < (del_t+self.tau[j])))
+            ind_after = self.t[j] >= del_t + self.tau[j]
+            grad[0, j] = _piecewise(
+                _delCBF1, _delCBF2, ind_during, ind_after, variables)
+            grad[1, j] = _piecewise(
+                _delATT1, _delATT2, ind_during, ind_after, variables)
         grad[~np.isfinite(grad)] = 1e-20
         grad = np.array(grad, dtype=self._DTYPE)
         return grad
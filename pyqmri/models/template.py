@@ -81,6 +81,9 @@ class BaseModel(ABC):
         Number of slices.
       dimX, dimY : int
         The image dimensions.
+      device_evaluation : bool
+        True if the model implements execute_forward_cl and
+        execute_gradient_cl.
     """
 
     def __init__(self, par):
@@ -98,6 +101,7 @@ class BaseModel(ABC):
         self._plot_cor = []
         self._plot_sag = []
         self.guess = None
+        self.device_evaluation = False
 
     def rescale(self, x):
         """Rescale the unknowns with the scaling factors.
@@ -158,6 +162,46 @@ class BaseModel(ABC):
         # if islice is None:
         return self._execute_gradient_3D(x)
 
+    def execute_forward_cl(self, x, out=None):
+        """Execute the signal model on the device.
+
+        Only available if device_evaluation is True.
+
+        Parameters
+        ----------
+          x : PyOpenCL.Array
+            The array of quantitative parameters to be fitted
+          out : PyOpenCL.Array, None
+            Optional output array.
+
+        Returns
+        -------
+          PyOpenCL.Array
+            The image series.
+        """
+        raise NotImplementedError(
+            "Device evaluation is not implemented for this model.")
+
+    def execute_gradient_cl(self, x, out=None):
+        """Execute the partial derivatives of the signal model on the device.
+
+        Only available if device_evaluation is True.
+
+        Parameters
+        ----------
+          x : PyOpenCL.Array
+            The array of quantitative parameters to be fitted
+          out : PyOpenCL.Array, None
+            Optional output array.
+
+        Returns
+        -------
+          PyOpenCL.Array
+            The partial derivatives.
+        """
+        raise NotImplementedError(
+            "Device evaluation is not implemented for this model.")
+
     @abstractmethod
     def _execute_forward_3D(self, x):
         ...
@@ -6,6 +6,8 @@ import pyopencl.array as clarray
 import numpy as np
 import scipy.special as sps
 from pyqmri.transforms import PyOpenCLnuFFT as CLnuFFT
+from pyqmri._helper_fun._mask import compact_mask
+from pyqmri._helper_fun._mempool import device_pool
 import pyqmri.streaming as streaming
 
 
@@ -112,6 +114,8 @@ class Operator(ABC):
         self._overlap = 0
         self.ratio = []
         self._weights = par["weights"]
+        # Out-of-place results are allocated from the shared memory pool.
+        self._pool = device_pool(self.queue[0])
         for j in range(self.num_dev):
             self.ratio.append(
                 clarray.to_device(
@@ -217,7 +221,8 @@ class Operator(ABC):
                            imagespace=False,
                            SMS=False,
                            streamed=False,
-                           imagerecon=False):
+                           imagerecon=False,
+                           basis=None):
         """MRI forward/adjoint operator factory method.
 
         Parameters
@@ -245,6 +250,9 @@ class Operator(ABC):
             Use standard reconstruction (false) or streaming of memory blocks
             to the compute device (true). Only use this if data does not
             fit in one block.
+          basis : numpy.array, None
+            Temporal basis (NScan x NSub) for fitting in a low-rank
+            subspace. Only available for standard k-space fitting.
 
         Returns
         -------
@@ -254,6 +262,12 @@ class Operator(ABC):
           PyQMRI.NUFFT
             An instance of the used (nu-)FFT if k-space fitting is performed,
             None otherwise.
+
+        Raises
+        ------
+          NotImplementedError
+            If a temporal basis is combined with streaming, SMS or
+            imagespace fitting.
         """
         if imagerecon:
             op = OperatorKspaceImageRecon(
@@ -264,7 +278,21 @@ class Operator(ABC):
                 DTYPE_real=DTYPE_real)
             FT = op.NUFFT
             return op, FT
-        
+
+        if basis is not None:
+            if streamed or imagespace or SMS:
+                raise NotImplementedError(
+                    "Subspace fitting is only available for non-streamed "
+                    "k-space fitting without SMS.")
+            op = OperatorKspaceSubspace(
+                par,
+                prg[0],
+                basis,
+                trafo=trafo,
+                DTYPE=DTYPE,
+                DTYPE_real=DTYPE_real)
+            return op, op.NUFFT
+
         if streamed:
             if imagespace:
                 op = OperatorImagespaceStreamed(
@@ -578,7 +606,7 @@ class OperatorImagespace(Operator):
             wait_for = []
         tmp_result = clarray.zeros(
             self.queue[0], (self.NScan, self.NSlice, self.dimY, self.dimX),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         self.prg.operator_fwd_imagespace(
             self.queue[0], (self.NSlice, self.dimY, self.dimX), None,
             tmp_result.data, inp[0].data, inp[2].data,
@@ -646,7 +674,7 @@ class OperatorImagespace(Operator):
             wait_for = []
         out = clarray.zeros(
             self.queue[0], (self.unknowns, self.NSlice, self.dimY, self.dimX),
-            dtype=self.DTYPE)
+            dtype=self.DTYPE, allocator=self._pool)
         self.prg.operator_ad_imagespace(
             out.queue, (self.NSlice, self.dimY, self.dimX), None,
             out.data, inp[0].data, inp[2].data,
@@ -735,8 +763,8 @@ class OperatorKspace(Operator):
         self.ctx = self.ctx[0]
         self._tmp_result = clarray.zeros(
             self.queue[0], (self.NScan, self.NC,
-                         self.NSlice, self.dimY, self.dimX),
-            self.DTYPE, "C")
+                            self.NSlice, self.dimY, self.dimX),
+            self.DTYPE, "C", allocator=self._pool)
         if not trafo:
             self.Nproj = self.dimY
             self.N = self.dimX
@@ -837,7 +865,7 @@ class OperatorKspace(Operator):
         tmp_sino = clarray.zeros(
             self.queue[0],
             self._out_shape_fwd,
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         self.NUFFT.FFT(tmp_sino, self._tmp_result,
                        wait_for=tmp_sino.events).wait()
         return tmp_sino
@@ -911,7 +939,7 @@ class OperatorKspace(Operator):
                                                     + inp[0].events)))
         out = clarray.zeros(
             self.queue[0], (self.unknowns, self.NSlice, self.dimY, self.dimX),
-            dtype=self.DTYPE)
+            dtype=self.DTYPE, allocator=self._pool)
         self.prg.operator_ad(
             out.queue, (self.NSlice, self.dimY, self.dimX), None,
             out.data, self._tmp_result.data, inp[1].data,
@@ -961,6 +989,382 @@ class OperatorKspace(Operator):
                       out.events + inp[1].events))
 
 
+class OperatorKspaceSubspace(Operator):
+    """k-Space based Operator in a low-rank temporal subspace.
+
+    The image series of all scans is assumed to lie in the span of the
+    columns of a temporal basis Phi (NScan x NSub). The partial derivatives
+    are projected onto this basis, thus the operator kernels act on NSub
+    coefficient images instead of NScan images and the model gradient
+    stored on the device scales with NSub.
+
+    If all scans share the same sampling pattern, i.e. the same Cartesian
+    mask or identical trajectories, the coefficient images are transformed
+    and the expansion to all scans is carried out in k-space, which reduces
+    the number of (nu)FFTs to NSub. Otherwise, the expansion is carried out
+    in image space prior to the (nu)FFT of each scan.
+
+    Parameters
+    ----------
+      par : dict A python dict containing the necessary information to
+        setup the object. Needs to contain the number of slices (NSlice),
+        number of scans (NScan), image dimensions (dimX, dimY), number of
+        coils (NC), sampling points (N) and read outs (NProj)
+        a PyOpenCL queue (queue) and the complex coil
+        sensitivities (C).
+      prg : PyOpenCL.Program
+        The PyOpenCL.Program object containing the necessary kernels to
+        execute the linear Operator.
+      basis : numpy.array
+        The temporal basis with orthonormal columns (NScan x NSub).
+      DTYPE : numpy.dtype, numpy.complex64
+        Complex working precission.
+      DTYPE_real : numpy.dtype, numpy.float32
+        Real working precission.
+      trafo : bool, true
+        Switch between cartesian (false) and non-cartesian FFT (True, default).
+
+    Attributes
+    ----------
+    ctx : PyOpenCL.Context
+      The context for the PyOpenCL computations.
+    queue : PyOpenCL.Queue
+      The computation Queue for the PyOpenCL kernels.
+    NSub : int
+      Number of temporal basis functions.
+    NUFFT : PyQMRI.PyOpenCLnuFFT
+      The (nu) FFT used for fitting. Transforms NSub images if the
+      expansion is carried out in k-space.
+    """
+
+    def __init__(self, par, prg, basis, DTYPE=np.complex64,
+                 DTYPE_real=np.float32, trafo=True):
+        super().__init__(par, prg, DTYPE, DTYPE_real)
+        self.ctx = self.ctx[0]
+        self.NSub = basis.shape[1]
+        self._basis = clarray.to_device(
+            self.queue[0], np.require(basis, DTYPE, 'C'))
+        if not trafo:
+            self.Nproj = self.dimY
+            self.N = self.dimX
+        if par["is3D"] and trafo:
+            self._out_shape_fwd = (self.NScan, self.NC,
+                                   1, self.Nproj, self.N)
+        else:
+            self._out_shape_fwd = (self.NScan, self.NC,
+                                   self.NSlice, self.Nproj, self.N)
+        if trafo:
+            self._expand_kspace = np.all(par["traj"] == par["traj"][:1])
+        else:
+            self._expand_kspace = compact_mask(par["mask"]).shape[0] == 1
+
+        self._tmp_sub = clarray.zeros(
+            self.queue[0], (self.NSub, self.NC,
+                            self.NSlice, self.dimY, self.dimX),
+            self.DTYPE, "C")
+        if self._expand_kspace:
+            par_sub = dict(par)
+            par_sub["NScan"] = self.NSub
+            if trafo:
+                par_sub["traj"] = np.require(
+                    par["traj"][:self.NSub], requirements='C')
+                if par["dcf"].ndim == par["traj"].ndim - 1:
+                    par_sub["dcf"] = np.require(
+                        par["dcf"][:self.NSub], requirements='C')
+            else:
+                par_sub["mask"] = compact_mask(par["mask"])
+            self._tmp_ksp = clarray.zeros(
+                self.queue[0], (self.NSub,) + self._out_shape_fwd[1:],
+                self.DTYPE, "C")
+        else:
+            par_sub = par
+            self._tmp_result = clarray.zeros(
+                self.queue[0], (self.NScan, self.NC,
+                                self.NSlice, self.dimY, self.dimX),
+                self.DTYPE, "C", allocator=self._pool)
+        self.NUFFT = CLnuFFT.create(self.ctx,
+                                    self.queue[0],
+                                    par_sub,
+                                    radial=trafo,
+                                    DTYPE=DTYPE,
+                                    DTYPE_real=DTYPE_real)
+
+    def fwd(self, out, inp, **kwargs):
+        """Forward operator application in-place.
+
+        Apply the linear operator from parameter space to measurement space
+        If streamed operations are used the PyOpenCL.Arrays are replaced
+        by Numpy.Array
+
+        Parameters
+        ----------
+          out : PyOpenCL.Array
+            The complex measurement space data which is the result of the
+            computation.
+          inp : PyOpenCL.Array
+            The complex parameter space data which is used as input.
+            The model gradient needs to be projected onto the subspace
+            with projectModelGradient.
+          wait_for : list of PyopenCL.Event
+            A List of PyOpenCL events to wait for.
+
+        Returns
+        -------
+          PyOpenCL.Event
+            A PyOpenCL event to wait for.
+        """
+        if "wait_for" in kwargs.keys():
+            wait_for = kwargs["wait_for"]
+        else:
+            wait_for = []
+        self._tmp_sub.add_event(
+            self.prg.operator_fwd(
+                self.queue[0],
+                (self.NSlice, self.dimY, self.dimX),
+                None,
+                self._tmp_sub.data, inp[0].data,
+                inp[1].data,
+                inp[2].data, np.int32(self.NC),
+                np.int32(self.NSub),
+                np.int32(self.unknowns),
+                wait_for=(self._tmp_sub.events + inp[0].events
+                          + wait_for)))
+        if self._expand_kspace:
+            self._tmp_ksp.add_event(
+                self.NUFFT.FFT(
+                    self._tmp_ksp,
+                    self._tmp_sub,
+                    wait_for=self._tmp_sub.events + self._tmp_ksp.events))
+            return self._expand(out, self._tmp_ksp, wait_for)
+        self._tmp_result.add_event(
+            self._expand(self._tmp_result, self._tmp_sub, wait_for))
+        return self.NUFFT.FFT(
+            out,
+            self._tmp_result,
+            wait_for=wait_for + self._tmp_result.events + out.events)
+
+    def fwdoop(self, inp, **kwargs):
+        """Forward operator application out-of-place.
+
+        Apply the linear operator from parameter space to measurement space
+        If streamed operations are used the PyOpenCL.Arrays are replaced
+        by Numpy.Array
+        This method need to generate a temporary array and will return it as
+        the result.
+
+        Parameters
+        ----------
+          inp : PyOpenCL.Array
+            The complex parameter space data which is used as input.
+          wait_for : list of PyopenCL.Event
+            A List of PyOpenCL events to wait for.
+
+        Returns
+        -------
+          PyOpenCL.Array: A PyOpenCL array containing the result of the
+          computation.
+        """
+        tmp_sino = clarray.zeros(
+            self.queue[0],
+            self._out_shape_fwd,
+            self.DTYPE, "C", allocator=self._pool)
+        self.fwd(tmp_sino, inp, **kwargs).wait()
+        return tmp_sino
+
+    def adj(self, out, inp, **kwargs):
+        """Adjoint operator application in-place.
+
+        Apply the linear operator from measurement space to parameter space
+        If streamed operations are used the PyOpenCL.Arrays are replaced
+        by Numpy.Array
+
+        Parameters
+        ----------
+          out : PyOpenCL.Array
+            The complex parameter space data which is the result of the
+            computation.
+          inp : PyOpenCL.Array
+            The complex measurement space data which is used as input.
+          wait_for : list of PyopenCL.Event
+            A List of PyOpenCL events to wait for.
+
+        Returns
+        -------
+          PyOpenCL.Event: A PyOpenCL event to wait for.
+        """
+        if "wait_for" in kwargs.keys():
+            wait_for = kwargs["wait_for"]
+        else:
+            wait_for = []
+        self._adjSubspace(inp[0], wait_for)
+        return self.prg.operator_ad(
+            self.queue[0], (self.NSlice, self.dimY, self.dimX), None,
+            out.data, self._tmp_sub.data, inp[1].data,
+            inp[2].data, np.int32(self.NC),
+            np.int32(self.NSub),
+            np.int32(self.unknowns),
+            wait_for=self._tmp_sub.events + out.events)
+
+    def adjoop(self, inp, **kwargs):
+        """Adjoint operator application out-of-place.
+
+        Apply the linear operator from measurement space to parameter space
+        If streamed operations are used the PyOpenCL.Arrays are replaced
+        by Numpy.Array
+        This method need to generate a temporary array and will return it as
+        the result.
+
+        Parameters
+        ----------
+          inp : PyOpenCL.Array
+            The complex measurement space which is used as input.
+          wait_for : list of PyopenCL.Event
+            A List of PyOpenCL events to wait for.
+
+        Returns
+        -------
+          PyOpenCL.Array: A PyOpenCL array containing the result of the
+          computation.
+        """
+        out = clarray.zeros(
+            self.queue[0], (self.unknowns, self.NSlice, self.dimY, self.dimX),
+            dtype=self.DTYPE, allocator=self._pool)
+        self.adj(out, inp, **kwargs).wait()
+        return out
+
+    def adjKyk1(self, out, inp, **kwargs):
+        """Apply the linear operator from parameter space to k-space.
+
+        This method fully implements the combined linear operator
+        consisting of the data part as well as the TGV regularization part.
+
+        Parameters
+        ----------
+          out : PyOpenCL.Array
+            The complex parameter space data which is used as input.
+          inp : PyOpenCL.Array
+            The complex parameter space data which is used as input.
+          wait_for : list of PyopenCL.Event
+            A List of PyOpenCL events to wait for.
+
+        Returns
+        -------
+          PyOpenCL.Event: A PyOpenCL event to wait for.
+        """
+        if "wait_for" in kwargs.keys():
+            wait_for = kwargs["wait_for"]
+        else:
+            wait_for = []
+        self._adjSubspace(inp[0], wait_for)
+        return self.prg.update_Kyk1(
+            self.queue[0], (self.NSlice, self.dimY, self.dimX), None,
+            out.data, self._tmp_sub.data, inp[2].data,
+            inp[3].data, inp[1].data, np.int32(self.NC),
+            np.int32(self.NSub),
+            np.int32(self.unknowns), self.DTYPE_real(self._dz),
+            self.ratio[0].data,
+            wait_for=(self._tmp_sub.events +
+                      out.events + inp[1].events))
+
+    def projectModelGradient(self, grad):
+        """Project the partial derivatives onto the temporal subspace.
+
+        Parameters
+        ----------
+          grad : numpy.array or PyOpenCL.Array
+            The partial derivatives of all scans
+            (unknowns, NScan, NSlice, dimY, dimX).
+
+        Returns
+        -------
+          PyOpenCL.Array
+            The partial derivatives in the subspace
+            (unknowns, NSub, NSlice, dimY, dimX).
+        """
+        if isinstance(grad, np.ndarray):
+            return clarray.to_device(
+                self.queue[0],
+                np.require(
+                    np.einsum('tk,ut...->uk...',
+                              np.conj(self._basis.get()), grad),
+                    self.DTYPE, 'C'))
+        out = clarray.empty(
+            self.queue[0], (grad.shape[0], self.NSub) + grad.shape[2:],
+            dtype=self.DTYPE, allocator=self._pool)
+        out.add_event(self._project(out, grad, [], grad.shape[0]))
+        return out
+
+    def FFTScans(self, inp):
+        """Apply the (nu)FFT to a coil weighted image series of all scans.
+
+        If the (nu)FFT transforms NSub images, the scans are transformed
+        in blocks of NSub scans.
+
+        Parameters
+        ----------
+          inp : numpy.array
+            The coil weighted images (NScan, NC, NSlice, dimY, dimX).
+
+        Returns
+        -------
+          numpy.array
+            The k-space data of all scans.
+        """
+        if not self._expand_kspace:
+            out = clarray.zeros(self.queue[0], self._out_shape_fwd,
+                                dtype=self.DTYPE, allocator=self._pool)
+            self.NUFFT.FFT(
+                out, clarray.to_device(self.queue[0], inp)).wait()
+            return out.get()
+        out = np.zeros(self._out_shape_fwd, dtype=self.DTYPE)
+        # The last block is shifted to end at the last scan.
+        offsets = list(range(0, self.NScan-self.NSub+1, self.NSub))
+        if offsets[-1] + self.NSub < self.NScan:
+            offsets.append(self.NScan-self.NSub)
+        for offset in offsets:
+            self._tmp_sub.set(
+                np.require(inp[offset:offset+self.NSub], self.DTYPE, 'C'))
+            self.NUFFT.FFT(self._tmp_ksp, self._tmp_sub).wait()
+            out[offset:offset+self.NSub] = self._tmp_ksp.get()
+        return out
+
+    def _adjSubspace(self, inp, wait_for):
+        if self._expand_kspace:
+            self._tmp_ksp.add_event(
+                self._project(self._tmp_ksp, inp, wait_for))
+            self._tmp_sub.add_event(
+                self.NUFFT.FFTH(
+                    self._tmp_sub, self._tmp_ksp,
+                    wait_for=self._tmp_ksp.events + self._tmp_sub.events))
+        else:
+            self._tmp_result.add_event(
+                self.NUFFT.FFTH(
+                    self._tmp_result, inp,
+                    wait_for=wait_for + inp.events))
+            self._tmp_sub.add_event(
+                self._project(self._tmp_sub, self._tmp_result, []))
+
+    def _expand(self, out, inp, wait_for, nblocks=1):
+        # inp holds blocks of NSub coefficients, out blocks of NScan scans.
+        return self.prg.subspace_expand(
+            self.queue[0],
+            (nblocks * self.NScan, inp.size // (nblocks * self.NSub)),
+            None,
+            out.data, inp.data, self._basis.data,
+            np.int32(self.NScan), np.int32(self.NSub),
+            wait_for=wait_for + inp.events + out.events)
+
+    def _project(self, out, inp, wait_for, nblocks=1):
+        # inp holds blocks of NScan scans, out blocks of NSub coefficients.
+        return self.prg.subspace_project(
+            self.queue[0],
+            (nblocks * self.NSub, out.size // (nblocks * self.NSub)),
+            None,
+            out.data, inp.data, self._basis.data,
+            np.int32(self.NScan), np.int32(self.NSub),
+            wait_for=wait_for + inp.events + out.events)
+
+
 class OperatorKspaceSMS(Operator):
     """k-Space based Operator for SMS reconstruction.
 
@@ -1007,8 +1411,8 @@ class OperatorKspaceSMS(Operator):
         self.packs = par["packs"]*par["numofpacks"]
         self._tmp_result = clarray.zeros(
             self.queue[0], (self.NScan, self.NC,
-                         self.NSlice, self.dimY, self.dimX),
-            self.DTYPE, "C")
+                            self.NSlice, self.dimY, self.dimX),
+            self.DTYPE, "C", allocator=self._pool)
         self._out_shape_fwd = (self.NScan, self.NC,
                                self.packs, self.Nproj, self.N)
 
@@ -1107,7 +1511,7 @@ class OperatorKspaceSMS(Operator):
         tmp_sino = clarray.zeros(
             self.queue[0],
             (self.NScan, self.NC, self.packs, self.Nproj, self.N),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
 
         self.NUFFT.FFT(tmp_sino, self._tmp_result).wait()
         return tmp_sino
@@ -1180,7 +1584,7 @@ class OperatorKspaceSMS(Operator):
                                                     + inp[0].events)))
         out = clarray.zeros(
             self.queue[0], (self.unknowns, self.NSlice, self.dimY, self.dimX),
-            dtype=self.DTYPE)
+            dtype=self.DTYPE, allocator=self._pool)
         self.prg.operator_ad(
             out.queue, (self.NSlice, self.dimY, self.dimX), None,
             out.data, self._tmp_result.data, inp[1].data,
@@ -2272,7 +2676,7 @@ class OperatorFiniteGradient(Operator):
         tmp_result = clarray.zeros(
             self.queue, (self.unknowns,
                          self.NSlice, self.dimY, self.dimX, 4),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         
         if not self.precond:
             self.prg.gradient(
@@ -2371,7 +2775,7 @@ class OperatorFiniteGradient(Operator):
             wait_for = []
         tmp_result = clarray.zeros(
             self.queue, (self.unknowns, self.NSlice, self.dimY, self.dimX),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         
         if not self.precond:
             self.prg.divergence(
@@ -2506,7 +2910,7 @@ class OperatorFiniteSymGradient(Operator):
         tmp_result = clarray.zeros(
             self.queue, (self.unknowns,
                          self.NSlice, self.dimY, self.dimX, 8),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         self.prg.sym_grad(
             self.queue, inp.shape[1:-1], None, tmp_result.data, inp.data,
             np.int32(self.unknowns_TGV),
@@ -2573,7 +2977,7 @@ class OperatorFiniteSymGradient(Operator):
         tmp_result = clarray.zeros(
             self.queue, (self.unknowns,
                          self.NSlice, self.dimY, self.dimX, 4),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         self.prg.sym_divergence(
             self.queue, inp.shape[1:-1], None, tmp_result.data, inp.data,
             np.int32(self.unknowns_TGV),
@@ -3072,7 +3476,7 @@ class OperatorSoftSense(Operator):
         self._tmp_result = clarray.zeros(
             self.queue, (self.NScan, self.NC,
                          self.NSlice, self.dimY, self.dimX),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         if not trafo:
             self.Nproj = self.dimY
             self.N = self.dimX
@@ -3086,6 +3490,10 @@ class OperatorSoftSense(Operator):
 
         if self._mask_tmp.ndim > 2:
             self.mask = clarray.to_device(self.queue, par["mask"])
+            # A single mask broadcast over all coils.
+            self._mask_args = (np.int32(self.mask.size), np.int32(1),
+                               np.int32(1), np.int32(self.mask.size),
+                               np.int32(0))
             par["mask"] = np.require(
                 np.ones((par["dimY"], par["dimX"]), dtype=par["DTYPE_real"]),
                 requirements='C')
@@ -3150,6 +3558,7 @@ class OperatorSoftSense(Operator):
                 None,
                 out.data,
                 self.mask.data,
+                *self._mask_args,
                 wait_for=(wait_for+out.events+self._tmp_result.events))
 
         return self.NUFFT.FFT(
@@ -3197,7 +3606,7 @@ class OperatorSoftSense(Operator):
         tmp_sino = clarray.zeros(
             self.queue,
             self._out_shape_fwd,
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         self.NUFFT.FFT(tmp_sino, self._tmp_result,
                        wait_for=tmp_sino.events).wait()
         if self.mask.size != 0:
@@ -3208,6 +3617,7 @@ class OperatorSoftSense(Operator):
                     None,
                     tmp_sino.data,
                     self.mask.data,
+                    *self._mask_args,
                     wait_for=(wait_for+tmp_sino.events)
                 )
             )
@@ -3247,6 +3657,7 @@ class OperatorSoftSense(Operator):
                     None,
                     inp[0].data,
                     self.mask.data,
+                    *self._mask_args,
                     wait_for=(wait_for+inp[0].events)
                 )
             )
@@ -3299,6 +3710,7 @@ class OperatorSoftSense(Operator):
                     None,
                     inp[0].data,
                     self.mask.data,
+                    *self._mask_args,
                     wait_for=(wait_for+inp[0].events)
                 )
             )
@@ -3310,7 +3722,7 @@ class OperatorSoftSense(Operator):
         out = clarray.empty(
             self.queue,
             (self.NMaps, self.NSlice, self.dimY, self.dimX),
-            dtype=self.DTYPE)
+            dtype=self.DTYPE, allocator=self._pool)
         self.prg.operator_ad_ssense(
             out.queue,
             (self.NSlice, self.dimY, self.dimX),
@@ -3354,6 +3766,7 @@ class OperatorSoftSense(Operator):
                     None,
                     inp[0].data,
                     self.mask.data,
+                    *self._mask_args,
                     wait_for=(wait_for+inp[0].events)
                 )
             )
@@ -3771,7 +4184,7 @@ class OperatorFiniteSpaceTimeGradient(Operator):
         tmp_result = clarray.zeros(
             self.queue, (self.unknowns,
                          self.NSlice, self.dimY, self.dimX, 4),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         
         self.prg.gradient_w_time(
             self.queue, inp.shape[1:], None, tmp_result.data, inp.data,
@@ -3843,7 +4256,7 @@ class OperatorFiniteSpaceTimeGradient(Operator):
             wait_for = []
         tmp_result = clarray.zeros(
             self.queue, (self.unknowns, self.NSlice, self.dimY, self.dimX),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
 
         self.prg.divergence_w_time(
                     self.queue, inp.shape[1:-1], None, tmp_result.data, inp.data,
@@ -3991,11 +4404,11 @@ class OperatorFiniteSpaceTimeSymGradient(Operator):
         tmp_result1 = clarray.zeros(
             self.queue, (self.unknowns,
                          self.NSlice, self.dimY, self.dimX, 4),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         tmp_result2 = clarray.zeros(
             self.queue, (self.unknowns,
                          self.NSlice, self.dimY, self.dimX, 8),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         
         self.prg.sym_grad_w_time(
             self.queue, inp.shape[1:-1], None, tmp_result1.data,tmp_result2.data, inp.data,
@@ -4067,7 +4480,7 @@ class OperatorFiniteSpaceTimeSymGradient(Operator):
             wait_for = []
         tmp_result = clarray.zeros(
             self.queue, (self.unknowns, self.NSlice, self.dimY, self.dimX, 4),
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
 
         self.prg.sym_divergence_w_time(
                     self.queue, inp[0].shape[1:-1], None, tmp_result.data, inp[0].data, inp[1].data,
@@ -4226,7 +4639,7 @@ class OperatorKspaceImageRecon(OperatorKspace):
         tmp_sino = clarray.zeros(
             self.queue,
             self._out_shape_fwd,
-            self.DTYPE, "C")
+            self.DTYPE, "C", allocator=self._pool)
         self.NUFFT.FFT(tmp_sino, self._tmp_result,
                        wait_for=tmp_sino.events).wait()
         return tmp_sino
@@ -4299,7 +4712,7 @@ class OperatorKspaceImageRecon(OperatorKspace):
                                                     + inp[0].events)))
         out = clarray.zeros(
             self.queue, (self.unknowns, self.NSlice, self.dimY, self.dimX),
-            dtype=self.DTYPE)
+            dtype=self.DTYPE, allocator=self._pool)
         self.prg.operator_ad(
             out.queue, (self.NSlice, self.dimY, self.dimX), None,
             out.data, self._tmp_result.data, inp[1].data,
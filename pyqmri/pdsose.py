@@ -16,6 +16,7 @@ import pyqmri.operator as operator
 import pyqmri.solver as optimizer
 from pyqmri._helper_fun import CLProgram as Program
 from pyqmri._helper_fun import _utils as utils
+from pyqmri._helper_fun._opnorm import OperatorNorm
 
 
 class SoftSenseOptimizer:
@@ -91,19 +92,16 @@ class SoftSenseOptimizer:
         self._i_term = -1
 
         self._streamed = streamed
-        if streamed and par["NSlice"]/(num_dev*par["par_slices"]) < 2:
+        # The last block is padded with slices of its predecessor if the
+        # number of slices is not divisible by the block size.
+        if (streamed
+                and -(-par["NSlice"]//par["par_slices"]) < 2*num_dev):
             raise ValueError(
                 "Number of Slices devided by parallel "
                 "computed slices and devices needs to be larger two.\n"
                 "Current values are %i total Slices, %i parallel slices and "
                 "%i compute devices."
                 % (par["NSlice"], par["par_slices"], num_dev))
-        if streamed and par["NSlice"] % par["par_slices"]:
-            raise ValueError(
-                "Number of Slices devided by parallel "
-                "computed slices needs to be an integer.\n"
-                "Current values are %i total Slices with %i parallel slices."
-                % (par["NSlice"], par["par_slices"]))
         if DTYPE == np.complex128:
             if streamed:
                 kernname = 'kernels/OpenCL_Kernels_double_streamed.c'
@@ -144,6 +142,7 @@ class SoftSenseOptimizer:
                                 par["dimY"], par["dimX"])
         else:
             self._cmaps = clarray.to_device(self._queue[0], self.par["C"])
+            self._opnorm = OperatorNorm(self._queue[0], DTYPE)
 
         self._MRI_operator, self._FT = operator.Operator.SoftSenseOperatorFactory(
             par,
@@ -264,35 +263,28 @@ class SoftSenseOptimizer:
     def _power_iterations(self, x, cmap, op, iters=10):
         x = np.require(x.astype(self._DTYPE), requirements='C')
 
+        if not self._streamed:
+            def normal(out, inp):
+                if len(cmap) > 0:
+                    out[...] = op.adjoop([op.fwdoop([inp, cmap]), cmap])
+                else:
+                    out[...] = op.adjoop(op.fwdoop(inp))
+            return self._opnorm.estimate(
+                op, x.shape, normal, x.shape, max_iters=iters+1, start=x)
+
         if len(cmap) > 0:
             cmap = cmap.astype(self._DTYPE)
-            if self._streamed:
-                y = op.adjoop([[op.fwdoop([[x, cmap]]), cmap]])
-            else:
-                x = clarray.to_device(self._queue[0], x)
-                y = op.adjoop([op.fwdoop([x, cmap]), cmap]).get()
+            y = op.adjoop([[op.fwdoop([[x, cmap]]), cmap]])
         else:
-            if self._streamed:
-                y = op.adjoop([op.fwdoop([x])])
-            else:
-                x = clarray.to_device(self._queue[0], x)
-                y = op.adjoop(op.fwdoop(x)).get()
+            y = op.adjoop([op.fwdoop([x])])
 
         l1 = []
         for _ in range(iters):
             y_norm = np.linalg.norm(y)
             x = y / y_norm if y_norm != 0 else y
-            if self._streamed:
-                y = op.adjoop([[op.fwdoop([[x, cmap]]), cmap]]) if len(cmap) > 0 \
-                    else op.adjoop([op.fwdoop([x])])
-            else:
-                x = clarray.to_device(self._queue[0], x)
-                y = op.adjoop([op.fwdoop([x, cmap]), cmap]).get() if len(cmap) > 0 \
-                    else op.adjoop(op.fwdoop(x)).get()
-
-                if not isinstance(x, np.ndarray):
-                    x = x.get()
-                l1.append(np.vdot(y, x))
+            y = op.adjoop([[op.fwdoop([[x, cmap]]), cmap]]) if len(cmap) > 0 \
+                else op.adjoop([op.fwdoop([x])])
+            l1.append(np.vdot(y, x))
 
         return np.sqrt(np.max(np.abs(l1)))
 
@@ -5,7 +5,13 @@ from pyqmri.irgn import IRGNOptimizer, ICOptimizer
 from pyqmri.solver import CGSolver
 from pyqmri._helper_fun import _utils as utils
 from pyqmri._helper_fun._est_coils import est_coils
+from pyqmri._helper_fun._coil_compression import compress_coils
+from pyqmri._helper_fun._mask import compact_mask
+from pyqmri._helper_fun._memplan import (INCORE, solver_footprint, plan_mode,
+                                         print_footprint)
 from pyqmri._helper_fun import _goldcomp as goldcomp
+from pyqmri._helper_fun._h5reader import LazyComplexDataset
+from pyqmri._helper_fun._profiler import PROFILER
 import pyopencl.array as clarray
 import pyopencl as cl
 import h5py
@@ -152,7 +158,7 @@ def _precoompFFT(data, par):
                 par["C"].transpose(0, -1, -2, -3),
                 requirements='C')
             par["mask"] = np.require(
-                par["mask"].T,
+                par["mask"].transpose(0, -1, -2, -3),
                 requirements='C')
             dimX = par["dimX"]
             NSlice = par["NSlice"]
@@ -170,7 +176,7 @@ def _precoompFFT(data, par):
                 par["C"].transpose(0, -1, -2, -3),
                 requirements='C')
             par["mask"] = np.require(
-                par["mask"].T,
+                par["mask"].transpose(0, -1, -2, -3),
                 requirements='C')
             dimX = par["dimX"]
             NSlice = par["NSlice"]
@@ -235,7 +241,9 @@ def _setupOCL(myargs, par):
     if par["use_GPU"]:
         queue_par = cl.command_queue_properties.OUT_OF_ORDER_EXEC_MODE_ENABLE
     else:
-        queue_par = None
+        # In-order queues. Current PyOpenCL releases reject None.
+        queue_par = 0
+    queue_par = PROFILER.queueProperties(queue_par)
     if isinstance(myargs.devices, int):
         myargs.devices = [myargs.devices]
     if myargs.streamed:
@@ -265,84 +273,88 @@ def _setupOCL(myargs, par):
             )
 
 
+def _planMemory(myargs, par, reg_type, trafo=True, imagespace=False,
+                soft_sense=False):
+    footprint = solver_footprint(par, reg_type, trafo, imagespace,
+                                 soft_sense)
+    if footprint is None:
+        print("No memory plan for regularization %s, running in-core."
+              % reg_type)
+        return INCORE
+    device = par["ctx"][0].devices[0]
+    print_footprint(footprint, device)
+    if len(myargs.devices) == 1 and myargs.devices[0] == -1:
+        num_devices = len(device.platform.get_devices())
+    else:
+        num_devices = len(myargs.devices)
+    mode = plan_mode(footprint, device, num_devices)
+    if mode != INCORE and not myargs.streamed_auto:
+        print("Warning: The in-core reconstruction exceeds the device "
+              "memory. Consider --streamed auto.")
+    return mode
+
+
+def _scansPerBlock(myargs, par, data, ksp_buffers, img_buffers):
+    itemsize = np.dtype(par["DTYPE"]).itemsize
+    img_size = par["NSlice"]*par["dimY"]*par["dimX"]
+    if myargs.trafo:
+        grid_size = int(
+            img_size*par["ogf"]**(3 if par["is3D"] else 2))
+    else:
+        grid_size = img_size
+    ksp_size = int(np.prod(data.shape[1:]))
+    # The coil images and the FFT temporary array are always needed, the
+    # remaining buffers depend on the caller.
+    bytes_per_scan = itemsize*(
+        ksp_buffers*ksp_size + par["NC"]*(grid_size + img_size)
+        + img_buffers*img_size)
+    return utils.scans_per_block(
+        par, bytes_per_scan,
+        alloc_per_scan=itemsize*par["NC"]*max(grid_size, img_size))
+
+
 def _genImages(myargs, par, data, off):
     if not myargs.usecg:
-        FFT = utils.NUFFT(par, trafo=myargs.trafo, SMS=myargs.sms)
-
-        def nFTH(x, fft, par):
-            siz = np.shape(x)
-            result = np.zeros(
-                (par["NScan"], par["NC"], par["NSlice"],
-                 par["dimY"], par["dimX"]), dtype=par["DTYPE"])
-            tmp_result = clarray.empty(fft.queue,
-                                       (1, 1, par["NSlice"],
-                                        par["dimY"], par["dimX"]),
-                                       dtype=par["DTYPE"])
-            start = time.time()
-            for j in range(siz[0]):
-                for k in range(siz[1]):
-                    inp = clarray.to_device(fft.queue,
-                                            np.require(x[j, k, ...]
-                                                        [None, None, ...],
-                                                       requirements='C'))
-                    fft.FFTH(tmp_result, inp, scan_offset=j).wait()
-                    result[j, k, ...] = np.squeeze(tmp_result.get())
-            end = time.time()-start
-            print("FT took %f s" % end)
-            return result
-        images = np.require(np.sum(nFTH(data, FFT, par) *
-                                   (np.conj(par["C"])), axis=1),
-                            requirements='C')
-        del FFT, nFTH
+        # Two k-space and combined image buffers for double buffering.
+        par_scans = _scansPerBlock(myargs, par, data, 2, 2)
+
+        FFT = utils.NUFFT(par, trafo=myargs.trafo, SMS=myargs.sms,
+                          NScan=par_scans, NC=par["NC"])
+        start = time.time()
+        with PROFILER.phase("initial_images"):
+            images = FFT.FFTH_coil_combined(data, par["C"])
+        end = time.time()-start
+        print("FT took %f s using blocks of %i scans" % (end, par_scans))
+        del FFT
 
     else:
         tol = 1e-16
-        par_scans = 4 #why?
         lambd = 1e-1
         if "images" not in list(par["file"].keys()):
             images = np.zeros((par["NScan"],
                                par["NSlice"],
                                par["dimY"],
                                par["dimX"]), dtype=par["DTYPE"])
-            if par["NScan"]/par_scans >= 1:
-                cgs = CGSolver(par, par_scans, myargs.trafo, myargs.sms)
-                for j in range(int(par["NScan"]/par_scans)):
-                    if par["NSlice"] == 1:
-                        images[par_scans*j:par_scans*(j+1), ...] = cgs.run(
-                            data[par_scans*j:par_scans*(j+1), ...],
-                            tol=tol, lambd=lambd,
-                            scan_offset=par_scans*j)[:, None, ...]
-                    else:
-                        images[par_scans*j:par_scans*(j+1), ...] = cgs.run(
-                            data[par_scans*j:par_scans*(j+1), ...],
-                            tol=tol, lambd=lambd, scan_offset=par_scans*j)
-                del cgs
-            if np.mod(par["NScan"], par_scans):
-                cgs = CGSolver(par, np.mod(par["NScan"], par_scans),
-                               myargs.trafo, myargs.sms)
-                if par["NSlice"] == 1:
-                    if np.mod(par["NScan"], par_scans) == 1:
-                        images[-np.mod(par["NScan"], par_scans):, ...] = \
-                            cgs.run(
-                                data[-np.mod(par["NScan"], par_scans):, ...],
-                                tol=tol, lambd=lambd,
-                                scan_offset=par["NScan"]-np.mod(
-                                    par["NScan"], par_scans))
-                    else:
-                        images[-np.mod(par["NScan"], par_scans):, ...] = \
-                            cgs.run(
-                                data[-np.mod(par["NScan"], par_scans):, ...],
-                                tol=tol, lambd=lambd,
-                                scan_offset=par["NScan"]-np.mod(
-                                    par["NScan"], par_scans))[:, None, ...]
-                else:
-                    images[-np.mod(par["NScan"], par_scans):, ...] = \
-                        cgs.run(
-                            data[-np.mod(par["NScan"], par_scans):, ...],
-                            tol=tol, lambd=lambd,
-                            scan_offset=par["NScan"]-np.mod(
-                                par["NScan"], par_scans))
-                del cgs
+            # k-space data and its forward projection as well as
+            # the five CG vectors.
+            par_scans = _scansPerBlock(myargs, par, data, 2, 5)
+            # The last block is shifted to end at the last scan, thus a
+            # single solver can be used for all blocks.
+            offsets = list(range(0, par["NScan"]-par_scans+1, par_scans))
+            if offsets[-1] + par_scans < par["NScan"]:
+                offsets.append(par["NScan"]-par_scans)
+
+            cgs = CGSolver(par, par_scans, myargs.trafo, myargs.sms)
+            print("CG-SENSE using blocks of %i scans" % par_scans)
+            for offset in offsets:
+                start = time.time()
+                images[offset:offset+par_scans] = cgs.run(
+                    data[offset:offset+par_scans],
+                    tol=tol, lambd=lambd, scan_offset=offset)
+                print("Scans %i to %i: %i iterations in %f s" % (
+                    offset, offset+par_scans-1, cgs.iterations,
+                    time.time()-start))
+            del cgs
             par["file"].create_dataset("images", images.shape,
                                        dtype=par["DTYPE"], data=images)
         else:
@@ -352,15 +364,15 @@ def _genImages(myargs, par, data, off):
                 images = _genImages(myargs, par, data, off)
             else:
                 print("Using precomputed images")
-                slices_images = par["file"]['images'][()].shape[1]
-                images = \
-                    par["file"]['images'][
+                slices_images = par["file"]['images'].shape[1]
+                images = LazyComplexDataset(
+                    par["file"]['images'], dtype=par["DTYPE"])[
                         :,
                         int(slices_images / 2) - int(
                             np.floor((par["NSlice"]) / 2)) + off:int(
                             slices_images / 2) + int(
                             np.ceil(par["NSlice"] / 2)) + off,
-                        ...].astype(par["DTYPE"])
+                        ...]
     return images
 
 
@@ -469,20 +481,15 @@ def _read_data_from_file(par, myargs):
     if reco_Slices == -1:
         reco_Slices = NSlice
     off = 0
+    rawdata = LazyComplexDataset.fromFile(par["file"], "dat", par["DTYPE"])
     if myargs.sms or myargs.is3Ddata:
-        data = par["file"]['real_dat'][()].astype(par["DTYPE"])\
-            + 1j*par["file"]['imag_dat'][()].astype(par["DTYPE"])
+        data = rawdata[()]
     else:
-        data = par["file"]['real_dat'][
+        data = rawdata[
             ...,
             int(NSlice/2)-int(np.floor((reco_Slices)/2))+off:
             int(NSlice/2)+int(np.ceil(reco_Slices/2))+off, :, :
-        ].astype(par["DTYPE"])\
-            + 1j*par["file"]['imag_dat'][
-            ...,
-            int(NSlice/2)-int(np.floor((reco_Slices)/2))+off:
-            int(NSlice/2)+int(np.ceil(reco_Slices/2))+off, :, :
-        ].astype(par["DTYPE"])
+        ]
 
     dimreduction = np.array([0, 0])
     if myargs.trafo:
@@ -573,16 +580,17 @@ def _read_data_from_file(par, myargs):
 
 def _read_flip_angle_correction_data(par, myargs, dimreduction, reco_Slices):
     if "fa_corr" in list(par["file"].keys()):
-        NSlice_fa, _, _ = par["file"]['fa_corr'][()].shape
+        NSlice_fa, _, _ = par["file"]['fa_corr'].shape
     elif "interpol_fa" in list(par["file"].keys()):
-        NSlice_fa, _, _ = par["file"]['interpol_fa'][()].shape
+        NSlice_fa, _, _ = par["file"]['interpol_fa'].shape
 
+    # Read only the flipped slab
     par["fa_corr"] = np.flip(
-        par["file"]['fa_corr'][()].astype(par["DTYPE"]),
-        0)[
-        int(NSlice_fa/2)-int(np.floor((reco_Slices)/2)):
-        int(NSlice_fa/2)+int(np.ceil(reco_Slices/2)),
-        ...]
+        LazyComplexDataset(par["file"]['fa_corr'], dtype=par["DTYPE"])[
+            NSlice_fa-(int(NSlice_fa/2)+int(np.ceil(reco_Slices/2))):
+            NSlice_fa-(int(NSlice_fa/2)-int(np.floor((reco_Slices)/2))),
+            ...],
+        0)
     par["fa_corr"][par["fa_corr"] == 0] = 1
     par["fa_corr"] = par["fa_corr"][
         ...,
@@ -713,8 +721,16 @@ def _start_recon(myargs):
 # Check for 3D input data #####################################################
 ###############################################################################
     par["is3D"] = myargs.is3Ddata
+    par["csr_gridding"] = myargs.csr_gridding
+    par["toeplitz"] = myargs.toeplitz
+    par["subspace"] = myargs.subspace
+    par["opencl_model"] = myargs.opencl_model
     if par["is3D"]:
         myargs.use3Dcoilest = True
+    # The memory plan needs the model, start in-core and switch later on.
+    myargs.streamed_auto = myargs.streamed == "auto"
+    if myargs.streamed_auto:
+        myargs.streamed = False
 ###############################################################################
 # Select input file ###########################################################
 ###############################################################################
@@ -722,8 +738,9 @@ def _start_recon(myargs):
 ###############################################################################
 # Read Data ###################################################################
 ###############################################################################
-    data, dimX, dimY, NSlice, reco_Slices, dimreduction, off = \
-        _read_data_from_file(par, myargs)
+    with PROFILER.phase("hdf5_read"):
+        data, dimX, dimY, NSlice, reco_Slices, dimreduction, off = \
+            _read_data_from_file(par, myargs)
 ###############################################################################
 # Flip angle correction #######################################################
 ###############################################################################
@@ -755,30 +772,11 @@ def _start_recon(myargs):
                                 myargs.trafo,
                                 myargs.dz)
     if not myargs.trafo:
-        # max_val = 1
-        # w_x = np.abs(np.linspace(-max_val / 2, max_val / 2, par["dimX"]))**3
-        # w_x = w_x/np.max(w_x)
-        # w_y = np.abs(np.linspace(-max_val / 2, max_val / 2, par["dimY"]))**3
-        # w_y = w_y/np.max(w_y)1
-
-        # tmpmask = np.ones(data.shape[2:])  # *(w_y[:,None]@w_x[None,:]))
-        # tmpmask[np.abs(data[0, 0, ...]) == 0] = 0
-        # par['mask'] = np.reshape(
-        #     tmpmask,
-        #     (data.shape[2:])).astype(par["DTYPE_real"])
-        # del tmpmask
-
-        tmpmask = np.ones(data.shape)  # *(w_y[:,None]@w_x[None,:]))
-        tmpmask[np.abs(data) == 0] = 0
-        par['mask'] = np.reshape(
-            tmpmask,
-            (data.shape)).astype(par["DTYPE_real"])
-        
-        #par['mask'] = np.reshape(tmpmask,(data.shape[0]*data.shape[1]*data.shape[2],data.shape[3],data.shape[4])).astype(par["DTYPE_real"])
-
-        del tmpmask
-
-
+        # The sampling pattern is shared by all coils, the mask is reduced
+        # to its compact layout after the fully sampled dimensions are
+        # transformed.
+        par['mask'] = np.any(
+            data != 0, axis=1).astype(par["DTYPE_real"])
     else:
         par['mask'] = None
 ###############################################################################
@@ -815,13 +813,28 @@ def _start_recon(myargs):
         ###############################################################################
         # Coil Sensitivity Estimation #################################################
         ###############################################################################
-        est_coils(data, par, par["file"], myargs, off, dimreduction)
+        with PROFILER.phase("coil_estimation"):
+            est_coils(data, par, par["file"], myargs, off, dimreduction)
         par['C'] = par['C'].astype(par["DTYPE"])
 ###############################################################################
+# Coil Compression ############################################################
+###############################################################################
+        if myargs.coil_compression.upper() != "NONE":
+            with PROFILER.phase("coil_compression"):
+                data, par["virtual_coils"], par["coil_energy"] = \
+                    compress_coils(data, par,
+                                   method=myargs.coil_compression,
+                                   ncoils=myargs.virtual_coils,
+                                   energy=myargs.coil_energy)
+            print("Compressed %i coils to %i virtual coils retaining "
+                  "%.2f %% of the energy." % (
+                      NC, par["virtual_coils"], 100*par["coil_energy"]))
+###############################################################################
 # Init forward model and initial guess ########################################
 ###############################################################################
     if myargs.trafo is False:
         data = _precoompFFT(data, par)
+        par["mask"] = compact_mask(par["mask"])
 
     if myargs.sig_model == "GeneralModel":
         par["modelfile"] = myargs.modelfile
@@ -839,7 +852,8 @@ def _start_recon(myargs):
 # Reconstruct images using CG-SENSE  ##########################################
 ###############################################################################
 #    del par["file"]["images"]
-    images = _genImages(myargs, par, data, off)
+    with PROFILER.phase("initial_guess"):
+        images = _genImages(myargs, par, data, off)
     # import ipdb
     # import pyqmri
     # import matplotlib.pyplot as plt
@@ -865,6 +879,21 @@ def _start_recon(myargs):
 
     par["images"] = images
 ###############################################################################
+# Plan device memory ##########################################################
+###############################################################################
+    if not myargs.streamed:
+        mode = _planMemory(myargs, par, myargs.reg, myargs.trafo,
+                           myargs.imagespace)
+        if mode != INCORE and myargs.streamed_auto:
+            print("Switching to %s mode." % mode)
+            myargs.streamed = True
+            par["overlap"] = 1
+            if "ICT" in myargs.reg:
+                par["par_slices"] = max(myargs.par_slices, 1)
+            else:
+                par["par_slices"] = -1
+            _setupOCL(myargs, par)
+###############################################################################
 # initialize operator  ########################################################
 ###############################################################################
     if myargs.sig_model == "ImageReco" and "ICT" in myargs.reg:
@@ -891,14 +920,22 @@ def _start_recon(myargs):
                             DTYPE_real=par["DTYPE_real"])
     with h5py.File(par["outdir"]+"output_" + par["fname"]+".h5", "a") as f:
         f.create_dataset("images_ifft", data=images)
+        if "virtual_coils" in par.keys():
+            f.attrs["coil_compression"] = myargs.coil_compression.upper()
+            f.attrs["virtual_coils"] = par["virtual_coils"]
+            f.attrs["coil_energy"] = par["coil_energy"]
     par["file"].close()
 ###############################################################################
 # Start Reco ##################################################################
 ###############################################################################
-    if myargs.imagespace is True:
-        opt.execute(images)
-    else:
-        opt.execute(data)
+    with PROFILER.phase("fit"):
+        if myargs.imagespace is True:
+            opt.execute(images)
+        else:
+            opt.execute(data)
+    if PROFILER.enabled:
+        PROFILER.writeReport(
+            par["outdir"] + "profile_" + par["fname"])
     plt.close('all')
 
 
@@ -912,6 +949,12 @@ def _str2bool(v):
     raise argparse.ArgumentTypeError('Boolean value expected.')
 
 
+def _str2mode(v):
+    if isinstance(v, str) and v.lower() == 'auto':
+        return 'auto'
+    return _str2bool(v)
+
+
 def run(reg_type='TGV',
         slices=-1,
         trafo=True,
@@ -933,7 +976,17 @@ def run(reg_type='TGV',
         double_precision=False,
         coils3D=False,
         is3Ddata=False,
-        initial_guess=-1):
+        initial_guess=-1,
+        csr_gridding=False,
+        toeplitz=False,
+        profile=False,
+        opencl_model=False,
+        coil_workers=0,
+        opencl_coils=False,
+        coil_compression='none',
+        virtual_coils=0,
+        coil_energy=0.99,
+        subspace=0):
     """
     Start a 3D model based reconstruction.
 
@@ -955,12 +1008,16 @@ def run(reg_type='TGV',
         Defaults to 1
       trafo : bool, True
         Choos between Radial (1) or Cartesian (0) FFT
-      streamed : bool, False
+      streamed : bool or str, False
         Toggle between streaming slices to the GPU (1) or computing
-        everything with a single memory transfer (0). Defaults to 0
+        everything with a single memory transfer (0). Pass "auto" to stream
+        only if the in-core reconstruction exceeds the device memory, using
+        all devices for devices=-1 and an automatic number of slices per
+        package. Defaults to 0
       par_slices : int, 1
         Number of slices per streamed package. Volume devided by GPU's and
-        par_slices must be an even number! Defaults to 1
+        par_slices must be at least two. -1 selects the number of slices
+        from the device memory and a timed trial. Defaults to 1
       data : str, ''
         The path to the .h5 file containing the data to reconstruct.
         If left empty, a GUI will open and asks for data file selection. This
@@ -1002,6 +1059,43 @@ def run(reg_type='TGV',
         Optional initial guess for the selected model. Defaults to -1, i.e. 
         default setting is used. Number of elements need to match the 
         unknowns of the selected model. 
+      csr_gridding : bool, False
+        Precompute the radial gridding as sparse matrices instead of
+        evaluating the kernel lookup table on the fly. Falls back to the
+        lookup table if the matrices do not fit on the device.
+      toeplitz : bool, False
+        Apply the normal operator of the radial CG-SENSE reconstruction
+        used for the initial images as a convolution with the precomputed
+        point spread function on a twice oversampled grid.
+      profile : bool, False
+        Record per kernel, transfer and host phase timings. A JSON summary
+        and a Chrome trace are written next to the output file.
+      opencl_model : bool, False
+        Translate the signal equation and its partial derivatives of the
+        GeneralModel to OpenCL and evaluate them on the device.
+        Falls back to NumPy evaluation for unsupported expressions.
+      coil_workers : int, 0
+        Number of local worker processes for the slice-wise coil
+        sensitivity estimation. Defaults to the number of CPU cores.
+      opencl_coils : bool, False
+        Estimate the coil sensitivities with the OpenCL implementation of
+        NLINV on the reconstruction device. All slices are processed at
+        once if the device memory permits.
+      coil_compression : str, none
+        Compress the receive coils to virtual coils after the coil
+        sensitivity estimation. Either none, SVD or GCC (geometric coil
+        compression along the readout, Cartesian data only).
+      virtual_coils : int, 0
+        Number of virtual coils. Defaults to 0, i.e. the number is chosen
+        to retain the fraction coil_energy of the signal energy.
+      coil_energy : float, 0.99
+        Fraction of the signal energy retained by the virtual coils if
+        virtual_coils is 0.
+      subspace : int, 0
+        Rank of a temporal subspace estimated from simulated signal curves
+        of the model. The linearized problem is solved in this subspace,
+        which reduces the number of (nu)FFTs for many-contrast models.
+        Defaults to 0, i.e. no subspace.
     """
     params = [('--recon_type', "TGV"),
               ('--reg_type', str(reg_type)),
@@ -1025,7 +1119,17 @@ def run(reg_type='TGV',
               ('--out', str(out)),
               ('--double_precision', str(double_precision)),
               ('--estCoils3D', str(coils3D)),
-              ('--is3Ddata', str(is3Ddata))
+              ('--is3Ddata', str(is3Ddata)),
+              ('--csr_gridding', str(csr_gridding)),
+              ('--toeplitz', str(toeplitz)),
+              ('--profile', str(profile)),
+              ('--opencl_model', str(opencl_model)),
+              ('--coil_workers', str(coil_workers)),
+              ('--opencl_coils', str(opencl_coils)),
+              ('--coil_compression', str(coil_compression)),
+              ('--virtual_coils', str(virtual_coils)),
+              ('--coil_energy', str(coil_energy)),
+              ('--subspace', str(subspace))
               ]
 
     sysargs = sys.argv[1:]
@@ -1037,7 +1141,8 @@ def run(reg_type='TGV',
     if unknown:
         print("Unknown command line arguments passed: " + str(unknown) + "."
               " These will be ignored for fitting.")
-    _start_recon(argsrun)
+    with PROFILER.session(argsrun.profile):
+        _start_recon(argsrun)
 
 
 def _parseArguments(args):
@@ -1060,12 +1165,14 @@ def _parseArguments(args):
         '--trafo', dest='trafo', type=_str2bool,
         help='Choos between radial (1, default) and Cartesian (0) sampling. ')
     argparmain.add_argument(
-        '--streamed', dest='streamed', type=_str2bool,
-        help='Enable streaming of large data arrays (e.g. >10 slices).')
+        '--streamed', dest='streamed', type=_str2mode,
+        help='Enable streaming of large data arrays (e.g. >10 slices). '
+        'auto streams only if the data exceeds the device memory.')
     argparmain.add_argument(
         '--par_slices', dest='par_slices', type=int,
         help='number of slices per package. Volume devided by GPU\'s and'
-        ' par_slices must be an even number!')
+        ' par_slices must be at least two. -1 selects the number of slices'
+        ' from the device memory and a timed trial.')
     argparmain.add_argument(
         '--data', dest='file',
         help="Full path to input data. "
@@ -1130,6 +1237,46 @@ def _parseArguments(args):
     argparmain.add_argument(
         '--is3Ddata', dest='is3Ddata', type=_str2bool,
         help="Flag to indicate 3D k-space data as input.")
+    argparmain.add_argument(
+        '--csr_gridding', dest='csr_gridding', type=_str2bool,
+        help="Precompute the radial gridding as sparse matrices. "
+        "Trades device memory for atomic-free gridding. Defaults to False.")
+    argparmain.add_argument(
+        '--toeplitz', dest='toeplitz', type=_str2bool,
+        help="Apply the normal operator of the radial CG-SENSE "
+        "reconstruction by Toeplitz embedding. Defaults to False.")
+    argparmain.add_argument(
+        '--profile', dest='profile', type=_str2bool,
+        help="Write per kernel and per phase timings (JSON and Chrome "
+        "trace) next to the output file. Defaults to False.")
+    argparmain.add_argument(
+        '--opencl_model', dest='opencl_model', type=_str2bool,
+        help="Evaluate the GeneralModel signal and Jacobian with generated "
+        "OpenCL code on the device. Defaults to False.")
+    argparmain.add_argument(
+        '--coil_workers', dest='coil_workers', type=int,
+        help="Number of worker processes for the slice-wise coil "
+        "sensitivity estimation. Defaults to 0, i.e. one per CPU core.")
+    argparmain.add_argument(
+        '--opencl_coils', dest='opencl_coils', type=_str2bool,
+        help="Estimate the coil sensitivities with NLINV on the OpenCL "
+        "device. Defaults to False.")
+    argparmain.add_argument(
+        '--coil_compression', dest='coil_compression', type=str,
+        help="Compress the coils to virtual coils before fitting. "
+        "Options are: none (default), SVD, GCC (Cartesian only).")
+    argparmain.add_argument(
+        '--virtual_coils', dest='virtual_coils', type=int,
+        help="Number of virtual coils. Defaults to 0, i.e. chosen by "
+        "the retained energy.")
+    argparmain.add_argument(
+        '--coil_energy', dest='coil_energy', type=float,
+        help="Fraction of the signal energy retained by coil compression "
+        "if the number of virtual coils is not set. Defaults to 0.99.")
+    argparmain.add_argument(
+        '--subspace', dest='subspace', type=int,
+        help="Rank of the temporal subspace used for fitting. "
+        "Defaults to 0, i.e. fitting of all scans.")
 
     arguments, unknown = argparmain.parse_known_args(args)
     return arguments, unknown
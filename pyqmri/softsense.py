@@ -13,8 +13,9 @@ from tkinter import Tk
 import numpy as np
 import h5py
 
-from pyqmri.pyqmri import _str2bool
-from pyqmri.pyqmri import _setupOCL
+from pyqmri.pyqmri import _str2bool, _str2mode
+from pyqmri.pyqmri import _setupOCL, _planMemory
+from pyqmri._helper_fun._memplan import INCORE
 from pyqmri.pdsose import SoftSenseOptimizer
 
 # from pyqmri._helper_fun import _utils as utils
@@ -239,6 +240,9 @@ def _start_recon(myargs):
         par["DTYPE"] = np.complex64
         par["DTYPE_real"] = np.float32
     par["weights"] = np.array(1)
+    myargs.streamed_auto = myargs.streamed == "auto"
+    if myargs.streamed_auto:
+        myargs.streamed = False
     ###############################################################################
     # Read data from files ########################################################
     ###############################################################################
@@ -262,6 +266,18 @@ def _start_recon(myargs):
     ###############################################################################
     _setup_par(par, myargs, data, cmaps)
 
+    ###############################################################################
+    # Plan device memory ##########################################################
+    ###############################################################################
+    if not myargs.streamed:
+        mode = _planMemory(myargs, par, myargs.reg_type, trafo=False,
+                           soft_sense=True)
+        if mode != INCORE and myargs.streamed_auto:
+            print("Switching to %s mode." % mode)
+            myargs.streamed = True
+            _setupOCL(myargs, par)
+            _setup_par(par, myargs, data, cmaps)
+
     ###############################################################################
     # initialize operator  ########################################################
     ###############################################################################
@@ -322,9 +338,11 @@ def run(recon_type='3D',
         The number of slices to reconsturct. Slices are picked symmetrically
         from the volume center. Pass -1 to select all slices available.
         Defaults to -1
-      streamed : bool, False
+      streamed : bool or str, False
         Toggle between streaming slices to the GPU (1) or computing
-        everything with a single memory transfer (0). Defaults to 0
+        everything with a single memory transfer (0). Pass "auto" to stream
+        only if the in-core reconstruction exceeds the device memory.
+        Defaults to 0
       par_slices : int, 1
         Number of slices per streamed package. Volume devided by GPU's and
         par_slices must be an even number! Defaults to 1
@@ -396,8 +414,9 @@ def _parse_arguments(args):
       help="Choose regularization type "
            "options are: 'TGV', 'TV'")
     argpar.add_argument(
-        '--streamed', default='0', dest='streamed', type=_str2bool,
-        help='Enable streaming of large data arrays (e.g. >10 slices).')
+        '--streamed', default='0', dest='streamed', type=_str2mode,
+        help='Enable streaming of large data arrays (e.g. >10 slices). '
+             'auto streams only if the data exceeds the device memory.')
     argpar.add_argument(
         '--reco_slices', default='-1', dest='reco_slices', type=int,
         help='Number of slices taken around center for reconstruction '
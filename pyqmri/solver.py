@@ -10,8 +10,12 @@ from pkg_resources import resource_filename
 import pyopencl as cl
 import pyopencl.array as clarray
 import pyopencl.reduction as clred
+from pyopencl.elementwise import ElementwiseKernel
 import pyqmri.operator as operator
 from pyqmri._helper_fun import CLProgram as Program
+from pyqmri._helper_fun._scratch import HostStorage
+from pyqmri._helper_fun._mempool import device_pool
+from pyqmri._helper_fun._opnorm import OperatorNorm
 import pyqmri.streaming as streaming
 import faulthandler; faulthandler.enable()
 
@@ -40,6 +44,20 @@ class CGSolver:
       SMS : bool
         Simultaneouos Multi Slice. Switch between noraml (0)
         and slice accelerated (1) reconstruction.
+
+    Attributes
+    ----------
+      iterations : int
+        Number of CG iterations performed in the last call to run.
+
+    Notes
+    -----
+      All CG vectors are allocated once and reused in consecutive calls to
+      run. Dot products and the update steps are computed on the device,
+      only the residual norm is transferred to the host in each iteration.
+      If the NUFFT is created with par["toeplitz"], the normal operator is
+      applied as a Toeplitz embedded convolution instead of a forward and
+      adjoint NUFFT.
     """
 
     def __init__(self, par, NScan=1, trafo=1, SMS=0):
@@ -51,6 +69,7 @@ class CGSolver:
         self._dimY = par["dimY"]
         self._NC = par["NC"]
         self._queue = par["queue"][0]
+        self._pool = device_pool(self._queue)
         if par["DTYPE"] == np.complex64:
             file = open(
                 resource_filename(
@@ -84,22 +103,74 @@ class CGSolver:
                 self._queue,
                 (self._NScan, self._NC,
                  int(self._NSlice/par["MB"]), par["Nproj"], par["N"]),
-                self._DTYPE, "C")
+                self._DTYPE, "C", allocator=self._pool)
         else:
             self._tmp_sino = clarray.zeros(
                 self._queue,
                 (self._NScan, self._NC,
                  self._NSlice, par["Nproj"], par["N"]),
-                self._DTYPE, "C")
+                self._DTYPE, "C", allocator=self._pool)
         self._FT = FT.FFT
         self._FTH = FT.FFTH
+        self._toeplitz = FT.toeplitz
+        self._FTHFT = FT.normal
         self._tmp_result = clarray.zeros(
             self._queue,
             (self._NScan, self._NC,
              self._NSlice, self._dimY, self._dimX),
-            self._DTYPE, "C")
+            self._DTYPE, "C", allocator=self._pool)
         par["NScan"] = NScan_save
         self._scan_offset = 0
+        self.iterations = 0
+
+        img_shape = (self._NScan, 1, self._NSlice, self._dimY, self._dimX)
+        self._x = clarray.zeros(self._queue, img_shape, self._DTYPE, "C",
+                                allocator=self._pool)
+        self._b = clarray.zeros_like(self._x)
+        self._Ax = clarray.zeros_like(self._x)
+        self._res = clarray.zeros_like(self._x)
+        self._p = clarray.zeros_like(self._x)
+        self._data = clarray.zeros_like(self._tmp_sino)
+        # Device side scalars: residual norms (0, 1) and the real and
+        # imaginary part of <p, Ax> (2, 3).
+        self._scalars = clarray.zeros(self._queue, 4, self._DTYPE_real)
+        self._setupKernels(par["ctx"][0])
+
+    def _setupKernels(self, ctx):
+        if self._DTYPE == np.complex64:
+            ctype = "float"
+        else:
+            ctype = "double"
+        self._normkrnl = clred.ReductionKernel(
+            ctx, self._DTYPE_real, 0,
+            reduce_expr="a+b",
+            map_expr="pown(x[i].s0,2)+pown(x[i].s1,2)",
+            arguments="__global %s2 *x" % ctype)
+        self._vdotrealkrnl = clred.ReductionKernel(
+            ctx, self._DTYPE_real, 0,
+            reduce_expr="a+b",
+            map_expr="x[i].s0*y[i].s0+x[i].s1*y[i].s1",
+            arguments="__global %s2 *x, __global %s2 *y" % (ctype, ctype))
+        self._vdotimagkrnl = clred.ReductionKernel(
+            ctx, self._DTYPE_real, 0,
+            reduce_expr="a+b",
+            map_expr="x[i].s0*y[i].s1-x[i].s1*y[i].s0",
+            arguments="__global %s2 *x, __global %s2 *y" % (ctype, ctype))
+        self._axpy = ElementwiseKernel(
+            ctx,
+            "%s2 *y, %s2 *x, %s a" % (ctype, ctype, ctype),
+            "y[i] = y[i] + a*x[i]")
+        self._update_x_res = ElementwiseKernel(
+            ctx,
+            "%s2 *x, %s2 *res, %s2 *p, %s2 *Ax, %s *rr, %s *pAx"
+            % ((ctype,)*6),
+            "%s alpha = rr[0]*pAx[0]/(pAx[0]*pAx[0]+pAx[1]*pAx[1]);"
+            "x[i] = x[i] + alpha*p[i];"
+            "res[i] = res[i] - alpha*Ax[i]" % ctype)
+        self._update_p = ElementwiseKernel(
+            ctx,
+            "%s2 *p, %s2 *res, %s *rr_new, %s *rr_old" % ((ctype,)*4),
+            "p[i] = res[i] + rr_new[0]/rr_old[0]*p[i]")
 
     def __del__(self):
         """Destructor.
@@ -112,6 +183,9 @@ class CGSolver:
         del self._tmp_sino
         del self._FT
         del self._FTH
+        del self._FTHFT
+        del self._x, self._b, self._Ax, self._res, self._p, self._data
+        del self._scalars
 
     def run(self, data, iters=30, lambd=1e-5, tol=1e-8, guess=None,
             scan_offset=0):
@@ -133,62 +207,71 @@ class CGSolver:
             threshold the algorithm is terminated.
           guess : numpy.array
             An optional initial guess for the images. If None, zeros is used.
+          scan_offset : int, 0
+            Offset of the first scan in data compared to the first
+            acquired scan.
 
         Returns
         -------
           numpy.Array:
-              The result of the image reconstruction.
+              The result of the image reconstruction with shape
+              (NScan, NSlice, dimY, dimX).
         """
         self._scan_offset = scan_offset
+        rr = self._scalars[0:1]
+        rr_new = self._scalars[1:2]
+        pAx = self._scalars[2:4]
+
         if guess is not None:
-            x = clarray.to_device(self._queue, guess)
+            self._x.set(np.require(
+                np.reshape(guess, self._x.shape), self._DTYPE,
+                requirements='C'))
         else:
-            x = clarray.zeros(self._queue,
-                              (self._NScan, 1,
-                               self._NSlice, self._dimY, self._dimX),
-                              self._DTYPE, "C")
-        b = clarray.zeros(self._queue,
-                          (self._NScan, 1,
-                           self._NSlice, self._dimY, self._dimX),
-                          self._DTYPE, "C")
-        Ax = clarray.zeros(self._queue,
-                           (self._NScan, 1,
-                            self._NSlice, self._dimY, self._dimX),
-                           self._DTYPE, "C")
-
-        data = clarray.to_device(self._queue, data)
-        self._operator_rhs(b, data)
-        res = b
-        p = res
-        delta = np.linalg.norm(res.get())**2/np.linalg.norm(b.get())**2
+            self._x.fill(0)
+        self._data.set(np.require(data, self._DTYPE, requirements='C'))
+
+        self._b.add_event(self._operator_rhs(self._b, self._data))
+        for vec in (self._res, self._p):
+            vec.add_event(cl.enqueue_copy(
+                self._queue, vec.data, self._b.data,
+                wait_for=vec.events + self._b.events))
+        bnorm = self._normkrnl(self._b).get()
+        rr.add_event(self._normkrnl(
+            self._res, out=self._scalars[0], return_event=True)[1])
 
         for i in range(iters):
-            self._operator_lhs(Ax, p)
-            Ax = Ax + lambd*p
-            #alpha = (clarray.vdot(res, res) /
-            #         (clarray.vdot(p, Ax))).real.get()
-            alpha = (clarray.vdot(res, res) /
-                    (clarray.vdot(p, Ax))).real     
-
-            x = (x + alpha*p)
-            res_new = res - alpha*Ax
-            delta = np.linalg.norm(res_new.get())**2 /\
-                np.linalg.norm(b.get())**2
+            self._Ax.add_event(self._operator_lhs(self._Ax, self._p))
+            self._Ax.add_event(self._axpy(
+                self._Ax, self._p, self._DTYPE_real(lambd),
+                wait_for=self._Ax.events + self._p.events))
+            pAx.add_event(self._vdotrealkrnl(
+                self._p, self._Ax, out=self._scalars[2],
+                return_event=True)[1])
+            pAx.add_event(self._vdotimagkrnl(
+                self._p, self._Ax, out=self._scalars[3],
+                return_event=True)[1])
+            evt = self._update_x_res(
+                self._x, self._res, self._p, self._Ax, rr, pAx,
+                wait_for=(self._x.events + self._res.events
+                          + self._p.events + self._Ax.events
+                          + pAx.events + rr.events))
+            for vec in (self._x, self._res, self._p, self._Ax):
+                vec.add_event(evt)
+
+            rr_new.add_event(self._normkrnl(
+                self._res, out=rr_new[0], return_event=True)[1])
+            delta = rr_new.get()[0]/bnorm
             if delta < tol:
                 print(
                     "Converged after %i iterations to %1.3e." % (i, delta))
-                del Ax, \
-                    b, res, p, data, res_new
-                return np.squeeze(x.get())
-            # beta = (clarray.vdot(res_new, res_new) /
-            #         clarray.vdot(res, res)).real.get()
-            beta = (clarray.vdot(res_new, res_new) /
-                    clarray.vdot(res, res)).real        
-
-            p = res_new + beta * p
-            (res, res_new) = (res_new, res)
-        del Ax, b, res, p, data, res_new
-        return np.squeeze(x.get())
+                break
+            self._p.add_event(self._update_p(
+                self._p, self._res, rr_new, rr,
+                wait_for=(self._p.events + self._res.events
+                          + rr.events + rr_new.events)))
+            rr, rr_new = rr_new, rr
+        self.iterations = i + 1
+        return self._x.get()[:, 0]
 
     def eval_fwd_kspace_cg(self, y, x, wait_for=None):
         """Apply forward operator for image reconstruction.
@@ -235,6 +318,11 @@ class CGSolver:
             wait_for = []
         self._tmp_result.add_event(self.eval_fwd_kspace_cg(
             self._tmp_result, x, wait_for=self._tmp_result.events+x.events))
+        if self._toeplitz:
+            self._tmp_result.add_event(self._FTHFT(
+                self._tmp_result, self._tmp_result,
+                scan_offset=self._scan_offset))
+            return self._combine_coils(out, wait_for)
         self._tmp_sino.add_event(self._FT(
             self._tmp_sino, self._tmp_result, scan_offset=self._scan_offset))
         return self._operator_rhs(out, self._tmp_sino)
@@ -259,6 +347,9 @@ class CGSolver:
         self._tmp_result.add_event(self._FTH(
             self._tmp_result, x, wait_for=wait_for+x.events,
             scan_offset=self._scan_offset))
+        return self._combine_coils(out, wait_for)
+
+    def _combine_coils(self, out, wait_for):
         return self._prg.operator_ad_cg(self._queue,
                                         (self._NSlice, self._dimY,
                                          self._dimX),
@@ -310,6 +401,7 @@ class CGSolver_H1:
         self._op = linops[0]
         self._grad_op = linops[1]
         self._queue = queue
+        self._pool = device_pool(queue[0])
         self.tol = irgn_par["tol"]
         self._coils = coils
         self.display_iterations = irgn_par["display_iterations"]
@@ -343,24 +435,19 @@ class CGSolver_H1:
         self._tmp_result = clarray.zeros(
                     self._queue[0],
                     data.shape,
-                    self._DTYPE, "C")
+                    self._DTYPE, allocator=self._pool)
         if guess is not None:
-            x = clarray.to_device(self._queue[0], guess[0])
+            x = clarray.to_device(self._queue[0], guess[0],
+                                  allocator=self._pool)
         else:
             x = clarray.zeros(self._queue[0],
                               (self.unknowns,
                                self._NSlice, self._dimY, self._dimX),
-                              self._DTYPE, "C")
+                              self._DTYPE, "C", allocator=self._pool)
         x_old = x.copy()
         y = x.copy()
-        b = clarray.zeros(self._queue[0],
-                          (self.unknowns,
-                           self._NSlice, self._dimY, self._dimX),
-                          self._DTYPE, "C")
-        Ax = clarray.zeros(self._queue[0],
-                           (self.unknowns,
-                            self._NSlice, self._dimY, self._dimX),
-                           self._DTYPE, "C")
+        b = clarray.zeros_like(x)
+        Ax = clarray.zeros_like(x)
 
         tau1 = self.lambd*(self.power_iteration(x))
         tau2 = self.alpha*(self.power_iteration_grad(x))
@@ -368,7 +455,7 @@ class CGSolver_H1:
         tau = self._DTYPE_real(1/(tau1+tau2+1/self.delta))
 
         x0 = x.copy()
-        data = clarray.to_device(self._queue[0], data)
+        data = clarray.to_device(self._queue[0], data, allocator=self._pool)
         self._operator_rhs(b, data).wait()
         # theta = 0.1
 
@@ -548,7 +635,8 @@ class CGSolver_H1:
         # Ideally choose a random vector
         # To decrease the chance that our vector
         # Is orthogonal to the eigenvector
-        b_k = clarray.to_device(self._queue[0], (np.random.randn(*(x.shape))+1j*np.random.randn(*(x.shape))).astype(self._DTYPE))
+        b_k = clarray.to_device(self._queue[0], (np.random.randn(*(x.shape))+1j*np.random.randn(*(x.shape))).astype(self._DTYPE),
+                                allocator=self._pool)
         b_k1 = clarray.zeros_like(b_k)
 
         for _ in range(num_simulations):
@@ -569,7 +657,8 @@ class CGSolver_H1:
         # Ideally choose a random vector
         # To decrease the chance that our vector
         # Is orthogonal to the eigenvector
-        b_k = clarray.to_device(self._queue[0], (np.random.randn(*(x.shape))+1j*np.random.randn(*(x.shape))).astype(self._DTYPE))
+        b_k = clarray.to_device(self._queue[0], (np.random.randn(*(x.shape))+1j*np.random.randn(*(x.shape))).astype(self._DTYPE),
+                                allocator=self._pool)
         b_k1 = clarray.zeros_like(b_k)
 
         for _ in range(num_simulations):
@@ -667,8 +756,20 @@ class PDBaseSolver:
         list of maximal values, one for each unknown
       real_const : list of int
         list if a unknown is constrained to real values only. (1 True, 0 False)
+      gap_every : int
+        Evaluate the primal-dual gap, and thus the termination criteria,
+        only every gap_every iterations.
+      warm_start : bool
+        Keep the dual variables and all temporary arrays between calls of
+        run. Each run starts from the dual solution of the previous one,
+        rescaled to the current regularization parameters.
+      iterations : list of int
+        Number of performed primal-dual iterations per call of run.
     """
 
+    # Regularization parameter bounding each dual variable.
+    _dual_params = {"r": "lambd", "z1": "alpha", "z2": "beta"}
+
     def __init__(self,
                  par,
                  irgn_par,
@@ -701,6 +802,7 @@ class PDBaseSolver:
         self._fval_init = fval
         self._prg = prg
         self._queue = queue
+        self._pool = device_pool(queue[0])
         self.model = model
         self._coils = coil
         self.modelgrad = None
@@ -709,9 +811,26 @@ class PDBaseSolver:
         self.real_const = None
         self.tmp_par_array = None
         self.precond = False
-        
+        self._storage = None
+        if "gap_every" in irgn_par.keys():
+            self.gap_every = max(int(irgn_par["gap_every"]), 1)
+        else:
+            self.gap_every = 1
+        if "warm_start" in irgn_par.keys():
+            self.warm_start = bool(irgn_par["warm_start"])
+        else:
+            self.warm_start = False
+        self.iterations = []
+        self._resident = None
+        self.alpha = None
+        self.beta = None
+        self._opnorm = OperatorNorm(queue[0], DTYPE)
+
         self._kernelsize = (par["par_slices"] + par["overlap"], par["dimY"],
                             par["dimX"])
+        self._reduction_buffer = clarray.zeros(
+            queue[0], 16, dtype=self._DTYPE_real)
+        self._reduction_buffer_host = np.zeros(16, dtype=self._DTYPE_real)
         if self._DTYPE is np.complex64:
             self.abskrnl = clred.ReductionKernel(
                 par["ctx"][0], self._DTYPE_real, 0,
@@ -743,6 +862,16 @@ class PDBaseSolver:
                 reduce_expr="a+b",
                 map_expr="(pown(x[i].s0-y[i].s0,2)+pown(x[i].s1-y[i].s1,2))*w[i]",
                 arguments="__global float2 *x, __global float2 *y, __global float *w")
+            self.vdotrealkrnl = clred.ReductionKernel(
+                par["ctx"][0], self._DTYPE_real, 0,
+                reduce_expr="a+b",
+                map_expr="x[i].s0*y[i].s0+x[i].s1*y[i].s1",
+                arguments="__global float2 *x, __global float2 *y")
+            self.sumrealkrnl = clred.ReductionKernel(
+                par["ctx"][0], self._DTYPE_real, 0,
+                reduce_expr="a+b",
+                map_expr="x[i].s0",
+                arguments="__global float2 *x")
         elif self._DTYPE is np.complex128:
             self.abskrnl = clred.ReductionKernel(
                 par["ctx"][0], self._DTYPE_real, 0,
@@ -774,6 +903,16 @@ class PDBaseSolver:
                 reduce_expr="a+b",
                 map_expr="(pown(x[i].s0-y[i].s0,2)+pown(x[i].s1-y[i].s1,2))*w[i]",
                 arguments="__global double2 *x, __global double2 *y, __global double *w")
+            self.vdotrealkrnl = clred.ReductionKernel(
+                par["ctx"][0], self._DTYPE_real, 0,
+                reduce_expr="a+b",
+                map_expr="x[i].s0*y[i].s0+x[i].s1*y[i].s1",
+                arguments="__global double2 *x, __global double2 *y")
+            self.sumrealkrnl = clred.ReductionKernel(
+                par["ctx"][0], self._DTYPE_real, 0,
+                reduce_expr="a+b",
+                map_expr="x[i].s0",
+                arguments="__global double2 *x")
 
     @staticmethod
     def factory(
@@ -986,17 +1125,31 @@ class PDBaseSolver:
         """
 
         self._updateConstraints()
-        
-        l_max = 1#np.sqrt(self.power_iteration(inp[0], data.shape))
-        l_max += self.alpha*((0.5 * (18.0 + np.sqrt(33)))**2)
-        print("Estimated L: ", l_max)
-        print()
-        
-        tau = 1/np.sqrt(l_max)
-        tau_new = self._DTYPE_real(0)
+
+        (primal_vars,
+         primal_vars_new,
+         tmp_results_forward,
+         tmp_results_forward_new,
+         dual_vars,
+         dual_vars_new,
+         tmp_results_adjoint,
+         tmp_results_adjoint_new,
+         data) = self._residentVariables(inp, data)
 
         theta_line = self.theta_line
         beta_line = self.beta_line
+
+        l_max = self._operatorNorm(primal_vars, data)
+        if l_max is None:
+            l_max = 1
+            l_max += self.alpha*((0.5 * (18.0 + np.sqrt(33)))**2)
+            tau = 1/np.sqrt(l_max)
+        else:
+            tau = 1/(np.sqrt(beta_line)*l_max)
+        print("Estimated L: ", l_max)
+        print()
+
+        tau_new = self._DTYPE_real(0)
         beta_new = self._DTYPE_real(0)
         mu_line = self._DTYPE_real(0.75)
         delta_line = self._DTYPE_real(0.95)
@@ -1006,16 +1159,6 @@ class PDBaseSolver:
         dual = [0]
         gap = [0]
 
-        (primal_vars,
-         primal_vars_new,
-         tmp_results_forward,
-         tmp_results_forward_new,
-         dual_vars,
-         dual_vars_new,
-         tmp_results_adjoint,
-         tmp_results_adjoint_new,
-         data) = self._setupVariables(inp, data)
-
         self._updateInitial(
             out_fwd=tmp_results_forward,
             out_adj=tmp_results_adjoint,
@@ -1023,6 +1166,9 @@ class PDBaseSolver:
             in_dual=dual_vars
             )
 
+        if self._storage is not None:
+            self._storage.resetIO()
+
         for i in range(iters):
             self._updatePrimal(
                 out_primal=primal_vars_new,
@@ -1069,19 +1215,10 @@ class PDBaseSolver:
              primal_vars_new, primal_vars, dual_vars_new, dual_vars,
              tmp_results_adjoint_new, tmp_results_adjoint,
              tmp_results_forward_new, tmp_results_forward)
-                     
-            primal_val, dual_val, gap_val = self._calcResidual(
-                in_primal=primal_vars,
-                in_dual=dual_vars,
-                in_precomp_fwd=tmp_results_forward,
-                in_precomp_adj=tmp_results_adjoint,
-                data=data)
-            primal.append(primal_val)
-            dual.append(dual_val)
-            gap.append(gap_val)
 
-            # self.tau = tau
-            
+            if self._storage is not None:
+                self._storage.reportIO(i)
+
             if not np.mod(i+1, 100):
                 if self.display_iterations:
                     if isinstance(primal_vars["x"], np.ndarray):
@@ -1093,6 +1230,22 @@ class PDBaseSolver:
                             self.model.plot_unknowns(self.irgn.removePrecond(primal_vars["x"].get()))
                         else:
                             self.model.plot_unknowns(primal_vars["x"].get())
+
+            # The gap is only needed for the termination criteria. Skipping
+            # it avoids a host synchronization in each iteration.
+            if i > 0 and np.mod(i+1, self.gap_every):
+                continue
+
+            primal_val, dual_val, gap_val = self._calcResidual(
+                in_primal=primal_vars,
+                in_dual=dual_vars,
+                in_precomp_fwd=tmp_results_forward,
+                in_precomp_adj=tmp_results_adjoint,
+                data=data)
+            primal.append(primal_val)
+            dual.append(dual_val)
+            gap.append(gap_val)
+
             if (
                 len(gap)>40 and
                 np.abs(np.mean(gap[-40:-20]) - np.mean(gap[-20:]))
@@ -1104,7 +1257,7 @@ class PDBaseSolver:
         "because the method stagnated. Relative difference: %.3e" %
         (i+1, np.abs(np.mean(gap[-20:-10]) - np.mean(gap[-10:]))
                  /np.mean(gap[-20:-10])))
-                return primal_vars
+                break
             if np.abs((gap[-1] - gap[-2]) / gap[1]) < self.rtol:
                 print()
                 print(
@@ -1112,7 +1265,7 @@ class PDBaseSolver:
         "decrease in the PD-gap was %.3e which is below the "
         "relative tolerance of %.3e"
         % (i+1, np.abs((gap[-1] - gap[-2]) / gap[1]), self.rtol))
-                return primal_vars
+                break
             if np.abs((gap[-1]) / gap[1]) < self.atol:
                 print()
                 print(
@@ -1120,7 +1273,7 @@ class PDBaseSolver:
         "decrease in the PD-gap was %.3e which is below the "
         "absolute tolerance of %.3e" 
         % (i+1, np.abs(gap[-1] / gap[1]), self.atol))
-                return primal_vars
+                break
             
             
             print(
@@ -1130,10 +1283,84 @@ class PDBaseSolver:
                  1000*dual[-1] / gap[1],
                  1000*gap[-1] / gap[1],
                  beta_line), end="")
-
-        print()
+        else:
+            print()
+
+        self.iterations.append(i+1)
+        if self.warm_start:
+            self._resident = (primal_vars,
+                              primal_vars_new,
+                              tmp_results_forward,
+                              tmp_results_forward_new,
+                              dual_vars,
+                              dual_vars_new,
+                              tmp_results_adjoint,
+                              tmp_results_adjoint_new,
+                              data)
         return primal_vars
 
+    def _residentVariables(self, inp, data):
+        """Set up the variables of a run.
+
+        Without warm start, or in the first run, all variables are newly
+        allocated by _setupVariables. Otherwise, the arrays of the last run
+        are reused. The primal variable x and the data are overwritten
+        with the new input, while v and the dual variables keep their
+        values. The forward and adjoint results are recomputed in
+        _updateInitial.
+
+        Parameters
+        ----------
+          inp : tuple of numpy.array
+            The initial guess of the primal variables (x, v).
+          data : numpy.array
+            The data to fit.
+
+        Returns
+        -------
+          tuple
+            The variables in the order of _setupVariables.
+        """
+        if not self.warm_start or self._resident is None:
+            return self._setupVariables(inp, data)
+        (primal_vars, primal_vars_new, *_, old_data) = self._resident
+        for arr in (primal_vars["x"], primal_vars["xk"],
+                    primal_vars_new["xk"]):
+            self._assign(arr, inp[0])
+        if isinstance(old_data, clarray.Array):
+            self._assign(old_data, data)
+            data = old_data
+        return self._resident[:-1] + (data,)
+
+    def _assign(self, outp, inp):
+        if isinstance(outp, clarray.Array):
+            outp.set(np.require(inp, self._DTYPE, 'C'))
+        else:
+            outp[...] = inp
+
+    def _rescaleDuals(self, old):
+        """Rescale the resident dual variables.
+
+        Keeps the warm start feasible if the regularization parameters
+        change between two runs, e.g. for the projections of z1 and z2
+        onto the balls of radius alpha and beta. The data dual r scales
+        with lambda.
+
+        Parameters
+        ----------
+          old : dict
+            The previous parameter of each dual variable.
+        """
+        if self._resident is None:
+            return
+        for key, name in self._dual_params.items():
+            new = getattr(self, name)
+            if not old[key] or new == old[key]:
+                continue
+            for dual_vars in self._resident[4:6]:
+                if key in dual_vars:
+                    dual_vars[key] *= self._DTYPE_real(new / old[key])
+
     def _updateInitial(
             self,
             out_fwd,
@@ -1179,6 +1406,39 @@ class PDBaseSolver:
     def _setupVariables(self, inp, data):
         return ({}, {}, {}, {}, {}, {}, {}, {}, {})
 
+    def _evalReductions(self, reductions):
+        """Evaluate a set of reductions with a single host transfer.
+
+        Each reduction writes its result into one entry of a small device
+        buffer. The buffer is copied back to the host once all reductions
+        finished, thus only one synchronization point is necessary instead
+        of one per reduction.
+
+        Parameters
+        ----------
+          reductions : list of tuple
+            A list of (kernel, args) pairs. Each kernel needs to be a
+            PyOpenCL.ReductionKernel returning a real scalar.
+
+        Returns
+        -------
+          numpy.array
+            The value of each reduction in the order of the input list.
+        """
+        events = []
+        for j, (krnl, args) in enumerate(reductions):
+            events.append(
+                krnl(*args,
+                     out=self._reduction_buffer[j],
+                     return_event=True)[1])
+        cl.enqueue_copy(
+            self._queue[0],
+            self._reduction_buffer_host,
+            self._reduction_buffer.data,
+            wait_for=events,
+            is_blocking=False).wait()
+        return self._reduction_buffer_host[:len(reductions)].copy()
+
     def _updateConstraints(self):
         num_const = (len(self.model.constraints))
         min_const = np.zeros((num_const), dtype=self._DTYPE_real)
@@ -1204,12 +1464,15 @@ class PDBaseSolver:
         """Update the regularization parameters.
 
           Performs an update of the regularization parameters as these usually
-          vary from one to another Gauss-Newton step.
+          vary from one to another Gauss-Newton step. With warm start, the
+          dual variables of the last run are rescaled accordingly.
 
         Parameters
         ----------
           irgn_par (dic): A dictionary containing the new parameters.
         """
+        old = {key: getattr(self, name)
+               for key, name in self._dual_params.items()}
         if "alpha_ratio" in irgn_par.keys():
           self.alpha = irgn_par["gamma"] * irgn_par["alpha_ratio"]
           self.beta = irgn_par["gamma"] #* 2 #MH changed
@@ -1223,6 +1486,7 @@ class PDBaseSolver:
         #self.lambd = 1#irgn_par["lambd"]
         
         self.mu = 1/self.delta
+        self._rescaleDuals(old)
 
     def update_primal(self, outp, inp, par, idx=0, idxq=0,
                       bound_cond=0, wait_for=None):
@@ -1548,33 +1812,66 @@ class PDBaseSolver:
         self._fval_init = fval
 
 
-    def power_iteration(self, x, data_shape, num_simulations=50):
-        # Ideally choose a random vector
-        # To decrease the chance that our vector
-        # Is orthogonal to the eigenvector
-        x = clarray.to_device(self._queue[0], x)
-        y = clarray.zeros(self._queue[0], data_shape, self._DTYPE)
-        b_k = clarray.to_device(self._queue[0], 
-                                (np.random.randn(*(x.shape))
-                                 +1j*np.random.randn(*(x.shape))
-                                 ).astype(self._DTYPE))
-        b_k1 = clarray.zeros_like(b_k)
-    
-        for _ in range(num_simulations):
-            # calculate the matrix-by-vector product Ab
-            # self._operator_lhs(b_k1, b_k).wait()
-            self._op.fwd(y, [x, self._coils, self.modelgrad])
-            self._op.adj(b_k1, [y, self._coils, self.modelgrad])
-    
-            # calculate the norm
-            b_k1_norm = np.linalg.norm(b_k1.get())
-    
-            # re normalize the vector
-            b_k = b_k1 / self._DTYPE_real(b_k1_norm)
-            
-            lmax = np.abs((clarray.vdot(b_k1,b_k)/np.linalg.norm(b_k.get())**2).get())
-    
-        return lmax
+    def _operatorNorm(self, primal_vars, data):
+        """Estimate the norm of the combined linear operator.
+
+        Used to set the initial step size of the line search. Solvers
+        without an estimate fall back to a fixed bound.
+
+        Parameters
+        ----------
+          primal_vars : dict of PyOpenCL.Array
+            The primal variables of the current run.
+          data : PyOpenCL.Array
+            The data to fit.
+
+        Returns
+        -------
+          float or None
+            Upper bound of the operator norm estimated from the norms of
+            the operator blocks, None if no estimate is available.
+        """
+        return None
+
+    def _dataNorm(self, x, data):
+        tmp_data = clarray.zeros_like(data)
+
+        def normal(out, inp):
+            tmp_data.add_event(
+                self._op.fwd(tmp_data, [inp, self._coils, self.modelgrad]))
+            out.add_event(
+                self._op.adj(out, [tmp_data, self._coils, self.modelgrad]))
+
+        # The linearized model changes in each Gauss-Newton step, thus the
+        # estimate is only warm started from the last dominant vector.
+        return self._opnorm.estimate(
+            "data", (x.shape, data.shape), normal, x.shape, cached=False)
+
+    def _gradNorm(self, x):
+        tmp_grad = clarray.zeros(
+            self._queue[0], x.shape+(4,), dtype=self._DTYPE)
+
+        def normal(out, inp):
+            tmp_grad.add_event(self._grad_op.fwd(tmp_grad, inp))
+            out.add_event(self._grad_op.adj(out, tmp_grad))
+
+        ratio = self._grad_op.ratio
+        if isinstance(ratio, list):
+            ratio = ratio[0]
+        config = (x.shape, self.dz, tuple(ratio.get().ravel()))
+        return self._opnorm.estimate(
+            "grad", config, normal, x.shape, cached=not self.precond)
+
+    def _symgradNorm(self, v):
+        tmp_symgrad = clarray.zeros(
+            self._queue[0], v.shape[:-1]+(8,), dtype=self._DTYPE)
+
+        def normal(out, inp):
+            tmp_symgrad.add_event(self._symgrad_op.fwd(tmp_symgrad, inp))
+            out.add_event(self._symgrad_op.adj(out, tmp_symgrad))
+
+        return self._opnorm.estimate(
+            "symgrad", (v.shape, self.dz), normal, v.shape)
 
 class PDSolverTV(PDBaseSolver):
     """Primal Dual splitting optimization for TV.
@@ -1643,16 +1940,23 @@ class PDSolverTV(PDBaseSolver):
         self._op = linop[0]
         self._grad_op = linop[1]
 
+    def _operatorNorm(self, primal_vars, data):
+        blocks = [[self._dataNorm(primal_vars["x"], data)],
+                  [self._gradNorm(primal_vars["x"])]]
+        return np.linalg.norm(blocks, 2)
+
     def _setupVariables(self, inp, data):
 
-        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE))
+        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE),
+                                 allocator=self._pool)
 
         primal_vars = {}
         primal_vars_new = {}
         tmp_results_adjoint = {}
         tmp_results_adjoint_new = {}
 
-        primal_vars["x"] = clarray.to_device(self._queue[0], inp[0])
+        primal_vars["x"] = clarray.to_device(self._queue[0], inp[0],
+                                             allocator=self._pool)
         primal_vars["xk"] = primal_vars["x"].copy()
         primal_vars_new["x"] = clarray.zeros_like(primal_vars["x"])
         primal_vars_new["xk"] = primal_vars["x"].copy()
@@ -1667,12 +1971,13 @@ class PDSolverTV(PDBaseSolver):
         dual_vars["r"] = clarray.zeros(
             self._queue[0],
             data.shape,
-            dtype=self._DTYPE)
+            dtype=self._DTYPE, allocator=self._pool)
         dual_vars_new["r"] = clarray.zeros_like(dual_vars["r"])
 
         dual_vars["z1"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape + (4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         dual_vars_new["z1"] = clarray.zeros_like(dual_vars["z1"])
 
         tmp_results_forward["gradx"] = clarray.zeros_like(
@@ -1781,16 +2086,14 @@ class PDSolverTV(PDBaseSolver):
                 out_adj["Kyk1"], [out_dual["r"], self._coils, self.modelgrad])).wait()
             out_adj["Kyk1"] = out_adj["Kyk1"] - self._grad_op.adjoop(out_dual["z1"])
 
-        ynorm = (
-            (
-                self.normkrnldiff(out_dual["r"], in_dual["r"])
-                + self.normkrnldiff(out_dual["z1"], in_dual["z1"])
-            )**(1 / 2))
-        lhs = np.sqrt(beta) * tau * (
-            (
-                self.normkrnldiff(out_adj["Kyk1"], in_precomp_adj["Kyk1"])
-            )**(1 / 2))
-        return lhs.get(), ynorm.get()
+        norms = self._evalReductions([
+            (self.normkrnldiff, (out_dual["r"], in_dual["r"])),
+            (self.normkrnldiff, (out_dual["z1"], in_dual["z1"])),
+            (self.normkrnldiff, (out_adj["Kyk1"], in_precomp_adj["Kyk1"]))
+            ])
+        ynorm = np.sqrt(norms[0] + norms[1])
+        lhs = np.sqrt(beta) * tau * np.sqrt(norms[2])
+        return lhs, ynorm
 
     def _calcResidual(
             self,
@@ -1799,40 +2102,41 @@ class PDSolverTV(PDBaseSolver):
             in_precomp_fwd,
             in_precomp_adj,
             data):
+        reductions = [
+            (self.normkrnldiff, (in_precomp_fwd["Ax"], data)),
+            (self.abskrnl, (in_precomp_fwd["gradx"],)),
+            (self.normkrnldiff, (in_primal["x"], in_primal["xk"])),
+            (self.normkrnl, (in_precomp_adj["Kyk1"],)),
+            (self.vdotrealkrnl, (in_primal["xk"], in_precomp_adj["Kyk1"])),
+            (self.normkrnl, (in_dual["r"],)),
+            (self.vdotrealkrnl, (data, in_dual["r"]))
+            ]
+        if self.unknowns_H1 > 0:
+            reductions += [
+                (self.normkrnl,
+                 (in_precomp_fwd["gradx"][self.unknowns_TGV:],)),
+                (self.normkrnl, (in_dual["z1"][self.unknowns_TGV:],))
+                ]
+        red = self._evalReductions(reductions)
 
         primal_new = (
-            self.lambd / 2 *
-            self.normkrnldiff(in_precomp_fwd["Ax"], data)
-            + self.alpha * self.abskrnl(in_precomp_fwd["gradx"])
-            + 1 / (2 * self.delta) *
-                self.normkrnldiff(in_primal["x"],
-                                      in_primal["xk"])
-            ).real
+            self.lambd / 2 * red[0]
+            + self.alpha * red[1]
+            + 1 / (2 * self.delta) * red[2]
+            )
 
         dual = (
-            -self.delta / 2 * self.normkrnl(in_precomp_adj["Kyk1"])
-            - clarray.vdot(
-                in_primal["xk"],
-                - in_precomp_adj["Kyk1"]
-                )
-            - 1 / (2 * self.lambd) * self.normkrnl(in_dual["r"])
-            - clarray.vdot(data, in_dual["r"])
-            ).real
+            -self.delta / 2 * red[3]
+            + red[4]
+            - 1 / (2 * self.lambd) * red[5]
+            - red[6]
+            )
 
         if self.unknowns_H1 > 0:
-            primal_new += (
-                 self.omega / 2 * self.normkrnl(
-                     in_precomp_fwd["gradx"][self.unknowns_TGV:]
-                     )
-                 ).real
-
-            dual += (
-                - 1 / (2 * self.omega) * self.normkrnl(
-                    in_dual["z1"][self.unknowns_TGV:]
-                    )
-                ).real
+            primal_new += self.omega / 2 * red[7]
+            dual += - 1 / (2 * self.omega) * red[8]
         gap = np.abs(primal_new - dual)
-        return primal_new.get(), dual.get(), gap.get()
+        return primal_new, dual, gap
 
 
 class PDSolverTGV(PDBaseSolver):
@@ -1901,18 +2205,28 @@ class PDSolverTGV(PDBaseSolver):
         self._grad_op = linop[1]
         self._symgrad_op = linop[2]
 
+    def _operatorNorm(self, primal_vars, data):
+        blocks = [[self._dataNorm(primal_vars["x"], data), 0],
+                  [self._gradNorm(primal_vars["x"]), 1],
+                  [0, self._symgradNorm(primal_vars["v"])]]
+        return np.linalg.norm(blocks, 2)
+
     def _setupVariables(self, inp, data):
-        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE))
+        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE),
+                                 allocator=self._pool)
 
         primal_vars = {}
         primal_vars_new = {}
         tmp_results_adjoint = {}
         tmp_results_adjoint_new = {}
 
-        primal_vars["x"] = clarray.to_device(self._queue[0], inp[0])
+        primal_vars["x"] = clarray.to_device(self._queue[0], inp[0],
+                                             allocator=self._pool)
         primal_vars["xk"] = primal_vars["x"].copy()
         primal_vars_new["x"] = clarray.zeros_like(primal_vars["x"])
-        primal_vars["v"] = clarray.to_device(self._queue[0], np.zeros_like(inp[1]))
+        primal_vars["v"] = clarray.zeros(self._queue[0], inp[1].shape,
+                                         dtype=self._DTYPE,
+                                         allocator=self._pool)
         primal_vars_new["v"] = clarray.zeros_like(primal_vars["v"])
         primal_vars_new["xk"] = primal_vars["x"].copy()
 
@@ -1928,16 +2242,18 @@ class PDSolverTGV(PDBaseSolver):
         dual_vars["r"] = clarray.zeros(
             self._queue[0],
             data.shape,
-            dtype=self._DTYPE)
+            dtype=self._DTYPE, allocator=self._pool)
         dual_vars_new["r"] = clarray.zeros_like(dual_vars["r"])
 
         dual_vars["z1"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape+(4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         dual_vars_new["z1"] = clarray.zeros_like(dual_vars["z1"])
         dual_vars["z2"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape+(8,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         dual_vars_new["z2"] = clarray.zeros_like(dual_vars["z2"])
 
         tmp_results_forward["gradx"] = clarray.zeros_like(
@@ -2083,21 +2399,16 @@ class PDSolverTGV(PDBaseSolver):
                 inp=(out_dual["z2"], out_dual["z1"])))
     
 
-        ynorm = (
-            self.normkrnldiff(out_dual["r"], in_dual["r"],
-                        wait_for=out_dual["r"].events + in_dual["r"].events).get()
-            + self.normkrnldiff(out_dual["z1"], in_dual["z1"],
-                        wait_for=out_dual["z1"].events + in_dual["z1"].events).get()
-            + self.normkrnldiff(out_dual["z2"], in_dual["z2"],
-                        wait_for=out_dual["z2"].events + in_dual["z2"].events).get()
-            )**(1/2)
+        norms = self._evalReductions([
+            (self.normkrnldiff, (out_dual["r"], in_dual["r"])),
+            (self.normkrnldiff, (out_dual["z1"], in_dual["z1"])),
+            (self.normkrnldiff, (out_dual["z2"], in_dual["z2"])),
+            (self.normkrnldiff, (out_adj["Kyk1"], in_precomp_adj["Kyk1"])),
+            (self.normkrnldiff, (out_adj["Kyk2"], in_precomp_adj["Kyk2"]))
+            ])
 
-        lhs = np.sqrt(beta) * tau * (
-            self.normkrnldiff(out_adj["Kyk1"], in_precomp_adj["Kyk1"],
-              wait_for=out_adj["Kyk1"].events + in_precomp_adj["Kyk1"].events).get()
-            + self.normkrnldiff(out_adj["Kyk2"], in_precomp_adj["Kyk2"],
-              wait_for=out_adj["Kyk2"].events + in_precomp_adj["Kyk2"].events).get()
-            )**(1/2)
+        ynorm = np.sqrt(np.sum(norms[:3]))
+        lhs = np.sqrt(beta) * tau * np.sqrt(np.sum(norms[3:]))
 
         return lhs, ynorm
 
@@ -2108,42 +2419,45 @@ class PDSolverTGV(PDBaseSolver):
             in_precomp_fwd,
             in_precomp_adj,
             data):
+        reductions = [
+            (self.normkrnldiff, (in_precomp_fwd["Ax"], data)),
+            (self.abskrnldiff, (in_precomp_fwd["gradx"], in_primal["v"])),
+            (self.abskrnl, (in_precomp_fwd["symgradx"],)),
+            (self.normkrnldiff, (in_primal["x"], in_primal["xk"])),
+            (self.normkrnl, (in_precomp_adj["Kyk1"],)),
+            (self.vdotrealkrnl, (in_primal["xk"], in_precomp_adj["Kyk1"])),
+            (self.sumrealkrnl, (in_precomp_adj["Kyk2"],)),
+            (self.normkrnl, (in_dual["r"],)),
+            (self.vdotrealkrnl, (data, in_dual["r"]))
+            ]
+        if self.unknowns_H1 > 0:
+            reductions += [
+                (self.normkrnl,
+                 (in_precomp_fwd["gradx"][self.unknowns_TGV:],)),
+                (self.normkrnl, (in_dual["z1"][self.unknowns_TGV:],))
+                ]
+        red = self._evalReductions(reductions)
 
         primal_new = (
-            self.lambd / 2 * self.normkrnldiff(in_precomp_fwd["Ax"], data)
-            + self.alpha * self.abskrnldiff(in_precomp_fwd["gradx"],
-                                              in_primal["v"])
-            + self.beta * self.abskrnl(in_precomp_fwd["symgradx"])
-            + 1 / (2 * self.delta) * self.normkrnldiff(in_primal["x"],
-                                      in_primal["xk"]).get()
-
-            ).real
+            self.lambd / 2 * red[0]
+            + self.alpha * red[1]
+            + self.beta * red[2]
+            + 1 / (2 * self.delta) * red[3]
+            )
 
         dual = (
-            -self.delta / 2 * self.normkrnl(in_precomp_adj["Kyk1"])
-            - clarray.vdot(
-                in_primal["xk"],
-                -in_precomp_adj["Kyk1"]
-                )
-            - clarray.sum(in_precomp_adj["Kyk2"])
-            - 1 / (2 * self.lambd) * self.normkrnl(in_dual["r"])
-            - clarray.vdot(data, in_dual["r"])
-            ).real
+            -self.delta / 2 * red[4]
+            + red[5]
+            - red[6]
+            - 1 / (2 * self.lambd) * red[7]
+            - red[8]
+            )
 
         if self.unknowns_H1 > 0:
-            primal_new += (
-                 self.omega / 2 * self.normkrnl(
-                     in_precomp_fwd["gradx"][self.unknowns_TGV:]
-                     )
-                 ).get()
-
-            dual += (
-                - 1 / (2 * self.omega) * self.normkrnl(
-                    in_dual["z1"][self.unknowns_TGV:]
-                    )
-                ).get()
+            primal_new += self.omega / 2 * red[9]
+            dual += - 1 / (2 * self.omega) * red[10]
         gap = np.abs(primal_new - dual)
-        return primal_new.get(), dual.get(), gap.get()
+        return primal_new, dual, gap
 
 
 class PDSolverStreamed(PDBaseSolver):
@@ -2231,6 +2545,12 @@ class PDSolverStreamed(PDBaseSolver):
         self._symgrad_op = None
         self._grad_op = None
 
+        if "host_storage" in irgn_par.keys():
+            self._storage = HostStorage(irgn_par["host_storage"],
+                                        irgn_par.get("scratch_dir", ''))
+        else:
+            self._storage = HostStorage()
+
         if imagespace:
             self.data_shape = (par["NSlice"], par["NScan"],
                                par["dimY"], par["dimX"])
@@ -2247,20 +2567,24 @@ class PDSolverStreamed(PDBaseSolver):
         if reg_type == 'TV':
             pass
         elif reg_type == 'TGV':
-            self.v = np.zeros(
+            self.v = self._storage.zeros(
+                "reg_v",
                 self.grad_shape,
                 dtype=self._DTYPE)
-            self.z2 = np.zeros(
+            self.z2 = self._storage.zeros(
+                "reg_z2",
                 self.symgrad_shape,
                 dtype=self._DTYPE)
         else:
             raise NotImplementedError("Not implemented")
         self._setupstreamingops(reg_type, SMS=SMS)
 
-        self.r = np.zeros(
+        self.r = self._storage.zeros(
+                "reg_r",
                 self.data_shape,
                 dtype=self._DTYPE)
-        self.z1 = np.zeros(
+        self.z1 = self._storage.zeros(
+            "reg_z1",
             self.grad_shape,
             dtype=self._DTYPE)
 
@@ -2519,47 +2843,60 @@ class PDSolverStreamedTGV(PDSolverStreamed):
         tmp_results_adjoint_new = {}
 
         primal_vars["x"] = inp[0]
-        primal_vars["xk"] = primal_vars["x"].copy()
-        primal_vars_new["x"] = np.zeros_like(primal_vars["x"])
-        primal_vars["v"] = np.zeros(
-                                        primal_vars["x"].shape+(4,),
-                                        dtype=self._DTYPE)
-        primal_vars_new["v"] = np.zeros_like(primal_vars["v"])
-        primal_vars_new["xk"] = primal_vars["x"].copy()
-
-        tmp_results_adjoint["Kyk1"] = np.zeros_like(primal_vars["x"])
-        tmp_results_adjoint_new["Kyk1"] = np.zeros_like(primal_vars["x"])
-        tmp_results_adjoint["Kyk2"] = np.zeros_like(primal_vars["v"])
-        tmp_results_adjoint_new["Kyk2"] = np.zeros_like(primal_vars["v"])
+        primal_vars["xk"] = self._storage.copy(
+            "xk", primal_vars["x"])
+        primal_vars_new["x"] = self._storage.zeros_like(
+            "x_new", primal_vars["x"])
+        primal_vars["v"] = self._storage.zeros(
+            "v", primal_vars["x"].shape+(4,),
+            dtype=self._DTYPE)
+        primal_vars_new["v"] = self._storage.zeros_like(
+            "v_new", primal_vars["v"])
+        primal_vars_new["xk"] = self._storage.copy(
+            "xk_new", primal_vars["x"])
+
+        tmp_results_adjoint["Kyk1"] = self._storage.zeros_like(
+            "Kyk1", primal_vars["x"])
+        tmp_results_adjoint_new["Kyk1"] = self._storage.zeros_like(
+            "Kyk1_new", primal_vars["x"])
+        tmp_results_adjoint["Kyk2"] = self._storage.zeros_like(
+            "Kyk2", primal_vars["v"])
+        tmp_results_adjoint_new["Kyk2"] = self._storage.zeros_like(
+            "Kyk2_new", primal_vars["v"])
 
         dual_vars = {}
         dual_vars_new = {}
         tmp_results_forward = {}
         tmp_results_forward_new = {}
-        dual_vars["r"] = np.zeros(
-            data.shape,
+        dual_vars["r"] = self._storage.zeros(
+            "r", data.shape,
             dtype=self._DTYPE)
-        dual_vars_new["r"] = np.zeros_like(dual_vars["r"])
-
-        dual_vars["z1"] = np.zeros(
-                                            primal_vars["x"].shape+(4,),
-                                            dtype=self._DTYPE)
-        dual_vars_new["z1"] = np.zeros_like(dual_vars["z1"])
-        dual_vars["z2"] = np.zeros(
-                                            primal_vars["x"].shape+(8,),
-                                            dtype=self._DTYPE)
-        dual_vars_new["z2"] = np.zeros_like(dual_vars["z2"])
+        dual_vars_new["r"] = self._storage.zeros_like(
+            "r_new", dual_vars["r"])
 
-        tmp_results_forward["gradx"] = np.zeros_like(
-            dual_vars["z1"])
-        tmp_results_forward_new["gradx"] = np.zeros_like(
-            dual_vars["z1"])
-        tmp_results_forward["symgradx"] = np.zeros_like(
-            dual_vars["z2"])
-        tmp_results_forward_new["symgradx"] = np.zeros_like(
-            dual_vars["z2"])
-        tmp_results_forward["Ax"] = np.zeros_like(data)
-        tmp_results_forward_new["Ax"] = np.zeros_like(data)
+        dual_vars["z1"] = self._storage.zeros(
+            "z1", primal_vars["x"].shape+(4,),
+            dtype=self._DTYPE)
+        dual_vars_new["z1"] = self._storage.zeros_like(
+            "z1_new", dual_vars["z1"])
+        dual_vars["z2"] = self._storage.zeros(
+            "z2", primal_vars["x"].shape+(8,),
+            dtype=self._DTYPE)
+        dual_vars_new["z2"] = self._storage.zeros_like(
+            "z2_new", dual_vars["z2"])
+
+        tmp_results_forward["gradx"] = self._storage.zeros_like(
+            "gradx", dual_vars["z1"])
+        tmp_results_forward_new["gradx"] = self._storage.zeros_like(
+            "gradx_new", dual_vars["z1"])
+        tmp_results_forward["symgradx"] = self._storage.zeros_like(
+            "symgradx", dual_vars["z2"])
+        tmp_results_forward_new["symgradx"] = self._storage.zeros_like(
+            "symgradx_new", dual_vars["z2"])
+        tmp_results_forward["Ax"] = self._storage.zeros_like(
+            "Ax", data)
+        tmp_results_forward_new["Ax"] = self._storage.zeros_like(
+            "Ax_new", data)
 
         return (primal_vars,
                 primal_vars_new,
@@ -2954,32 +3291,42 @@ class PDSolverStreamedTV(PDSolverStreamed):
         tmp_results_adjoint_new = {}
 
         primal_vars["x"] = inp[0]
-        primal_vars["xk"] = primal_vars["x"].copy()
-        primal_vars_new["x"] = np.zeros_like(primal_vars["x"])
-        primal_vars_new["xk"] = primal_vars["x"].copy()
-
-        tmp_results_adjoint["Kyk1"] = np.zeros_like(primal_vars["x"])
-        tmp_results_adjoint_new["Kyk1"] = np.zeros_like(primal_vars["x"])
+        primal_vars["xk"] = self._storage.copy(
+            "xk", primal_vars["x"])
+        primal_vars_new["x"] = self._storage.zeros_like(
+            "x_new", primal_vars["x"])
+        primal_vars_new["xk"] = self._storage.copy(
+            "xk_new", primal_vars["x"])
+
+        tmp_results_adjoint["Kyk1"] = self._storage.zeros_like(
+            "Kyk1", primal_vars["x"])
+        tmp_results_adjoint_new["Kyk1"] = self._storage.zeros_like(
+            "Kyk1_new", primal_vars["x"])
 
         dual_vars = {}
         dual_vars_new = {}
         tmp_results_forward = {}
         tmp_results_forward_new = {}
-        dual_vars["r"] = np.zeros(
-            data.shape,
+        dual_vars["r"] = self._storage.zeros(
+            "r", data.shape,
             dtype=self._DTYPE)
-        dual_vars_new["r"] = np.zeros_like(dual_vars["r"])
+        dual_vars_new["r"] = self._storage.zeros_like(
+            "r_new", dual_vars["r"])
 
-        dual_vars["z1"] = np.zeros(primal_vars["x"].shape+(4,),
-                                   dtype=self._DTYPE)
-        dual_vars_new["z1"] = np.zeros_like(dual_vars["z1"])
-
-        tmp_results_forward["gradx"] = np.zeros_like(
-            dual_vars["z1"])
-        tmp_results_forward_new["gradx"] = np.zeros_like(
-            dual_vars["z1"])
-        tmp_results_forward["Ax"] = np.zeros_like(data)
-        tmp_results_forward_new["Ax"] = np.zeros_like(data)
+        dual_vars["z1"] = self._storage.zeros(
+            "z1", primal_vars["x"].shape+(4,),
+            dtype=self._DTYPE)
+        dual_vars_new["z1"] = self._storage.zeros_like(
+            "z1_new", dual_vars["z1"])
+
+        tmp_results_forward["gradx"] = self._storage.zeros_like(
+            "gradx", dual_vars["z1"])
+        tmp_results_forward_new["gradx"] = self._storage.zeros_like(
+            "gradx_new", dual_vars["z1"])
+        tmp_results_forward["Ax"] = self._storage.zeros_like(
+            "Ax", data)
+        tmp_results_forward_new["Ax"] = self._storage.zeros_like(
+            "Ax_new", data)
 
         return (primal_vars,
                 primal_vars_new,
@@ -3321,6 +3668,7 @@ class PDSoftSenseBaseSolver:
         self._fval_init = fval
         self._prg = prg
         self._queue = queue
+        self._pool = device_pool(queue[0])
         self._coils = coils
         self._kernelsize = (par["par_slices"] + par["overlap"], par["dimY"],
                             par["dimX"])
@@ -4183,13 +4531,15 @@ class PDSoftSenseSolverTV(PDSoftSenseBaseSolver):
         self._grad_op = linop[1]
 
     def _setupVariables(self, inp, data):
-        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE))
+        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE),
+                                 allocator=self._pool)
 
         primal_vars = {}
         primal_vars_new = {}
         tmp_results_adjoint = {}
 
-        primal_vars["x"] = clarray.to_device(self._queue[0], inp)
+        primal_vars["x"] = clarray.to_device(self._queue[0], inp,
+                                             allocator=self._pool)
         primal_vars_new["x"] = clarray.zeros_like(primal_vars["x"])
 
         tmp_results_adjoint["Kyk1"] = clarray.zeros_like(primal_vars["x"])
@@ -4201,11 +4551,12 @@ class PDSoftSenseSolverTV(PDSoftSenseBaseSolver):
         dual_vars["y"] = clarray.zeros(
             self._queue[0],
             data.shape,
-            dtype=self._DTYPE
+            dtype=self._DTYPE,
+            allocator=self._pool
         )
         dual_vars["z"] = clarray.zeros(self._queue[0],
                                        primal_vars["x"].shape + (4,),
-                                       dtype=self._DTYPE)
+                                       dtype=self._DTYPE, allocator=self._pool)
 
         dual_vars_new["y"] = clarray.zeros_like(dual_vars["y"])
         dual_vars_new["z"] = clarray.zeros_like(dual_vars["z"])
@@ -4425,16 +4776,19 @@ class PDSoftSenseSolverTGV(PDSoftSenseBaseSolver):
         self._symgrad_op = linop[2]
 
     def _setupVariables(self, inp, data):
-        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE))
+        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE),
+                                 allocator=self._pool)
 
         primal_vars = {}
         primal_vars_new = {}
         tmp_results_adjoint = {}
 
-        primal_vars["x"] = clarray.to_device(self._queue[0], inp)
+        primal_vars["x"] = clarray.to_device(self._queue[0], inp,
+                                             allocator=self._pool)
         primal_vars["v"] = clarray.zeros(self._queue[0],
                                          primal_vars["x"].shape + (4,),
-                                         dtype=self._DTYPE)
+                                         dtype=self._DTYPE,
+                                         allocator=self._pool)
         primal_vars_new["x"] = clarray.zeros_like(primal_vars["x"])
         primal_vars_new["v"] = clarray.zeros_like(primal_vars["v"])
 
@@ -4448,15 +4802,18 @@ class PDSoftSenseSolverTGV(PDSoftSenseBaseSolver):
         dual_vars["y"] = clarray.zeros(
             self._queue[0],
             data.shape,
-            dtype=self._DTYPE
+            dtype=self._DTYPE,
+            allocator=self._pool
         )
         dual_vars["z1"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape + (4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
 
         dual_vars["z2"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape + (8,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
 
         dual_vars_new["y"] = clarray.zeros_like(dual_vars["y"])
         dual_vars_new["z1"] = clarray.zeros_like(dual_vars["z1"])
@@ -5645,6 +6002,8 @@ class PDSolverICTV(PDBaseSolver):
         TV regularization weight
     """
 
+    _dual_params = {"r": "lambd", "z1": "alpha", "z2": "alpha"}
+
     def __init__(self,
                  par,
                  irgn_par,
@@ -5687,14 +6046,16 @@ class PDSolverICTV(PDBaseSolver):
 
     def _setupVariables(self, inp, data):
 
-        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE))
+        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE),
+                                 allocator=self._pool)
 
         primal_vars = {}
         primal_vars_new = {}
         tmp_results_adjoint = {}
         tmp_results_adjoint_new = {}
 
-        primal_vars["x"] = clarray.to_device(self._queue[0], inp[0])
+        primal_vars["x"] = clarray.to_device(self._queue[0], inp[0],
+                                             allocator=self._pool)
         primal_vars_new["x"] = clarray.zeros_like(primal_vars["x"])
         primal_vars["v"] = clarray.zeros_like(primal_vars["x"])
         primal_vars_new["v"] = clarray.zeros_like(primal_vars["x"])
@@ -5705,11 +6066,13 @@ class PDSolverICTV(PDBaseSolver):
         tmp_results_adjoint["Kyk2"] = clarray.zeros(
                                         self._queue[0],
                                         primal_vars["x"].shape+(4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         tmp_results_adjoint_new["Kyk2"] = clarray.zeros(
                                         self._queue[0],
                                         primal_vars["x"].shape+(4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
 
         dual_vars = {}
         dual_vars_new = {}
@@ -5718,17 +6081,19 @@ class PDSolverICTV(PDBaseSolver):
         dual_vars["r"] = clarray.zeros(
             self._queue[0],
             data.shape,
-            dtype=self._DTYPE)
+            dtype=self._DTYPE, allocator=self._pool)
         dual_vars_new["r"] = clarray.zeros_like(dual_vars["r"])
 
         dual_vars["z1"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape + (4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         dual_vars_new["z1"] = clarray.zeros_like(dual_vars["z1"])
 
         dual_vars["z2"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape + (4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         dual_vars_new["z2"] = clarray.zeros_like(dual_vars["z2"])
 
         tmp_results_forward["gradx1"] = clarray.zeros_like(
@@ -6086,6 +6451,10 @@ class PDSolverICTGV(PDBaseSolver):
         TV regularization weight
     """
 
+    _dual_params = {"r": "lambd", "z1": "alpha", "z2": "alpha",
+                    "z3_diag": "beta", "z3_offdiag": "beta",
+                    "z4_diag": "beta", "z4_offdiag": "beta"}
+
     def __init__(self,
                  par,
                  irgn_par,
@@ -6131,19 +6500,22 @@ class PDSolverICTGV(PDBaseSolver):
 
     def _setupVariables(self, inp, data):
 
-        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE))
+        data = clarray.to_device(self._queue[0], data.astype(self._DTYPE),
+                                 allocator=self._pool)
 
         primal_vars = {}
         primal_vars_new = {}
         tmp_results_adjoint = {}
         tmp_results_adjoint_new = {}
 
-        primal_vars["x"] = clarray.to_device(self._queue[0], inp[0])
+        primal_vars["x"] = clarray.to_device(self._queue[0], inp[0],
+                                             allocator=self._pool)
         primal_vars_new["x"] = clarray.zeros_like(primal_vars["x"])
         primal_vars["v"] = clarray.zeros_like(primal_vars["x"])
         primal_vars_new["v"] = clarray.zeros_like(primal_vars["x"])
         
-        primal_vars["w1"] = clarray.zeros(self._queue[0],primal_vars["x"].shape+(4,), dtype=self._DTYPE)
+        primal_vars["w1"] = clarray.zeros(self._queue[0],primal_vars["x"].shape+(4,), dtype=self._DTYPE,
+                                          allocator=self._pool)
         primal_vars_new["w1"] = clarray.zeros_like(primal_vars["w1"])
         primal_vars["w2"] = clarray.zeros_like(primal_vars["w1"])
         primal_vars_new["w2"] = clarray.zeros_like(primal_vars["w1"])
@@ -6158,20 +6530,24 @@ class PDSolverICTGV(PDBaseSolver):
         tmp_results_adjoint["Kyk3"] = clarray.zeros(
                                         self._queue[0],
                                         primal_vars["x"].shape+(4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         tmp_results_adjoint_new["Kyk3"] = clarray.zeros(
                                         self._queue[0],
                                         primal_vars["x"].shape+(4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         
         tmp_results_adjoint["Kyk4"] = clarray.zeros(
                                         self._queue[0],
                                         primal_vars["x"].shape+(4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         tmp_results_adjoint_new["Kyk4"] = clarray.zeros(
                                         self._queue[0],
                                         primal_vars["x"].shape+(4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
 
         dual_vars = {}
         dual_vars_new = {}
@@ -6180,37 +6556,43 @@ class PDSolverICTGV(PDBaseSolver):
         dual_vars["r"] = clarray.zeros(
             self._queue[0],
             data.shape,
-            dtype=self._DTYPE)
+            dtype=self._DTYPE, allocator=self._pool)
         dual_vars_new["r"] = clarray.zeros_like(dual_vars["r"])
 
         dual_vars["z1"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape + (4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         dual_vars_new["z1"] = clarray.zeros_like(dual_vars["z1"])
 
         dual_vars["z2"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape + (4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         dual_vars_new["z2"] = clarray.zeros_like(dual_vars["z2"])
         
         dual_vars["z3_diag"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape + (4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         dual_vars_new["z3_diag"] = clarray.zeros_like(dual_vars["z3_diag"])
         
         dual_vars["z4_diag"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape + (4,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         dual_vars_new["z4_diag"] = clarray.zeros_like(dual_vars["z4_diag"])
         
         dual_vars["z3_offdiag"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape + (8,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         dual_vars_new["z3_offdiag"] = clarray.zeros_like(dual_vars["z3_offdiag"])
         
         dual_vars["z4_offdiag"] = clarray.zeros(self._queue[0],
                                         primal_vars["x"].shape + (8,),
-                                        dtype=self._DTYPE)
+                                        dtype=self._DTYPE,
+                                        allocator=self._pool)
         dual_vars_new["z4_offdiag"] = clarray.zeros_like(dual_vars["z4_offdiag"])
 
         tmp_results_forward["gradx1"] = clarray.zeros_like(
@@ -2,16 +2,22 @@
 # -*- coding: utf-8 -*-
 """Module holding the class for streaming operations on the GPU."""
 
+import time
+import collections
+
 import numpy as np
 import pyopencl as cl
 import pyopencl.array as clarray
 import pyopencl.reduction as clred
+from pyqmri._helper_fun._scratch import prefetch
 
 class Stream:
     """Basic streaming Class.
 
     This Class is responsible for performing asynchroneous transfer
     and computation on the GPU for arbitrary large numpy data.
+    Transfers and computations are only chained via OpenCL events, the
+    host waits for the queues once at the end of eval and evalwithnorm.
 
     Parameters
     ----------
@@ -46,6 +52,10 @@ class Stream:
         be computed.
       DTYPE : numpy.dype, numpy.complex64
         Complex data type.
+      pinned : bool, True
+        Stage the block transfers in page-locked host memory. Falls back
+        to transfers from the numpy arrays if the pinned buffers can not be
+        allocated.
 
     Attributes
     ----------
@@ -83,6 +93,16 @@ class Stream:
         For each function a list of devices with a single output is generated.
         E.g. for one function and one device
         the list would have dimension [1][1]
+      overlap_efficiency : float, None
+        Fraction of the wall time of the last call to eval or evalwithnorm
+        during which the devices were computing, averaged over devices.
+        None if the queues do not support profiling.
+      bandwidth_todevice : float, None
+        Host to device transfer rate of the blocks in GB/s during the last
+        call. None if the queues do not support profiling.
+      bandwidth_tohost : float, None
+        Device to host transfer rate of the blocks in GB/s during the last
+        call. None if the queues do not support profiling.
     """
 
     def __init__(self,
@@ -97,7 +117,8 @@ class Stream:
                  reverse=False,
                  lhs=None,
                  DTYPE=np.complex64,
-                 DTYPE_real = np.float32):
+                 DTYPE_real = np.float32,
+                 pinned=True):
         self.fun = fun
         self.num_dev = num_dev
         self.slices = par_slices
@@ -107,6 +128,7 @@ class Stream:
         self.nslice = nslice
         self.num_fun = len(self.fun)
         self.dtype = DTYPE
+        self.pinned = pinned
 
         self.lhs = lhs
         self.at_end = False
@@ -118,6 +140,16 @@ class Stream:
 
         self.inp = []
         self.outp = []
+        self.inp_pinned = []
+        self.outp_pinned = []
+        self.overlap_efficiency = None
+        self.bandwidth_todevice = None
+        self.bandwidth_tohost = None
+        self._compute_events = []
+        self._tohost_events = (0, [])
+        self._transfer_events = {"todevice": [], "tohost": []}
+        self._pinned_events = {}
+        self._pending_tohost = collections.deque()
 
         self._alloctmparrays(inp_shape, outp_shape)
         
@@ -155,6 +187,8 @@ class Stream:
             self.fun.append(other.fun[j])
             self.inp.append(other.inp[j])
             self.outp.append(other.outp[j])
+            self.inp_pinned.append(other.inp_pinned[j])
+            self.outp_pinned.append(other.outp_pinned[j])
         self.num_fun += other.num_fun
         return self
 
@@ -168,8 +202,10 @@ class Stream:
         block_size = self.slices+self.overlap
         for j in range(self.num_fun):
             self.inp.append([])
+            self.inp_pinned.append([])
             for i in range(2*self.num_dev):
                 self.inp[j].append([])
+                self.inp_pinned[j].append([])
                 for k in range(len(inp_shape[j])):
                     if not len(inp_shape[j][k]) == 0:
                         self.inp[j][i].append(
@@ -177,17 +213,58 @@ class Stream:
                                 self.queue[4*int(i/2)],
                                 ((block_size, )+inp_shape[j][k][1:]),
                                 dtype=self.dtype))
+                        self.inp_pinned[j][i].append(
+                            self._allocpinned(
+                                self.queue[4*int(i/2)+i % 2],
+                                self.inp[j][i][k].shape))
                     else:
                         self.inp[j][i].append([])
+                        self.inp_pinned[j][i].append(None)
 
         for j in range(self.num_fun):
             self.outp.append([])
+            self.outp_pinned.append([])
             for i in range(2*self.num_dev):
                 self.outp[j].append(
                     clarray.zeros(
                         self.queue[4*int(i/2)],
                         ((block_size, )+outp_shape[j][1:]),
                         dtype=self.dtype))
+                self.outp_pinned[j].append(
+                    self._allocpinned(
+                        self.queue[4*int(i/2)+2+i % 2],
+                        self.outp[j][i].shape))
+        if not self.pinned:
+            # Mixing staged and direct copies would break the order of the
+            # overlapping blocks on the host.
+            self.inp_pinned = [[[None]*len(inps) for inps in dev]
+                               for dev in self.inp_pinned]
+            self.outp_pinned = [[None]*len(dev) for dev in self.outp_pinned]
+
+    def _allocpinned(self, queue, shape):
+        # Mapping a buffer allocated by the driver yields page-locked host
+        # memory, which is only used as source or destination of copies.
+        if not self.pinned:
+            return None
+        try:
+            buffer = cl.Buffer(
+                queue.context,
+                cl.mem_flags.READ_WRITE | cl.mem_flags.ALLOC_HOST_PTR,
+                int(np.prod(shape))*np.dtype(self.dtype).itemsize)
+            staging, event = cl.enqueue_map_buffer(
+                queue, buffer,
+                cl.map_flags.READ | cl.map_flags.WRITE,
+                0, shape, self.dtype)
+            event.wait()
+        except (cl.Error, MemoryError):
+            self.pinned = False
+            return None
+        return staging
+
+    def _waitpinned(self, staging):
+        event = self._pinned_events.pop(id(staging), None)
+        if event is not None:
+            event.wait()
 
     def _getindtodev(self):
         if self.reverse:
@@ -250,8 +327,10 @@ class Stream:
           par (list of list of parameters):
             Optional list of parameters which should be passed to a function.
         """
+        self._checkshapes(outp)
         # Reset Array Index
         self._resetindex()
+        start = time.perf_counter()
         # Warmup Queue 1
         self._streamtodevice(inp, 0)
         self._startcomputation(par, bound_cond=1, odd=0)
@@ -281,11 +360,7 @@ class Stream:
             self._streamtohost(outp, 1)
             self._streamtohost(outp, 0)
         # Wait for all Queues to finish
-        for i in range(self.num_dev):
-            self.queue[4*i].finish()
-            self.queue[4*i+1].finish()
-            self.queue[4*i+2].finish()
-            self.queue[4*i+3].finish()
+        self._finish(start)
 
     def evalwithnorm(self, outp, inp, par=None):
         """Evaluate all functions of the object and returns norms.
@@ -309,10 +384,12 @@ class Stream:
             (lhs, rhs) The lhs and rhs for the linesearch used in the TGV
             algorithm.
         """
+        self._checkshapes(outp)
         # Reset Array Index
         self._resetindex()
-        rhs = 0
-        lhs = 0
+        start = time.perf_counter()
+        rhs = []
+        lhs = []
         # Warmup Queue 1
         self._streamtodevice(inp, 0)
         self._startcomputation(par, bound_cond=1, odd=0)
@@ -346,12 +423,68 @@ class Stream:
             (rhs, lhs) = self._streamtohostnorm(outp, rhs, lhs, 1)
             (rhs, lhs) = self._streamtohostnorm(outp, rhs, lhs, 0)
         # Wait for all Queues to finish
+        self._finish(start)
+        return (sum(norm.get() for norm in lhs),
+                sum(norm.get() for norm in rhs))
+
+    def _checkshapes(self, outp):
+        # The blocks are copied into the results slice by slice, thus a
+        # result which only broadcasts would fail late or mix up blocks.
+        for ifun in range(self.num_fun):
+            shape = (self.nslice,)+self.outp[ifun][0].shape[1:]
+            if not tuple(outp[ifun].shape) == shape:
+                raise ValueError(
+                    "Output %d of the stream has shape %s, expected %s."
+                    % (ifun, tuple(outp[ifun].shape), shape))
+
+    def _finish(self, start):
         for i in range(self.num_dev):
             self.queue[4*i].finish()
             self.queue[4*i+1].finish()
             self.queue[4*i+2].finish()
             self.queue[4*i+3].finish()
-        return (lhs, rhs)
+        while self._pending_tohost:
+            self._flushtohost()
+        wall = time.perf_counter() - start
+        try:
+            busy = 0
+            for idev in range(self.num_dev):
+                busy += self._busytime(idev)
+            self.overlap_efficiency = busy / (self.num_dev*wall)
+            self.bandwidth_todevice = self._bandwidth("todevice")
+            self.bandwidth_tohost = self._bandwidth("tohost")
+        except cl.Error:
+            # Queues without profiling enabled.
+            self.overlap_efficiency = None
+            self.bandwidth_todevice = None
+            self.bandwidth_tohost = None
+        self._compute_events = []
+        self._tohost_events = (0, [])
+        self._transfer_events = {"todevice": [], "tohost": []}
+        self._pinned_events = {}
+
+    def _bandwidth(self, direction):
+        nbytes = 0
+        duration = 0
+        for size, event in self._transfer_events[direction]:
+            nbytes += size
+            duration += event.profile.end - event.profile.start
+        if duration == 0:
+            return None
+        return nbytes / duration
+
+    def _busytime(self, idev):
+        intervals = sorted(
+            (start.profile.end, end.profile.end)
+            for dev, start, end in self._compute_events if dev == idev)
+        busy = 0
+        stop = 0
+        for (first, last) in intervals:
+            first = max(first, stop)
+            if last > first:
+                busy += last - first
+                stop = last
+        return busy*1e-9
 
     def _streamtodevice(self, inp, odd):
         for idev in range(self.num_dev):
@@ -360,25 +493,33 @@ class Stream:
                 if not len(inp[ifun]) == 0:
                     for iinp in range(len(self.inp[ifun][idev])):
                         if not len(inp[ifun][iinp]) == 0:
-                            self.inp[
-                                ifun][
-                                    2*idev+odd][
-                                        iinp].add_event(
-                                            cl.enqueue_copy(
-                                                self.queue[4*idev+odd],
-                                                self.inp[
-                                                    ifun][
-                                                        2*idev+odd][
-                                                            iinp].data,
-                                                inp[
-                                                    ifun][
-                                                        iinp][idx, ...],
-                                                wait_for=self.inp[
-                                                    ifun][
-                                                        2*idev+odd][
-                                                            iinp].events,
-                                                is_blocking=False))
+                            buffer = self.inp[ifun][2*idev+odd][iinp]
+                            source = inp[ifun][iinp][idx, ...]
+                            staging = self.inp_pinned[
+                                ifun][2*idev+odd][iinp]
+                            if staging is not None:
+                                # Only waits for the transfer of the block
+                                # before the previous one.
+                                self._waitpinned(staging)
+                                np.copyto(staging, source)
+                                source = staging
+                            # Waits for the last computation reading the
+                            # buffer.
+                            event = cl.enqueue_copy(
+                                self.queue[4*idev+odd],
+                                buffer.data,
+                                source,
+                                wait_for=buffer.events,
+                                is_blocking=False)
+                            buffer.events[:] = [event]
+                            if staging is not None:
+                                self._pinned_events[id(staging)] = event
+                            self._transfer_events["todevice"].append(
+                                (buffer.nbytes, event))
                             self.queue[4*idev+odd].flush()
+                            prefetch(inp[ifun][iinp],
+                                     slice(self.idx_todev_start,
+                                           self.idx_todev_stop))
 
     def _startcomputation(self, par=None, bound_cond=0, odd=0):
         if par is None:
@@ -387,73 +528,120 @@ class Stream:
                 par.append([])
         for idev in range(self.num_dev):
             for ifun in range(self.num_fun):
-                for inps in self.inp[ifun][2*idev+odd]:
-                    for inp in inps:
-                        for event in inp.events:
-                            event.wait()
-                self.outp[
-                    ifun][
-                        2*idev+odd].add_event(
-                            self.fun[ifun](
-                                self.outp[ifun][2*idev+odd],
-                                self.inp[ifun][2*idev+odd][:],
-                                par[ifun],
-                                idev,
-                                odd,
-                                bound_cond=bound_cond))
+                outp = self.outp[ifun][2*idev+odd]
+                buffers = [outp] + [
+                    inp for inp in self.inp[ifun][2*idev+odd]
+                    if isinstance(inp, clarray.Array)]
+                wait_for = []
+                for buffer in buffers:
+                    wait_for += buffer.events
+                # The marker completes once all transfers of the block and
+                # the previous transfer of the output are done.
+                ready = cl.enqueue_marker(self.queue[4*idev+odd],
+                                          wait_for=wait_for)
+                event = self.fun[ifun](
+                    outp,
+                    self.inp[ifun][2*idev+odd][:],
+                    par[ifun],
+                    idev,
+                    odd,
+                    bound_cond=bound_cond,
+                    wait_for=[ready])
+                for buffer in buffers:
+                    buffer.events[:] = [event]
+                self._compute_events.append((idev, ready, event))
                 self.queue[4*idev+odd].flush()
             bound_cond = 0
 
+    def _tohostwaitlist(self, idev):
+        prev_dev, events = self._tohost_events
+        if prev_dev == idev:
+            return events
+        # Events can not be shared between the contexts of different
+        # devices, thus the completion is forwarded via user events.
+        wait_for = []
+        for event in events:
+            forward = cl.UserEvent(self.queue[4*idev].context)
+            event.set_callback(
+                cl.command_execution_status.COMPLETE,
+                lambda status, forward=forward: forward.set_status(
+                    cl.command_execution_status.COMPLETE))
+            wait_for.append(forward)
+        return wait_for
+
+    def _copytohost(self, outp, idx, idev, odd):
+        # Adjacent blocks overlap on the host, hence the copies are
+        # ordered to keep the values of the later block.
+        previous = self._tohostwaitlist(idev)
+        events = []
+        for ifun in range(self.num_fun):
+            buffer = self.outp[ifun][2*idev+odd]
+            staging = self.outp_pinned[ifun][2*idev+odd]
+            if staging is None:
+                event = cl.enqueue_copy(
+                    self.queue[4*idev+2+odd],
+                    outp[ifun][idx, ...],
+                    buffer.data,
+                    wait_for=buffer.events+previous,
+                    is_blocking=False)
+                events.append(event)
+            else:
+                # Pinned blocks are written to the result in order, once
+                # the staging buffer is needed again or at the end.
+                while any(entry[0] is staging
+                          for entry in self._pending_tohost):
+                    self._flushtohost()
+                event = cl.enqueue_copy(
+                    self.queue[4*idev+2+odd],
+                    staging,
+                    buffer.data,
+                    wait_for=buffer.events,
+                    is_blocking=False)
+                self._pending_tohost.append(
+                    (staging, outp[ifun][idx, ...], event))
+            buffer.events.append(event)
+            self._transfer_events["tohost"].append((buffer.nbytes, event))
+            self.queue[4*idev+2+odd].flush()
+        self._tohost_events = (idev, events)
+
+    def _flushtohost(self):
+        staging, result, event = self._pending_tohost.popleft()
+        event.wait()
+        np.copyto(result, staging)
+
     def _streamtohost(self, outp, odd):
         for idev in range(self.num_dev):
-            self.queue[4*idev+3-odd].finish()
-            if self.num_dev > 1:
-                self.queue[4*np.mod(idev-1, self.num_dev)+2+odd].finish()
-                self.queue[4*np.mod(idev-1, self.num_dev)+3-odd].finish()
             idx = self._getindtohost()
-            for ifun in range(self.num_fun):
-                self.outp[ifun][2*idev+odd].add_event(
-                    cl.enqueue_copy(
-                        self.queue[4*idev+2+odd],
-                        outp[ifun][idx, ...],
-                        self.outp[ifun][2*idev+odd].data,
-                        wait_for=self.outp[ifun][2*idev+odd].events,
-                        is_blocking=False))
-                self.queue[4*idev+2+odd].flush()
+            self._copytohost(outp, idx, idev, odd)
 
     def _streamtohostnorm(self, outp, rhs, lhs, odd):
         for idev in range(self.num_dev):
-            self.queue[4*idev+3-odd].finish()
-            if self.num_dev > 1:
-                self.queue[4*np.mod(idev-1, self.num_dev)+2+odd].finish()
-                self.queue[4*np.mod(idev-1, self.num_dev)+3-odd].finish()
             idx = self._getindtohost()
+            block = self._normblock(idx)
             for ifun in range(self.num_fun):
-                self.outp[ifun][2*idev+odd].add_event(
-                    cl.enqueue_copy(
-                        self.queue[4*idev+2+odd],
-                        outp[ifun][idx, ...],
-                        self.outp[ifun][2*idev+odd].data,
-                        wait_for=self.outp[ifun][2*idev+odd].events,
-                        is_blocking=False))
-                if self.reverse:
-                    if not self.at_end:
-                        (rhs, lhs) = self._calcnormreverse(
-                            rhs, lhs, idev, ifun, odd)
-                    else:
-                        (rhs, lhs) = self._calcnormforward(
-                            rhs, lhs, idev, ifun, odd)
-                else:
-                    if not self.at_end:
-                        (rhs, lhs) = self._calcnormforward(
-                            rhs, lhs, idev, ifun, odd)
-                    else:
-                        (rhs, lhs) = self._calcnormreverse(
-                            rhs, lhs, idev, ifun, odd)
-                self.queue[4*idev+odd].flush()
-                self.queue[4*idev+2+odd].flush()
+                self._calcnorm(rhs, lhs, idev, ifun, odd, block)
+            self.queue[4*idev+odd].flush()
+            self._copytohost(outp, idx, idev, odd)
         return (rhs, lhs)
 
+    def _normblock(self, idx):
+        # Each slice enters the norms once. The overlap at the open end of
+        # a block is only valid in the next block and the last block is
+        # shifted back if the slices are not divisible by the block size.
+        if self.reverse:
+            start = idx.start
+            if start > 0:
+                start += self.overlap
+            stop = min(idx.stop, self._norm_next)
+            self._norm_next = start
+        else:
+            start = max(idx.start, self._norm_next)
+            stop = idx.stop
+            if stop < self.nslice:
+                stop -= self.overlap
+            self._norm_next = stop
+        return slice(start-idx.start, max(stop, start)-idx.start)
+
     def _resetindex(self):
         if self.reverse:
             self.idx_todev_start = self.nslice - (self.slices + self.overlap)
@@ -461,11 +649,13 @@ class Stream:
             self.idx_tohost_start = self.nslice - (self.slices +
                                                    self.overlap)
             self.idx_tohost_stop = self.nslice
+            self._norm_next = self.nslice
         else:
             self.idx_todev_start = 0
             self.idx_todev_stop = (self.slices + self.overlap)
             self.idx_tohost_start = 0
             self.idx_tohost_stop = (self.slices + self.overlap)
+            self._norm_next = 0
 
     def connectouttoin(self, outpos, inpos):
         """Connect output to input of functions within the object.
@@ -485,44 +675,19 @@ class Stream:
         for j in range(2*self.num_dev):
             self.inp[inpos[0]][j][inpos[1]] = self.outp[outpos][j]
 
-    def _calcnormreverse(self, rhs, lhs, idev, ifun, odd=0):
+    def _calcnorm(self, rhs, lhs, idev, ifun, odd, block):
+        outp = self.outp[ifun][2*idev+odd]
         if self.lhs[ifun] is False:
-            rhs += self.normkrnldiff[4*idev+odd](
-                self.outp[
-                    ifun][
-                        2*idev+odd][self.overlap:, ...],
-                self.inp[
-                    ifun][
-                        2*idev+odd][0][self.overlap:, ...]        
-                ).get()
+            inp = self.inp[ifun][2*idev+odd][0]
+            norms = rhs
         else:
-            lhs += self.normkrnldiff[4*idev+odd](
-                self.outp[
-                    ifun][
-                        2*idev+odd][self.overlap:, ...],
-                self.inp[
-                    ifun][
-                        2*idev+odd][-1][self.overlap:, ...]
-                ).get()
-        return (rhs, lhs)
-
-    def _calcnormforward(self, rhs, lhs, idev, ifun, odd=0):
-        if self.lhs[ifun] is False:
-            rhs += self.normkrnldiff[4*idev+odd](
-                self.outp[
-                    ifun][
-                        2*idev+odd][:self.slices, ...] ,
-                self.inp[
-                    ifun][
-                        2*idev+odd][0][:self.slices, ...]
-                ).get()
-        else:
-            lhs += self.normkrnldiff[4*idev+odd](
-                self.outp[
-                    ifun][
-                        2*idev+odd][:self.slices, ...],
-                self.inp[
-                    ifun][
-                        2*idev+odd][-1][:self.slices, ...]
-                ).get()
-        return (rhs, lhs)
+            inp = self.inp[ifun][2*idev+odd][-1]
+            norms = lhs
+        norm, event = self.normkrnldiff[4*idev+odd](
+            outp[block, ...],
+            inp[block, ...],
+            queue=self.queue[4*idev+odd],
+            return_event=True)
+        norms.append(norm)
+        outp.events.append(event)
+        inp.events.append(event)
@@ -1,13 +1,82 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """Module holding the classes for different FFT operators."""
+import hashlib
 import numpy as np
 import pyopencl as cl
 import pyopencl.array as clarray
+import scipy.sparse as sp
 from gpyfft.fft import FFT
 from pkg_resources import resource_filename
 from pyqmri._helper_fun._calckbkernel import calckbkernel
+from pyqmri._helper_fun._mask import compact_mask
 from pyqmri._helper_fun import CLProgram as Program
+from pyqmri._helper_fun._profiler import PROFILER
+from pyqmri._helper_fun._mempool import device_pool
+from pyqmri._helper_fun._memplan import csr_footprint
+
+
+_MAX_FFT_PLANS = 8
+_MAX_CSR_MATRICES = 2
+
+
+def fftPlan(ctx, queue, array, axes):
+    """Get an in-place gpyfft plan for the layout of the given array.
+
+    Plans are cached in the memory pool of the context, see
+    pyqmri._helper_fun._mempool.device_pool. NUFFT objects with identical
+    shapes, strides, precision, and FFT axes on the same queue share one
+    plan, as the plan is only bound to the array layout and applied to the
+    arrays passed to enqueue_arrays. At most _MAX_FFT_PLANS plans are kept
+    per context and all are released together with the last object
+    allocating from the pool.
+
+    Parameters
+    ----------
+      ctx : PyOpenCL.Context
+        The context of the FFT.
+      queue : PyOpenCL.Queue
+        The queue the FFT is enqueued in.
+      array : PyOpenCL.Array
+        A template array with the layout of the transformed data. The plan
+        does not keep a reference to it.
+      axes : tuple of int
+        The FFT axes.
+
+    Returns
+    -------
+      gpyfft.fft.FFT
+        The FFT plan.
+    """
+    plans = device_pool(queue).fft_plans
+    # The plan holds the queue, thus its pointer is not reused while the
+    # plan is cached.
+    key = (queue.int_ptr, array.shape, array.strides, array.dtype.str,
+           tuple(axes))
+    if key in plans:
+        plans.move_to_end(key)
+    else:
+        plan = FFT(ctx, queue, array, out_array=array, axes=axes)
+        # Only enqueue_arrays is used, the template is not needed.
+        plan.data = None
+        plan.result = None
+        plans[key] = plan
+        if len(plans) > _MAX_FFT_PLANS:
+            plans.popitem(last=False)
+    if PROFILER.enabled:
+        return _ProfiledFFT(plans[key])
+    return plans[key]
+
+
+class _ProfiledFFT():
+    def __init__(self, fft):
+        self._fft = fft
+
+    def enqueue_arrays(self, *args, **kwargs):
+        events = self._fft.enqueue_arrays(*args, **kwargs)
+        for event in events:
+            PROFILER.record("clFFT", event)
+        return events
 
 
 class PyOpenCLnuFFT():
@@ -44,6 +113,13 @@ class PyOpenCLnuFFT():
         The PyOpenCL Program Object containing the compiled kernels.
       fft_dim : tuple of int
         The dimensions to take the fft over
+      NScan : int
+        Number of scans processed in one call.
+      NC : int
+        Number of coils processed in one call.
+      toeplitz : bool
+        True if the normal operator is applied as a Toeplitz embedded
+        convolution.
     """
 
     def __init__(self, ctx, queue, fft_dim, DTYPE, DTYPE_real):
@@ -51,8 +127,336 @@ class PyOpenCLnuFFT():
         self.DTYPE_real = DTYPE_real
         self.ctx = ctx
         self.queue = queue
+        self._pool = device_pool(queue)
         self.prg = None
         self.fft_dim = fft_dim
+        self.NScan = 1
+        self.NC = 1
+        self.toeplitz = False
+
+    def normal(self, sg_out, sg, wait_for=None, scan_offset=0):
+        """Apply the normal operator FFTH(FFT(sg)) in image space.
+
+        For a fixed non-Cartesian trajectory, the normal operator is a
+        convolution with the point spread function of each scan. It is
+        applied as a multiplication in the Fourier domain of the image
+        zero-padded to twice its size, without any gridding. The kernels
+        are computed once per scan on first use and kept by this object.
+        In 2D the kernel is the exact sum over all samples, weighted by the
+        density compensation and interpolation scaling of the NUFFT. In 3D
+        it is approximated by gridding on twice the grid size.
+
+        Parameters
+        ----------
+          sg_out : PyOpenCL.Array
+            The complex image data which is the result of the computation.
+            Can be the same array as sg.
+          sg : PyOpenCL.Array
+            The complex image data.
+          wait_for : list of PyopenCL.Event, None
+            A List of PyOpenCL events to wait for.
+          scan_offset : int, 0
+            Offset compared to the first acquired scan.
+
+        Returns
+        -------
+          PyOpenCL.Event: A PyOpenCL event to wait for.
+
+        Raises
+        ------
+          NotImplementedError
+            If the Toeplitz mode is not enabled for this FFT object.
+        """
+        if not self.toeplitz:
+            raise NotImplementedError(
+                "The Toeplitz normal operator is only available for "
+                "non-streamed radial NUFFTs created with par[\"toeplitz\"].")
+        if wait_for is None:
+            wait_for = []
+        NScan = sg.shape[0]
+        if len(self.fft_dim) == 3:
+            NZ = sg.shape[2]
+            nbatch = sg.shape[1]
+        else:
+            NZ = 1
+            nbatch = sg.shape[1] * sg.shape[2]
+        psf = self._toeplitzKernel(scan_offset, NScan)
+        shape = self._toeplitz_shape
+        NZp = shape[0] if len(shape) == 3 else 1
+        tmp = self._toeplitzBuffer((NScan * nbatch,) + shape)
+
+        tmp.add_event(
+            self.prg.toeplitz_pad(
+                self.queue,
+                (NScan * nbatch * NZp, shape[-2], shape[-1]),
+                None,
+                tmp.data,
+                sg.data,
+                np.int32(NZ),
+                np.int32(sg.shape[-2]),
+                np.int32(sg.shape[-1]),
+                np.int32(NZp),
+                wait_for=wait_for + sg.events + tmp.events))
+        self._toeplitzFFT(tmp, nbatch, forward=True)
+        tmp.add_event(
+            self.prg.toeplitz_mult(
+                self.queue,
+                (NScan * nbatch, int(np.prod(shape))),
+                None,
+                tmp.data,
+                psf.data,
+                np.int32(nbatch),
+                np.int32(scan_offset),
+                wait_for=tmp.events + psf.events))
+        self._toeplitzFFT(tmp, nbatch, forward=False)
+        return self.prg.toeplitz_crop(
+            self.queue,
+            (NScan * nbatch * NZ, sg.shape[-2], sg.shape[-1]),
+            None,
+            sg_out.data,
+            tmp.data,
+            np.int32(NZ),
+            np.int32(NZp),
+            np.int32(shape[-2]),
+            np.int32(shape[-1]),
+            wait_for=wait_for + sg_out.events + tmp.events)
+
+    def _setupToeplitz(self, par, kwidth, klength, streamed):
+        if "toeplitz" not in par.keys() or not par["toeplitz"]:
+            return
+        if streamed:
+            print("The Toeplitz normal operator is not available in "
+                  "streamed mode. Falling back to gridding.")
+            return
+        self.toeplitz = True
+        self._toeplitz_par = {
+            key: par[key] for key in (
+                "fft_dim", "ogf", "NSlice", "dimY", "dimX", "N",
+                "use_GPU", "dcf", "traj")}
+        if len(self.fft_dim) == 3:
+            image_shape = (par["NSlice"], par["dimY"], par["dimX"])
+        else:
+            image_shape = (par["dimY"], par["dimX"])
+        self._toeplitz_shape = tuple(2 * dim for dim in image_shape)
+        self._toeplitz_kwargs = {"kwidth": kwidth, "klength": klength}
+        self._tmp_toeplitz = None
+        self._toeplitz_fft = None
+        # The kernel of each scan is computed on first use and freed
+        # together with this object.
+        self._toeplitz_psf = None
+        self._toeplitz_computed = np.zeros(par["traj"].shape[0], dtype=bool)
+
+    def _toeplitzKernel(self, scan_offset, NScan):
+        if self._toeplitz_psf is None:
+            self._toeplitz_psf = clarray.zeros(
+                self.queue,
+                (self._toeplitz_computed.size,
+                 int(np.prod(self._toeplitz_shape))),
+                dtype=self.DTYPE_real)
+        psf = self._toeplitz_psf
+        computed = self._toeplitz_computed
+        for scan in range(scan_offset, scan_offset + NScan):
+            if not computed[scan]:
+                psf[scan].set(self._pointSpreadFunction(scan).ravel())
+                computed[scan] = True
+        return psf
+
+    def _pointSpreadFunction(self, scan):
+        if len(self.fft_dim) == 3:
+            psf = self._griddedPointSpreadFunction(scan)
+        else:
+            psf = self._exactPointSpreadFunction(scan)
+        # The shift of half the padded size is not needed to compute the
+        # image and is zeroed to keep the kernel Hermitian.
+        for axis, dim in enumerate(psf.shape):
+            psf[(slice(None),)*axis + (dim // 2,)] = 0
+        return np.fft.fftn(psf).real.astype(self.DTYPE_real)
+
+    def _exactPointSpreadFunction(self, scan, chunksize=4096):
+        # The NUFFT of a centered delta yields the weight of each sample,
+        # i.e. the density compensation and the interpolation scaling.
+        # With these weights the PSF is a separable sum over all samples
+        # which is evaluated exactly and keeps the normal operator
+        # positive semidefinite.
+        par = self._toeplitz_par
+        delta = np.zeros((1, 1, 1, par["dimY"], par["dimX"]),
+                         dtype=self.DTYPE)
+        delta[0, 0, 0, par["dimY"] // 2, par["dimX"] // 2] = 1
+        delta = clarray.to_device(self.queue, delta)
+        ksp = clarray.zeros(
+            self.queue, (1, 1, 1) + par["traj"].shape[1:3], dtype=self.DTYPE)
+        ksp.add_event(self.FFT(ksp, delta, scan_offset=scan))
+        weights = np.abs(ksp.get().ravel())**2
+        traj = par["traj"][scan].reshape(-1, 2)
+
+        shift_y = np.fft.fftfreq(2 * par["dimY"], 1 / (2 * par["dimY"]))
+        shift_x = np.fft.fftfreq(2 * par["dimX"], 1 / (2 * par["dimX"]))
+        psf = np.zeros(self._toeplitz_shape, dtype=np.complex128)
+        for j in range(0, weights.size, chunksize):
+            phase_y = np.exp(2j * np.pi / self._gridsize * np.outer(
+                shift_y, traj[j:j+chunksize, 1]))
+            phase_x = np.exp(2j * np.pi / self._gridsize * np.outer(
+                shift_x, traj[j:j+chunksize, 0]))
+            psf += (phase_y * weights[j:j+chunksize]) @ phase_x.T
+        return psf
+
+    def _griddedPointSpreadFunction(self, scan):
+        # The PSF over all shifts between two image pixels is the normal
+        # operator applied to a centered delta on twice the image size.
+        # The exact sum over all samples is too expensive in 3D.
+        par = dict(self._toeplitz_par)
+        par["NScan"] = 1
+        par["NC"] = 1
+        par["N"] = 2 * par["N"]
+        par["dimY"] = 2 * par["dimY"]
+        par["dimX"] = 2 * par["dimX"]
+        par["NSlice"] = 2 * par["NSlice"]
+        par["traj"] = 2 * par["traj"][scan:scan+1]
+        # The 3D gridding expects as many samples per spoke as grid
+        # points. Added samples have zero weight.
+        pad = int(round(par["dimX"]*self.ogf)) - par["traj"].shape[2]
+        par["traj"] = np.require(
+            np.pad(par["traj"], ((0, 0), (0, 0), (0, pad), (0, 0))),
+            requirements='C')
+        par["dcf"] = np.require(
+            np.pad(par["dcf"], ((0, 0), (0, pad))), requirements='C')
+        nufft = type(self)(
+            self.ctx, self.queue, par, DTYPE=self.DTYPE,
+            DTYPE_real=self.DTYPE_real, **self._toeplitz_kwargs)
+        nufft.prg = self.prg
+
+        delta = np.zeros(
+            (1, 1, par["NSlice"], par["dimY"], par["dimX"]),
+            dtype=self.DTYPE)
+        delta[(0, 0) + tuple(dim // 2 for dim in delta.shape[2:])] = 1
+        delta = clarray.to_device(self.queue, delta)
+        ksp = clarray.zeros(
+            self.queue, (1, 1, 1) + par["traj"].shape[1:3], dtype=self.DTYPE)
+        ksp.add_event(nufft.FFT(ksp, delta))
+        delta.add_event(nufft.FFTH(delta, ksp))
+        # Both FFT directions of the NUFFT are scaled by the grid size.
+        psf = (delta.get()[0, 0].reshape(self._toeplitz_shape)
+               * (nufft.fft_scale / self.fft_scale)**2)
+        del nufft
+        return np.fft.ifftshift(psf)
+
+    def _toeplitzBuffer(self, shape):
+        if self._tmp_toeplitz is None or self._tmp_toeplitz.shape != shape:
+            self._tmp_toeplitz = clarray.zeros(
+                self.queue, shape, dtype=self.DTYPE, allocator=self._pool)
+            self._toeplitz_fft = None
+        return self._tmp_toeplitz
+
+    def _toeplitzFFT(self, tmp, nbatch, forward):
+        if self.iternumber > 1:
+            par_fft = nbatch
+        else:
+            par_fft = tmp.shape[0]
+        if self._toeplitz_fft is None:
+            self._toeplitz_fft = fftPlan(
+                self.ctx, self.queue, tmp[0:par_fft, ...], self.fft_dim)
+        cl.wait_for_events(tmp.events)
+        fft_events = []
+        for j in range(tmp.shape[0] // par_fft):
+            fft_events.append(self._toeplitz_fft.enqueue_arrays(
+                data=tmp[j * par_fft:(j + 1) * par_fft, ...],
+                result=tmp[j * par_fft:(j + 1) * par_fft, ...],
+                forward=forward)[0])
+        tmp.add_event(cl.enqueue_marker(self.queue, wait_for=fft_events))
+
+    def FFTH_coil_combined(self, s, coils):
+        """Perform the adjoint FFT and coil combination of a full k-space.
+
+        The k-space is streamed to the device in blocks of NScan scans, the
+        number of scans the object was created for. The upload of the next
+        block is enqueued before the current block is processed to overlap
+        transfer and computation. The coil combination with the complex
+        conjugate coil sensitivities is carried out on the device, thus only
+        the combined images are transferred back to the host.
+
+        Parameters
+        ----------
+          s : numpy.array
+            The complex k-space data of all scans and coils.
+          coils : numpy.array
+            The complex coil sensitivities.
+
+        Returns
+        -------
+          numpy.array
+            The coil combined complex images of all scans.
+        """
+        nscan = s.shape[0]
+        if nscan < self.NScan:
+            raise ValueError(
+                "The k-space needs to contain at least %i scans." % self.NScan)
+        img_shape = coils.shape[1:]
+        result = np.zeros((nscan, *img_shape), dtype=self.DTYPE)
+
+        # The last block is shifted to end at the last scan, thus all blocks
+        # have the same size.
+        offsets = list(range(0, nscan - self.NScan + 1, self.NScan))
+        if offsets[-1] + self.NScan < nscan:
+            offsets.append(nscan - self.NScan)
+
+        coils = clarray.to_device(
+            self.queue, np.require(coils, self.DTYPE, requirements='C'))
+        ksp = [clarray.empty(
+            self.queue, (self.NScan, *s.shape[1:]), dtype=self.DTYPE)
+               for _ in range(2)]
+        img = clarray.empty(
+            self.queue, (self.NScan, self.NC, *img_shape), dtype=self.DTYPE)
+        comb = [clarray.empty(
+            self.queue, (self.NScan, *img_shape), dtype=self.DTYPE)
+                for _ in range(2)]
+
+        def upload(block):
+            buf = ksp[block % 2]
+            buf.add_event(
+                cl.enqueue_copy(
+                    self.queue, buf.data,
+                    np.require(
+                        s[offsets[block]:offsets[block]+self.NScan],
+                        self.DTYPE, requirements='C'),
+                    wait_for=buf.events,
+                    is_blocking=False))
+
+        upload(0)
+        downloads = []
+        for block, offset in enumerate(offsets):
+            if block + 1 < len(offsets):
+                upload(block + 1)
+            ksp_cur = ksp[block % 2]
+            comb_cur = comb[block % 2]
+            # The previous block is still read from the temporary arrays
+            # of the FFT and the coil images until these events finished.
+            evt = self.FFTH(img, ksp_cur, scan_offset=offset,
+                            wait_for=img.events)
+            img.add_event(evt)
+            ksp_cur.add_event(evt)
+            evt = self.prg.coil_combine_adj(
+                self.queue,
+                (self.NScan, int(np.prod(img_shape))),
+                None,
+                comb_cur.data,
+                img.data,
+                coils.data,
+                np.int32(self.NC),
+                wait_for=img.events + comb_cur.events)
+            img.add_event(evt)
+            comb_cur.add_event(evt)
+            host_buf = np.empty(comb_cur.shape, dtype=self.DTYPE)
+            evt = cl.enqueue_copy(
+                self.queue, host_buf, comb_cur.data,
+                wait_for=comb_cur.events,
+                is_blocking=False)
+            comb_cur.add_event(evt)
+            downloads.append((offset, host_buf, evt))
+
+        for offset, host_buf, evt in downloads:
+            evt.wait()
+            result[offset:offset+self.NScan] = host_buf
+        return result
 
     @staticmethod
     def create(ctx,
@@ -292,7 +696,11 @@ class PyOpenCLRadialNUFFT(PyOpenCLnuFFT):
             DTYPE=np.complex64,
             DTYPE_real=np.float32,
             streamed=False):
+        # Read in __del__, thus set before anything can fail.
+        self._use_csr = False
         super().__init__(ctx, queue, par["fft_dim"], DTYPE, DTYPE_real)
+        self.NScan = par["NScan"]
+        self.NC = par["NC"]
         
         self.ogf = par["ogf"]
         
@@ -329,22 +737,16 @@ class PyOpenCLRadialNUFFT(PyOpenCLnuFFT):
             hostbuf=deapo.data)
         self.dcf = clarray.to_device(self.queue, par["dcf"])
         self.traj = clarray.to_device(self.queue, par["traj"])
-        self._tmp_fft_array = (
-            clarray.zeros(
-                self.queue,
-                (self.fft_shape),
-                dtype=DTYPE))
+        self._tmp_fft_array = clarray.zeros(
+            self.queue, self.fft_shape, dtype=DTYPE, allocator=self._pool)
         if par["use_GPU"]:
             self.par_fft = int(
                 self.fft_shape[0] / par["NScan"])
         else:
             self.par_fft = self.fft_shape[0]
         self.iternumber = int(self.fft_shape[0]/self.par_fft)
-        self.fft = FFT(ctx, queue, self._tmp_fft_array[
-            0:self.par_fft, ...],
-                       out_array=self._tmp_fft_array[
-                           0:self.par_fft, ...],
-                       axes=self.fft_dim)
+        self.fft = fftPlan(ctx, queue, self._tmp_fft_array[
+            0:self.par_fft, ...], self.fft_dim)
 
         self._kernelpoints = kerneltable.size
         self._kwidth = kwidth / 2
@@ -353,6 +755,15 @@ class PyOpenCLRadialNUFFT(PyOpenCLnuFFT):
         self._check = clarray.to_device(self.queue, self._check)
         self._gridsize = self.fft_shape[-1]
 
+        self._setupToeplitz(par, kwidth, klength, streamed)
+
+        if "csr_gridding" in par.keys() and par["csr_gridding"]:
+            if streamed:
+                print("CSR gridding is not available in streamed mode. "
+                      "Falling back to LUT gridding.")
+            else:
+                self._use_csr = self._setupCSR(par, kerneltable)
+
     def __del__(self):
         """Explicitly delete OpenCL Objets."""
         del self.traj
@@ -361,11 +772,69 @@ class PyOpenCLRadialNUFFT(PyOpenCLnuFFT):
         del self.cl_kerneltable
         del self.cl_deapo
         del self._check
+        if self._use_csr:
+            del self._csr_fwd
+            del self._csr_adj
         del self.queue
         del self.ctx
         del self.prg
         del self.fft
 
+    def estimateCSRMemory(self, par):
+        """Estimate the device memory of the sparse gridding matrices.
+
+        See pyqmri._helper_fun._memplan.csr_footprint.
+
+        Parameters
+        ----------
+          par : dict
+            A python dict containing the trajectory (traj).
+
+        Returns
+        -------
+          tuple of ints
+            The estimated number of non-zeros and bytes of both matrices.
+        """
+        return csr_footprint(
+            int(np.prod(par["traj"].shape[:-1])), par["traj"].shape[0],
+            self._gridsize, self.DTYPE_real, self._kwidth)
+
+    def _setupCSR(self, par, kerneltable, mem_fraction=0.25):
+        # NUFFTs of the same trajectory on a context share the matrices.
+        key = tuple(
+            hashlib.sha1(np.ascontiguousarray(arr)).hexdigest()
+            for arr in (par["traj"], par["dcf"], kerneltable)) + (
+                self._kwidth, self._gridsize, np.dtype(self.DTYPE_real).str)
+        matrices = self._pool.csr_matrices
+        if key in matrices:
+            matrices.move_to_end(key)
+            self._csr_fwd, self._csr_adj = matrices[key]
+            return True
+
+        nnz, nbytes = self.estimateCSRMemory(par)
+        device = self.queue.device
+        print("Estimated memory of the CSR gridding matrices: %.1f MB"
+              % (nbytes / 1024**2))
+        if (nbytes > mem_fraction * device.global_mem_size
+                or nnz * np.dtype(self.DTYPE_real).itemsize
+                > device.max_mem_alloc_size
+                or nnz >= np.iinfo(np.int32).max):
+            print("CSR gridding matrices do not fit on the device. "
+                  "Falling back to LUT gridding.")
+            return False
+
+        fwd, adj = _gridding_matrix(
+            par["traj"], par["dcf"], kerneltable,
+            self._kwidth, self._gridsize, self.DTYPE_real)
+        self._csr_fwd = tuple(
+            clarray.to_device(self.queue, arr) for arr in fwd)
+        self._csr_adj = tuple(
+            clarray.to_device(self.queue, arr) for arr in adj)
+        matrices[key] = (self._csr_fwd, self._csr_adj)
+        if len(matrices) > _MAX_CSR_MATRICES:
+            matrices.popitem(last=False)
+        return True
+
     def FFTH(self, sg, s, wait_for=None, scan_offset=0):
         """Perform the inverse (adjoint) NUFFT operation.
 
@@ -386,34 +855,52 @@ class PyOpenCLRadialNUFFT(PyOpenCLnuFFT):
         """
         if wait_for is None:
             wait_for = []
-        # Zero tmp arrays
-        self._tmp_fft_array.add_event(
-            self.prg.zero_tmp(
-                self.queue,
-                (self._tmp_fft_array.size,
-                 ),
-                None,
-                self._tmp_fft_array.data,
-                wait_for=self._tmp_fft_array.events))
-        # Grid k-space
-        self._tmp_fft_array.add_event(
-            self.prg.grid_lut(
-                self.queue,
-                (s.shape[0], s.shape[1] * s.shape[2],
-                 s.shape[-2] * s.shape[-1]),
-                None,
-                self._tmp_fft_array.data,
-                s.data,
-                self.traj.data,
-                np.int32(self._gridsize),
-                np.int32(sg.shape[2]),
-                self.DTYPE_real(self._kwidth),
-                self.dcf.data,
-                self.cl_kerneltable,
-                np.int32(self._kernelpoints),
-                np.int32(scan_offset),
-                wait_for=(wait_for + 
-                          s.events + self._tmp_fft_array.events)))
+        if self._use_csr:
+            # Grid k-space, every grid point is written by the gather
+            self._tmp_fft_array.add_event(
+                self.prg.grid_csr(
+                    self.queue,
+                    (s.shape[0], s.shape[1] * s.shape[2],
+                     self._gridsize**2),
+                    None,
+                    self._tmp_fft_array.data,
+                    s.data,
+                    self._csr_adj[0].data,
+                    self._csr_adj[1].data,
+                    self._csr_adj[2].data,
+                    np.int32(s.shape[-2] * s.shape[-1]),
+                    np.int32(scan_offset),
+                    wait_for=(wait_for +
+                              s.events + self._tmp_fft_array.events)))
+        else:
+            # Zero tmp arrays
+            self._tmp_fft_array.add_event(
+                self.prg.zero_tmp(
+                    self.queue,
+                    (self._tmp_fft_array.size,
+                     ),
+                    None,
+                    self._tmp_fft_array.data,
+                    wait_for=self._tmp_fft_array.events))
+            # Grid k-space
+            self._tmp_fft_array.add_event(
+                self.prg.grid_lut(
+                    self.queue,
+                    (s.shape[0], s.shape[1] * s.shape[2],
+                     s.shape[-2] * s.shape[-1]),
+                    None,
+                    self._tmp_fft_array.data,
+                    s.data,
+                    self.traj.data,
+                    np.int32(self._gridsize),
+                    np.int32(sg.shape[2]),
+                    self.DTYPE_real(self._kwidth),
+                    self.dcf.data,
+                    self.cl_kerneltable,
+                    np.int32(self._kernelpoints),
+                    np.int32(scan_offset),
+                    wait_for=(wait_for +
+                              s.events + self._tmp_fft_array.events)))
         # FFT
         self._tmp_fft_array.add_event(
             self.prg.fftshift(
@@ -535,6 +1022,20 @@ class PyOpenCLRadialNUFFT(PyOpenCLnuFFT):
                 self._check.data,
                 wait_for=fft_events))
         # Resample on Spoke
+        if self._use_csr:
+            return self.prg.invgrid_csr(
+                self.queue,
+                (s.shape[0], s.shape[1] * s.shape[2], s.shape[-2] *
+                 s.shape[-1]),
+                None,
+                s.data,
+                self._tmp_fft_array.data,
+                self._csr_fwd[0].data,
+                self._csr_fwd[1].data,
+                self._csr_fwd[2].data,
+                np.int32(self._gridsize),
+                np.int32(scan_offset),
+                wait_for=s.events + wait_for + self._tmp_fft_array.events)
         return self.prg.invgrid_lut(
             self.queue,
             (s.shape[0], s.shape[1] * s.shape[2], s.shape[-2] *
@@ -626,6 +1127,8 @@ class PyOpenCL3DRadialNUFFT(PyOpenCLnuFFT):
             DTYPE_real=np.float32,
             streamed=False):
         super().__init__(ctx, queue, par["fft_dim"], DTYPE, DTYPE_real)
+        self.NScan = par["NScan"]
+        self.NC = par["NC"]
         
         # self.ogf = par["N"]/par["dimX"]     
         self.ogf = par["ogf"]
@@ -655,22 +1158,16 @@ class PyOpenCL3DRadialNUFFT(PyOpenCLnuFFT):
             hostbuf=deapo.data)
         self.dcf = clarray.to_device(self.queue, par["dcf"])
         self.traj = clarray.to_device(self.queue, par["traj"])
-        self._tmp_fft_array = (
-            clarray.zeros(
-                self.queue,
-                (self.fft_shape),
-                dtype=DTYPE))
+        self._tmp_fft_array = clarray.zeros(
+            self.queue, self.fft_shape, dtype=DTYPE, allocator=self._pool)
         if par["use_GPU"]:
             self.par_fft = int(
                 self.fft_shape[0] / par["NScan"])
         else:
             self.par_fft = self.fft_shape[0]
         self.iternumber = int(self.fft_shape[0]/self.par_fft)
-        self.fft = FFT(ctx, queue, self._tmp_fft_array[
-            0:self.par_fft, ...],
-                       out_array=self._tmp_fft_array[
-                           0:self.par_fft, ...],
-                       axes=self.fft_dim)
+        self.fft = fftPlan(ctx, queue, self._tmp_fft_array[
+            0:self.par_fft, ...], self.fft_dim)
 
         self._kernelpoints = kerneltable.size
         self._kwidth = kwidth / 2
@@ -678,6 +1175,7 @@ class PyOpenCL3DRadialNUFFT(PyOpenCLnuFFT):
         self._check[1::2] = -1
         self._check = clarray.to_device(self.queue, self._check)
         self._gridsize = self.fft_shape[-1]
+        self._setupToeplitz(par, kwidth, klength, streamed)
 
     def __del__(self):
         """Explicitly delete OpenCL Objets."""
@@ -921,7 +1419,10 @@ class PyOpenCLCartNUFFT(PyOpenCLnuFFT):
         is created only once an reused in each iterations, iterationg over
         all scans to keep the memory footprint low.
       mask : PyOpenCL.Array
-        The undersampling mask for the Cartesian grid.
+        The compact undersampling mask for the Cartesian grid
+        (scans, slices, dimY, dimX), see
+        pyqmri._helper_fun._mask.compact_mask. Unsampled points are not
+        read from the k-space.
       prg : PyOpenCL.Program
         The PyOpenCL.Program object containing the necessary kernels to
         execute the linear Operator. This will be determined by the
@@ -937,6 +1438,8 @@ class PyOpenCLCartNUFFT(PyOpenCLnuFFT):
             DTYPE_real=np.float32,
             streamed=False):
         super().__init__(ctx, queue, par["fft_dim"], DTYPE, DTYPE_real)
+        self.NScan = par["NScan"]
+        self.NC = par["NC"]
         if streamed:
             self.fft_shape = (
                 par["NScan"] *
@@ -963,23 +1466,18 @@ class PyOpenCLCartNUFFT(PyOpenCLnuFFT):
         if par["fft_dim"] is not None:
             self.fft_scale = DTYPE_real(
                 np.sqrt(np.prod(self.fft_shape[self.fft_dim[0]:])))
-            self._tmp_fft_array = (
-                clarray.zeros(
-                    self.queue,
-                    self.fft_shape,
-                    dtype=DTYPE))
+            self._tmp_fft_array = clarray.zeros(
+                self.queue, self.fft_shape, dtype=DTYPE,
+                allocator=self._pool)
             if par["use_GPU"]:
                 self.par_fft = int(
                     self.fft_shape[0] / par["NScan"])
             else:
                 self.par_fft = self.fft_shape[0]
             self.iternumber = int(self.fft_shape[0]/self.par_fft)
-            self.mask = clarray.to_device(self.queue, par["mask"])
-            self.fft = FFT(ctx, queue, self._tmp_fft_array[
-                0:self.par_fft, ...],
-                           out_array=self._tmp_fft_array[
-                               0:self.par_fft, ...],
-                           axes=self.fft_dim)
+            self._setupMask(par, streamed)
+            self.fft = fftPlan(ctx, queue, self._tmp_fft_array[
+                0:self.par_fft, ...], self.fft_dim)
 
     def __del__(self):
         """Explicitly delete OpenCL Objets."""
@@ -1020,7 +1518,7 @@ class PyOpenCLCartNUFFT(PyOpenCLnuFFT):
                     None,
                     self._tmp_fft_array.data,
                     s.data,
-                    self.mask.data,
+                    *self._maskArgs(scan_offset),
                     wait_for=s.events+self._tmp_fft_array.events+wait_for))
             cl.wait_for_events(self._tmp_fft_array.events)
             fft_events = []
@@ -1104,7 +1602,7 @@ class PyOpenCLCartNUFFT(PyOpenCLnuFFT):
                     None,
                     s.data,
                     self._tmp_fft_array.data,
-                    self.mask.data,
+                    *self._maskArgs(scan_offset),
                     wait_for=s.events+fft_events))
 
         return self.prg.copy(
@@ -1117,6 +1615,34 @@ class PyOpenCLCartNUFFT(PyOpenCLnuFFT):
                     self.DTYPE_real(1),
                     wait_for=s.events+sg.events+wait_for)
 
+    def _setupMask(self, par, streamed):
+        # The compact mask is broadcast over coils and, if its pattern is
+        # shared, over scans and slices.
+        mask = compact_mask(par["mask"])
+        if streamed:
+            # Slices are streamed in blocks with the scans and coils of
+            # each slice next to each other. The blocks do not know their
+            # slice offset, thus all slices need to share the mask.
+            if mask.shape[1] > 1:
+                raise ValueError(
+                    "Streamed Cartesian reconstructions need a sampling "
+                    "pattern shared by all slices.")
+            self._scan_stride = self.NC * par["dimY"] * par["dimX"]
+        else:
+            self._scan_stride = int(np.prod(self.fft_shape)) // self.NScan
+        self._mask_scans = mask.shape[0]
+        self._mask_len = int(np.prod(mask.shape[1:]))
+        self.mask = clarray.to_device(
+            self.queue, np.require(mask, self.DTYPE_real, 'C'))
+
+    def _maskArgs(self, scan_offset):
+        return (self.mask.data,
+                np.int32(self._scan_stride),
+                np.int32(self.NScan),
+                np.int32(self._mask_scans),
+                np.int32(self._mask_len),
+                np.int32(scan_offset))
+
 
 class PyOpenCLSMSNUFFT(PyOpenCLnuFFT):
     """Cartesian FFT-SMS object.
@@ -1178,6 +1704,8 @@ class PyOpenCLSMSNUFFT(PyOpenCLnuFFT):
             DTYPE_real=np.float32,
             streamed=False):
         super().__init__(ctx, queue, par["fft_dim"], DTYPE, DTYPE_real)
+        self.NScan = par["NScan"]
+        self.NC = par["NC"]
         
         if streamed:
             self.fft_shape = (
@@ -1201,23 +1729,21 @@ class PyOpenCLSMSNUFFT(PyOpenCLnuFFT):
         if par["fft_dim"] is not None:
             self.fft_scale = DTYPE_real(
                 np.sqrt(np.prod(self.fft_shape[self.fft_dim[0]:])))
-            self._tmp_fft_array = (
-                clarray.zeros(
-                    self.queue,
-                    self.fft_shape,
-                    dtype=DTYPE))
+            self._tmp_fft_array = clarray.zeros(
+                self.queue, self.fft_shape, dtype=DTYPE,
+                allocator=self._pool)
             if par["use_GPU"] and not streamed:
                 self.par_fft = int(
                     self.fft_shape[0] / par["NScan"])
             else:
                 self.par_fft = self.fft_shape[0]
             self.iternumber = int(self.fft_shape[0]/self.par_fft)
-            self.mask = clarray.to_device(self.queue, par["mask"])
-            self.fft = FFT(ctx, queue, self._tmp_fft_array[
-                0:self.par_fft, ...],
-                           out_array=self._tmp_fft_array[
-                               0:self.par_fft, ...],
-                           axes=self.fft_dim)
+            # The SMS kernels use the pattern of the first scan and slice.
+            self.mask = clarray.to_device(
+                self.queue,
+                np.require(compact_mask(par["mask"]), DTYPE_real, 'C'))
+            self.fft = fftPlan(ctx, queue, self._tmp_fft_array[
+                0:self.par_fft, ...], self.fft_dim)
 
     def __del__(self):
         """Explicitly delete OpenCL Objets."""
@@ -1369,3 +1895,102 @@ class PyOpenCLSMSNUFFT(PyOpenCLnuFFT):
                 self.DTYPE_real(1),
                 np.int32(sg.shape[2]/self.packs/self.MB),
                 wait_for=s.events+sg.events+wait_for))
+
+
+def _gridding_matrix(traj, dcf, kerneltable, kwidth, gridsize, DTYPE_real):
+    """Precompute the radial gridding interpolation as sparse matrices.
+
+    Evaluates the same kernel lookup, density compensation and wrap-around
+    as the grid_lut/invgrid_lut kernels, but once on the host. The forward
+    matrix maps grid points to k-space samples with rows ordered as
+    (scan, sample), its transpose maps k-space samples to grid points with
+    rows ordered as (scan, grid point). Each is returned as the CSR triplet
+    (row pointer, column indices, values).
+
+    Parameters
+    ----------
+      traj : numpy.Array
+        The k-space trajectory of shape (NScan, Nproj, N, 2) in grid units.
+      dcf : numpy.Array
+        The density compensation of shape (Nproj, N), shared by all scans.
+      kerneltable : numpy.Array
+        The gridding kernel lookup table.
+      kwidth : float
+        The radius of the gridding kernel.
+      gridsize : int
+        The size of the (square) overgridded k-space.
+      DTYPE_real : numpy.dtype
+        The real precision type of the matrix values.
+
+    Returns
+    -------
+      tuple of tuples of numpy.Array
+        The forward and the transposed matrix as CSR triplets.
+    """
+    nscan = traj.shape[0]
+    kpos = traj.reshape(nscan, -1, 2).astype(DTYPE_real)
+    kdim = kpos.shape[1]
+    dcf = dcf.reshape(kdim)
+    kerneltable = kerneltable.astype(DTYPE_real)
+    nkernelpts = kerneltable.size
+    gridcenter = gridsize // 2
+    offsets = np.arange(int(2 * kwidth) + 3)
+
+    fwd = []
+    adj = []
+    for scan in range(nscan):
+        kx = kpos[scan, :, 0, None, None]
+        ky = kpos[scan, :, 1, None, None]
+        ixmin = np.trunc(kx - kwidth + gridcenter).astype(np.int64)
+        ixmax = np.trunc(kx + kwidth + gridcenter).astype(np.int64) + 1
+        iymin = np.trunc(ky - kwidth + gridcenter).astype(np.int64)
+        iymax = np.trunc(ky + kwidth + gridcenter).astype(np.int64) + 1
+        gcount1 = ixmin + offsets[None, :, None]
+        gcount2 = iymin + offsets[None, None, :]
+
+        dk = np.sqrt((gcount1 - gridcenter - kx)**2
+                     + (gcount2 - gridcenter - ky)**2)
+        valid = (gcount1 <= ixmax) & (gcount2 <= iymax) & (dk < kwidth)
+
+        fracind = dk / kwidth * (nkernelpts - 1)
+        kernelind = np.minimum(fracind.astype(np.int64), nkernelpts - 2)
+        fracdk = fracind - kernelind
+        kern = (kerneltable[kernelind] * (1 - fracdk)
+                + kerneltable[kernelind + 1] * fracdk)
+
+        indx = np.broadcast_to(gcount1, dk.shape).copy()
+        indy = np.broadcast_to(gcount2, dk.shape).copy()
+        gcount1 = np.broadcast_to(gcount1, dk.shape)
+        gcount2 = np.broadcast_to(gcount2, dk.shape)
+        wrap = gcount1 < 0
+        indx[wrap] += gridsize
+        indy[wrap] = gridsize - indy[wrap]
+        wrap = gcount1 >= gridsize
+        indx[wrap] -= gridsize
+        indy[wrap] = gridsize - indy[wrap]
+        wrap = gcount2 < 0
+        indy[wrap] += gridsize
+        indx[wrap] = gridsize - indx[wrap]
+        wrap = gcount2 >= gridsize
+        indy[wrap] -= gridsize
+        indx[wrap] = gridsize - indx[wrap]
+        valid &= ((indx >= 0) & (indx < gridsize)
+                  & (indy >= 0) & (indy < gridsize))
+
+        rows = np.broadcast_to(
+            np.arange(kdim)[:, None, None], dk.shape)[valid]
+        cols = (indx + indy * gridsize)[valid]
+        vals = (kern * dcf[:, None, None])[valid]
+        mat = sp.csr_matrix(
+            (vals.astype(DTYPE_real), (rows, cols)),
+            shape=(kdim, gridsize**2))
+        mat.sum_duplicates()
+        fwd.append(mat)
+        adj.append(mat.T.tocsr())
+
+    return tuple(
+        (mat.indptr.astype(np.int32),
+         mat.indices.astype(np.int32),
+         mat.data.astype(DTYPE_real))
+        for mat in (sp.vstack(fwd, format="csr"),
+                    sp.vstack(adj, format="csr")))
@@ -20,7 +20,7 @@ setup(name='pyqmri',
       exclude_package_data = {'': ['data*','output*']},
       packages=find_packages(exclude=("output*","data*")),
       setup_requires=["cython"],
-      python_requires ='>=3.6',
+      python_requires ='>=3.8',
       install_requires=[
         'cython',
         'pyopencl',
@@ -28,7 +28,6 @@ setup(name='pyqmri',
         'h5py',
         'mako',
         'matplotlib',
-        'ipyparallel',
         'pyfftw',
         'pyqt5',
         'numexpr',
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Performance benchmarks for operators, NUFFTs and solver iterations.
+
+Runs on the CPU OpenCL platform by default, using synthetic phantoms of
+configurable size. Results are reported as time per call and throughput
+in voxels/s (image space) and samples/s (k-space).
+
+Timings depend on the machine and OpenCL platform, thus no reference
+results are shipped. To check a change for regressions, store the results
+of the unchanged tree and compare against them on the same machine:
+
+    python benchmark.py --save base.json
+    python benchmark.py --compare base.json
+"""
+import sys
+import json
+import time
+import types
+import argparse
+import platform
+import subprocess
+
+import numpy as np
+import pyopencl.array as clarray
+from pkg_resources import resource_filename
+
+import pyqmri
+from pyqmri._helper_fun import CLProgram as Program
+from pyqmri._helper_fun import _goldcomp as goldcomp
+from pyqmri._helper_fun import _utils as utils
+from pyqmri.models.template import constraints
+from pyqmri.solver import PDBaseSolver
+
+
+class tmpArgs():
+    pass
+
+
+def _phantom(NSlice, dimY, dimX, DTYPE):
+    """Stack of ellipses with a smooth phase."""
+    z, y, x = np.meshgrid(np.linspace(-1, 1, NSlice),
+                          np.linspace(-1, 1, dimY),
+                          np.linspace(-1, 1, dimX),
+                          indexing='ij')
+    img = np.zeros((NSlice, dimY, dimX))
+    for (cx, cy, ax, ay, val) in ((0, 0, 0.7, 0.9, 1),
+                                  (0.2, 0.1, 0.2, 0.3, -0.4),
+                                  (-0.3, -0.2, 0.15, 0.25, 0.3)):
+        img[((x-cx)/ax)**2 + ((y-cy)/ay)**2 + z**2/1.5 <= 1] += val
+    return (img * np.exp(1j*np.pi*0.2*(x+y))).astype(DTYPE)
+
+
+def _coils(NC, NSlice, dimY, dimX, DTYPE):
+    """Gaussian coil profiles placed on a circle."""
+    y, x = np.meshgrid(np.linspace(-1, 1, dimY),
+                       np.linspace(-1, 1, dimX),
+                       indexing='ij')
+    coils = np.zeros((NC, NSlice, dimY, dimX), dtype=DTYPE)
+    for coil in range(NC):
+        phi = 2*np.pi*coil/NC
+        coils[coil] = np.exp(
+            -((x-np.cos(phi))**2 + (y-np.sin(phi))**2)
+            + 1j*phi)[None]
+    return coils / np.sqrt(np.sum(np.abs(coils)**2, 0))
+
+
+def setupPar(args, trafo=True, SMS=False, streamed=False):
+    """Create the parameter dict on the CPU platform."""
+    parser = tmpArgs()
+    parser.streamed = streamed
+    parser.devices = -1
+    parser.use_GPU = args.use_GPU
+
+    par = {}
+    pyqmri.pyqmri._setupOCL(parser, par)
+    args.device = par["queue"][0].device.name
+    par["DTYPE"] = args.DTYPE
+    par["DTYPE_real"] = args.DTYPE_real
+    par["NScan"] = args.scans
+    par["NC"] = args.coils
+    par["NSlice"] = args.slices
+    par["dimX"] = args.size
+    par["dimY"] = args.size
+    par["Nproj"] = args.size // 2
+    par["N"] = 2 * args.size
+    par["unknowns_TGV"] = 2
+    par["unknowns_H1"] = 0
+    par["unknowns"] = 2
+    par["dz"] = 1
+    par["weights"] = np.ones(2, dtype=args.DTYPE_real)
+    par["overlap"] = 1
+    par["par_slices"] = args.par_slices
+    par["is3D"] = False
+    par["fft_dim"] = (-2, -1)
+    par["packs"] = 1
+    par["MB"] = 1
+
+    if trafo:
+        angles = (np.arange(par["NScan"]*par["Nproj"]) * np.pi
+                  / ((1+np.sqrt(5))/2)).reshape(par["NScan"], par["Nproj"])
+        radius = np.arange(-par["N"]/2, par["N"]/2) / 2
+        par["traj"] = np.stack(
+            (radius*np.cos(angles)[..., None],
+             radius*np.sin(angles)[..., None]),
+            axis=-1).astype(args.DTYPE_real)
+        par["ogf"] = par["N"] / par["dimX"]
+        par["traj"] *= par["ogf"]
+        par["dcf"] = np.require(
+            np.abs(np.sqrt(np.array(goldcomp.cmp(par["traj"]),
+                                    dtype=args.DTYPE_real))),
+            args.DTYPE_real, requirements='C')
+    else:
+        par["Nproj"] = par["dimY"]
+        par["N"] = par["dimX"]
+        par["mask"] = np.ones((par["dimY"], par["dimX"]),
+                              dtype=args.DTYPE_real)
+    if SMS:
+        par["MB"] = 2
+        par["packs"] = par["NSlice"] // par["MB"]
+        par["shift"] = np.array(
+            [0, par["dimY"]//2]).astype(args.DTYPE_real)
+    return par
+
+
+def _programs(par, streamed=False):
+    name = 'kernels/OpenCL_Kernels'
+    if par["DTYPE"] == np.complex128:
+        name += '_double'
+    if streamed:
+        name += '_streamed'
+    with open(resource_filename('pyqmri', name + '.c')) as file:
+        code = file.read()
+    return [Program(ctx, code) for ctx in par["ctx"]]
+
+
+def _timeit(fun, repeats, finish):
+    fun()
+    finish()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fun()
+    finish()
+    return (time.perf_counter() - start) / repeats
+
+
+def _result(elapsed, voxels=0, samples=0):
+    result = {"time": elapsed}
+    if voxels:
+        result["voxels_per_s"] = voxels / elapsed
+    if samples:
+        result["samples_per_s"] = samples / elapsed
+    return result
+
+
+def benchOperator(args, results):
+    """MRIOperatorFactory forward and adjoint, k-space and image space."""
+    for trafo, imagespace in ((True, False), (False, False), (False, True)):
+        par = setupPar(args, trafo=trafo)
+        queue = par["queue"][0]
+        prg = _programs(par)
+        op, _ = pyqmri.operator.Operator.MRIOperatorFactory(
+            par, prg, par["DTYPE"], par["DTYPE_real"],
+            trafo=trafo, imagespace=imagespace)
+        x = np.stack([_phantom(par["NSlice"], par["dimY"], par["dimX"],
+                               par["DTYPE"])]*par["unknowns"])
+        grad = np.ones((par["unknowns"], par["NScan"])+x.shape[1:],
+                       dtype=par["DTYPE"])
+        x = clarray.to_device(queue, x)
+        grad = clarray.to_device(queue, grad)
+        if imagespace:
+            name = "operator_imagespace"
+            coils = []
+            out_fwd = clarray.zeros(
+                queue, (par["NScan"],)+x.shape[1:], dtype=par["DTYPE"])
+            samples = out_fwd.size
+        else:
+            name = "operator_radial" if trafo else "operator_cartesian"
+            coils = clarray.to_device(queue, _coils(
+                par["NC"], par["NSlice"], par["dimY"], par["dimX"],
+                par["DTYPE"]))
+            out_fwd = clarray.zeros(
+                queue, (par["NScan"], par["NC"], par["NSlice"],
+                        par["Nproj"], par["N"]), dtype=par["DTYPE"])
+            samples = out_fwd.size
+        out_adj = clarray.zeros_like(x)
+        voxels = x.size
+        results[name + "_fwd"] = _result(_timeit(
+            lambda: out_fwd.add_event(op.fwd(out_fwd, [x, coils, grad])),
+            args.repeats, queue.finish), voxels, samples)
+        results[name + "_adj"] = _result(_timeit(
+            lambda: out_adj.add_event(op.adj(out_adj, [out_fwd, coils,
+                                                       grad])),
+            args.repeats, queue.finish), voxels, samples)
+
+
+def benchGradient(args, results):
+    """GradientOperatorFactory and SymGradientOperatorFactory."""
+    par = setupPar(args, trafo=False)
+    queue = par["queue"][0]
+    prg = _programs(par)
+    x = clarray.to_device(queue, np.stack(
+        [_phantom(par["NSlice"], par["dimY"], par["dimX"],
+                  par["DTYPE"])]*par["unknowns"]))
+    for name, factory, width in (
+            ("gradient", pyqmri.operator.Operator.GradientOperatorFactory,
+             4),
+            ("symgradient",
+             pyqmri.operator.Operator.SymGradientOperatorFactory, 8)):
+        op = factory(par, prg, par["DTYPE"], par["DTYPE_real"])
+        inp = x if width == 4 else clarray.zeros(
+            queue, x.shape+(4,), dtype=par["DTYPE"])
+        out = clarray.zeros(queue, x.shape+(width,), dtype=par["DTYPE"])
+        out_adj = clarray.zeros_like(inp)
+        results[name + "_fwd"] = _result(_timeit(
+            lambda: out.add_event(op.fwd(out, inp)),
+            args.repeats, queue.finish), x.size)
+        results[name + "_adj"] = _result(_timeit(
+            lambda: out_adj.add_event(op.adj(out_adj, out)),
+            args.repeats, queue.finish), x.size)
+
+
+def benchNUFFT(args, results):
+    """Radial, Cartesian and SMS NUFFT forward and adjoint."""
+    for name, trafo, SMS in (("nufft_radial", True, False),
+                             ("fft_cartesian", False, False),
+                             ("fft_sms", False, True)):
+        par = setupPar(args, trafo=trafo, SMS=SMS)
+        queue = par["queue"][0]
+        fft = utils.NUFFT(par, trafo=trafo, SMS=SMS,
+                          NScan=par["NScan"], NC=par["NC"])
+        img = clarray.to_device(queue, np.tile(
+            _phantom(par["NSlice"], par["dimY"], par["dimX"],
+                     par["DTYPE"]),
+            (par["NScan"], par["NC"], 1, 1, 1)))
+        ksp = clarray.zeros(
+            queue, (par["NScan"], par["NC"],
+                    par["packs"] if SMS else par["NSlice"],
+                    par["Nproj"], par["N"]), dtype=par["DTYPE"])
+        results[name + "_fwd"] = _result(_timeit(
+            lambda: ksp.add_event(fft.FFT(ksp, img)),
+            args.repeats, queue.finish), img.size, ksp.size)
+        results[name + "_adj"] = _result(_timeit(
+            lambda: img.add_event(fft.FFTH(img, ksp)),
+            args.repeats, queue.finish), img.size, ksp.size)
+
+
+def benchStream(args, results):
+    """Stream.eval through the streamed image space operator."""
+    par = setupPar(args, trafo=False, streamed=True)
+    prg = _programs(par, streamed=True)
+    op = pyqmri.operator.OperatorImagespaceStreamed(
+        par, prg, DTYPE=par["DTYPE"], DTYPE_real=par["DTYPE_real"])
+    x = np.require(np.stack(
+        [_phantom(par["NSlice"], par["dimY"], par["dimX"],
+                  par["DTYPE"])]*par["unknowns"], axis=1),
+                   requirements='C')
+    grad = np.ones((par["NSlice"], par["unknowns"], par["NScan"],
+                    par["dimY"], par["dimX"]), dtype=par["DTYPE"])
+    out = np.zeros(op.data_shape, dtype=par["DTYPE"])
+    results["stream_imagespace_fwd"] = _result(_timeit(
+        lambda: op.fwd([out], [[x, [], grad]]),
+        args.repeats, lambda: None), x.size, out.size)
+
+
+def benchSolver(args, results):
+    """N primal-dual iterations of PDSolverTGV and PDSolverTV."""
+    for reg_type in ("TGV", "TV"):
+        par = setupPar(args, trafo=args.solver_trafo)
+        queue = par["queue"][0]
+        prg = _programs(par)
+        irgn_par = {"delta": 1e0, "omega": 0, "gamma": 1e-3, "lambd": 1,
+                    "rtol": 0, "atol": 0, "stag": 0, "beta": 1,
+                    "display_iterations": False,
+                    "gap_every": args.iters}
+        op, _ = pyqmri.operator.Operator.MRIOperatorFactory(
+            par, prg, par["DTYPE"], par["DTYPE_real"],
+            trafo=args.solver_trafo)
+        grad_op = pyqmri.operator.Operator.GradientOperatorFactory(
+            par, prg, par["DTYPE"], par["DTYPE_real"])
+        symgrad_op = None
+        if reg_type == "TGV":
+            symgrad_op = pyqmri.operator.Operator.SymGradientOperatorFactory(
+                par, prg, par["DTYPE"], par["DTYPE_real"])
+        model = types.SimpleNamespace(
+            constraints=[constraints() for _ in range(par["unknowns"])])
+        coils = clarray.to_device(queue, _coils(
+            par["NC"], par["NSlice"], par["dimY"], par["dimX"],
+            par["DTYPE"]))
+        pdop = PDBaseSolver.factory(
+            prg, par["queue"], par, irgn_par, 1, coils,
+            linops=(op, grad_op, symgrad_op), model=model,
+            reg_type=reg_type, DTYPE=par["DTYPE"],
+            DTYPE_real=par["DTYPE_real"])
+        x = np.stack([_phantom(par["NSlice"], par["dimY"], par["dimX"],
+                               par["DTYPE"])]*par["unknowns"])
+        pdop.modelgrad = clarray.to_device(queue, np.ones(
+            (par["unknowns"], par["NScan"])+x.shape[1:], dtype=par["DTYPE"]))
+        pdop.updateRegPar(irgn_par)
+        data = op.fwdoop([clarray.to_device(queue, x), coils,
+                          pdop.modelgrad]).get()
+        v = np.zeros(x.shape+(4,), dtype=par["DTYPE"])
+        elapsed = _timeit(
+            lambda: pdop.run((x, v), data, args.iters),
+            1, queue.finish) / args.iters
+        results["pd_%s_iteration" % reg_type.lower()] = _result(
+            elapsed, x.size, data.size)
+
+
+BENCHMARKS = {"operator": benchOperator,
+              "gradient": benchGradient,
+              "nufft": benchNUFFT,
+              "stream": benchStream,
+              "solver": benchSolver}
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against a baseline and return the regressions."""
+    regressions = []
+    print("%-32s %12s %12s %8s" % ("benchmark", "baseline", "current",
+                                   "ratio"))
+    for name, result in results.items():
+        if name not in baseline["results"]:
+            continue
+        ratio = result["time"] / baseline["results"][name]["time"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = " <-- regression"
+        print("%-32s %10.3e s %10.3e s %7.2fx%s" % (
+            name, baseline["results"][name]["time"], result["time"],
+            ratio, flag))
+    return regressions
+
+
+def _commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _parseArguments(args):
+    argparmain = argparse.ArgumentParser(
+        description="PyQMRI performance benchmarks.")
+    argparmain.add_argument(
+        '--only', dest='only', nargs='*', choices=list(BENCHMARKS),
+        default=list(BENCHMARKS), help="Benchmarks to run.")
+    argparmain.add_argument('--size', dest='size', type=int, default=64,
+                            help="Image size in x and y.")
+    argparmain.add_argument('--slices', dest='slices', type=int, default=4,
+                            help="Number of slices.")
+    argparmain.add_argument('--scans', dest='scans', type=int, default=4,
+                            help="Number of scans.")
+    argparmain.add_argument('--coils', dest='coils', type=int, default=4,
+                            help="Number of coils.")
+    argparmain.add_argument('--par_slices', dest='par_slices', type=int,
+                            default=2, help="Slices per streamed block.")
+    argparmain.add_argument('--repeats', dest='repeats', type=int,
+                            default=10, help="Repetitions per benchmark.")
+    argparmain.add_argument('--iters', dest='iters', type=int, default=10,
+                            help="Primal-dual iterations.")
+    argparmain.add_argument(
+        '--solver_trafo', dest='solver_trafo',
+        type=pyqmri.pyqmri._str2bool, default=False,
+        help="Use radial (True) or Cartesian (False) data in the solver.")
+    argparmain.add_argument(
+        '--use_GPU', dest='use_GPU', type=pyqmri.pyqmri._str2bool,
+        default=False, help="Run on the GPU instead of the CPU platform.")
+    argparmain.add_argument(
+        '--double_precision', dest='double_precision',
+        type=pyqmri.pyqmri._str2bool, default=False,
+        help="Benchmark double precision.")
+    argparmain.add_argument('--save', dest='save', type=str, default='',
+                            help="Store the results as baseline JSON.")
+    argparmain.add_argument('--compare', dest='compare', type=str,
+                            default='', help="Baseline JSON to compare to.")
+    argparmain.add_argument(
+        '--tolerance', dest='tolerance', type=float, default=0.1,
+        help="Relative slowdown reported as regression.")
+    return argparmain.parse_args(args)
+
+
+def main(args=None):
+    """Run the selected benchmarks."""
+    args = _parseArguments(sys.argv[1:] if args is None else args)
+    if args.double_precision:
+        args.DTYPE, args.DTYPE_real = np.complex128, np.float64
+    else:
+        args.DTYPE, args.DTYPE_real = np.complex64, np.float32
+
+    results = {}
+    for name in args.only:
+        print("Running " + name + " benchmarks")
+        BENCHMARKS[name](args, results)
+
+    for name, result in results.items():
+        print("%-32s %10.3e s %s" % (name, result["time"], "  ".join(
+            "%s %.3e" % (key, val) for key, val in result.items()
+            if key != "time")))
+
+    report = {"commit": _commit(),
+              "host": platform.node(),
+              "device": args.device,
+              "config": {key: val for key, val in vars(args).items()
+                         if key not in ("DTYPE", "DTYPE_real", "device",
+                                        "save", "compare")},
+              "results": results}
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
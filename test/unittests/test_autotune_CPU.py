@@ -0,0 +1,92 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+import pyopencl as cl
+
+import pyqmri
+from pyqmri import streaming
+from pyqmri._helper_fun._autotune import (find_streams, stream_footprint,
+                                          time_streams, tune_par_slices)
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+
+
+class tmpArgs():
+    pass
+
+
+class AutotuneTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = True
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        par["NSlice"] = 30
+        par["overlap"] = 1
+        self.par = par
+        self.num_dev = len(par["ctx"])
+        self.mem_size = min(ctx.devices[0].global_mem_size
+                            for ctx in par["ctx"])
+
+    def createStream(self, shape, slices):
+        return streaming.Stream(
+            [self.copy], [shape], [[shape, shape]], slices, 1, shape[0],
+            self.par["queue"], self.num_dev, DTYPE=DTYPE,
+            DTYPE_real=DTYPE_real, pinned=False)
+
+    def copy(self, outp, inp, par=None, idx=0, idxq=0, bound_cond=0,
+             wait_for=None):
+        if wait_for is None:
+            wait_for = []
+        return cl.enqueue_copy(self.par["queue"][4*idx+idxq], outp.data,
+                               inp[0].data,
+                               wait_for=outp.events+inp[0].events+wait_for)
+
+    def test_footprint(self):
+        shape = (8, 2, 4, 5)
+        stream = self.createStream(shape, 2)
+        holder = tmpArgs()
+        holder.op = tmpArgs()
+        holder.op.stream = stream
+        holder.streams = [stream]
+        self.assertEqual(find_streams(holder), [stream])
+        # Two inputs and one output, double buffered.
+        self.assertEqual(stream_footprint([stream]),
+                         2*3*np.prod(shape[1:])*np.dtype(DTYPE).itemsize)
+
+    def test_time_streams(self):
+        stream = self.createStream((8, 2, 4, 5), 2)
+        self.assertGreater(time_streams([stream]), 0)
+
+    def test_memory_limit(self):
+        # Three slices plus overlap per block fit.
+        bytes_per_slice = 0.8*self.mem_size/4
+        self.assertLessEqual(
+            tune_par_slices(self.par, bytes_per_slice), 3)
+
+    def test_pipelined(self):
+        par_slices = tune_par_slices(self.par, 1)
+        self.assertGreaterEqual(
+            -(-self.par["NSlice"]//par_slices), 4*self.num_dev)
+
+    def test_padding(self):
+        self.par["NSlice"] = 29
+        par_slices = tune_par_slices(self.par, 1, min_blocks=2)
+        self.assertGreaterEqual(
+            -(-self.par["NSlice"]//par_slices), 2*self.num_dev)
+
+    def test_trial(self):
+        def trial(par_slices):
+            return abs(par_slices-5)
+        self.assertEqual(tune_par_slices(self.par, 1, trial, max_trials=30),
+                         5)
+
+    def test_no_fit(self):
+        with self.assertRaises(ValueError):
+            tune_par_slices(self.par, self.mem_size)
@@ -0,0 +1,102 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+import pyopencl.array as clarray
+
+import pyqmri
+from pyqmri.solver import CGSolver
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+RTOL = 1e-4
+
+
+class tmpArgs():
+    pass
+
+
+def setupPar(par):
+    par["NScan"] = 2
+    par["NC"] = 3
+    par["NSlice"] = 2
+    par["dimX"] = 16
+    par["dimY"] = 16
+    par["Nproj"] = 16
+    par["N"] = 16
+    par["unknowns_TGV"] = 1
+    par["unknowns_H1"] = 0
+    par["unknowns"] = 1
+    par["dz"] = 1
+    par["weights"] = np.ones(1, dtype=DTYPE_real)
+    par["overlap"] = 1
+    par["par_slices"] = 1
+    par["is3D"] = False
+    par["fft_dim"] = (-2, -1)
+    par["DTYPE"] = DTYPE
+    par["DTYPE_real"] = DTYPE_real
+
+
+class CGTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        setupPar(par)
+        rng = np.random.default_rng(0)
+        # Every second phase encode line plus the center.
+        mask = np.zeros((par["dimY"], par["dimX"]), dtype=DTYPE_real)
+        mask[::2] = 1
+        mask[6:10] = 1
+        par["mask"] = mask
+        shape = (par["NC"], par["NSlice"], par["dimY"], par["dimX"])
+        par["C"] = (rng.standard_normal(shape)
+                    + 1j*rng.standard_normal(shape)).astype(DTYPE)
+        shape = (par["NScan"], par["NC"], par["NSlice"],
+                 par["Nproj"], par["N"])
+        self.data = (mask*(rng.standard_normal(shape)
+                           + 1j*rng.standard_normal(shape))).astype(DTYPE)
+        self.par = par
+        self.queue = par["queue"][0]
+        self.cgs = CGSolver(par, par["NScan"], trafo=False, SMS=False)
+
+    def apply(self, fun, x):
+        inp = clarray.to_device(self.queue, np.require(x, DTYPE,
+                                                       requirements='C'))
+        out = clarray.zeros_like(self.cgs._x)
+        out.add_event(fun(out, inp))
+        return out.get().astype(np.complex128)
+
+    def hostCG(self, iters, lambd, tol):
+        # Reference with the update steps and dot products on the host.
+        b = self.apply(self.cgs._operator_rhs, self.data)
+        x = np.zeros_like(b)
+        res = b.copy()
+        p = res.copy()
+        for i in range(iters):
+            Ax = self.apply(self.cgs._operator_lhs, p) + lambd*p
+            alpha = (np.vdot(res, res)/np.vdot(p, Ax)).real
+            x = x + alpha*p
+            res_new = res - alpha*Ax
+            delta = np.linalg.norm(res_new)**2/np.linalg.norm(b)**2
+            if delta < tol:
+                break
+            beta = (np.vdot(res_new, res_new)/np.vdot(res, res)).real
+            p = res_new + beta*p
+            res = res_new
+        return x[:, 0], i + 1
+
+    def test_run(self):
+        for iters, tol in ((5, 0), (100, 1e-6)):
+            ref, ref_iters = self.hostCG(iters, 1e-2, tol)
+            result = self.cgs.run(self.data, iters=iters, lambd=1e-2,
+                                  tol=tol)
+            self.assertEqual(self.cgs.iterations, ref_iters)
+            np.testing.assert_allclose(
+                result, ref, rtol=RTOL, atol=RTOL*np.abs(ref).max())
+
@@ -0,0 +1,86 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+
+from pyqmri._helper_fun._coil_compression import compress_coils
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+RTOL = 1e-4
+
+
+class CoilCompressionTest(unittest.TestCase):
+    def setUp(self):
+        NScan, NC, NSlice, dimY, dimX = 2, 8, 2, 16, 20
+        rng = np.random.default_rng(0)
+        y, x = np.mgrid[:dimY, :dimX]
+        # Eight coils which are linear combinations of three coils with a
+        # smooth variation along the readout.
+        base = np.stack([
+            np.exp(-((y-dimY/2)**2 + (x-dimX*c/2)**2)/100 + 1j*c*x/dimX)
+            for c in range(3)])
+        mixing = (rng.standard_normal((NC, 3))
+                  + 1j*rng.standard_normal((NC, 3)))
+        coils = np.einsum('cb,byx->cyx', mixing, base)
+        self.coils = np.repeat(coils[:, None], NSlice, axis=1).astype(DTYPE)
+        images = (rng.standard_normal((NScan, 1, NSlice, dimY, dimX))
+                  + 1j*rng.standard_normal((NScan, 1, NSlice, dimY, dimX)))
+        self.images = images.astype(DTYPE)
+        self.data = np.fft.fft2(self.coils*self.images,
+                                norm='ortho').astype(DTYPE)
+        self.par = {"C": self.coils.copy(),
+                    "NC": NC,
+                    "DTYPE": DTYPE,
+                    "DTYPE_real": DTYPE_real,
+                    "mask": np.ones((NScan, NSlice, dimY, dimX),
+                                    dtype=DTYPE_real)}
+
+    def checkForwardModel(self, data):
+        np.testing.assert_allclose(
+            data,
+            np.fft.fft2(self.par["C"]*self.images, norm='ortho'),
+            rtol=RTOL, atol=RTOL*np.abs(data).max())
+
+    def test_svd_energy(self):
+        data, ncoils, energy = compress_coils(self.data, self.par, "SVD",
+                                              energy=0.999999)
+        self.assertEqual(ncoils, 3)
+        np.testing.assert_allclose(energy, 1, rtol=RTOL)
+        self.assertEqual(data.shape[1], 3)
+        self.assertEqual(self.par["NC"], 3)
+        self.assertEqual(self.par["mask"].shape, (2, 2, 16, 20))
+        np.testing.assert_allclose(np.linalg.norm(data),
+                                   np.linalg.norm(self.data), rtol=RTOL)
+        self.checkForwardModel(data)
+
+    def test_svd_ncoils(self):
+        data, ncoils, energy = compress_coils(self.data, self.par, "SVD",
+                                              ncoils=2)
+        self.assertEqual(ncoils, 2)
+        self.assertLess(energy, 1)
+        self.checkForwardModel(data)
+
+    def test_gcc(self):
+        data, ncoils, energy = compress_coils(self.data, self.par, "GCC",
+                                              ncoils=2)
+        self.assertEqual(ncoils, 2)
+        _, _, svd_energy = compress_coils(
+            self.data, dict(self.par, C=self.coils.copy()), "SVD", ncoils=2)
+        self.assertGreaterEqual(energy, svd_energy)
+        self.checkForwardModel(data)
+
+    def test_gcc_radial(self):
+        self.par["mask"] = None
+        with self.assertRaises(ValueError):
+            compress_coils(self.data, self.par, "GCC")
+
+    def test_gcc_partial_readout(self):
+        self.par["mask"][..., ::2] = 0
+        data, ncoils, energy = compress_coils(self.data, self.par, "GCC",
+                                              ncoils=2)
+        _, _, svd_energy = compress_coils(
+            self.data, dict(self.par, C=self.coils.copy()), "SVD", ncoils=2)
+        np.testing.assert_allclose(energy, svd_energy, rtol=RTOL)
+        self.checkForwardModel(data)
@@ -0,0 +1,59 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import os
+import tempfile
+import numpy as np
+import h5py
+
+from pyqmri._helper_fun._h5reader import LazyComplexDataset
+
+
+DTYPE = np.complex64
+
+
+class LazyComplexDatasetTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data = (np.random.randn(3, 4, 5, 6, 7) +
+                     1j*np.random.randn(3, 4, 5, 6, 7))
+        self.file = h5py.File(
+            os.path.join(self.tmpdir.name, "data.h5"), "w")
+        self.file.create_dataset("real_dat", data=self.data.real)
+        self.file.create_dataset("imag_dat", data=self.data.imag)
+        self.file.create_dataset("Coils", data=self.data)
+        compound = np.empty(self.data.shape,
+                            dtype=[("real", "<f8"), ("imag", "<f8")])
+        compound["real"] = self.data.real
+        compound["imag"] = self.data.imag
+        self.file.create_dataset("compound", data=compound)
+
+    def tearDown(self):
+        self.file.close()
+        self.tmpdir.cleanup()
+
+    def test_split_slab(self):
+        reader = LazyComplexDataset.fromFile(self.file, "dat", DTYPE)
+        slab = reader[..., 1:4, :, :]
+        self.assertEqual(slab.dtype, DTYPE)
+        np.testing.assert_allclose(
+            slab, self.data[..., 1:4, :, :].astype(DTYPE), rtol=1e-6)
+
+    def test_chunked_read_into_buffer(self):
+        reader = LazyComplexDataset(self.file["Coils"], dtype=DTYPE,
+                                    chunk_bytes=1)
+        out = np.zeros((2, 4, 2, 6, 7), dtype=DTYPE)
+        reader.read((slice(1, 3), slice(None), slice(2, 4)), out)
+        np.testing.assert_allclose(
+            out, self.data[1:3, :, 2:4].astype(DTYPE), rtol=1e-6)
+
+    def test_compound(self):
+        reader = LazyComplexDataset.fromFile(self.file, "compound", DTYPE)
+        np.testing.assert_allclose(
+            reader[()], self.data.astype(DTYPE), rtol=1e-6)
+
+    def test_shape_mismatch(self):
+        reader = LazyComplexDataset.fromFile(self.file, "dat", DTYPE)
+        with self.assertRaises(ValueError):
+            reader.read((0, ...), np.zeros((4, 5), dtype=DTYPE))
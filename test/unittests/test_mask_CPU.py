@@ -0,0 +1,141 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+import pyopencl.array as clarray
+
+import pyqmri
+from pyqmri.transforms import PyOpenCLnuFFT
+from pyqmri._helper_fun._mask import compact_mask
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+RTOL = 1e-4
+
+
+class tmpArgs():
+    pass
+
+
+class CompactMaskTest(unittest.TestCase):
+    def setUp(self):
+        self.shape = (3, 2, 4, 8, 6)
+        self.pattern = np.ones(self.shape[-2:], dtype=DTYPE_real)
+        self.pattern[1::2] = 0
+
+    def test_full_size(self):
+        mask = np.ones(self.shape, dtype=DTYPE_real)*self.pattern
+        np.testing.assert_equal(compact_mask(mask),
+                                self.pattern[None, None])
+
+    def test_per_scan(self):
+        mask = np.ones((3, 4, 8, 6), dtype=DTYPE_real)*self.pattern
+        mask[1] = self.pattern[::-1]
+        compact = compact_mask(mask)
+        self.assertEqual(compact.shape, (3, 1, 8, 6))
+        np.testing.assert_equal(compact[:, 0], mask[:, 0])
+
+    def test_per_slice(self):
+        mask = np.ones((4, 8, 6), dtype=DTYPE_real)*self.pattern
+        mask[2] = 1
+        compact = compact_mask(mask)
+        self.assertEqual(compact.shape, (1, 4, 8, 6))
+        np.testing.assert_equal(compact[0], mask)
+
+    def test_shared(self):
+        self.assertEqual(compact_mask(self.pattern).shape, (1, 1, 8, 6))
+
+    def test_dimensions(self):
+        with self.assertRaises(ValueError):
+            compact_mask(np.ones(6))
+
+
+class CartesianMaskTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        par["NScan"] = 3
+        par["NC"] = 2
+        par["NSlice"] = 2
+        par["dimX"] = 16
+        par["dimY"] = 12
+        par["N"] = par["dimX"]
+        par["Nproj"] = par["dimY"]
+        par["is3D"] = False
+        par["fft_dim"] = (-2, -1)
+        # A different set of phase encoding lines for each scan.
+        mask = np.zeros((par["NScan"], par["NSlice"],
+                         par["dimY"], par["dimX"]), dtype=DTYPE_real)
+        for scan in range(par["NScan"]):
+            mask[scan, :, scan::par["NScan"]] = 1
+        par["mask"] = compact_mask(mask)
+        self.par = par
+        self.queue = par["queue"][0]
+        self.shape = (par["NScan"], par["NC"], par["NSlice"],
+                      par["dimY"], par["dimX"])
+        rng = np.random.default_rng(0)
+        self.image = (rng.standard_normal(self.shape)
+                      + 1j*rng.standard_normal(self.shape)).astype(DTYPE)
+        self.kspace = (np.fft.fft2(self.image, norm='ortho')
+                       * mask[:, None]).astype(DTYPE)
+
+    def createFFT(self, NScan):
+        par = dict(self.par)
+        par["NScan"] = NScan
+        return PyOpenCLnuFFT.create(par["ctx"][0], self.queue, par,
+                                    DTYPE=DTYPE, DTYPE_real=DTYPE_real)
+
+    def test_compact_layout(self):
+        self.assertEqual(self.par["mask"].shape,
+                         (self.par["NScan"], 1,
+                          self.par["dimY"], self.par["dimX"]))
+
+    def test_fwd(self):
+        FT = self.createFFT(self.par["NScan"])
+        out = clarray.zeros(self.queue, self.shape, dtype=DTYPE)
+        out.add_event(FT.FFT(out, clarray.to_device(self.queue,
+                                                    self.image)))
+        np.testing.assert_allclose(out.get(), self.kspace,
+                                   rtol=RTOL, atol=RTOL)
+
+    def test_adj(self):
+        FT = self.createFFT(self.par["NScan"])
+        out = clarray.zeros(self.queue, self.shape, dtype=DTYPE)
+        out.add_event(FT.FFTH(out, clarray.to_device(self.queue,
+                                                     self.kspace)))
+        np.testing.assert_allclose(
+            out.get(), np.fft.ifft2(self.kspace, norm='ortho'),
+            rtol=RTOL, atol=RTOL)
+
+    def test_scan_offset(self):
+        FT = self.createFFT(1)
+        out = clarray.zeros(self.queue, (1,) + self.shape[1:], dtype=DTYPE)
+        out.add_event(FT.FFT(out, clarray.to_device(self.queue,
+                                                    self.image[2:]),
+                             scan_offset=2))
+        np.testing.assert_allclose(out.get(), self.kspace[2:],
+                                   rtol=RTOL, atol=RTOL)
+
+    def test_streamed_slices(self):
+        par = dict(self.par)
+        par["par_slices"] = 1
+        par["overlap"] = 1
+        # The streamed blocks share the mask of all slices.
+        FT = PyOpenCLnuFFT.create(par["ctx"][0], self.queue, par,
+                                  DTYPE=DTYPE, DTYPE_real=DTYPE_real,
+                                  streamed=True)
+        self.assertEqual(FT.mask.shape[1], 1)
+        mask = np.ones((par["NSlice"], par["dimY"], par["dimX"]),
+                       dtype=DTYPE_real)
+        mask[1, ::2] = 0
+        par["mask"] = compact_mask(mask)
+        with self.assertRaisesRegex(ValueError, "all slices"):
+            PyOpenCLnuFFT.create(par["ctx"][0], self.queue, par,
+                                 DTYPE=DTYPE, DTYPE_real=DTYPE_real,
+                                 streamed=True)
@@ -0,0 +1,157 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+
+from pyqmri._helper_fun._memplan import (INCORE, STREAMED, MULTI_DEVICE,
+                                         solver_footprint, plan_mode)
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+
+
+class tmpDevice():
+    def __init__(self, global_mem_size, max_mem_alloc_size):
+        self.global_mem_size = global_mem_size
+        self.max_mem_alloc_size = max_mem_alloc_size
+
+
+GB = 1024**3
+GPU_1GB = tmpDevice(1.25*GB, 1*GB)
+GPU_8GB = tmpDevice(8*GB, 2*GB)
+GPU_24GB = tmpDevice(24*GB, 6*GB)
+
+
+def setupPar(par):
+    par["NScan"] = 4
+    par["NC"] = 3
+    par["NSlice"] = 2
+    par["dimX"] = 16
+    par["dimY"] = 16
+    par["Nproj"] = 8
+    par["N"] = 32
+    par["ogf"] = 2
+    par["unknowns"] = 3
+    par["unknowns_TGV"] = 2
+    par["NMaps"] = 2
+    par["DTYPE"] = DTYPE
+    par["DTYPE_real"] = DTYPE_real
+
+
+def setupPar2D(par):
+    # Dimensions of the radial test data set
+    setupPar(par)
+    par["NScan"] = 10
+    par["NC"] = 8
+    par["NSlice"] = 12
+    par["dimX"] = 128
+    par["dimY"] = 128
+    par["Nproj"] = 34
+    par["N"] = 256
+    par["unknowns"] = 2
+    par["fft_dim"] = (-2, -1)
+
+
+def setupPar3D(par):
+    setupPar2D(par)
+    par["NC"] = 20
+    par["NSlice"] = 64
+    par["dimX"] = 256
+    par["dimY"] = 256
+    par["Nproj"] = 21
+    par["N"] = 512
+
+
+class MemoryPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.par = {}
+        setupPar(self.par)
+        self.vol = 2*16*16
+
+    def total(self, footprint):
+        return sum(size for _, size in footprint)
+
+    def test_tgv_radial(self):
+        footprint = dict(solver_footprint(self.par))
+        self.assertEqual(footprint["z2 (twins)"], 2*8*3*self.vol*8)
+        self.assertEqual(footprint["v (twins)"], 2*4*2*self.vol*8)
+        self.assertEqual(footprint["modelgrad"], 4*3*self.vol*8)
+        self.assertEqual(footprint["NUFFT grid"], 4*3*2*32*32*8)
+
+    def test_tv_cartesian(self):
+        self.par["mask"] = np.ones((4, 1, 16, 16), dtype=DTYPE_real)
+        footprint = dict(solver_footprint(self.par, "TV", trafo=False))
+        self.assertNotIn("z2 (twins)", footprint)
+        self.assertEqual(footprint["FFT temporary"], 4*3*self.vol*8)
+        self.assertEqual(footprint["FFT mask"], 4*16*16*4)
+
+    def test_imagespace(self):
+        footprint = dict(solver_footprint(self.par, imagespace=True))
+        self.assertEqual(footprint["data"], 4*self.vol*8)
+        self.assertNotIn("coils", footprint)
+
+    def test_soft_sense(self):
+        footprint = dict(solver_footprint(self.par, trafo=False,
+                                          soft_sense=True))
+        self.assertEqual(footprint["z2 (twins)"], 2*8*2*self.vol*8)
+        self.assertNotIn("modelgrad", footprint)
+
+    def test_regularization(self):
+        self.assertIsNone(solver_footprint(self.par, "H1"))
+        self.assertIsNone(solver_footprint(self.par, "ICTV",
+                                           soft_sense=True))
+        tv = self.total(solver_footprint(self.par, "TV"))
+        tgv = self.total(solver_footprint(self.par, "TGV"))
+        ictv = self.total(solver_footprint(self.par, "ICTV"))
+        ictgv = self.total(solver_footprint(self.par, "ICTGV"))
+        self.assertLess(tv, ictv)
+        self.assertLess(tgv, ictgv)
+        self.assertLess(ictv, ictgv)
+
+    def test_optional_buffers(self):
+        plain = self.total(solver_footprint(self.par))
+        for key, value, name in (("csr_gridding", True, "CSR gridding"),
+                                 ("toeplitz", True, "Toeplitz kernels"),
+                                 ("subspace", 2, "subspace basis")):
+            par = dict(self.par)
+            par[key] = value
+            footprint = solver_footprint(par)
+            self.assertIn(name, dict(footprint))
+            self.assertGreater(self.total(footprint), plain)
+
+
+class PlanModeTest(unittest.TestCase):
+    def test_small(self):
+        par = {}
+        setupPar(par)
+        for reg_type in ("TV", "TGV", "ICTV", "ICTGV"):
+            self.assertEqual(
+                plan_mode(solver_footprint(par, reg_type), GPU_1GB), INCORE)
+
+    def test_2D(self):
+        par = {}
+        setupPar2D(par)
+        for reg_type in ("TV", "TGV", "ICTV", "ICTGV"):
+            self.assertEqual(
+                plan_mode(solver_footprint(par, reg_type), GPU_8GB), INCORE)
+        # Only the larger ICTGV variables exceed the device.
+        self.assertEqual(
+            plan_mode(solver_footprint(par, "TGV"), GPU_1GB), INCORE)
+        self.assertEqual(
+            plan_mode(solver_footprint(par, "ICTGV"), GPU_1GB), STREAMED)
+
+    def test_3D(self):
+        par = {}
+        setupPar3D(par)
+        footprint = solver_footprint(par)
+        self.assertEqual(plan_mode(footprint, GPU_24GB), STREAMED)
+        self.assertEqual(plan_mode(footprint, GPU_24GB, 2), MULTI_DEVICE)
+
+    def test_allocation_limit(self):
+        par = {}
+        setupPar2D(par)
+        # The NUFFT grid exceeds the largest single allocation.
+        self.assertEqual(
+            plan_mode(solver_footprint(par), tmpDevice(8*GB, 256*1024**2)),
+            STREAMED)
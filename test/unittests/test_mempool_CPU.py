@@ -0,0 +1,143 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+import pyopencl.array as clarray
+from pkg_resources import resource_filename
+
+import pyqmri
+from pyqmri._helper_fun import CLProgram as Program
+from pyqmri._helper_fun._mempool import device_pool
+from pyqmri import transforms
+
+DTYPE = np.complex64
+
+
+class tmpArgs():
+    pass
+
+
+class DevicePoolTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        self.queue = par["queue"]
+        self.pool = device_pool(self.queue[0])
+        self.shape = (3, 8, 16)
+
+    def test_shared(self):
+        self.assertIs(device_pool(self.queue[1]), self.pool)
+
+    def test_reuse(self):
+        arr = clarray.zeros(self.queue[0], self.shape, DTYPE,
+                            allocator=self.pool)
+        active = self.pool.active_bytes
+        self.assertGreaterEqual(self.pool.peak_bytes, active)
+        del arr
+        self.assertLess(self.pool.active_bytes, active)
+        held = self.pool.held_bytes
+        arr = clarray.zeros(self.queue[0], self.shape, DTYPE,
+                            allocator=self.pool)
+        # The released buffer is handed out again.
+        self.assertEqual(self.pool.active_bytes, active)
+        self.assertLess(self.pool.held_bytes, held)
+
+    def test_fft_plans(self):
+        arr = clarray.zeros(self.queue[0], self.shape, DTYPE)
+        plan = transforms.fftPlan(self.queue[0].context, self.queue[0],
+                                  arr, (-2, -1))
+        self.assertIs(
+            transforms.fftPlan(self.queue[0].context, self.queue[0],
+                               arr.copy(), (-2, -1)), plan)
+        for size in range(1, transforms._MAX_FFT_PLANS + 2):
+            arr = clarray.zeros(self.queue[0], (size, 4), DTYPE)
+            transforms.fftPlan(self.queue[0].context, self.queue[0],
+                               arr, (-1,))
+        self.assertEqual(len(self.pool.fft_plans), transforms._MAX_FFT_PLANS)
+        self.assertNotIn(plan, self.pool.fft_plans.values())
+
+    def test_report(self):
+        self.assertIn("peak", self.pool.report())
+
+
+class SharedPoolOperatorTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        par["NScan"] = 2
+        par["NC"] = 3
+        par["NSlice"] = 2
+        par["dimX"] = 16
+        par["dimY"] = 16
+        par["N"] = 16
+        par["Nproj"] = 16
+        par["dz"] = 1
+        par["overlap"] = 0
+        par["is3D"] = False
+        par["unknowns"] = 2
+        par["unknowns_TGV"] = 2
+        par["unknowns_H1"] = 0
+        par["weights"] = np.array([1, 1])
+        par["fft_dim"] = (-2, -1)
+        with open(resource_filename(
+                'pyqmri', 'kernels/OpenCL_Kernels.c')) as myfile:
+            prg = Program(par["ctx"][0], myfile.read())
+        self.queue = par["queue"][0]
+
+        rng = np.random.default_rng(0)
+        self.ops = []
+        self.coils = []
+        self.grads = []
+        for _ in range(2):
+            par["mask"] = (rng.random((par["dimY"], par["dimX"])) > 0.5
+                           ).astype(np.float32)
+            self.ops.append(pyqmri.operator.OperatorKspace(
+                par, prg, DTYPE=DTYPE, DTYPE_real=np.float32, trafo=False))
+            self.coils.append(clarray.to_device(self.queue, (
+                rng.standard_normal((par["NC"], par["NSlice"],
+                                     par["dimY"], par["dimX"]))
+                + 1j*rng.standard_normal((par["NC"], par["NSlice"],
+                                          par["dimY"], par["dimX"]))
+                ).astype(DTYPE)))
+            self.grads.append(clarray.to_device(self.queue, (
+                rng.standard_normal((par["unknowns"], par["NScan"],
+                                     par["NSlice"], par["dimY"],
+                                     par["dimX"]))
+                ).astype(DTYPE)))
+        self.data = clarray.to_device(self.queue, (
+            rng.standard_normal((par["NScan"], par["NC"], par["NSlice"],
+                                 par["dimY"], par["dimX"]))
+            + 1j*rng.standard_normal((par["NScan"], par["NC"],
+                                      par["NSlice"], par["dimY"],
+                                      par["dimX"]))).astype(DTYPE))
+        self.shape = (par["unknowns"], par["NSlice"], par["dimY"],
+                      par["dimX"])
+
+    def adj(self, j, wait=True):
+        out = clarray.zeros(self.queue, self.shape, DTYPE)
+        out.add_event(self.ops[j].adj(
+            out, [self.data, self.coils[j], self.grads[j]]))
+        if wait:
+            out.finish()
+        return out
+
+    def test_back_to_back(self):
+        self.assertIs(self.ops[0]._pool, self.ops[1]._pool)
+        self.assertIsNot(self.ops[0]._tmp_result, self.ops[1]._tmp_result)
+        ref = [self.adj(j).get() for j in range(2)]
+        # Both operators are enqueued before either result is read.
+        out = [self.adj(j, wait=False) for j in range(2)]
+        for j in range(2):
+            np.testing.assert_allclose(
+                out[j].get(), ref[j], rtol=1e-5, atol=1e-5)
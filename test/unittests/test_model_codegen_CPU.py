@@ -0,0 +1,85 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import os
+import tempfile
+import importlib
+import numpy as np
+import pyopencl.array as clarray
+
+import pyqmri
+
+GeneralModel = importlib.import_module("pyqmri.models.GeneralModel")
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+RTOL = 1e-4
+ATOL = 1e-6
+
+
+class tmpArgs():
+    pass
+
+
+class ModelCodegenTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        self.queue = par["queue"][0]
+        self.tmpdir = tempfile.TemporaryDirectory()
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        try:
+            GeneralModel.genDefaultModelfile()
+        finally:
+            os.chdir(cwd)
+
+        par["NScan"] = 5
+        par["NSlice"] = 3
+        par["dimY"] = 12
+        par["dimX"] = 16
+        par["DTYPE"] = DTYPE
+        par["DTYPE_real"] = DTYPE_real
+        par["modelfile"] = os.path.join(self.tmpdir.name, "models.ini")
+        par["TR"] = 5.0
+        par["fa"] = np.linspace(0.05, 0.3, par["NScan"])
+        par["fa_corr"] = 0.9 + 0.2*np.random.rand(
+            par["NSlice"], par["dimY"], par["dimX"])
+        par["TE"] = np.linspace(1, 30, par["NScan"])
+        par["opencl_model"] = True
+        self.par = par
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _compare(self, modelname, x):
+        self.par["modelname"] = modelname
+        model = GeneralModel.Model(self.par)
+        self.assertTrue(model.device_evaluation)
+        model.uk_scale = [2.0, 0.5]
+        x = x.astype(DTYPE)
+        x_cl = clarray.to_device(self.queue, x)
+        np.testing.assert_allclose(
+            model.execute_forward_cl(x_cl).get(),
+            model.execute_forward(x), rtol=RTOL, atol=ATOL)
+        np.testing.assert_allclose(
+            model.execute_gradient_cl(x_cl).get(),
+            model.execute_gradient(x), rtol=RTOL, atol=ATOL)
+
+    def test_VFA(self):
+        shape = (self.par["NSlice"], self.par["dimY"], self.par["dimX"])
+        x = np.stack((np.random.rand(*shape) + 1j*np.random.rand(*shape),
+                      1.8 + 0.1*np.random.rand(*shape)))
+        self._compare("VFA-E1", x)
+
+    def test_MonoExp(self):
+        shape = (self.par["NSlice"], self.par["dimY"], self.par["dimX"])
+        x = np.stack((np.random.rand(*shape) + 1j*np.random.rand(*shape),
+                      0.01 + 0.1*np.random.rand(*shape)))
+        self._compare("MonoExp", x)
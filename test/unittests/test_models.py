@@ -0,0 +1,167 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+
+from pyqmri.models import ASL, PASL
+from pyqmri.models.IRLL import Model as IRLLModel
+
+DTYPE = np.complex128
+DTYPE_real = np.float64
+RTOL = 1e-12
+
+
+def setupPar(par):
+    par["NScan"] = 6
+    par["NSlice"] = 2
+    par["dimX"] = 4
+    par["dimY"] = 3
+    par["DTYPE"] = DTYPE
+    par["DTYPE_real"] = DTYPE_real
+
+
+class IRLLTest(unittest.TestCase):
+    def setUp(self):
+        par = {}
+        setupPar(par)
+        par["Nproj"] = 7
+        par["Nproj_measured"] = par["NScan"]*par["Nproj"]
+        par["tau"] = 5.5
+        par["gradient_delay"] = 10
+        par["time_per_slice"] = 5000
+        par["flip_angle(s)"] = 5
+        rng = np.random.default_rng(0)
+        shape = (par["NSlice"], par["dimY"], par["dimX"])
+        par["fa_corr"] = rng.uniform(0.8, 1.2, shape)
+        self.par = par
+        self.model = IRLLModel(dict(par))
+
+        # One projection per scan evaluates every projection separately.
+        par_ref = dict(par)
+        par_ref["NScan"] = par["NScan"]*par["Nproj"]
+        par_ref["Nproj"] = 1
+        self.model_ref = IRLLModel(par_ref)
+
+        T1 = rng.uniform(300, 2000, shape)
+        self.x = np.array([rng.uniform(0.5, 2, shape),
+                           np.exp(-self.model.scale/T1)], dtype=DTYPE)
+
+    def test_forward(self):
+        ref = self.model_ref.execute_forward(self.x).reshape(
+            (self.par["NScan"], self.par["Nproj"]) + self.x.shape[1:])
+        np.testing.assert_allclose(self.model.execute_forward(self.x),
+                                   np.mean(ref, axis=1), rtol=RTOL)
+
+    def test_gradient(self):
+        ref = self.model_ref.execute_gradient(self.x).reshape(
+            (2, self.par["NScan"], self.par["Nproj"]) + self.x.shape[1:])
+        ref = np.mean(ref, axis=2)
+        grad = self.model.execute_gradient(self.x)
+        for uk in range(2):
+            np.testing.assert_allclose(
+                grad[uk], ref[uk], rtol=RTOL,
+                atol=RTOL*np.abs(ref[uk]).max())
+
+
+class ASLTest(unittest.TestCase):
+    module = ASL
+
+    def setUp(self):
+        par = {}
+        setupPar(par)
+        par["transpXYZ"] = False
+        par["transpXY"] = False
+        par["transpYZ"] = False
+        rng = np.random.default_rng(0)
+        shape = (par["NSlice"], par["dimY"], par["dimX"])
+        par["file"] = {
+            "T1b": rng.uniform(1.5, 1.7, shape),
+            "T1": rng.uniform(1.1, 1.5, shape),
+            "lambd": rng.uniform(0.85, 0.95, shape),
+            "M0": rng.uniform(0.5, 2, shape),
+            "tau": rng.uniform(0.6, 1, (par["NScan"],) + shape),
+            "alpha": rng.uniform(0.8, 0.9, shape)}
+        par["t"] = np.linspace(0.2, 3, par["NScan"])
+        self.model = self.module.Model(par)
+        self.model.uk_scale = [2, 0.5]
+        # Arrival times before, during and after the bolus.
+        self.x = np.array([rng.uniform(0.1, 1, shape)/60/2,
+                           rng.uniform(0.3, 1.5, shape)/0.5])
+
+    def variables(self, scaled):
+        f_sc, del_t_sc = self.model.uk_scale
+        f = self.x[0]*f_sc
+        del_t = self.x[1]*del_t_sc
+        T1p = 1/self.model.T1 + f/self.model.lambd
+        variables = {
+            "M0": self.model.M0, "alpha": self.model.alpha,
+            "lambd": self.model.lambd, "T1b": self.model.T1b, "T1p": T1p,
+            "expAttT1b": np.exp(-del_t/self.model.T1b),
+            "f_sc": f_sc, "del_t_sc": del_t_sc}
+        if scaled:
+            variables.update(f=f, del_t=del_t)
+        else:
+            variables.update(f=self.x[0], del_t=self.x[1])
+        return variables, del_t
+
+    def timeVariables(self, variables, j):
+        t = self.model.t
+        variables.update(t=t[j] if t.ndim == 4 else np.full_like(
+            self.model.M0, t[j]), tau=self.model.tau[j])
+
+    def reference(self, during, after, scaled):
+        # Evaluates each expression only for the voxels of its phase.
+        variables, del_t = self.variables(scaled)
+        result = np.zeros((self.model.NScan,)+self.model.M0.shape)
+        for j in range(self.model.NScan):
+            self.timeVariables(variables, j)
+            t, tau = variables["t"], variables["tau"]
+            for expr, ind in ((during, (t >= del_t) & (t < del_t+tau)),
+                              (after, t >= del_t+tau)):
+                local = {key: val[ind] if np.ndim(val) else val
+                         for key, val in variables.items()}
+                local["exp"] = np.exp
+                result[j, ind] = eval(expr, {}, local)
+        return result
+
+    def test_phases(self):
+        t = self.model.t
+        if t.ndim == 1:
+            t = t[:, None, None, None]
+        del_t = self.x[1]*self.model.uk_scale[1]
+        self.assertTrue(np.any(t < del_t))
+        self.assertTrue(np.any((t >= del_t) & (t < del_t+self.model.tau)))
+        self.assertTrue(np.any(t >= del_t+self.model.tau))
+
+    def test_forward(self):
+        ref = self.reference(self.module._S1, self.module._S2, True)
+        np.testing.assert_allclose(self.model.execute_forward(self.x),
+                                   ref, rtol=RTOL,
+                                   atol=RTOL*np.abs(ref).max())
+
+    def test_gradient(self):
+        grad = self.model.execute_gradient(self.x)
+        for uk, (during, after) in enumerate(
+                ((self.module._delCBF1, self.module._delCBF2),
+                 (self.module._delATT1, self.module._delATT2))):
+            ref = self.reference(during, after, False)
+            np.testing.assert_allclose(grad[uk], ref, rtol=RTOL,
+                                       atol=RTOL*np.abs(ref).max())
+
+
+class PASLTest(ASLTest):
+    module = PASL
+
+    def variables(self, scaled):
+        variables, del_t = super().variables(scaled)
+        T1r = variables.pop("T1p") - 1/self.model.T1b
+        variables.update(T1r=T1r, expAttT1r=np.exp(del_t*T1r))
+        self._T1app = T1r + 1/self.model.T1b
+        return variables, del_t
+
+    def timeVariables(self, variables, j):
+        super().timeVariables(variables, j)
+        t = variables["t"]
+        variables.update(expT1r=np.exp(t*variables["T1r"]),
+                         expT1app=np.exp(-t*self._T1app))
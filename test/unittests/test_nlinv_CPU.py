@@ -0,0 +1,100 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import pyqmri
+from pyqmri._helper_fun import _nlinvns as nlinvns
+from pyqmri._helper_fun._nlinv_pool import NLINVPool
+from pyqmri._helper_fun._nlinvns_cl import NLINVOpenCL, weights
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+RTOL = 1e-3
+
+
+class tmpArgs():
+    pass
+
+
+def setupData():
+    NSlice, NC, dimY, dimX = 2, 3, 24, 20
+    y, x = np.mgrid[:dimY, :dimX]
+    image = (((y-dimY/2)/(dimY/3))**2 + ((x-dimX/2)/(dimX/3))**2 < 1)
+    coils = np.stack([
+        np.exp(-((y-dimY/2-8*np.cos(2*np.pi*c/NC))**2
+                 + (x-dimX/2-8*np.sin(2*np.pi*c/NC))**2)/200
+               + 1j*c)
+        for c in range(NC)])
+    data = np.stack([
+        np.fft.fft2(coils*image*(islice+1), norm="ortho")
+        for islice in range(NSlice)]).astype(DTYPE)
+    data[..., 1::4, :] = 0
+    return data
+
+
+class NLINVOpenCLTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        par["DTYPE"] = DTYPE
+        par["DTYPE_real"] = DTYPE_real
+        self.par = par
+
+        self.data = setupData()
+
+    def test_weights(self):
+        shape = self.data.shape[-2:]
+        np.testing.assert_allclose(
+            weights(shape),
+            nlinvns._fftshift2(nlinvns._weights(*shape)),
+            rtol=1e-6)
+
+    def test_nlinv(self):
+        with NLINVOpenCL(self.par, self.data.shape, 3) as nlinv:
+            for islice in range(self.data.shape[0]):
+                nlinv.submit(islice, self.data[islice])
+            C, image = nlinv.results()
+        for islice in range(self.data.shape[0]):
+            result = nlinvns.nlinvns(self.data[islice], 3, True, False)
+            np.testing.assert_allclose(
+                C[:, islice], result[2:, -1],
+                rtol=RTOL, atol=RTOL*np.abs(result[2:, -1]).max())
+            np.testing.assert_allclose(
+                image[islice], result[0, -1],
+                rtol=RTOL, atol=RTOL*np.abs(result[0, -1]).max())
+
+
+class NLINVPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.data = setupData()
+
+    def test_nlinv(self):
+        with NLINVPool(self.data.shape, workers=2, n=3) as nlinv:
+            self.assertEqual(nlinv.workers, 2)
+            names = [shm.name for shm in nlinv._shm]
+            for islice in range(self.data.shape[0]):
+                nlinv.submit(islice, self.data[islice])
+            C, image = nlinv.results()
+        self.assertEqual(C.shape, (self.data.shape[1], self.data.shape[0])
+                         + self.data.shape[2:])
+        for islice in range(self.data.shape[0]):
+            result = nlinvns.nlinvns(self.data[islice], 3, True, False)
+            np.testing.assert_allclose(
+                C[:, islice], result[2:, -1],
+                rtol=RTOL, atol=RTOL*np.abs(result[2:, -1]).max())
+            np.testing.assert_allclose(
+                image[islice], result[0, -1],
+                rtol=RTOL, atol=RTOL*np.abs(result[0, -1]).max())
+        # The shared memory is released once the pool is closed.
+        for name in names:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
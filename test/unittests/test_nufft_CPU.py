@@ -0,0 +1,151 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+import pyopencl.array as clarray
+
+import pyqmri
+from pyqmri._helper_fun import _goldcomp as goldcomp
+from pyqmri._helper_fun import _utils as utils
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+RTOL = 1e-5
+
+
+class tmpArgs():
+    pass
+
+
+def setupPar(par):
+    par["NScan"] = 5
+    par["NC"] = 2
+    par["NSlice"] = 1
+    par["dimX"] = 32
+    par["dimY"] = 32
+    par["Nproj"] = 16
+    par["N"] = 64
+    par["is3D"] = False
+    par["fft_dim"] = (-2, -1)
+    par["DTYPE"] = DTYPE
+    par["DTYPE_real"] = DTYPE_real
+    par["ogf"] = par["N"] / par["dimX"]
+    angles = (np.arange(par["NScan"]*par["Nproj"]) * np.pi
+              / ((1+np.sqrt(5))/2)).reshape(par["NScan"], par["Nproj"])
+    radius = np.arange(-par["N"]/2, par["N"]/2) / 2 * par["ogf"]
+    par["traj"] = np.stack(
+        (radius*np.cos(angles)[..., None],
+         radius*np.sin(angles)[..., None]),
+        axis=-1).astype(DTYPE_real)
+    par["dcf"] = np.require(
+        np.abs(np.sqrt(np.array(goldcomp.cmp(par["traj"]),
+                                dtype=DTYPE_real))),
+        DTYPE_real, requirements='C')
+
+
+class CoilCombinedTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        setupPar(par)
+        self.par = par
+        self.queue = par["queue"][0]
+
+        rng = np.random.default_rng(0)
+        shape = (par["NScan"], par["NC"], par["NSlice"],
+                 par["Nproj"], par["N"])
+        self.kspace = (rng.standard_normal(shape)
+                       + 1j*rng.standard_normal(shape)).astype(DTYPE)
+        shape = (par["NC"], par["NSlice"], par["dimY"], par["dimX"])
+        self.coils = (rng.standard_normal(shape)
+                      + 1j*rng.standard_normal(shape)).astype(DTYPE)
+
+    def reference(self):
+        par = self.par
+        FT = utils.NUFFT(par, NScan=1, NC=1)
+        ref = np.zeros((par["NScan"],)+self.coils.shape[1:], dtype=DTYPE)
+        for scan in range(par["NScan"]):
+            for coil in range(par["NC"]):
+                ksp = clarray.to_device(
+                    self.queue, self.kspace[scan:scan+1, coil:coil+1])
+                img = clarray.zeros(
+                    self.queue, (1, 1)+self.coils.shape[1:], dtype=DTYPE)
+                img.add_event(FT.FFTH(img, ksp, scan_offset=scan))
+                ref[scan] += np.conj(self.coils[coil])*img.get()[0, 0]
+        return ref
+
+    def test_coil_combined(self):
+        # Blocks of two scans, the last block is shifted back by one scan.
+        FT = utils.NUFFT(self.par, NScan=2, NC=self.par["NC"])
+        images = FT.FFTH_coil_combined(self.kspace, self.coils)
+        ref = self.reference()
+        np.testing.assert_allclose(images, ref,
+                                   rtol=RTOL, atol=RTOL*np.abs(ref).max())
+
+    def test_too_few_scans(self):
+        FT = utils.NUFFT(self.par, NScan=2, NC=self.par["NC"])
+        with self.assertRaises(ValueError):
+            FT.FFTH_coil_combined(self.kspace[:1], self.coils)
+
+
+class CSRGriddingTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        setupPar(par)
+        self.par = par
+        self.queue = par["queue"][0]
+
+        par["csr_gridding"] = True
+        self.FT_csr = utils.NUFFT(par, NScan=2, NC=par["NC"])
+        par["csr_gridding"] = False
+        self.FT = utils.NUFFT(par, NScan=2, NC=par["NC"])
+
+        rng = np.random.default_rng(0)
+        self.img_shape = (2, par["NC"], par["NSlice"],
+                          par["dimY"], par["dimX"])
+        self.ksp_shape = (2, par["NC"], par["NSlice"],
+                          par["Nproj"], par["N"])
+        self.image = (rng.standard_normal(self.img_shape)
+                      + 1j*rng.standard_normal(self.img_shape)).astype(DTYPE)
+        self.kspace = (rng.standard_normal(self.ksp_shape)
+                       + 1j*rng.standard_normal(self.ksp_shape)).astype(DTYPE)
+
+    def test_csr_used(self):
+        self.assertTrue(self.FT_csr._use_csr)
+        self.assertFalse(self.FT._use_csr)
+
+    def test_fwd(self):
+        inp = clarray.to_device(self.queue, self.image)
+        for scan_offset in (0, 3):
+            results = []
+            for FT in (self.FT_csr, self.FT):
+                out = clarray.zeros(self.queue, self.ksp_shape, dtype=DTYPE)
+                out.add_event(FT.FFT(out, inp, scan_offset=scan_offset))
+                results.append(out.get())
+            np.testing.assert_allclose(
+                results[0], results[1],
+                rtol=RTOL, atol=RTOL*np.abs(results[1]).max())
+
+    def test_adj(self):
+        inp = clarray.to_device(self.queue, self.kspace)
+        for scan_offset in (0, 3):
+            results = []
+            for FT in (self.FT_csr, self.FT):
+                out = clarray.zeros(self.queue, self.img_shape, dtype=DTYPE)
+                out.add_event(FT.FFTH(out, inp, scan_offset=scan_offset))
+                results.append(out.get())
+            np.testing.assert_allclose(
+                results[0], results[1],
+                rtol=RTOL, atol=RTOL*np.abs(results[1]).max())
@@ -0,0 +1,80 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+import pyopencl.array as clarray
+
+import pyqmri
+from pyqmri._helper_fun._opnorm import OperatorNorm
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+RTOL = 1e-2
+
+
+class tmpArgs():
+    pass
+
+
+class OperatorNormTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        self.queue = par["queue"][0]
+
+        self.shape = (2, 4, 8, 8)
+        diag = np.linspace(0.1, 1, np.prod(self.shape)).reshape(self.shape)
+        diag[0, 0, 0, 0] = 4
+        self.diag = clarray.to_device(self.queue, diag.astype(DTYPE))
+        self.opnorm = OperatorNorm(self.queue, DTYPE, max_iters=500)
+
+    def normal(self, out, inp):
+        out[...] = self.diag * inp
+
+    def test_estimate(self):
+        norm = self.opnorm.estimate("diag", self.shape, self.normal,
+                                    self.shape)
+        np.testing.assert_allclose(norm, 2, rtol=RTOL)
+
+    def test_cache(self):
+        norm = self.opnorm.estimate("diag", self.shape, self.normal,
+                                    self.shape)
+        self.diag *= DTYPE(4)
+        self.assertEqual(
+            self.opnorm.estimate("diag", self.shape, self.normal,
+                                 self.shape),
+            norm)
+        np.testing.assert_allclose(
+            self.opnorm.estimate("diag", self.shape, self.normal,
+                                 self.shape, cached=False),
+            4, rtol=RTOL)
+        self.assertLessEqual(self.opnorm.iterations["diag"], 2)
+
+    def test_start(self):
+        start = np.zeros(self.shape, dtype=DTYPE)
+        start[0, 0, 0, 0] = 1
+        norm = self.opnorm.estimate("diag", self.shape, self.normal,
+                                    self.shape, start=start)
+        np.testing.assert_allclose(norm, 2, rtol=1e-6)
+        self.assertLessEqual(self.opnorm.iterations["diag"], 2)
+
+    def test_instance_names(self):
+        first, second = object(), object()
+        norm = self.opnorm.estimate(first, self.shape, self.normal,
+                                    self.shape)
+        self.diag *= DTYPE(4)
+        # Operators of the same class and shape are cached separately.
+        self.assertEqual(
+            self.opnorm.estimate(first, self.shape, self.normal,
+                                 self.shape),
+            norm)
+        np.testing.assert_allclose(
+            self.opnorm.estimate(second, self.shape, self.normal,
+                                 self.shape),
+            4, rtol=RTOL)
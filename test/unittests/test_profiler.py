@@ -0,0 +1,43 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import pyopencl as cl
+
+from pyqmri._helper_fun._profiler import Profiler
+
+
+class ProfilerSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.profiler = Profiler()
+        self.enqueue_copy = cl.enqueue_copy
+
+    def tearDown(self):
+        cl.enqueue_copy = self.enqueue_copy
+
+    def test_restore(self):
+        with self.profiler.session():
+            self.assertTrue(self.profiler.enabled)
+            self.assertIsNot(cl.enqueue_copy, self.enqueue_copy)
+        self.assertFalse(self.profiler.enabled)
+        self.assertIs(cl.enqueue_copy, self.enqueue_copy)
+
+    def test_restore_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.profiler.session():
+                with self.profiler.phase("failing"):
+                    raise RuntimeError
+        self.assertFalse(self.profiler.enabled)
+        self.assertIs(cl.enqueue_copy, self.enqueue_copy)
+
+    def test_disabled(self):
+        with self.profiler.session(False):
+            self.assertFalse(self.profiler.enabled)
+        self.assertIs(cl.enqueue_copy, self.enqueue_copy)
+
+    def test_reset(self):
+        with self.profiler.session():
+            with self.profiler.phase("first"):
+                pass
+        with self.profiler.session():
+            self.assertEqual(self.profiler.phases, {})
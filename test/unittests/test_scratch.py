@@ -0,0 +1,23 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+
+from pyqmri._helper_fun._scratch import HostStorage
+
+
+class HostStorageTest(unittest.TestCase):
+    def test_backend(self):
+        with self.assertRaisesRegex(ValueError, "ram or memmap"):
+            HostStorage("disk")
+
+    def test_memmap(self):
+        storage = HostStorage("memmap")
+        arr = storage.zeros("x", (2, 3), np.complex64)
+        arr[...] = 1
+        # Reused and zeroed if requested again.
+        self.assertIs(storage.zeros("x", (2, 3), np.complex64), arr)
+        np.testing.assert_equal(arr, 0)
+        arr[...] = 1
+        np.testing.assert_equal(storage.copy("y", arr), 1)
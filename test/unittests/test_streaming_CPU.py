@@ -0,0 +1,164 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+import pyopencl as cl
+from pkg_resources import resource_filename
+
+import pyqmri
+from pyqmri import streaming
+from pyqmri._helper_fun import CLProgram as Program
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+RTOL = 1e-5
+
+
+class tmpArgs():
+    pass
+
+
+class StreamTest(unittest.TestCase):
+    reverse = False
+    pinned = True
+
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = True
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        self.queue = par["queue"]
+        self.num_dev = len(par["ctx"])
+        self.prg = [
+            cl.Program(ctx, """
+                __kernel void scale(__global float2 *out,
+                                    __global float2 *in)
+                {
+                    size_t i = get_global_id(0);
+                    out[i] = 2*in[i];
+                }""").build() for ctx in par["ctx"]]
+
+        self.shape = (11, 3, 4, 5)
+        rng = np.random.default_rng(0)
+        self.inp = (rng.standard_normal(self.shape)
+                    + 1j*rng.standard_normal(self.shape)).astype(DTYPE)
+        self.stream = streaming.Stream(
+            [self.scale], [self.shape], [[self.shape]], 2, 1,
+            self.shape[0], self.queue, self.num_dev, self.reverse,
+            [False], DTYPE=DTYPE, DTYPE_real=DTYPE_real,
+            pinned=self.pinned)
+
+    def scale(self, outp, inp, par=None, idx=0, idxq=0,
+              bound_cond=0, wait_for=None):
+        if wait_for is None:
+            wait_for = []
+        return self.prg[idx].scale(
+            self.queue[4*idx+idxq], (outp.size,), None,
+            outp.data, inp[0].data,
+            wait_for=outp.events+inp[0].events+wait_for)
+
+    def test_eval(self):
+        outp = np.zeros_like(self.inp)
+        self.stream.eval([outp], [[self.inp]])
+        np.testing.assert_allclose(outp, 2*self.inp, rtol=RTOL)
+        efficiency = self.stream.overlap_efficiency
+        self.assertTrue(efficiency is None or 0 <= efficiency <= 1)
+        for bandwidth in (self.stream.bandwidth_todevice,
+                          self.stream.bandwidth_tohost):
+            self.assertTrue(bandwidth is None or bandwidth > 0)
+
+    def test_evalwithnorm(self):
+        outp = np.zeros_like(self.inp)
+        lhs, rhs = self.stream.evalwithnorm([outp], [[self.inp]])
+        np.testing.assert_allclose(outp, 2*self.inp, rtol=RTOL)
+        self.assertEqual(lhs, 0)
+        # Each slice enters the norm once, also for the padded last block.
+        np.testing.assert_allclose(rhs, np.linalg.norm(self.inp)**2,
+                                   rtol=1e-4)
+
+    def test_staging(self):
+        # Pinned staging falls back to direct copies if allocation fails.
+        for staging in self.stream.outp_pinned[0]:
+            self.assertEqual(staging is not None, self.stream.pinned)
+
+    def test_repeated_eval(self):
+        outp = np.zeros_like(self.inp)
+        for factor in range(1, 4):
+            self.stream.eval([outp], [[self.inp*factor]])
+            np.testing.assert_allclose(outp, 2*factor*self.inp, rtol=RTOL)
+
+
+class StreamReverseTest(StreamTest):
+    reverse = True
+
+
+class StreamPageableTest(StreamTest):
+    pinned = False
+
+    def test_staging(self):
+        self.assertFalse(self.stream.pinned)
+        self.assertTrue(all(staging is None
+                            for staging in self.stream.outp_pinned[0]))
+
+
+class StreamOperatorTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = True
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        par["NSlice"] = 7
+        par["NScan"] = 3
+        par["NC"] = 1
+        par["dimY"] = 6
+        par["dimX"] = 5
+        par["N"] = 5
+        par["Nproj"] = 6
+        par["unknowns_TGV"] = 2
+        par["unknowns_H1"] = 0
+        par["unknowns"] = 2
+        par["dz"] = 1
+        par["weights"] = np.ones(2, dtype=DTYPE_real)
+        par["overlap"] = 1
+        par["par_slices"] = 2
+        par["is3D"] = False
+
+        file = resource_filename(
+            'pyqmri', 'kernels/OpenCL_Kernels_streamed.c')
+        prg = []
+        for ctx in par["ctx"]:
+            with open(file) as myfile:
+                prg.append(Program(ctx, myfile.read()))
+        self.op = pyqmri.operator.OperatorImagespaceStreamed(
+            par, prg, DTYPE=DTYPE, DTYPE_real=DTYPE_real)
+
+        rng = np.random.default_rng(0)
+        shape = self.op.unknown_shape
+        self.x = (rng.standard_normal(shape)
+                  + 1j*rng.standard_normal(shape)).astype(DTYPE)
+        shape = (par["NSlice"], par["unknowns"], par["NScan"],
+                 par["dimY"], par["dimX"])
+        self.grad = (rng.standard_normal(shape)
+                     + 1j*rng.standard_normal(shape)).astype(DTYPE)
+
+    def test_eval(self):
+        outp = np.zeros(self.op.data_shape, dtype=DTYPE)
+        self.op.fwdstr.eval([outp], [[self.x, [], self.grad]])
+        np.testing.assert_allclose(
+            outp, np.einsum('kuzyx,kuyx->kzyx', self.grad, self.x),
+            rtol=RTOL, atol=RTOL)
+
+    def test_shape_mismatch(self):
+        shape = self.op.data_shape
+        outp = np.zeros(shape[:2]+(1,)+shape[2:], dtype=DTYPE)
+        with self.assertRaisesRegex(ValueError, "expected"):
+            self.op.fwdstr.eval([outp], [[self.x, [], self.grad]])
+        with self.assertRaisesRegex(ValueError, "expected"):
+            self.op.fwdstr.evalwithnorm([outp], [[self.x, [], self.grad]])
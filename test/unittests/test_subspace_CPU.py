@@ -0,0 +1,235 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+import pyopencl.array as clarray
+from pkg_resources import resource_filename
+
+import pyqmri
+from pyqmri._helper_fun import CLProgram as Program
+from pyqmri._helper_fun import _goldcomp as goldcomp
+from pyqmri._helper_fun._subspace import temporal_basis
+from pyqmri.models.template import constraints
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+RTOL = 1e-4
+
+
+class tmpArgs():
+    pass
+
+
+class ExpDecayModel():
+    def __init__(self, TE):
+        self.TE = TE
+        self.constraints = [constraints(0, 10), constraints(0.01, 1)]
+        self.guess = None
+
+    def execute_forward(self, x):
+        return x[0]*np.exp(-self.TE[:, None, None, None]*x[1])
+
+    def execute_gradient(self, x):
+        decay = np.exp(-self.TE[:, None, None, None]*x[1])
+        return np.stack((decay,
+                         -x[0]*self.TE[:, None, None, None]*decay))
+
+
+def setupPar(par, NScan=8):
+    par["NScan"] = NScan
+    par["NC"] = 2
+    par["NSlice"] = 2
+    par["dimX"] = 32
+    par["dimY"] = 32
+    par["Nproj"] = 16
+    par["N"] = 64
+    par["unknowns_TGV"] = 2
+    par["unknowns_H1"] = 0
+    par["unknowns"] = 2
+    par["dz"] = 1
+    par["weights"] = np.array([1, 1])
+    par["is3D"] = False
+    par["fft_dim"] = (-2, -1)
+    par["ogf"] = par["N"] / par["dimX"]
+    par["DTYPE"] = DTYPE
+    par["DTYPE_real"] = DTYPE_real
+
+
+def radialTrajectory(par, shared):
+    nspokes = par["Nproj"] if shared else par["NScan"]*par["Nproj"]
+    angles = np.arange(nspokes) * np.pi / ((1+np.sqrt(5))/2)
+    angles = np.resize(angles, par["NScan"]*par["Nproj"]).reshape(
+        par["NScan"], par["Nproj"])
+    radius = np.arange(-par["N"]/2, par["N"]/2) / 2 * par["ogf"]
+    par["traj"] = np.stack(
+        (radius*np.cos(angles)[..., None],
+         radius*np.sin(angles)[..., None]),
+        axis=-1).astype(DTYPE_real)
+    par["dcf"] = np.require(
+        np.abs(np.sqrt(np.array(goldcomp.cmp(par["traj"]),
+                                dtype=DTYPE_real))),
+        DTYPE_real, requirements='C')
+
+
+class OperatorKspaceSubspaceTest(unittest.TestCase):
+    trafo = False
+    shared = True
+
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        setupPar(par)
+        if self.trafo:
+            radialTrajectory(par, self.shared)
+        else:
+            par["Nproj"] = par["dimY"]
+            par["N"] = par["dimX"]
+            par["mask"] = np.ones(
+                (par["NScan"], par["NSlice"], par["dimY"], par["dimX"]),
+                dtype=DTYPE_real)
+            if self.shared:
+                par["mask"][..., 1::2, :] = 0
+            else:
+                for scan in range(par["NScan"]):
+                    par["mask"][scan, :, scan % 2::2] = 0
+        self.par = par
+        self.queue = par["queue"][0]
+        prg = Program(
+            par["ctx"][0],
+            open(resource_filename(
+                'pyqmri', 'kernels/OpenCL_Kernels.c')).read())
+
+        rng = np.random.default_rng(0)
+        self.NSub = 3
+        basis, _ = np.linalg.qr(
+            rng.standard_normal((par["NScan"], self.NSub))
+            + 1j*rng.standard_normal((par["NScan"], self.NSub)))
+        self.basis = basis.astype(DTYPE)
+
+        self.op = pyqmri.operator.Operator.MRIOperatorFactory(
+            par, [prg], DTYPE, DTYPE_real, trafo=self.trafo,
+            basis=self.basis)[0]
+        self.op_full = pyqmri.operator.OperatorKspace(
+            par, prg, DTYPE=DTYPE, DTYPE_real=DTYPE_real,
+            trafo=self.trafo)
+
+        vol = (par["NSlice"], par["dimY"], par["dimX"])
+        grad_sub = (rng.standard_normal((par["unknowns"], self.NSub) + vol)
+                    + 1j*rng.standard_normal(
+                        (par["unknowns"], self.NSub) + vol))
+        # Partial derivatives within the span of the basis
+        self.model_gradient = np.require(
+            np.einsum('tk,uk...->ut...', self.basis, grad_sub),
+            DTYPE, 'C')
+        self.C = (rng.standard_normal((par["NC"],) + vol)
+                  + 1j*rng.standard_normal((par["NC"],) + vol)).astype(DTYPE)
+        self.opinfwd = (rng.standard_normal((par["unknowns"],) + vol)
+                        + 1j*rng.standard_normal(
+                            (par["unknowns"],) + vol)).astype(DTYPE)
+        kspace = self.op_full._out_shape_fwd
+        self.opinadj = (rng.standard_normal(kspace)
+                        + 1j*rng.standard_normal(kspace)).astype(DTYPE)
+        self.coil_buf = clarray.to_device(self.queue, self.C)
+        self.grad_buf = clarray.to_device(self.queue, self.model_gradient)
+        self.grad_sub = self.op.projectModelGradient(self.model_gradient)
+
+    def test_adjointness(self):
+        inpfwd = clarray.to_device(self.queue, self.opinfwd)
+        inpadj = clarray.to_device(self.queue, self.opinadj)
+        outfwd = self.op.fwdoop(
+            [inpfwd, self.coil_buf, self.grad_sub]).get()
+        outadj = self.op.adjoop(
+            [inpadj, self.coil_buf, self.grad_sub]).get()
+        a = np.vdot(outfwd, self.opinadj)
+        b = np.vdot(self.opinfwd, outadj)
+        np.testing.assert_allclose(a, b, rtol=RTOL)
+
+    def test_project_gradient(self):
+        np.testing.assert_allclose(
+            self.op.projectModelGradient(self.grad_buf).get(),
+            self.grad_sub.get(), rtol=RTOL, atol=RTOL)
+
+    def test_fwd_equals_full(self):
+        inpfwd = clarray.to_device(self.queue, self.opinfwd)
+        out = self.op.fwdoop([inpfwd, self.coil_buf, self.grad_sub]).get()
+        ref = self.op_full.fwdoop(
+            [inpfwd, self.coil_buf, self.grad_buf]).get()
+        self.assertLess(np.linalg.norm(out-ref)/np.linalg.norm(ref), RTOL)
+
+    def test_adj_equals_full(self):
+        inpadj = clarray.to_device(self.queue, self.opinadj)
+        out = clarray.zeros_like(clarray.to_device(self.queue, self.opinfwd))
+        out.add_event(self.op.adj(
+            out, [inpadj, self.coil_buf, self.grad_sub]))
+        ref = self.op_full.adjoop(
+            [inpadj, self.coil_buf, self.grad_buf]).get()
+        out = out.get()
+        self.assertLess(np.linalg.norm(out-ref)/np.linalg.norm(ref), RTOL)
+
+    def test_fft_scans(self):
+        images = (self.C * np.ones(
+            (self.par["NScan"],) + self.C.shape)).astype(DTYPE)
+        images *= np.arange(1, self.par["NScan"]+1)[:, None, None, None,
+                                                    None]
+        ref = clarray.zeros(self.queue, self.op_full._out_shape_fwd,
+                            dtype=DTYPE)
+        self.op_full.NUFFT.FFT(
+            ref, clarray.to_device(self.queue, images)).wait()
+        np.testing.assert_allclose(self.op.FFTScans(images), ref.get(),
+                                   rtol=RTOL, atol=RTOL)
+
+
+class OperatorKspaceSubspaceCartesianDistinctTest(
+        OperatorKspaceSubspaceTest):
+    trafo = False
+    shared = False
+
+    def test_kspace_expansion(self):
+        self.assertFalse(self.op._expand_kspace)
+
+
+class OperatorKspaceSubspaceRadialTest(OperatorKspaceSubspaceTest):
+    trafo = True
+    shared = True
+
+    def test_kspace_expansion(self):
+        self.assertTrue(self.op._expand_kspace)
+        self.assertEqual(self.op.NUFFT.NScan, self.NSub)
+
+
+class OperatorKspaceSubspaceRadialDistinctTest(OperatorKspaceSubspaceTest):
+    trafo = True
+    shared = False
+
+    def test_kspace_expansion(self):
+        self.assertFalse(self.op._expand_kspace)
+
+
+class TemporalBasisTest(unittest.TestCase):
+    def setUp(self):
+        self.par = {}
+        setupPar(self.par, NScan=16)
+        self.model = ExpDecayModel(np.linspace(0.1, 8, self.par["NScan"]))
+
+    def test_basis(self):
+        basis, energy = temporal_basis(self.model, self.par, 4)
+        self.assertEqual(basis.shape, (self.par["NScan"], 4))
+        np.testing.assert_allclose(basis.conj().T @ basis, np.eye(4),
+                                   atol=1e-5)
+        self.assertGreater(energy, 0.99)
+        signal = self.model.execute_forward(
+            np.array([1, 0.3])[:, None, None, None]*np.ones(
+                (2, 1, 1, 1)))[:, 0, 0, 0]
+        residual = signal - basis @ (basis.conj().T @ signal)
+        self.assertLess(np.linalg.norm(residual)/np.linalg.norm(signal),
+                        1e-2)
+
+    def test_rank(self):
+        with self.assertRaises(ValueError):
+            temporal_basis(self.model, self.par, self.par["NScan"]+1)
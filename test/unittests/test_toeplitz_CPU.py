@@ -0,0 +1,103 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import numpy as np
+import pyopencl.array as clarray
+
+import pyqmri
+from pyqmri.transforms import PyOpenCLnuFFT
+from pyqmri._helper_fun import _goldcomp as goldcomp
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+RTOL = 2e-2
+
+
+class tmpArgs():
+    pass
+
+
+class ToeplitzNormalTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        par["NScan"] = 2
+        par["NC"] = 2
+        par["NSlice"] = 1
+        par["dimX"] = 32
+        par["dimY"] = 32
+        par["Nproj"] = 16
+        par["N"] = 64
+        par["is3D"] = False
+        par["fft_dim"] = (-2, -1)
+        par["ogf"] = par["N"] / par["dimX"]
+        angles = (np.arange(par["NScan"]*par["Nproj"]) * np.pi
+                  / ((1+np.sqrt(5))/2)).reshape(par["NScan"], par["Nproj"])
+        radius = np.arange(-par["N"]/2, par["N"]/2) / 2 * par["ogf"]
+        par["traj"] = np.stack(
+            (radius*np.cos(angles)[..., None],
+             radius*np.sin(angles)[..., None]),
+            axis=-1).astype(DTYPE_real)
+        par["dcf"] = np.require(
+            np.abs(np.sqrt(np.array(goldcomp.cmp(par["traj"]),
+                                    dtype=DTYPE_real))),
+            DTYPE_real, requirements='C')
+        par["toeplitz"] = True
+        self.par = par
+        self.queue = par["queue"][0]
+        self.FT = PyOpenCLnuFFT.create(par["ctx"][0], self.queue, par,
+                                       DTYPE=DTYPE, DTYPE_real=DTYPE_real,
+                                       radial=True)
+        self.shape = (par["NScan"], par["NC"], par["NSlice"],
+                      par["dimY"], par["dimX"])
+
+        y, x = np.mgrid[:par["dimY"], :par["dimX"]]
+        image = (np.exp(-((y-16)**2 + (x-15)**2)/40)
+                 * np.exp(1j*np.pi*x/par["dimX"]))
+        self.image = (np.ones(self.shape)*image).astype(DTYPE)
+        rng = np.random.default_rng(0)
+        self.random = (rng.standard_normal(self.shape)
+                       + 1j*rng.standard_normal(self.shape)).astype(DTYPE)
+
+    def normal(self, x, scan_offset=0):
+        inp = clarray.to_device(self.queue, x)
+        out = clarray.zeros_like(inp)
+        out.add_event(self.FT.normal(out, inp, scan_offset=scan_offset))
+        return out.get()
+
+    def test_gridding(self):
+        inp = clarray.to_device(self.queue, self.image)
+        kspace = clarray.zeros(
+            self.queue,
+            self.shape[:3] + (self.par["Nproj"], self.par["N"]),
+            dtype=DTYPE)
+        ref = clarray.zeros_like(inp)
+        kspace.add_event(self.FT.FFT(kspace, inp))
+        ref.add_event(self.FT.FFTH(ref, kspace))
+        ref = ref.get()
+        out = self.normal(self.image)
+        self.assertLess(
+            np.linalg.norm(out-ref)/np.linalg.norm(ref), RTOL)
+
+    def test_hermitian(self):
+        rng = np.random.default_rng(1)
+        other = (rng.standard_normal(self.shape)
+                 + 1j*rng.standard_normal(self.shape)).astype(DTYPE)
+        lhs = np.vdot(other, self.normal(self.random))
+        rhs = np.vdot(self.normal(other), self.random)
+        np.testing.assert_allclose(lhs, rhs, rtol=1e-4)
+        self.assertGreater(
+            np.vdot(self.random, self.normal(self.random)).real, 0)
+
+    def test_scan_offset(self):
+        out = self.normal(self.random)
+        inp = clarray.to_device(self.queue, self.random[1:])
+        inp.add_event(self.FT.normal(inp, inp, scan_offset=1))
+        np.testing.assert_allclose(inp.get(), out[1:], rtol=1e-5,
+                                   atol=1e-5*np.abs(out).max())
@@ -0,0 +1,147 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import types
+
+import numpy as np
+import pyopencl.array as clarray
+from pkg_resources import resource_filename
+
+import pyqmri
+from pyqmri._helper_fun import CLProgram as Program
+from pyqmri.models.template import constraints
+from pyqmri.solver import PDBaseSolver
+
+DTYPE = np.complex64
+DTYPE_real = np.float32
+RTOL = 1e-5
+
+
+class tmpArgs():
+    pass
+
+
+def setupPar(par):
+    par["NScan"] = 3
+    par["NC"] = 2
+    par["NSlice"] = 2
+    par["dimX"] = 16
+    par["dimY"] = 16
+    par["Nproj"] = 16
+    par["N"] = 16
+    par["unknowns_TGV"] = 2
+    par["unknowns_H1"] = 0
+    par["unknowns"] = 2
+    par["dz"] = 1
+    par["weights"] = np.ones(2, dtype=DTYPE_real)
+    par["overlap"] = 1
+    par["par_slices"] = 1
+    par["is3D"] = False
+    par["fft_dim"] = (-2, -1)
+    par["mask"] = np.ones((par["dimY"], par["dimX"]), dtype=DTYPE_real)
+    par["DTYPE"] = DTYPE
+    par["DTYPE_real"] = DTYPE_real
+
+
+class WarmStartTest(unittest.TestCase):
+    def setUp(self):
+        parser = tmpArgs()
+        parser.streamed = False
+        parser.devices = -1
+        parser.use_GPU = False
+
+        par = {}
+        pyqmri.pyqmri._setupOCL(parser, par)
+        setupPar(par)
+        with open(resource_filename(
+                'pyqmri', 'kernels/OpenCL_Kernels.c')) as myfile:
+            self.prg = [Program(par["ctx"][0], myfile.read())]
+        self.par = par
+        self.queue = par["queue"][0]
+
+        self.op, _ = pyqmri.operator.Operator.MRIOperatorFactory(
+            par, self.prg, DTYPE, DTYPE_real, trafo=False)
+        self.grad_op = pyqmri.operator.Operator.GradientOperatorFactory(
+            par, self.prg, DTYPE, DTYPE_real)
+        self.symgrad_op = \
+            pyqmri.operator.Operator.SymGradientOperatorFactory(
+                par, self.prg, DTYPE, DTYPE_real)
+
+        rng = np.random.default_rng(0)
+        shape = (par["NC"], par["NSlice"], par["dimY"], par["dimX"])
+        self.coils = clarray.to_device(self.queue, (
+            rng.standard_normal(shape)
+            + 1j*rng.standard_normal(shape)).astype(DTYPE))
+        self.modelgrad = clarray.to_device(self.queue, np.ones(
+            (par["unknowns"], par["NScan"], par["NSlice"], par["dimY"],
+             par["dimX"]), dtype=DTYPE))
+        x = np.zeros((par["unknowns"], par["NSlice"], par["dimY"],
+                      par["dimX"]), dtype=DTYPE)
+        x[:, :, 4:12, 4:12] = 1
+        data = self.op.fwdoop(
+            [clarray.to_device(self.queue, x), self.coils,
+             self.modelgrad]).get()
+        self.data = (data + 0.05*(
+            rng.standard_normal(data.shape)
+            + 1j*rng.standard_normal(data.shape))).astype(DTYPE)
+        self.guess = (np.zeros_like(x), np.zeros(x.shape+(4,), dtype=DTYPE))
+
+    def solver(self, warm_start):
+        irgn_par = {"delta": 1, "omega": 0, "gamma": 1e-2, "lambd": 1,
+                    "rtol": 0, "atol": 0, "stag": 0, "beta": 1,
+                    "display_iterations": False, "gap_every": 5,
+                    "warm_start": warm_start}
+        model = types.SimpleNamespace(
+            constraints=[constraints() for _ in range(
+                self.par["unknowns"])])
+        pdop = PDBaseSolver.factory(
+            self.prg, self.par["queue"], self.par, irgn_par, 1, self.coils,
+            linops=(self.op, self.grad_op, self.symgrad_op), model=model,
+            reg_type="TGV", DTYPE=DTYPE, DTYPE_real=DTYPE_real)
+        pdop.modelgrad = self.modelgrad
+        return pdop, irgn_par
+
+    def step(self, pdop, irgn_par, gamma, inp):
+        irgn_par["gamma"] = gamma
+        pdop.updateRegPar(irgn_par)
+        result = pdop.run(inp, self.data, 10)
+        return (result["x"].get(), result["v"].get())
+
+    def test_warm_start(self):
+        pdop, irgn_par = self.solver(True)
+        inp = self.step(pdop, irgn_par, 1e-2, self.guess)
+        dual_vars = pdop._resident[4]
+        duals = {key: dual_vars[key].get() for key in ("r", "z1", "z2")}
+        self.assertGreater(np.abs(duals["z1"]).max(), 0)
+
+        irgn_par["gamma"] = 5e-3
+        pdop.updateRegPar(irgn_par)
+        # The duals are kept and rescaled to the new parameters, z1 with
+        # alpha and z2 with beta, r is bound by the unchanged lambda.
+        self.assertIs(pdop._resident[4], dual_vars)
+        np.testing.assert_allclose(dual_vars["z1"].get(), 0.5*duals["z1"],
+                                   rtol=RTOL)
+        np.testing.assert_allclose(dual_vars["z2"].get(), 0.5*duals["z2"],
+                                   rtol=RTOL)
+        np.testing.assert_allclose(dual_vars["r"].get(), duals["r"],
+                                   rtol=RTOL)
+
+        pdop.run(inp, self.data, 10)
+        self.assertIs(pdop._resident[4], dual_vars)
+        self.assertEqual(len(pdop.iterations), 2)
+
+    def test_cold_start(self):
+        pdop, irgn_par = self.solver(False)
+        inp = self.step(pdop, irgn_par, 1e-2, self.guess)
+        self.assertIsNone(pdop._resident)
+        second = self.step(pdop, irgn_par, 5e-3, inp)
+        self.assertIsNone(pdop._resident)
+
+        # The second step does not depend on the state of the first one.
+        other, other_par = self.solver(False)
+        self.step(other, other_par, 1e-1, self.guess)
+        ref = self.step(other, other_par, 5e-3, inp)
+        for out, expected in zip(second, ref):
+            np.testing.assert_allclose(out, expected, rtol=RTOL,
+                                       atol=RTOL*np.abs(expected).max())